@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark: always-on providers (`start all`) vs the on-demand activator
+(`activate start all`) — resident processes and memory while idle, and
+request latency (first request after idle, warm requests).
+
+Usage:
+    python3 benchmarks/bench_activator.py [--requests 200] [--proxy-delay 0.3]
+
+Runs a copy of core/ in a temp directory with free ports and a stand-in
+cli-proxy-api that sleeps --proxy-delay before binding its port.  Memory
+is the summed VmRSS of the proxy processes (Linux /proc; the stand-in is
+a Python process, so compare counts rather than absolute sizes).  POSIX
+only.
+"""
+
+import argparse
+import http.client
+import os
+import re
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PROVIDERS = ("antigravity", "claude", "openai", "gemini")
+
+_FAKE_BINARY = """#!{python}
+import http.server, re, sys, time
+cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+port = int(re.search(r"(?m)^port:\\s*(\\d+)", cfg).group(1))
+time.sleep({delay})
+
+class H(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *a):
+        pass
+
+print("API server started successfully on: 127.0.0.1:%d" % port, flush=True)
+http.server.ThreadingHTTPServer(("127.0.0.1", port), H).serve_forever()
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _setup(tmp, proxy_delay):
+    shutil.copytree(str(REPO_ROOT / "core"), str(tmp / "core"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    constants = tmp / "core" / "constants.py"
+    src = constants.read_text()
+    ports = {}
+    for provider in PROVIDERS:
+        ports[provider] = _free_port()
+        src = re.sub(r'("{}":\s*)\d+'.format(provider), r"\g<1>{}".format(ports[provider]), src, count=1)
+    constants.write_text(src)
+    exe = tmp / "cli-proxy-api"
+    exe.write_text(_FAKE_BINARY.format(python=sys.executable, delay=proxy_delay))
+    exe.chmod(exe.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    (tmp / "config.yaml").write_text('port: 0\nauth-dir: "tokens"\n')
+    (tmp / "tokens").mkdir()
+    env = dict(os.environ, CC_PROXY_TOKEN_DIR=str(tmp / "tokens"), CC_PROXY_DAEMON="0")
+    return env, ports
+
+
+def _cc_proxy(tmp, env, *args):
+    proc = subprocess.run([sys.executable, str(tmp / "core" / "cc_proxy.py")] + list(args),
+                          env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if proc.returncode != 0:
+        raise SystemExit("{} failed:\n{}".format(" ".join(args), proc.stdout))
+
+
+def _proxy_processes(tmp):
+    """(count, summed VmRSS in KiB) of processes running from *tmp*."""
+    count = rss = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            cmdline = Path("/proc", entry, "cmdline").read_bytes()
+            status = Path("/proc", entry, "status").read_text()
+        except OSError:
+            continue
+        if str(tmp).encode() not in cmdline:
+            continue
+        count += 1
+        m = re.search(r"(?m)^VmRSS:\s*(\d+)", status)
+        rss += int(m.group(1)) if m else 0
+    return count, rss
+
+
+def _request_ms(port):
+    t0 = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("POST", "/v1/messages", body=b"{}")
+        conn.getresponse().read()
+    except http.client.HTTPException:
+        pass   # the stand-in has no POST handler; any reply counts
+    finally:
+        conn.close()
+    return (time.perf_counter() - t0) * 1000
+
+
+def _warm_ms(port, n):
+    samples = sorted(_request_ms(port) for _ in range(n))
+    return samples[len(samples) // 2]
+
+
+def _measure(tmp, env, ports, requests, start_args):
+    _cc_proxy(tmp, env, *start_args)
+    time.sleep(0.5)
+    idle = _proxy_processes(tmp)
+    first = _request_ms(ports["claude"])
+    warm = _warm_ms(ports["claude"], requests)
+    _cc_proxy(tmp, env, "stop")
+    return idle, first, warm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--proxy-delay", type=float, default=0.3, help="stand-in binary startup (s)")
+    args = parser.parse_args()
+    if os.name == "nt" or not os.path.isdir("/proc"):
+        print("needs POSIX stand-in scripts and /proc")
+        return 0
+
+    tmp = Path(tempfile.mkdtemp(prefix="ccproxy_bench_act_"))
+    env, ports = _setup(tmp, args.proxy_delay)
+    try:
+        always = _measure(tmp, env, ports, args.requests, ("start", "all"))
+        ondemand = _measure(tmp, env, ports, args.requests, ("activate", "start", "all", "--idle", "600"))
+    finally:
+        _cc_proxy(tmp, env, "stop")
+        shutil.rmtree(str(tmp), ignore_errors=True)
+
+    print("4 providers, proxy startup {:.0f} ms, {} warm requests".format(args.proxy_delay * 1000, args.requests))
+    print("  {:<12} {:>10} {:>12} {:>14} {:>14}".format("", "idle procs", "idle RSS", "first request", "warm (median)"))
+    for name, ((count, rss), first, warm) in (("start all", always), ("activator", ondemand)):
+        print("  {:<12} {:>10} {:>9.1f} MB {:>11.1f} ms {:>11.2f} ms".format(
+            name, count, rss / 1024.0, first, warm))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark: thread-per-account prefetch (previous implementation) vs the
+asyncio prefetch engine, against local stand-in management servers.
+
+Usage:
+    python3 benchmarks/bench_prefetch.py [--accounts 40] [--latency 0.02] [--rounds 3]
+
+Reports wall time and peak live thread count per refresh.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from unittest.mock import patch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "core"))
+sys.path.insert(0, str(REPO_ROOT / "tests"))
+
+import constants
+from constants import PROVIDERS
+from api import _management_api, _proxy_api
+from httppool import pooled_request
+from quota import _QUOTA_SPECS, _api_call_decode, _api_call_payload
+from display import _dedupe_auth_files
+from prefetch import PrefetchEngine
+
+_PREFIX = {"antigravity": "antigravity", "openai": "codex", "claude": "claude", "gemini": "gemini"}
+
+
+def _legacy_fetch_quota(provider, secret, auth_index):
+    """Blocking api-call quota fetch, as quota._fetch_quota_<provider> used to do."""
+    (method, url, headers, body), parse = _QUOTA_SPECS[provider]
+    try:
+        _, raw = pooled_request(constants.PORTS[provider], "POST", "/v0/management/api-call",
+                                body=_api_call_payload(auth_index, method, url, headers, body),
+                                headers={"Authorization": "Bearer " + secret,
+                                         "Content-Type": "application/json"},
+                                timeout=8)
+        return parse(*_api_call_decode(raw))
+    except Exception:
+        return parse(None, None)
+
+
+def _legacy_prefetch_provider(provider):
+    """Thread-per-account fan-out, as display._prefetch_provider_data used to do."""
+    result = {"models_per_account": {}, "quota_data": {}, "proxy_models": None}
+    auth = _dedupe_auth_files(_management_api(provider, "auth-files", "cc"), provider=provider)
+    _management_api(provider, "usage", "cc")
+    files = auth.get("files", [])
+    threads = []
+
+    def _models(f, out):
+        name = f.get("name")
+        qs = "auth-files/models?name={}".format(urllib.parse.quote(name, safe="@.-_"))
+        out[name] = _management_api(provider, qs, "cc").get("models", [])
+
+    def _quota(f, out):
+        out[f["name"]] = _legacy_fetch_quota(provider, "cc", f["auth_index"])
+
+    def _pm():
+        result["proxy_models"] = _proxy_api(provider, "v1/models")
+
+    threads += [threading.Thread(target=_models, args=(f, result["models_per_account"])) for f in files]
+    if provider in _QUOTA_SPECS:
+        threads += [threading.Thread(target=_quota, args=(f, result["quota_data"])) for f in files]
+    threads.append(threading.Thread(target=_pm))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    return result
+
+
+def _legacy_prefetch_all():
+    out = {}
+    threads = [threading.Thread(target=lambda p=p: out.__setitem__(p, _legacy_prefetch_provider(p)))
+               for p in PROVIDERS]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=15)
+    return out
+
+
+def _measure(fn):
+    peak = [threading.active_count()]
+    done = threading.Event()
+
+    def _sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], threading.active_count())
+            done.wait(0.001)
+
+    sampler = threading.Thread(target=_sample, daemon=True)
+    sampler.start()
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    done.set()
+    sampler.join()
+    return wall, peak[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.02, help="server latency per request (s)")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    # Stand-in servers run in a child process so thread counts and GIL time
+    # below belong to the client side only.
+    server = subprocess.Popen(
+        [sys.executable, str(REPO_ROOT / "tests" / "mgmt_stub.py"),
+         "--accounts", str(args.accounts), "--latency", str(args.latency)]
+        + [_PREFIX[p] for p in PROVIDERS],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    ports = json.loads(server.stdout.readline())
+    orig_ports = dict(constants.PORTS)
+    for p in PROVIDERS:
+        constants.PORTS[p] = ports[_PREFIX[p]]
+
+    running = lambda b, p: {"provider": p, "running": True, "healthy": True, "pid": 1, "url": "", "tokens": []}
+    engine = PrefetchEngine()
+    patches = [
+        patch("prefetch.get_status", side_effect=running),
+        patch("prefetch._read_secret_key", return_value="cc"),
+        patch("prefetch._quota_cache_load", return_value=None),
+        patch("prefetch._quota_cache_load_many", return_value={}),
+        patch("prefetch.ledger_ingest_details"),
+        patch("prefetch.ledger_rollups", return_value=None),
+        patch("prefetch._quota_cache_save"),
+        patch("prefetch._usage_cumulative_update_from_live"),
+        patch("prefetch._usage_cumulative_apply_to_usage_data", side_effect=lambda p, d: d),
+    ]
+    for p in patches:
+        p.start()
+    try:
+        base = threading.active_count()
+        print("providers={} accounts/provider={} latency={:.0f}ms baseline_threads={}".format(
+            len(PROVIDERS), args.accounts, args.latency * 1000, base))
+        for label, fn in (
+            ("thread-per-account", _legacy_prefetch_all),
+            ("asyncio engine", lambda: engine.prefetch(Path("."), PROVIDERS, fetch_quota=True, fetch_check=True)),
+        ):
+            walls, peaks = [], []
+            for _ in range(args.rounds):
+                wall, peak = _measure(fn)
+                walls.append(wall)
+                peaks.append(peak)
+            print("  {:<20} wall {:7.1f} ms (best of {})   peak threads {:4d}".format(
+                label, min(walls) * 1000, args.rounds, max(peaks)))
+    finally:
+        for p in patches:
+            p.stop()
+        engine.close()
+        server.stdin.close()
+        server.wait(timeout=10)
+        constants.PORTS.update(orig_ports)
+
+
+if __name__ == "__main__":
+    main()
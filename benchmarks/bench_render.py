@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes written per TUI frame, full-frame repaint (previous
+implementation) vs the ScreenBuffer line-diff renderer.
+
+Usage:
+    python3 benchmarks/bench_render.py [--accounts 120] [--frames 50]
+
+Simulates a session on a synthetic dashboard: the clock ticks every frame
+and the account cursor moves down one row per keypress.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "core"))
+
+from constants import _TUI_CLEAR, _TUI_HOME
+from tui import ScreenBuffer, _tui_frame
+
+SIZE = (140, 400)  # tall enough that no rows are clipped
+
+
+def _synthetic_state(n_accounts):
+    files = [
+        {"name": "claude-user{}@example.com.json".format(i), "email": "user{}@example.com".format(i),
+         "auth_index": "idx{}".format(i), "status": "active", "source": "file",
+         "last_refresh": "2026-03-01T10:00:00Z"}
+        for i in range(n_accounts)
+    ]
+    details = [
+        {"timestamp": "2026-03-01T10:{:02d}:00Z".format(i % 60), "source": f["email"],
+         "tokens": {"input_tokens": 100, "output_tokens": 20, "total_tokens": 120}}
+        for i, f in enumerate(files)
+    ]
+    data = {
+        "status": {"provider": "claude", "running": True, "healthy": True, "pid": 1,
+                   "url": "", "tokens": []},
+        "auth_data": {"files": files},
+        "usage_data": {"usage": {"total_requests": n_accounts, "success_count": n_accounts,
+                                 "failure_count": 0, "total_tokens": 120 * n_accounts,
+                                 "apis": {"k": {"models": {"model-a": {"details": details}}}}}},
+        "usage_source": "live",
+        "models_per_account": {f["name"]: [{"id": "model-a"}] for f in files},
+        "proxy_models": {"data": [{"id": "model-a"}]},
+    }
+    return {"providers": ["claude"], "provider_idx": 0, "account_idx": 0,
+            "data": {"claude": data}, "message": ""}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=120)
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+
+    state = _synthetic_state(args.accounts)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    screen = ScreenBuffer(fd=devnull)
+    full_bytes = []
+    diff_bytes = []
+    clock = iter("2026-03-01 10:{:02d}:{:02d}".format(i // 60 % 60, i % 60) for i in range(10 ** 6))
+    try:
+        with patch("tui.datetime") as fake_dt, \
+                patch("tui.shutil.get_terminal_size", return_value=os.terminal_size(SIZE)):
+            fake_dt.now.return_value.strftime.side_effect = lambda fmt: next(clock)
+            for i in range(args.frames):
+                state["account_idx"] = i % args.accounts
+                text, _ = _tui_frame(Path("."), state)
+                full_bytes.append(len((_TUI_HOME + _TUI_CLEAR + text).encode("utf-8")))
+                diff_bytes.append(screen.render(text, SIZE))
+    finally:
+        os.close(devnull)
+
+    steady_full = sum(full_bytes[1:]) / max(1, len(full_bytes) - 1)
+    steady_diff = sum(diff_bytes[1:]) / max(1, len(diff_bytes) - 1)
+    print("accounts={} frames={} frame_lines={}".format(args.accounts, args.frames, text.count("\n")))
+    print("  {:<20} first {:7d} B   per keypress {:9.0f} B".format("full repaint", full_bytes[0], steady_full))
+    print("  {:<20} first {:7d} B   per keypress {:9.0f} B   ({:.1f}x less)".format(
+        "line diff", diff_bytes[0], steady_diff, steady_full / max(1.0, steady_diff)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: `cc_proxy.py run claude` against an already running proxy, full
+path (CC_PROXY_FAST_RUN=0: token check, config rewrite, port lookup, health
+round trip, claude as a child) vs the fast path (state compare, exec).
+
+Usage:
+    python3 benchmarks/bench_run_fastpath.py [--rounds 20]
+
+Runs a copy of core/ in a temp directory with free ports, a stand-in
+cli-proxy-api and a `claude` on PATH that exits at once, so the numbers
+are cc-proxy's own overhead before claude starts.  POSIX only.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_FAKE_BINARY = """#!{python}
+import http.server, re, sys
+cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+port = int(re.search(r"(?m)^port:\\s*(\\d+)", cfg).group(1))
+
+class H(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *a):
+        pass
+
+print("API server started successfully on: 127.0.0.1:%d" % port, flush=True)
+http.server.HTTPServer(("127.0.0.1", port), H).serve_forever()
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _script(path, text):
+    path.write_text(text)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def _setup(tmp):
+    shutil.copytree(str(REPO_ROOT / "core"), str(tmp / "core"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    constants = tmp / "core" / "constants.py"
+    src = constants.read_text()
+    for provider in ("antigravity", "claude", "openai", "gemini"):
+        src = re.sub(r'("{}":\s*)\d+'.format(provider), r"\g<1>{}".format(_free_port()), src, count=1)
+    constants.write_text(src)
+    _script(tmp / "cli-proxy-api", _FAKE_BINARY.format(python=sys.executable))
+    (tmp / "config.yaml").write_text('port: 0\nauth-dir: "tokens"\n')
+    bin_dir = tmp / "bin"
+    bin_dir.mkdir()
+    _script(bin_dir / "claude", "#!/bin/sh\nexit 0\n")
+    token_dir = tmp / "tokens"
+    token_dir.mkdir()
+    for i in range(3):
+        (token_dir / "claude-user{}@example.com.json".format(i)).write_text(json.dumps(
+            {"type": "claude", "email": "user{}@example.com".format(i), "expired": "2099-01-01T00:00:00Z"}))
+    env = dict(os.environ)
+    env.update({
+        "PATH": "{}{}{}".format(bin_dir, os.pathsep, env.get("PATH", "")),
+        "CC_PROXY_TOKEN_DIR": str(token_dir),
+        "CC_PROXY_DAEMON": "0",
+    })
+    return env
+
+
+def _run(tmp, env):
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, str(tmp / "core" / "cc_proxy.py"), "run", "claude"],
+                          env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit("run failed:\n" + proc.stdout)
+    return elapsed, proc.stdout
+
+
+def _median(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    if os.name == "nt":
+        print("fast path is POSIX only")
+        return 0
+
+    tmp = Path(tempfile.mkdtemp(prefix="ccproxy_bench_run_"))
+    env = _setup(tmp)
+    try:
+        _run(tmp, env)   # starts the proxy and records the run state
+        full_env = dict(env, CC_PROXY_FAST_RUN="0")
+        full = [_run(tmp, full_env)[0] for _ in range(args.rounds)]
+        fast, out = [], ""
+        for _ in range(args.rounds):
+            elapsed, out = _run(tmp, env)
+            fast.append(elapsed)
+        if "Reusing healthy proxy" not in out:
+            raise SystemExit("fast path not taken:\n" + out)
+    finally:
+        subprocess.run([sys.executable, str(tmp / "core" / "cc_proxy.py"), "stop"], env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(str(tmp), ignore_errors=True)
+
+    print("`run claude` with a healthy proxy  (median of {} runs, claude exits at once)".format(args.rounds))
+    print("  full path  {:8.1f} ms".format(_median(full)))
+    print("  fast path  {:8.1f} ms".format(_median(fast)))
+    print("  saved      {:8.1f} ms".format(_median(full) - _median(fast)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
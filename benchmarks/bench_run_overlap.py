@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold `cc_proxy.py run claude` (proxy stopped) until claude's
+first request is answered, sequential start vs CC_PROXY_OVERLAP_START=1.
+
+Usage:
+    python3 benchmarks/bench_run_overlap.py [--rounds 5] [--proxy-delay 0.4] [--claude-delay 0.4]
+
+Runs a copy of core/ in a temp directory with free ports.  The stand-in
+cli-proxy-api sleeps --proxy-delay before binding its port; the stand-in
+`claude` sleeps --claude-delay (its own startup), sends one request to
+ANTHROPIC_BASE_URL and exits.  The proxy is stopped between rounds.
+POSIX only.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_FAKE_BINARY = """#!{python}
+import http.server, re, sys, time
+cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+port = int(re.search(r"(?m)^port:\\s*(\\d+)", cfg).group(1))
+time.sleep({delay})
+
+class H(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *a):
+        pass
+
+print("API server started successfully on: 127.0.0.1:%d" % port, flush=True)
+http.server.HTTPServer(("127.0.0.1", port), H).serve_forever()
+"""
+
+_FAKE_CLAUDE = """#!{python}
+import os, time, urllib.request
+time.sleep({delay})
+urllib.request.urlopen(os.environ["ANTHROPIC_BASE_URL"] + "/", timeout=10).read()
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _script(path, text):
+    path.write_text(text)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def _setup(tmp, proxy_delay, claude_delay):
+    shutil.copytree(str(REPO_ROOT / "core"), str(tmp / "core"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    constants = tmp / "core" / "constants.py"
+    src = constants.read_text()
+    for provider in ("antigravity", "claude", "openai", "gemini"):
+        src = re.sub(r'("{}":\s*)\d+'.format(provider), r"\g<1>{}".format(_free_port()), src, count=1)
+    constants.write_text(src)
+    _script(tmp / "cli-proxy-api", _FAKE_BINARY.format(python=sys.executable, delay=proxy_delay))
+    (tmp / "config.yaml").write_text('port: 0\nauth-dir: "tokens"\n')
+    bin_dir = tmp / "bin"
+    bin_dir.mkdir()
+    _script(bin_dir / "claude", _FAKE_CLAUDE.format(python=sys.executable, delay=claude_delay))
+    (tmp / "tokens").mkdir()
+    env = dict(os.environ)
+    env.update({
+        "PATH": "{}{}{}".format(bin_dir, os.pathsep, env.get("PATH", "")),
+        "CC_PROXY_TOKEN_DIR": str(tmp / "tokens"),
+        "CC_PROXY_DAEMON": "0",
+        "CC_PROXY_FAST_RUN": "0",
+    })
+    return env
+
+
+def _cc_proxy(tmp, env, *args):
+    return subprocess.run([sys.executable, str(tmp / "core" / "cc_proxy.py")] + list(args),
+                          env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def _cold_run(tmp, env):
+    _cc_proxy(tmp, env, "stop")
+    t0 = time.perf_counter()
+    proc = _cc_proxy(tmp, env, "run", "claude")
+    elapsed = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit("run failed:\n" + proc.stdout)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--proxy-delay", type=float, default=0.4, help="stand-in binary startup (s)")
+    parser.add_argument("--claude-delay", type=float, default=0.4, help="stand-in claude startup (s)")
+    args = parser.parse_args()
+    if os.name == "nt":
+        print("stand-in binaries are POSIX scripts")
+        return 0
+
+    tmp = Path(tempfile.mkdtemp(prefix="ccproxy_bench_ov_"))
+    env = _setup(tmp, args.proxy_delay, args.claude_delay)
+    try:
+        seq = [_cold_run(tmp, env) for _ in range(args.rounds)]
+        overlap_env = dict(env, CC_PROXY_OVERLAP_START="1")
+        ovl = [_cold_run(tmp, overlap_env) for _ in range(args.rounds)]
+    finally:
+        _cc_proxy(tmp, env, "stop")
+        shutil.rmtree(str(tmp), ignore_errors=True)
+
+    print("cold `run claude` to first answered request  (best of {}; proxy {:.0f} ms, claude {:.0f} ms startup)".format(
+        args.rounds, args.proxy_delay * 1000, args.claude_delay * 1000))
+    print("  sequential  {:8.1f} ms".format(min(seq) * 1000))
+    print("  overlapped  {:8.1f} ms".format(min(ovl) * 1000))
+    print("  saved       {:8.1f} ms".format((min(seq) - min(ovl)) * 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark: how fast the supervisor notices a crashed provider and has it
+serving again (`supervise start claude`, then SIGKILL the binary).
+
+Usage:
+    python3 benchmarks/bench_supervisor.py [--rounds 4] [--proxy-delay 0.2]
+
+Runs a copy of core/ in a temp directory with free ports and a stand-in
+cli-proxy-api that sleeps --proxy-delay before binding its port.  Each
+round kills the running binary and times (a) until the supervisor state
+file shows the exit and (b) until the port answers again from a new pid.
+Recovery includes the jittered backoff, which doubles each round (the
+crash-loop breaker is raised out of the way).  Without the supervisor
+the provider stays down until someone runs `start`.  POSIX only.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import re
+import shutil
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_FAKE_BINARY = """#!{python}
+import http.server, re, sys, time
+cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+port = int(re.search(r"(?m)^port:\\s*(\\d+)", cfg).group(1))
+time.sleep({delay})
+
+class H(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *a):
+        pass
+
+print("API server started successfully on: 127.0.0.1:%d" % port, flush=True)
+http.server.HTTPServer(("127.0.0.1", port), H).serve_forever()
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _setup(tmp, proxy_delay):
+    shutil.copytree(str(REPO_ROOT / "core"), str(tmp / "core"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    constants = tmp / "core" / "constants.py"
+    src = constants.read_text()
+    port = None
+    for provider in ("antigravity", "claude", "openai", "gemini"):
+        p = _free_port()
+        port = p if provider == "claude" else port
+        src = re.sub(r'("{}":\s*)\d+'.format(provider), r"\g<1>{}".format(p), src, count=1)
+    constants.write_text(src)
+    exe = tmp / "cli-proxy-api"
+    exe.write_text(_FAKE_BINARY.format(python=sys.executable, delay=proxy_delay))
+    exe.chmod(exe.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    (tmp / "config.yaml").write_text('port: 0\nauth-dir: "tokens"\n')
+    (tmp / "tokens").mkdir()
+    env = dict(os.environ, CC_PROXY_TOKEN_DIR=str(tmp / "tokens"), CC_PROXY_DAEMON="0",
+               CC_PROXY_CRASH_LOOP_LIMIT="100")
+    return env, port
+
+
+def _cc_proxy(tmp, env, *args):
+    return subprocess.run([sys.executable, str(tmp / "core" / "cc_proxy.py")] + list(args),
+                          env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def _claude_state(tmp):
+    try:
+        with open(str(tmp / "configs" / ".supervisor.json")) as f:
+            return json.load(f)["providers"]["claude"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _answers(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=0.5)
+    try:
+        conn.request("GET", "/")
+        return conn.getresponse().status == 200
+    except OSError:
+        return False
+    finally:
+        conn.close()
+
+
+def _crash_round(tmp, port):
+    pid = _claude_state(tmp)["pid"]
+    t0 = time.perf_counter()
+    os.kill(pid, signal.SIGKILL)
+    detected = recovered = None
+    while recovered is None:
+        info = _claude_state(tmp)
+        if detected is None and info.get("state") != "running":
+            detected = time.perf_counter() - t0
+        if info.get("state") == "running" and info.get("pid") != pid and _answers(port):
+            recovered = time.perf_counter() - t0
+        if time.perf_counter() - t0 > 120:
+            raise SystemExit("provider did not come back")
+        time.sleep(0.005)
+    return detected, recovered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--proxy-delay", type=float, default=0.2, help="stand-in binary startup (s)")
+    args = parser.parse_args()
+    if os.name == "nt":
+        print("stand-in binaries are POSIX scripts")
+        return 0
+
+    tmp = Path(tempfile.mkdtemp(prefix="ccproxy_bench_sup_"))
+    env, port = _setup(tmp, args.proxy_delay)
+    rows = []
+    try:
+        out = _cc_proxy(tmp, env, "supervise", "start", "claude")
+        if out.returncode != 0:
+            raise SystemExit("supervise start failed:\n" + out.stdout)
+        for _ in range(args.rounds):
+            rows.append(_crash_round(tmp, port))
+    finally:
+        _cc_proxy(tmp, env, "stop")
+        shutil.rmtree(str(tmp), ignore_errors=True)
+
+    print("SIGKILL of a supervised provider (proxy startup {:.0f} ms)".format(args.proxy_delay * 1000))
+    print("  {:<6} {:>12} {:>12}".format("crash", "detected", "serving"))
+    for i, (detected, recovered) in enumerate(rows, 1):
+        print("  {:<6} {:>9.1f} ms {:>9.1f} ms".format(i, detected * 1000, recovered * 1000))
+    print("  unsupervised: down until the next `start`")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
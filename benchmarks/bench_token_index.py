@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: get_token_infos() on a large token directory, parsing every
+file on each call (previous implementation) vs the stat-keyed token index.
+
+Usage:
+    python3 benchmarks/bench_token_index.py [--files 500] [--rounds 50]
+
+The "changed" row rewrites one token file before each call, which is what
+a refresh after a re-auth or an account toggle costs.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "core"))
+
+import config
+from config import _read_token_fields, _token_status, get_token_infos
+from paths import get_token_files
+
+
+def _parse_all(base_dir, provider):
+    """The pre-index cost: glob + stat, then json.load for every file."""
+    now = config.datetime.now(config.timezone.utc)
+    out = []
+    for path in get_token_files(base_dir, provider):
+        status, _ = _token_status(_read_token_fields(str(path)), now)
+        out.append(status)
+    return out
+
+
+def _time(fn, rounds, before=None):
+    samples = []
+    for i in range(rounds):
+        if before:
+            before(i)
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="ccproxy_bench_tix_"))
+    token_dir = tmp / "tokens"
+    token_dir.mkdir()
+    payload = {"type": "claude", "access_token": "x" * 1200, "refresh_token": "y" * 200,
+               "expired": "2099-01-01T00:00:00.123456789+09:00"}
+    for i in range(args.files):
+        payload["email"] = "user{}@example.com".format(i)
+        (token_dir / "claude-user{}@example.com.json".format(i)).write_text(json.dumps(payload))
+
+    def touch_one(i):
+        payload["email"] = "user0@example.com"
+        payload["refresh_token"] = "z{}".format(i)
+        (token_dir / "claude-user0@example.com.json").write_text(json.dumps(payload))
+
+    try:
+        with patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(token_dir)}):
+            full = _time(lambda: _parse_all(tmp, "claude"), args.rounds)
+            get_token_infos(tmp, "claude")  # build the index once
+            reads = []
+            with patch("config._read_token_fields", side_effect=lambda p: reads.append(p) or _read_token_fields(p)):
+                steady = _time(lambda: get_token_infos(tmp, "claude"), args.rounds)
+                steady_reads = len(reads)
+                changed = _time(lambda: get_token_infos(tmp, "claude"), args.rounds, before=touch_one)
+    finally:
+        shutil.rmtree(str(tmp))
+
+    print("token files: {}  (median of {} calls)".format(args.files, args.rounds))
+    print("  parse every file       {:8.2f} ms".format(full))
+    print("  index, nothing changed {:8.2f} ms  ({} files parsed)".format(steady, steady_reads))
+    print("  index, one file changed {:7.2f} ms".format(changed))
+    print("  speedup (steady)       {:8.1f}x".format(full / steady if steady else float("inf")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
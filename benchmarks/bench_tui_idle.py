@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: idle wakeups and CPU time of the cc-proxy-ui key loop, per-poll
+termios toggling (previous implementation) vs the TuiInput selector loop.
+
+Usage:
+    python3 benchmarks/bench_tui_idle.py [--seconds 3]
+
+Both loops read from an idle pseudo-terminal for the given time.  The legacy
+loop polls every 30 ms and switches the terminal into cbreak mode and back
+on every poll; TuiInput enters cbreak once and sleeps in select() until the
+next timed job (the 5 s auto refresh).  POSIX only.
+"""
+
+import argparse
+import os
+import select
+import sys
+import termios
+import time
+import tty
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "core"))
+
+from tui import TuiInput
+
+REFRESH_INTERVAL = 5.0  # _tui_main_loop auto refresh
+
+
+def _legacy_loop(fd, seconds):
+    """The old _read_key_timeout(0.03) poll, one call per loop iteration."""
+    wakeups = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        old = termios.tcgetattr(fd)
+        try:
+            tty.setcbreak(fd)
+            r, _, _ = select.select([fd], [], [], 0.03)
+            if r:
+                os.read(fd, 1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old)
+        wakeups += 1
+    return wakeups
+
+
+def _selector_loop(fd, seconds):
+    deadline = time.monotonic() + seconds
+    with TuiInput(fd=fd) as inp:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return inp.wakeups
+            inp.wait(min(remaining, REFRESH_INTERVAL))
+
+
+def _measure(name, loop, fd, seconds):
+    cpu0, wall0 = time.process_time(), time.monotonic()
+    wakeups = loop(fd, seconds)
+    cpu, wall = time.process_time() - cpu0, time.monotonic() - wall0
+    print("  {:<20} wakeups/s {:8.1f}   cpu {:6.1f} ms/s".format(
+        name, wakeups / wall, cpu * 1000.0 / wall))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    master, slave = os.openpty()
+    try:
+        print("idle for {:.1f}s per loop".format(args.seconds))
+        _measure("per-poll termios", _legacy_loop, slave, args.seconds)
+        _measure("selector loop", _selector_loop, slave, args.seconds)
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+if __name__ == "__main__":
+    main()
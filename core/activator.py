@@ -0,0 +1,410 @@
+"""
+On-demand provider activator: one process listens on every provider port,
+starts a provider's cli-proxy-api when the first connection for it
+arrives and stops it again after CC_PROXY_IDLE_TIMEOUT seconds (default
+900) without traffic, capturing the usage snapshot first as `stop` does.
+
+The activator keeps the provider ports for its whole life, so a binary it
+starts runs on a spare loopback port with configs/<provider>/
+config.ondemand.yaml (config.yaml with that port) and every connection is
+piped through, as the blue/green shim does.  Connections that arrive while
+the binary is starting wait for it instead of being refused.  Health
+checks (GET /) and management API calls are not traffic, so status and the
+TUI never keep an idle provider alive; an open client connection always
+does, however quiet.
+
+configs/.activator.json holds the activator pid and each provider's state
+(idle / starting / running, backend port and pid).  proxy.get_status()
+shows idle providers as "on demand", `stop <provider>` stops the binary but
+leaves the activator listening, and `stop` of everything stops it too.
+
+  cc_proxy.py activate start [provider ...|all] [--idle SECONDS]
+  cc_proxy.py activate serve [provider ...|all] [--idle SECONDS]   (foreground)
+  cc_proxy.py activate stop | status
+Depends on: constants, paths, process, config, proxy, shim
+"""
+
+import json
+import os
+import selectors
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from constants import HOST, IDLE_TIMEOUT_ENV, IS_WINDOWS, PORTS, PROVIDERS
+from paths import get_activator_state_file
+from process import (
+    _port_listening, activator_pid, is_pid_alive, read_activator_state, read_pid, remove_pid,
+    terminate_pids, write_pid,
+)
+from config import rewrite_port_in_config
+from proxy import (
+    _LogTail, _capture_usage_snapshot_before_stop, _clear_pool, _prepare_config, _spawn_proxy,
+    wait_ready,
+)
+from shim import relay
+
+IDLE_TIMEOUT_DEFAULT = 900.0   # seconds without client traffic before a provider is stopped
+ACTIVATE_HOUSEKEEP_INTERVAL = 1.0
+ACTIVATE_PEEK_TIMEOUT = 1.0    # wait for a request line before classifying the connection
+ACTIVATE_CONNECT_TIMEOUT = 2.0
+ACTIVATE_BACKEND_GRACE = 3.0   # SIGTERM → SIGKILL for an idle backend
+ACTIVATE_START_TIMEOUT = 5.0   # `activate start` waits this long for the ports
+ACTIVATE_STOP_WAIT = 15.0      # `activate stop`: snapshots and backend shutdown happen first
+ONDEMAND_CONFIG_NAME = "config.ondemand.yaml"
+
+
+def _log(msg):
+    print("[cc-proxy-activator] {}".format(msg), flush=True)
+
+
+def idle_timeout(value=None):
+    try:
+        return max(0.0, float(value if value is not None else os.environ.get(IDLE_TIMEOUT_ENV, IDLE_TIMEOUT_DEFAULT)))
+    except ValueError:
+        return IDLE_TIMEOUT_DEFAULT
+
+
+def _is_housekeeping(head):
+    """True for a request from cc-proxy itself (GET / health check, /v0/management/...)."""
+    parts = head.split(b" ", 2)
+    if len(parts) < 3:
+        return False
+    return parts[1] == b"/" or parts[1].startswith(b"/v0/management/")
+
+
+def _spare_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+class _Slot(object):
+    """One provider: its listener, backend process and traffic counters."""
+
+    def __init__(self, provider, sock):
+        self.provider = provider
+        self.sock = sock
+        self.state = "idle"   # idle | starting | running
+        self.proc = None
+        self.backend = None
+        self.since = None
+        self.active = 0       # open client connections
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()        # start/stop, one at a time
+        self.count_lock = threading.Lock()
+
+
+class Activator(object):
+    def __init__(self, base_dir, providers, idle=None):
+        self.base_dir = base_dir
+        self.idle = idle_timeout(idle)
+        self.slots = {}
+        self._closed = False
+        for pvd in providers:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if not IS_WINDOWS:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind((HOST, PORTS[pvd]))
+            except OSError as e:
+                sock.close()
+                _log("skipping {}: port {} in use ({})".format(pvd, PORTS[pvd], e.strerror))
+                continue
+            sock.listen(128)
+            sock.setblocking(False)
+            self.slots[pvd] = _Slot(pvd, sock)
+        self._write_state()
+
+    # -- state file ---------------------------------------------------------
+
+    def _write_state(self):
+        state = {"pid": os.getpid(), "idle_timeout": self.idle, "providers": {}}
+        for pvd, slot in self.slots.items():
+            state["providers"][pvd] = {
+                "state": slot.state, "backend": slot.backend,
+                "pid": slot.proc.pid if slot.proc is not None else None, "since": slot.since,
+            }
+        path = str(get_activator_state_file(self.base_dir))
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    # -- backend lifecycle --------------------------------------------------
+
+    def _start_backend(self, slot):
+        """Launch the binary on a spare port and wait for it; call with slot.lock held."""
+        t0 = time.monotonic()
+        pvd = slot.provider
+        prepared = _prepare_config(self.base_dir, pvd, quiet=True)
+        if isinstance(prepared, dict):
+            _log("cannot start {}: {}".format(pvd, prepared["reason"]))
+            return False
+        exe, config_path, wd = prepared
+        config = wd / ONDEMAND_CONFIG_NAME
+        shutil.copy(str(config_path), str(config))
+        port = _spare_port()
+        rewrite_port_in_config(config, port)
+
+        slot.state = "starting"
+        self._write_state()
+        tail = _LogTail(wd / "main.log")
+        proc = _spawn_proxy(exe, config, wd)
+        result = wait_ready({pvd: (proc, port, tail)}, t0)[pvd]
+        if not result["ok"]:
+            terminate_pids([proc.pid], grace=1.0)
+            proc.wait()
+            slot.state = "idle"
+            self._write_state()
+            _log("{} failed to start: {}".format(pvd, result["reason"]))
+            return False
+        slot.proc, slot.backend, slot.since = proc, port, time.time()
+        slot.state = "running"
+        slot.last_active = time.monotonic()
+        write_pid(self.base_dir, pvd, proc.pid)
+        self._write_state()
+        _log("started {} (pid={}, port {}, {:.2f}s)".format(pvd, proc.pid, port, result["elapsed"]))
+        return True
+
+    def _stop_backend(self, slot, reason):
+        """Snapshot usage and stop the binary; call with slot.lock held."""
+        pvd = slot.provider
+        _capture_usage_snapshot_before_stop(self.base_dir, pvd, quiet=True)
+        proc = slot.proc
+        slot.state = "idle"
+        terminate_pids([proc.pid], grace=ACTIVATE_BACKEND_GRACE)
+        proc.wait()
+        slot.proc = slot.backend = slot.since = None
+        remove_pid(self.base_dir, pvd)
+        _clear_pool(PORTS[pvd])
+        self._write_state()
+        _log("stopped {} ({})".format(pvd, reason))
+
+    def _backend_for(self, slot, counted):
+        """Backend port for a new connection, starting the binary if needed; None if it cannot start."""
+        if not counted and slot.state == "running":
+            proc, backend = slot.proc, slot.backend
+            if proc is not None and proc.poll() is None:
+                return backend    # no lock: the idle stop's own snapshot request comes through here
+        with slot.lock:
+            if slot.state != "running" or slot.proc.poll() is not None:
+                if slot.proc is not None:
+                    slot.proc = None
+                    slot.state = "idle"
+                if not self._start_backend(slot):
+                    return None
+            if counted:
+                with slot.count_lock:
+                    slot.active += 1
+                slot.last_active = time.monotonic()
+            return slot.backend
+
+    def housekeep(self):
+        now = time.monotonic()
+        for slot in self.slots.values():
+            if not slot.lock.acquire(False):
+                continue   # starting or stopping
+            try:
+                if slot.state != "running":
+                    continue
+                if slot.proc.poll() is not None:
+                    _log("{} exited (code {})".format(slot.provider, slot.proc.returncode))
+                    slot.proc = slot.backend = slot.since = None
+                    slot.state = "idle"
+                    remove_pid(self.base_dir, slot.provider)
+                    self._write_state()
+                elif slot.active == 0 and now - slot.last_active >= self.idle:
+                    self._stop_backend(slot, "idle {:.0f}s".format(now - slot.last_active))
+            finally:
+                slot.lock.release()
+
+    # -- connections --------------------------------------------------------
+
+    def _handle(self, slot, client):
+        upstream = None
+        counted = False
+        try:
+            client.setblocking(True)
+            client.settimeout(ACTIVATE_PEEK_TIMEOUT)
+            try:
+                head = client.recv(256, socket.MSG_PEEK)
+                if not head:
+                    return
+            except socket.timeout:
+                head = b""   # a client that has not spoken yet is still traffic
+            traffic = not _is_housekeeping(head)
+            backend = self._backend_for(slot, traffic)
+            if backend is None:
+                return
+            counted = traffic
+            upstream = socket.create_connection((HOST, backend), timeout=ACTIVATE_CONNECT_TIMEOUT)
+            upstream.settimeout(None)
+            client.settimeout(None)
+            relay(client, upstream,
+                  on_data=(lambda: setattr(slot, "last_active", time.monotonic())) if counted else None)
+        except OSError:
+            pass
+        finally:
+            client.close()
+            if upstream is not None:
+                upstream.close()
+            if counted:
+                with slot.count_lock:
+                    slot.active -= 1
+                slot.last_active = time.monotonic()
+
+    def serve(self):
+        sel = selectors.DefaultSelector()
+        for slot in self.slots.values():
+            sel.register(slot.sock, selectors.EVENT_READ, slot)
+        _log("listening for {} (idle timeout {:.0f}s)".format(", ".join(self.slots), self.idle))
+        last = time.monotonic()
+        try:
+            while not self._closed:
+                for key, _ in sel.select(ACTIVATE_HOUSEKEEP_INTERVAL):
+                    try:
+                        client, _ = key.fileobj.accept()
+                    except OSError:
+                        continue
+                    threading.Thread(target=self._handle, args=(key.data, client), daemon=True).start()
+                if time.monotonic() - last >= ACTIVATE_HOUSEKEEP_INTERVAL:
+                    last = time.monotonic()
+                    self.housekeep()
+        finally:
+            sel.close()
+
+    def stop(self):
+        """Make serve() return within one housekeeping interval."""
+        self._closed = True
+
+    def shutdown(self):
+        """Snapshot and stop every running backend, then release the ports."""
+        self._closed = True
+        pids = []
+        for slot in self.slots.values():
+            if slot.proc is not None and slot.proc.poll() is None:
+                _capture_usage_snapshot_before_stop(self.base_dir, slot.provider, quiet=True)
+                pids.append(slot.proc.pid)
+        for slot in self.slots.values():
+            slot.sock.close()
+        terminate_pids(pids, grace=ACTIVATE_BACKEND_GRACE)
+        for slot in self.slots.values():
+            if slot.proc is not None:
+                slot.proc.wait()
+                remove_pid(self.base_dir, slot.provider)
+        try:
+            get_activator_state_file(self.base_dir).unlink()
+        except OSError:
+            pass
+
+
+def serve(base_dir, providers, idle=None):
+    """Run the activator in the foreground until SIGTERM / Ctrl-C."""
+    if activator_pid(base_dir):
+        print("[cc-proxy] The activator is already running (pid={}).".format(activator_pid(base_dir)),
+              file=sys.stderr)
+        return 1
+    activator = Activator(base_dir, providers, idle)
+    if not activator.slots:
+        print("[cc-proxy] No provider port could be claimed.", file=sys.stderr)
+        activator.shutdown()
+        return 1
+    if not IS_WINDOWS:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        activator.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        activator.shutdown()
+    return 0
+
+
+def _parse_args(args):
+    """[provider ...|all] [--idle SECONDS] → (providers, idle) or None after printing why."""
+    providers, idle = [], None
+    rest = list(args)
+    while rest:
+        arg = rest.pop(0)
+        if arg == "--idle" and rest:
+            idle = rest.pop(0)
+        elif arg == "all":
+            providers = list(PROVIDERS)
+        elif arg in PROVIDERS:
+            providers.append(arg)
+        else:
+            print("[cc-proxy] Usage: activate start|serve [provider ...|all] [--idle SECONDS]", file=sys.stderr)
+            return None
+    return providers or list(PROVIDERS), idle
+
+
+def cmd_activate(base_dir, args):
+    """`cc_proxy.py activate start|serve|stop|status ...`."""
+    action, rest = (args[0], args[1:]) if args else ("", [])
+
+    if action == "serve":
+        parsed = _parse_args(rest)
+        return serve(base_dir, *parsed) if parsed else 1
+
+    pid = activator_pid(base_dir)
+    if action == "status":
+        if not pid:
+            print("[cc-proxy] activator: not running")
+            return 1
+        state = read_activator_state(base_dir)
+        print("[cc-proxy] activator: running (pid={}, idle timeout {:.0f}s)".format(pid, state.get("idle_timeout", 0)))
+        for pvd, info in sorted((state.get("providers") or {}).items()):
+            line = "  {:<12} :{:<5}  {}".format(pvd, PORTS.get(pvd, 0), info.get("state"))
+            if info.get("state") == "running":
+                line += "  (pid={}, up {}s)".format(info.get("pid"), int(time.time() - (info.get("since") or time.time())))
+            print(line)
+        return 0
+
+    if action == "stop":
+        if not pid:
+            print("[cc-proxy] activator: not running")
+            return 0
+        backends = [p for p in (read_pid(base_dir, pvd) for pvd in PROVIDERS) if p and is_pid_alive(p)]
+        terminate_pids([pid], grace=ACTIVATE_STOP_WAIT)
+        terminate_pids([p for p in backends if is_pid_alive(p)])   # left over if it had to be killed
+        print("[cc-proxy] activator stopped (pid={}).".format(pid))
+        return 0
+
+    if action == "start":
+        parsed = _parse_args(rest)
+        if not parsed:
+            return 1
+        if pid:
+            print("[cc-proxy] activator already running (pid={}).".format(pid))
+            return 0
+        log_path = get_activator_state_file(base_dir).parent / "activator.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        cc_proxy_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cc_proxy.py")
+        argv = [sys.executable, cc_proxy_py, "activate", "serve"] + list(rest)
+        kwargs = {"creationflags": 0x08000000} if IS_WINDOWS else {"start_new_session": True}
+        with open(str(log_path), "a") as log:
+            proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **kwargs)
+        deadline = time.monotonic() + ACTIVATE_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if activator_pid(base_dir) == proc.pid and all(_port_listening(PORTS[p]) for p in
+                                                          read_activator_state(base_dir).get("providers", {})):
+                print("[cc-proxy] activator started (pid={}); providers start on first use.".format(proc.pid))
+                return 0
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        print("[cc-proxy] activator failed to start; see {}".format(log_path), file=sys.stderr)
+        return 1
+
+    print("[cc-proxy] Usage: activate start|serve [provider ...|all] [--idle SECONDS] | stop | status",
+          file=sys.stderr)
+    return 1
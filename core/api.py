@@ -1,14 +1,15 @@
 """
 Management API client and secret key resolution.
-Depends on: constants, paths
+Depends on: constants, paths, httppool
 """
 
 import json
 import os
 import re
 
-from constants import HOST, PORTS
+from constants import PORTS
 from paths import get_config_file
+from httppool import pooled_request
 
 
 def _management_api_request(provider, endpoint, secret="cc", method="GET", payload=None, timeout=8):
@@ -17,19 +18,20 @@ def _management_api_request(provider, endpoint, secret="cc", method="GET", paylo
     method: GET/POST/DELETE
     payload: dict -> JSON body (for POST/PUT)
     """
-    import urllib.request
-
     port = PORTS[provider]
-    url = "http://{}:{}/v0/management/{}".format(HOST, port, endpoint.lstrip("/"))
+    path = "/v0/management/{}".format(endpoint.lstrip("/"))
     headers = {"Authorization": "Bearer {}".format(secret)}
     raw = None
     if payload is not None:
         raw = json.dumps(payload).encode("utf-8")
         headers["Content-Type"] = "application/json"
 
-    req = urllib.request.Request(url, data=raw, headers=headers, method=method.upper())
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        body = resp.read()
+    _, body = pooled_request(port, method, path, body=raw, headers=headers, timeout=timeout)
+    return _decode_management_body(body)
+
+
+def _decode_management_body(body):
+    """Management response bytes → dict ({} when empty, {"raw": text} when not JSON)."""
     if not body:
         return {}
     text = body.decode("utf-8", errors="replace").strip()
@@ -48,12 +50,8 @@ def _management_api(provider, endpoint, secret="cc"):
 
 def _proxy_api(provider, path, timeout=5):
     """GET arbitrary path from a running provider proxy (no management auth)."""
-    import urllib.request
-    port = PORTS[provider]
-    url = "http://{}:{}/{}".format(HOST, port, path.lstrip("/"))
-    req = urllib.request.Request(url)
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    _, body = pooled_request(PORTS[provider], "GET", path, timeout=timeout)
+    return json.loads(body.decode("utf-8"))
 
 
 def _read_secret_key(base_dir, provider):
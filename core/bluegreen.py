@@ -0,0 +1,172 @@
+"""
+Blue/green restart: bring up a second cli-proxy-api on a spare port, swap
+the canonical port over to it through the forwarding shim (shim.py), and
+leave draining and stopping the old instance to the shim.  Sessions
+pointed at the canonical port never see it closed.
+
+Opt in with CC_PROXY_RESTART_MODE=bluegreen; proxy.restart_many() calls
+here.  The first blue/green restart of a provider that was started the
+normal way migrates it: the old binary is stopped (a short gap) and the
+shim takes over its port; every later restart is gapless.  The two
+instances alternate between configs/<provider>/config.blue.yaml and
+config.green.yaml, copied from config.yaml with the spare port, so a
+running instance's config never changes under it.
+Depends on: constants, paths, process, config, proxy
+"""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from constants import DRAIN_TIMEOUT_ENV, HOST, PORTS
+from paths import (
+    get_binary_path, get_bluegreen_state_file, get_config_file, get_provider_dir,
+    get_token_dir,
+)
+from process import (
+    invalidate_port_pid_cache, is_pid_alive, read_pid, resolve_pids_by_ports,
+    terminate_pids, write_pid,
+)
+from config import rewrite_auth_dir_in_config, rewrite_port_in_config
+from proxy import (
+    _LogTail, _capture_usage_snapshot_before_stop, _clear_pool, _spawn_proxy, start_many,
+    stop_many, wait_ready,
+)
+
+DRAIN_TIMEOUT_DEFAULT = 120.0  # seconds the old instance may keep serving open connections
+SHIM_READY_TIMEOUT = 2.0
+
+
+def drain_timeout():
+    try:
+        return max(0.0, float(os.environ.get(DRAIN_TIMEOUT_ENV, DRAIN_TIMEOUT_DEFAULT)))
+    except ValueError:
+        return DRAIN_TIMEOUT_DEFAULT
+
+
+def read_state(base_dir, provider):
+    try:
+        with open(str(get_bluegreen_state_file(base_dir, provider)), "r") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(base_dir, provider, state):
+    """Replace the state file in one step; the shim treats the new inode as the swap."""
+    path = str(get_bluegreen_state_file(base_dir, provider))
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _spare_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def shim_pid(base_dir, provider):
+    """PID of the live shim that owns *provider*'s canonical port, else None."""
+    pid = read_state(base_dir, provider).get("shim_pid")
+    if not pid or not is_pid_alive(pid):
+        return None
+    owner = resolve_pids_by_ports([PORTS[provider]], max_age=0).get(PORTS[provider])
+    return pid if owner == pid else None
+
+
+def _spawn_shim(base_dir, provider):
+    wd = get_provider_dir(base_dir, provider)
+    shim_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shim.py")
+    log_file = open(str(wd / "shim.log"), "a")
+    try:
+        return subprocess.Popen(
+            [sys.executable, shim_py, str(PORTS[provider]), str(get_bluegreen_state_file(base_dir, provider))],
+            cwd=str(wd), stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    finally:
+        log_file.close()
+
+
+def bluegreen_restart(base_dir, provider, quiet=False):
+    """Restart *provider* without closing its port.
+
+    Returns {"ok", "elapsed", "pid", "backend"?, "migrated"?, "reason"?}.
+    If the new instance never gets healthy the old one is left untouched.
+    """
+    t0 = time.monotonic()
+    exe = get_binary_path(base_dir)
+    config_path = get_config_file(base_dir, provider)
+    if not exe.exists():
+        return {"ok": False, "elapsed": 0.0, "reason": "binary not found"}
+    if not config_path.exists():
+        return {"ok": False, "elapsed": 0.0, "reason": "no config.yaml"}
+
+    state = read_state(base_dir, provider)
+    current_shim = shim_pid(base_dir, provider)
+    color = "green" if state.get("color") == "blue" else "blue"
+    wd = get_provider_dir(base_dir, provider)
+    color_config = wd / "config.{}.yaml".format(color)
+    shutil.copy(str(config_path), str(color_config))
+    port = _spare_port()
+    rewrite_port_in_config(color_config, port)
+    rewrite_auth_dir_in_config(color_config, get_token_dir(base_dir, create=True))
+
+    if not quiet:
+        print("[cc-proxy] Starting {} {} instance on port {}...".format(provider, color, port))
+    tail = _LogTail(wd / "main.log")
+    proc = _spawn_proxy(exe, color_config, wd)
+    result = wait_ready({provider: (proc, port, tail)}, t0)[provider]
+    if not result["ok"]:
+        terminate_pids([proc.pid], grace=1.0)
+        if not quiet:
+            print("[cc-proxy] {} {} instance failed ({}); keeping the running one.".format(
+                provider, color, result["reason"]), file=sys.stderr)
+        return result
+
+    new_state = {"backend": port, "backend_pid": proc.pid, "color": color,
+                 "shim_pid": current_shim, "retire": []}
+    if current_shim:
+        _capture_usage_snapshot_before_stop(base_dir, provider, quiet=True)
+        now = time.time()
+        retire = [r for r in state.get("retire") or [] if r.get("deadline", 0) > now]
+        if state.get("backend"):
+            retire.append({"port": state["backend"],
+                           "pid": state.get("backend_pid") or read_pid(base_dir, provider),
+                           "deadline": now + drain_timeout()})
+        new_state["retire"] = retire
+        _write_state(base_dir, provider, new_state)
+        _clear_pool(PORTS[provider])  # our idle keep-alives would hold the old instance open
+    else:
+        # The binary owns the canonical port itself: stop it, then put the shim there.
+        _write_state(base_dir, provider, new_state)
+        stop_many(base_dir, [provider], quiet=True)
+        shim = _spawn_shim(base_dir, provider)
+        shim_ready = wait_ready(
+            {provider: (shim, PORTS[provider], _LogTail(wd / "shim.log"))}, t0,
+            SHIM_READY_TIMEOUT)[provider]
+        if not shim_ready["ok"]:
+            terminate_pids([shim.pid, proc.pid], grace=1.0)
+            if not quiet:
+                print("[cc-proxy] Forwarding shim failed ({}); starting {} normally.".format(
+                    shim_ready["reason"], provider), file=sys.stderr)
+            return start_many(base_dir, [provider], quiet=quiet)[provider]
+        new_state["shim_pid"] = shim.pid
+        _write_state(base_dir, provider, new_state)
+        _clear_pool(PORTS[provider])
+        result["migrated"] = True
+
+    write_pid(base_dir, provider, proc.pid)
+    invalidate_port_pid_cache()
+    result.update({"elapsed": time.monotonic() - t0, "pid": proc.pid, "backend": port})
+    if not quiet:
+        print("[cc-proxy] {} now served by {} instance (pid={}, {:.2f}s); old instance drains in the background.".format(
+            provider, color, proc.pid, result["elapsed"]))
+    return result
@@ -18,322 +18,522 @@ Usage:
   python3 core/cc_proxy.py install-profile [--hint-only]
   python3 core/cc_proxy.py update [--force]
   python3 core/cc_proxy.py clean [-- claude-args...]
+  python3 core/cc_proxy.py daemon start|stop|status
+  python3 core/cc_proxy.py activate start|serve [provider ...|all] [--idle SECONDS] | stop | status
+  python3 core/cc_proxy.py supervise start|serve [provider ...|all] | stop | status
 
 Module structure (core/):
   constants.py  — shared constants, ANSI codes, TUI key codes
   paths.py      — path resolution, token directory helpers
   process.py    — PID management, port lookup, health check, clipboard
   config.py     — YAML config rewriting, token parsing/validation
+  httppool.py   — shared keep-alive HTTP connection pool (per provider port)
   api.py        — management API client, secret key resolution
+  locks.py      — cross-process file locks for shared /tmp caches
   quota.py      — upstream quota fetching and caching
   usage.py      — usage snapshot and cumulative tracking
+  ledger.py     — persistent SQLite usage ledger (daily/model/account rollups)
   proxy.py      — proxy lifecycle (start/stop/status)
   display.py    — ANSI formatting, box drawing, status dashboard rendering
+  prefetch.py   — asyncio prefetch engine (shared event loop for status/ui)
   tui.py        — terminal UI main loop
   commands.py   — auth, invoke, profile install, token/secret commands
+  daemon.py     — optional cc-proxyd (warm state over a Unix socket) + client
+  bluegreen.py  — zero-downtime restart behind a forwarding shim (opt-in)
+  shim.py       — canonical-port forwarder used by bluegreen (run as a process)
+  hotreload.py  — account toggle reload strategies (API → file watch → restart)
+  tokenwatch.py — token directory watcher (inotify, scandir polling fallback)
+  fastrun.py    — `run` fast path: exec claude when nothing changed since the last run
+  overlap.py    — opt-in `run` cold start overlapping the proxy start with claude's
+  activator.py  — on-demand provider start on first connection, stop when idle
+  supervisor.py — restarts crashed providers (backoff, crash-loop breaker)
+
+Each subcommand imports only the modules it uses (see _COMMANDS), so e.g.
+`stop` never loads the TUI, the asyncio engine or SQLite.
+CC_PROXY_IMPORT_PROFILE=1 prints per-module import times to stderr on exit.
 """
 
-import shutil
+import os
 import sys
-import threading
-from datetime import datetime
+
+IMPORT_PROFILE_ENV = "CC_PROXY_IMPORT_PROFILE"
+
+
+def _install_import_profiler(stream=None):
+    """Time every first-time import from here on; print an -X importtime style table at exit.
+
+    Rows are emitted in completion order with self / cumulative microseconds,
+    indented by nesting depth, followed by the total.
+    """
+    import atexit
+    import builtins
+    import time
+
+    real_import = builtins.__import__
+    rows = []
+    child_time = [0.0]
+
+    def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return real_import(name, globals, locals, fromlist, level)
+        depth = len(child_time) - 1
+        child_time.append(0.0)
+        start = time.perf_counter()
+        try:
+            return real_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = child_time.pop()
+            child_time[-1] += elapsed
+            if name in sys.modules:  # skip failed optional imports (e.g. msvcrt)
+                rows.append((depth, elapsed - children, elapsed, name))
+
+    def _report():
+        out = stream or sys.stderr
+        out.write("import time: self [us] | cumulative | imported package\n")
+        for depth, self_s, cum_s, name in rows:
+            out.write("import time: {:>9d} | {:>10d} | {}{}\n".format(
+                int(self_s * 1e6), int(cum_s * 1e6), "  " * depth, name))
+        out.write("import time: total {:.1f} ms in {} modules\n".format(
+            sum(r[2] for r in rows if r[0] == 0) * 1000.0, len(rows)))
+        out.flush()
+
+    builtins.__import__ = _profiled_import
+    atexit.register(_report)
+
+
+if __name__ == "__main__":
+    if os.environ.get(IMPORT_PROFILE_ENV):
+        _install_import_profiler()
+
+    # `run` with nothing changed since the last one: exec claude right here
+    # (fastrun.py); otherwise continue with the daemon hop / full path.
+    if sys.argv[1:2] == ["run"]:
+        from fastrun import fast_run
+        _rc = fast_run(sys.argv[2:])
+        if _rc is not None:
+            sys.exit(_rc)
+
+    # Hand status/start/stop/run to a running cc-proxyd before paying for any
+    # command imports; falls through when no daemon answers.
+    from daemon import client_dispatch
+    _rc = client_dispatch(sys.argv[1:])
+    if _rc is not None:
+        sys.exit(_rc)
 
 from constants import PORTS, PRESETS, PROVIDERS
-from paths import get_base_dir
-from proxy import get_status, start_proxy, stop_proxy
-from config import ensure_tokens
-from tui import _tui_main_loop
-from display import (
-    _box_bottom, _box_line, _box_sep, _box_top,
-    _fmt_tokens, _prefetch_provider_data, _print_status_dashboard,
-    _provider_frame_color,
-)
-from usage import _usage_cumulative_clear
-from commands import (
-    cmd_set_secret, cmd_token_delete, cmd_token_dir, cmd_token_list,
-    install_profile, invoke_claude, run_auth,
-)
 
 
 def print_usage():
     print(__doc__)
 
 
-def main():
-    args = sys.argv[1:]
-    if not args or args[0] in ("-h", "--help"):
-        print_usage()
-        return 0
-
-    base_dir = get_base_dir()
-    cmd = args[0]
-
-    if cmd == "run":
-        if len(args) < 2:
-            print("[cc-proxy] Usage: run <preset> [-- claude-args...]", file=sys.stderr)
-            return 1
-        preset = args[1]
-        if preset not in PRESETS:
-            print("[cc-proxy] Unknown preset: {}".format(preset), file=sys.stderr)
-            print("[cc-proxy] Valid presets: {}".format(", ".join(PRESETS)), file=sys.stderr)
-            return 1
-        rest = args[2:]
-        if "--" in rest:
-            idx = rest.index("--")
-            claude_args = rest[idx + 1:]
-        else:
-            claude_args = rest
-
-        provider, opus, sonnet, haiku = PRESETS[preset]
-        if not ensure_tokens(base_dir, provider):
-            return 1
+def _invalid_provider(provider):
+    print("[cc-proxy] Invalid provider: {}".format(provider), file=sys.stderr)
+    return 1
+
+
+def _split_claude_args(rest):
+    if "--" in rest:
+        return rest[rest.index("--") + 1:]
+    return rest
+
+
+def _run_spec(args):
+    """`run <preset> [-- claude-args]` → (provider, opus, sonnet, haiku, claude_args), or None after printing why."""
+    if not args:
+        print("[cc-proxy] Usage: run <preset> [-- claude-args...]", file=sys.stderr)
+        return None
+    preset = args[0]
+    if preset not in PRESETS:
+        print("[cc-proxy] Unknown preset: {}".format(preset), file=sys.stderr)
+        print("[cc-proxy] Valid presets: {}".format(", ".join(PRESETS)), file=sys.stderr)
+        return None
+    return PRESETS[preset] + (_split_claude_args(args[1:]),)
+
+
+def prepare_run(base_dir, args):
+    """Validate `run <preset> [-- claude-args]` and bring its proxy up.
+
+    Returns (rc, spec); spec is (provider, opus, sonnet, haiku, claude_args)
+    when claude should be launched, else None and rc is the exit code.
+    """
+    from config import ensure_tokens
+    from fastrun import record_run_state
+    from proxy import start_proxy
+
+    spec = _run_spec(args)
+    if spec is None:
+        return 1, None
+    provider = spec[0]
+    if not ensure_tokens(base_dir, provider):
+        return 1, None
+    if not start_proxy(base_dir, provider):
+        return 1, None
+    record_run_state(base_dir, provider)
+    return 0, spec
+
+
+def _run_overlapped(base_dir, args):
+    """`run` with CC_PROXY_OVERLAP_START=1: launch claude while a cold proxy starts (overlap.py)."""
+    from config import ensure_tokens
+    from fastrun import record_run_state
+    from overlap import start_overlapped
+    from proxy import start_proxy
+    from commands import invoke_claude
+
+    spec = _run_spec(args)
+    if spec is None:
+        return 1
+    provider = spec[0]
+    if not ensure_tokens(base_dir, provider):
+        return 1
+    pending = start_overlapped(base_dir, provider)
+    if pending is None:
+        # already listening: reuse it the usual way
         if not start_proxy(base_dir, provider):
             return 1
-        return invoke_claude(provider, opus, sonnet, haiku, claude_args)
-
-    elif cmd == "start":
-        if len(args) < 2:
-            print("[cc-proxy] Usage: start <provider> | all", file=sys.stderr)
-            return 1
-        provider = args[1]
+        record_run_state(base_dir, provider)
+        return invoke_claude(*spec)
+
+    print("[cc-proxy] Starting {} proxy alongside claude...".format(provider))
+    rc = invoke_claude(*spec, port=pending.gate.port)
+    result = pending.finish()
+    if not result["ok"]:
+        print("[cc-proxy] {} proxy failed to start: {}".format(provider, result.get("reason", "unknown")),
+              file=sys.stderr)
+    return rc
+
+
+# ---------------------------------------------------------------------------
+# Subcommands: (base_dir, args without the command name) -> exit code
+# ---------------------------------------------------------------------------
+
+def _cmd_run(base_dir, args):
+    from overlap import overlap_start_enabled
+    if overlap_start_enabled():
+        return _run_overlapped(base_dir, args)
+    rc, spec = prepare_run(base_dir, args)
+    if spec is None:
+        return rc
+    from commands import invoke_claude
+    return invoke_claude(*spec)
+
+
+def _cmd_start(base_dir, args):
+    from proxy import start_many, start_proxy
+
+    if not args:
+        print("[cc-proxy] Usage: start <provider> | all", file=sys.stderr)
+        return 1
+    provider = args[0]
+
+    if provider == "all":
+        results = start_many(base_dir, PROVIDERS)
+        return 0 if all(r["ok"] for r in results.values()) else 1
+
+    if provider not in PROVIDERS:
+        return _invalid_provider(provider)
+    return 0 if start_proxy(base_dir, provider) else 1
+
+
+def _cmd_stop(base_dir, args):
+    provider = args[0] if args else None
+    if provider and provider not in PROVIDERS:
+        return _invalid_provider(provider)
+    from proxy import stop_proxy
+    stop_proxy(base_dir, provider)
+    return 0
+
+
+def _cmd_version(base_dir, args):
+    from proxy import get_binary_version
+    v = get_binary_version(base_dir)
+    print("[cc-proxy] core helper loaded. Binary status: {}".format(v))
+    return 0
+
+
+def _cmd_ui(base_dir, args):
+    provider = args[0] if args else None
+    if provider and provider not in PROVIDERS:
+        return _invalid_provider(provider)
+    from tui import _tui_main_loop
+    return _tui_main_loop(base_dir, provider)
+
+
+def _cmd_status(base_dir, args, cmd="status"):
+    import shutil
+    from datetime import datetime
+
+    from display import (
+        _box_bottom, _box_line, _box_sep, _box_top,
+        _fmt_tokens, _print_status_dashboard, _provider_frame_color,
+    )
+    from prefetch import get_engine, prefetch_providers
+    from proxy import get_status
+
+    # Parse flags and optional provider list from remaining args
+    rest = args
+    show_quota = "--quota" in rest
+    show_check = (cmd == "check") or ("--check" in rest)
+    show_short = "--short" in rest or "-s" in rest
+    positional = [a for a in rest if not a.startswith("--") and a != "-s"]
+    invalid = [p for p in positional if p not in PROVIDERS]
+    if invalid:
+        return _invalid_provider(", ".join(invalid))
+    # preserve user order while deduplicating
+    targets = list(dict.fromkeys(positional)) if positional else list(PROVIDERS)
+
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        prefetched = prefetch_providers(
+            base_dir, targets,
+            fetch_quota=show_quota,
+            fetch_check=show_check,
+        )
+    except Exception:
+        prefetched = {}
 
-        if provider == "all":
-            all_ok = True
-            for pvd in PROVIDERS:
-                if not start_proxy(base_dir, pvd):
-                    all_ok = False
-            return 0 if all_ok else 1
+    # Compute minimum width from actual email lengths
+    term_w = shutil.get_terminal_size(fallback=(80, 24)).columns
+    min_content = 72
+    for pvd in targets:
+        d = prefetched.get(pvd, {})
+        for f in (d.get("auth_data") or {}).get("files", []):
+            email = f.get("email") or f.get("name") or ""
+            min_content = max(min_content, len(email) + 24)
+    W = max(min_content + 4, min(term_w - 2, 120))
+
+    flags = ("--quota " if show_quota else "") + ("--check" if show_check else "") + ("-s" if show_short else "")
+    title = "  cc-proxy status {}".format(flags).rstrip()
+
+    if show_short:
+        from constants import _C_DIM, _C_GREEN, _C_RESET
+        # Compact: one summary line per provider
+        W = max(72, min(term_w - 2, 120))
+        print(_box_top(W))
+        padding = W - 4 - len(title) - len(now_str)
+        print(_box_line(title + " " * max(1, padding) + now_str, W))
+        print(_box_sep(W))
+        for pvd in targets:
+            data   = prefetched.get(pvd, {})
+            s      = data.get("status") or get_status(base_dir, pvd)
+            port   = PORTS[pvd]
+            files  = (data.get("auth_data") or {}).get("files", [])
+            n_acct = len(files)
+            u      = (data.get("usage_data") or {}).get("usage", {})
+            t_req  = u.get("total_requests", 0)
+            t_tok  = _fmt_tokens(u.get("total_tokens", 0))
+            usage_src = data.get("usage_source", "none")
+            if s.get("running"):
+                dot = _C_GREEN + "\u25cf" + _C_RESET
+                state = "running"
+                snap_tag = ""
+            else:
+                dot = _C_DIM + "\u25cb" + _C_RESET
+                state = "idle" if s.get("on_demand") else "stopped"
+                if (s.get("supervised") or {}).get("state") in ("backoff", "broken"):
+                    state = s["supervised"]["state"]
+                snap_tag = " [snap]" if usage_src == "snapshot" else ""
+            row = "  {:<13} :{:5d}  {} {:<7}{}  {:>2} accts  {:>5} req  {:>6} tok".format(
+                pvd, port, dot, state, snap_tag, n_acct, t_req, t_tok
+            )
+            print(_box_line(row, W))
+        print(_box_bottom(W))
+    else:
+        print(_box_top(W))
+        padding = W - 4 - len(title) - len(now_str)
+        print(_box_line(title + " " * max(1, padding) + now_str, W))
+        for pvd in targets:
+            data = prefetched.get(pvd, {})
+            s = data.get("status") or get_status(base_dir, pvd)
+            _print_status_dashboard(
+                base_dir, pvd, s, W,
+                auth_data=data.get("auth_data"),
+                usage_data=data.get("usage_data"),
+                auth_error=data.get("auth_error", False),
+                usage_source=data.get("usage_source", "none"),
+                usage_snapshot_at=data.get("usage_snapshot_at"),
+                usage_rollups=data.get("usage_rollups"),
+                models_per_account=data.get("models_per_account"),
+                quota_data=data.get("quota_data") if show_quota else None,
+                proxy_models=data.get("proxy_models"),
+                show_check=show_check,
+                frame_color=_provider_frame_color(pvd),
+            )
+        print(_box_bottom(W))
+    if show_quota:
+        # stale quota entries were shown as-is; let their refresh land in the cache
+        sys.stdout.flush()
+        get_engine().wait_revalidations()
+    return 0
 
-        if provider not in PROVIDERS:
-            print("[cc-proxy] Invalid provider: {}".format(provider), file=sys.stderr)
-            return 1
-        return 0 if start_proxy(base_dir, provider) else 1
 
-    elif cmd == "stop":
-        provider = args[1] if len(args) > 1 else None
-        if provider and provider not in PROVIDERS:
-            print("[cc-proxy] Invalid provider: {}".format(provider), file=sys.stderr)
-            return 1
-        stop_proxy(base_dir, provider)
-        return 0
+def _cmd_check(base_dir, args):
+    return _cmd_status(base_dir, args, cmd="check")
 
-    elif cmd == "version":
-        from proxy import get_binary_version
-        v = get_binary_version(base_dir)
-        print("[cc-proxy] core helper loaded. Binary status: {}".format(v))
-        return 0
 
-    elif cmd == "ui":
-        provider = args[1] if len(args) > 1 else None
-        if provider and provider not in PROVIDERS:
-            print("[cc-proxy] Invalid provider: {}".format(provider), file=sys.stderr)
-            return 1
-        return _tui_main_loop(base_dir, provider)
-
-    elif cmd in ("status", "check"):
-        # Parse flags and optional provider list from remaining args
-        rest = args[1:]
-        show_quota = "--quota" in rest
-        show_check = (cmd == "check") or ("--check" in rest)
-        show_short = "--short" in rest or "-s" in rest
-        positional = [a for a in rest if not a.startswith("--") and a != "-s"]
-        invalid = [p for p in positional if p not in PROVIDERS]
-        if invalid:
-            print("[cc-proxy] Invalid provider: {}".format(", ".join(invalid)), file=sys.stderr)
-            return 1
-        # preserve user order while deduplicating
-        targets = list(dict.fromkeys(positional)) if positional else list(PROVIDERS)
-
-        now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        prefetched = {}
+def _cmd_auth(base_dir, args):
+    if not args:
+        print("[cc-proxy] Usage: auth <provider>", file=sys.stderr)
+        return 1
+    provider = args[0]
+    if provider not in PROVIDERS:
+        return _invalid_provider(provider)
 
-        def _do_fetch(pvd, out):
-            out[pvd] = _prefetch_provider_data(
-                base_dir, pvd,
-                fetch_quota=show_quota,
-                fetch_check=show_check,
-            )
+    from commands import run_auth
+    from process import resolve_pid_by_port
+    from proxy import restart_many
 
-        fetch_threads = [threading.Thread(target=_do_fetch, args=(pvd, prefetched))
-                         for pvd in targets]
-        for t in fetch_threads:
-            t.start()
-        for t in fetch_threads:
-            t.join(timeout=15)
+    was_running = bool(resolve_pid_by_port(PORTS[provider]))
+    if not run_auth(base_dir, provider):
+        return 1
 
-        # Compute minimum width from actual email lengths
-        term_w = shutil.get_terminal_size(fallback=(80, 24)).columns
-        min_content = 72
-        for pvd in targets:
-            d = prefetched.get(pvd, {})
-            for f in (d.get("auth_data") or {}).get("files", []):
-                email = f.get("email") or f.get("name") or ""
-                min_content = max(min_content, len(email) + 24)
-        W = max(min_content + 4, min(term_w - 2, 120))
-
-        flags = ("--quota " if show_quota else "") + ("--check" if show_check else "") + ("-s" if show_short else "")
-        title = "  cc-proxy status {}".format(flags).rstrip()
-
-        if show_short:
-            # Compact: one summary line per provider
-            W = max(72, min(term_w - 2, 120))
-            print(_box_top(W))
-            padding = W - 4 - len(title) - len(now_str)
-            print(_box_line(title + " " * max(1, padding) + now_str, W))
-            print(_box_sep(W))
-            for pvd in targets:
-                data   = prefetched.get(pvd, {})
-                s      = data.get("status") or get_status(base_dir, pvd)
-                port   = PORTS[pvd]
-                files  = (data.get("auth_data") or {}).get("files", [])
-                n_acct = len(files)
-                u      = (data.get("usage_data") or {}).get("usage", {})
-                t_req  = u.get("total_requests", 0)
-                t_tok  = _fmt_tokens(u.get("total_tokens", 0))
-                usage_src = data.get("usage_source", "none")
-                from constants import _C_DIM, _C_GREEN, _C_RESET
-                if s.get("running"):
-                    dot = _C_GREEN + "\u25cf" + _C_RESET
-                    state = "running"
-                    snap_tag = ""
-                else:
-                    dot = _C_DIM + "\u25cb" + _C_RESET
-                    state = "stopped"
-                    snap_tag = " [snap]" if usage_src == "snapshot" else ""
-                row = "  {:<13} :{:5d}  {} {:<7}{}  {:>2} accts  {:>5} req  {:>6} tok".format(
-                    pvd, port, dot, state, snap_tag, n_acct, t_req, t_tok
-                )
-                print(_box_line(row, W))
-            print(_box_bottom(W))
-        else:
-            print(_box_top(W))
-            padding = W - 4 - len(title) - len(now_str)
-            print(_box_line(title + " " * max(1, padding) + now_str, W))
-            for pvd in targets:
-                data = prefetched.get(pvd, {})
-                s = data.get("status") or get_status(base_dir, pvd)
-                _print_status_dashboard(
-                    base_dir, pvd, s, W,
-                    auth_data=data.get("auth_data"),
-                    usage_data=data.get("usage_data"),
-                    auth_error=data.get("auth_error", False),
-                    usage_source=data.get("usage_source", "none"),
-                    usage_snapshot_at=data.get("usage_snapshot_at"),
-                    models_per_account=data.get("models_per_account"),
-                    quota_data=data.get("quota_data") if show_quota else None,
-                    proxy_models=data.get("proxy_models"),
-                    show_check=show_check,
-                    frame_color=_provider_frame_color(pvd),
-                )
-            print(_box_bottom(W))
+    if not was_running:
+        print("[cc-proxy] {} proxy is not running. Auto-restart skipped.".format(provider))
         return 0
 
-    elif cmd == "auth":
-        if len(args) < 2:
-            print("[cc-proxy] Usage: auth <provider>", file=sys.stderr)
-            return 1
-        provider = args[1]
-        if provider not in PROVIDERS:
-            print("[cc-proxy] Invalid provider: {}".format(provider), file=sys.stderr)
-            return 1
+    print("[cc-proxy] Restarting {} proxy to reload tokens...".format(provider))
+    if not restart_many(base_dir, [provider])[provider]["ok"]:
+        print("[cc-proxy] Failed to restart {} after auth.".format(provider), file=sys.stderr)
+        return 1
+    return 0
 
-        from process import resolve_pid_by_port
-        was_running = bool(resolve_pid_by_port(PORTS[provider]))
-        if not run_auth(base_dir, provider):
-            return 1
 
-        if not was_running:
-            print("[cc-proxy] {} proxy is not running. Auto-restart skipped.".format(provider))
-            return 0
+def _cmd_token_dir(base_dir, args):
+    from commands import cmd_token_dir
+    if args and args[0] == "--reset":
+        return cmd_token_dir(base_dir, reset=True)
+    token_dir = args[0] if args else None
+    return cmd_token_dir(base_dir, token_dir)
 
-        print("[cc-proxy] Restarting {} proxy to reload tokens...".format(provider))
-        stop_proxy(base_dir, provider)
-        if not start_proxy(base_dir, provider):
-            print("[cc-proxy] Failed to restart {} after auth.".format(provider), file=sys.stderr)
-            return 1
-        return 0
 
-    elif cmd == "token-dir":
-        rest = args[1:]
-        if rest and rest[0] == "--reset":
-            return cmd_token_dir(base_dir, reset=True)
-        token_dir = rest[0] if rest else None
-        return cmd_token_dir(base_dir, token_dir)
+def _cmd_token_list(base_dir, args):
+    if len(args) > 1:
+        print("[cc-proxy] Usage: token-list [provider]", file=sys.stderr)
+        return 1
+    provider = args[0] if args else None
+    if provider and provider not in PROVIDERS:
+        return _invalid_provider(provider)
+    from commands import cmd_token_list
+    return cmd_token_list(base_dir, provider)
 
-    elif cmd == "token-list":
-        if len(args) > 2:
-            print("[cc-proxy] Usage: token-list [provider]", file=sys.stderr)
-            return 1
-        provider = args[1] if len(args) > 1 else None
-        if provider and provider not in PROVIDERS:
-            print("[cc-proxy] Invalid provider: {}".format(provider), file=sys.stderr)
-            return 1
-        return cmd_token_list(base_dir, provider)
 
-    elif cmd == "token-delete":
-        if len(args) < 3:
-            print("[cc-proxy] Usage: token-delete <provider> <token-file-or-path> [--yes]", file=sys.stderr)
-            return 1
-        provider = args[1]
-        target = args[2]
-        yes = "--yes" in args[3:]
-        return cmd_token_delete(base_dir, provider, target, yes=yes)
-
-    elif cmd == "set-secret":
-        if len(args) < 2:
-            print("[cc-proxy] Usage: set-secret <secret>", file=sys.stderr)
-            return 1
-        cmd_set_secret(base_dir, args[1])
-        return 0
+def _cmd_token_delete(base_dir, args):
+    if len(args) < 2:
+        print("[cc-proxy] Usage: token-delete <provider> <token-file-or-path> [--yes]", file=sys.stderr)
+        return 1
+    from commands import cmd_token_delete
+    provider = args[0]
+    target = args[1]
+    yes = "--yes" in args[2:]
+    return cmd_token_delete(base_dir, provider, target, yes=yes)
 
-    elif cmd == "usage-clear":
-        provider = args[1] if len(args) > 1 else None
-        if provider:
-            if provider not in PROVIDERS:
-                print("[cc-proxy] Invalid provider: {}".format(provider), file=sys.stderr)
-                return 1
-            _usage_cumulative_clear(provider)
-            print("[cc-proxy] Cleared cumulative usage: {}".format(provider))
-        else:
-            for pvd in PROVIDERS:
-                _usage_cumulative_clear(pvd)
-            print("[cc-proxy] Cleared cumulative usage: all providers")
-        return 0
 
-    elif cmd == "install-profile":
-        hint_only = "--hint-only" in args
-        install_profile(base_dir, hint_only)
+def _cmd_set_secret(base_dir, args):
+    if not args:
+        print("[cc-proxy] Usage: set-secret <secret>", file=sys.stderr)
+        return 1
+    from commands import cmd_set_secret
+    cmd_set_secret(base_dir, args[0])
+    return 0
+
+
+def _cmd_usage_clear(base_dir, args):
+    provider = args[0] if args else None
+    if provider and provider not in PROVIDERS:
+        return _invalid_provider(provider)
+    from usage import _usage_cumulative_clear
+    if provider:
+        _usage_cumulative_clear(provider)
+        print("[cc-proxy] Cleared cumulative usage: {}".format(provider))
+    else:
+        for pvd in PROVIDERS:
+            _usage_cumulative_clear(pvd)
+        print("[cc-proxy] Cleared cumulative usage: all providers")
+    return 0
+
+
+def _cmd_install_profile(base_dir, args):
+    from commands import install_profile
+    install_profile(base_dir, "--hint-only" in args)
+    return 0
+
+
+def _cmd_clean(base_dir, args):
+    import shutil
+    import subprocess
+
+    claude_args = _split_claude_args(args)
+    env = os.environ.copy()
+    for key in ("ANTHROPIC_BASE_URL", "ANTHROPIC_AUTH_TOKEN",
+                "ANTHROPIC_DEFAULT_OPUS_MODEL", "ANTHROPIC_DEFAULT_SONNET_MODEL",
+                "ANTHROPIC_DEFAULT_HAIKU_MODEL"):
+        env.pop(key, None)
+    claude_bin = shutil.which("claude") or "claude"
+    result = subprocess.run([claude_bin] + claude_args, env=env)
+    return result.returncode
+
+
+def _cmd_update(base_dir, args):
+    from updater import cmd_update
+    return cmd_update(base_dir, force="--force" in args)
+
+
+def _cmd_daemon(base_dir, args):
+    from daemon import cmd_daemon
+    return cmd_daemon(base_dir, args[0] if args else "")
+
+
+def _cmd_activate(base_dir, args):
+    from activator import cmd_activate
+    return cmd_activate(base_dir, args)
+
+
+def _cmd_supervise(base_dir, args):
+    from supervisor import cmd_supervise
+    return cmd_supervise(base_dir, args)
+
+
+_COMMANDS = {
+    "run": _cmd_run,
+    "start": _cmd_start,
+    "stop": _cmd_stop,
+    "version": _cmd_version,
+    "ui": _cmd_ui,
+    "status": _cmd_status,
+    "check": _cmd_check,
+    "auth": _cmd_auth,
+    "token-dir": _cmd_token_dir,
+    "token-list": _cmd_token_list,
+    "token-delete": _cmd_token_delete,
+    "set-secret": _cmd_set_secret,
+    "usage-clear": _cmd_usage_clear,
+    "install-profile": _cmd_install_profile,
+    "clean": _cmd_clean,
+    "update": _cmd_update,
+    "daemon": _cmd_daemon,
+    "activate": _cmd_activate,
+    "supervise": _cmd_supervise,
+}
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else list(argv)
+    if not args or args[0] in ("-h", "--help"):
+        print_usage()
         return 0
 
-    elif cmd == "clean":
-        rest = args[1:]
-        if "--" in rest:
-            idx = rest.index("--")
-            claude_args = rest[idx + 1:]
-        else:
-            claude_args = rest
-        import os
-        import shutil as _shutil
-        env = os.environ.copy()
-        for key in ("ANTHROPIC_BASE_URL", "ANTHROPIC_AUTH_TOKEN",
-                    "ANTHROPIC_DEFAULT_OPUS_MODEL", "ANTHROPIC_DEFAULT_SONNET_MODEL",
-                    "ANTHROPIC_DEFAULT_HAIKU_MODEL"):
-            env.pop(key, None)
-        import subprocess
-        claude_bin = _shutil.which("claude") or "claude"
-        result = subprocess.run([claude_bin] + claude_args, env=env)
-        return result.returncode
-
-    elif cmd == "update":
-        from updater import cmd_update
-        force = "--force" in args[1:]
-        return cmd_update(base_dir, force=force)
-
-    else:
+    cmd = args[0]
+    handler = _COMMANDS.get(cmd)
+    if handler is None:
         print("[cc-proxy] Unknown command: {}".format(cmd), file=sys.stderr)
         print_usage()
         return 1
 
+    from paths import get_base_dir
+    return handler(get_base_dir(), args[1:])
+
 
 if __name__ == "__main__":
     sys.exit(main())
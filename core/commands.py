@@ -1,6 +1,6 @@
 """
 Auth, invoke, profile install, and token/secret commands.
-Depends on: constants, paths, process, proxy, config, api, usage
+Depends on: constants, paths, process, proxy, config, api, usage, fastrun
 """
 
 import os
@@ -9,15 +9,16 @@ import subprocess
 import sys
 from pathlib import Path
 
-from constants import HOST, IS_WINDOWS, LOGIN_FLAGS, PORTS, PROVIDERS, TOKEN_DIR_ENV, TOKEN_DIR_META_FILE
+from constants import IS_WINDOWS, LOGIN_FLAGS, PORTS, PROVIDERS, TOKEN_DIR_ENV, TOKEN_DIR_META_FILE
 from paths import (
     _save_token_dir_metadata, _token_prefixes_for_provider,
     get_binary_path, get_config_file, get_provider_dir, get_token_dir,
     resolve_account_file_path,
 )
 from process import find_free_port, resolve_pid_by_port
-from proxy import should_open_auth_browser, start_proxy, stop_proxy
+from proxy import restart_many, should_open_auth_browser
 from config import get_token_infos, rewrite_auth_dir_in_config, rewrite_secret_in_config
+from fastrun import claude_env_overrides
 from usage import _usage_cumulative_clear
 
 
@@ -131,13 +132,20 @@ def _enrich_env_with_user_path(env):
         env["PATH"] = existing + ";" + ";".join(extra)
 
 
-def invoke_claude(provider, opus, sonnet, haiku, claude_args):
+def _claude_not_found():
+    """Print the install hint for a missing claude CLI; returns the exit code to use."""
+    print(
+        "[cc-proxy] ERROR: 'claude' CLI not found in PATH.\n"
+        "[cc-proxy] Install Claude Code: https://claude.ai/download\n"
+        "[cc-proxy] After installation, restart your shell and try again.",
+        file=sys.stderr,
+    )
+    return 1
+
+
+def invoke_claude(provider, opus, sonnet, haiku, claude_args, port=None):
     env = os.environ.copy()
-    env["ANTHROPIC_BASE_URL"] = "http://{}:{}".format(HOST, PORTS[provider])
-    env["ANTHROPIC_AUTH_TOKEN"] = "sk-dummy"
-    env["ANTHROPIC_DEFAULT_OPUS_MODEL"] = opus
-    env["ANTHROPIC_DEFAULT_SONNET_MODEL"] = sonnet
-    env["ANTHROPIC_DEFAULT_HAIKU_MODEL"] = haiku
+    env.update(claude_env_overrides(provider, opus, sonnet, haiku, port))
 
     # Ensure claude.exe (Bun) gets the full user environment even in
     # IDE-embedded terminals that only inherit the system PATH.
@@ -145,13 +153,7 @@ def invoke_claude(provider, opus, sonnet, haiku, claude_args):
 
     claude_bin = _find_claude_bin()
     if not claude_bin:
-        print(
-            "[cc-proxy] ERROR: 'claude' CLI not found in PATH.\n"
-            "[cc-proxy] Install Claude Code: https://claude.ai/download\n"
-            "[cc-proxy] After installation, restart your shell and try again.",
-            file=sys.stderr,
-        )
-        return 1
+        return _claude_not_found()
 
     sys.stdout.flush()
     sys.stderr.flush()
@@ -250,22 +252,25 @@ def cmd_set_secret(base_dir, secret):
             updated += 1
     print("[cc-proxy] Secret key set in {} file(s).".format(updated))
 
-    restarted = 0
-    for pvd in PROVIDERS:
-        if resolve_pid_by_port(PORTS[pvd]):
-            print("[cc-proxy] Restarting provider: {}".format(pvd))
-            stop_proxy(base_dir, pvd)
-            if start_proxy(base_dir, pvd):
-                restarted += 1
-            else:
-                print("[cc-proxy] Failed to restart: {}".format(pvd), file=sys.stderr)
-
+    restarted = _restart_running(base_dir, quiet=False)
     if restarted == 0:
         print("[cc-proxy] No running providers found. Run cc-<provider> when needed.")
     else:
         print("[cc-proxy] Restarted {} running provider(s).".format(restarted))
 
 
+def _restart_running(base_dir, quiet=False):
+    """Restart every running provider together (see proxy.restart_many); returns the count restarted."""
+    running = [pvd for pvd in PROVIDERS if resolve_pid_by_port(PORTS[pvd])]
+    for pvd in running:
+        print("[cc-proxy] Restarting provider: {}".format(pvd))
+    results = restart_many(base_dir, running, quiet=quiet) if running else {}
+    for pvd, r in results.items():
+        if not r["ok"]:
+            print("[cc-proxy] Failed to restart: {}".format(pvd), file=sys.stderr)
+    return sum(1 for r in results.values() if r["ok"])
+
+
 def _propagate_token_dir(base_dir, resolved):
     """Update all provider configs and restart running providers with new token-dir."""
     updated = 0
@@ -277,15 +282,7 @@ def _propagate_token_dir(base_dir, resolved):
     if updated:
         print("[cc-proxy] Updated auth-dir in {} provider config(s).".format(updated))
 
-    restarted = 0
-    for pvd in PROVIDERS:
-        if resolve_pid_by_port(PORTS[pvd]):
-            print("[cc-proxy] Restarting provider: {}".format(pvd))
-            stop_proxy(base_dir, pvd, quiet=True)
-            if start_proxy(base_dir, pvd, quiet=True):
-                restarted += 1
-            else:
-                print("[cc-proxy] Failed to restart: {}".format(pvd), file=sys.stderr)
+    restarted = _restart_running(base_dir, quiet=True)
     if restarted:
         print("[cc-proxy] Restarted {} running provider(s).".format(restarted))
     else:
@@ -1,33 +1,55 @@
 """
 YAML config rewriting, token parsing/validation, and date formatting utilities.
 Also provides _parse_iso and _fmt_reset_time used by quota.py and display.py.
+
+Parsed token metadata is kept in configs/.token-index.json keyed by each
+file's (inode, mtime_ns, size), so get_token_infos() costs one scandir pass
+and re-parses only files that changed.  The index "generation" goes up
+whenever a token file is added, changed or removed.  While a
+tokenwatch.TokenWatcher keeps the index current from inotify events
+(update_token_index), the scandir pass is skipped as well.
 Depends on: constants, paths
 """
 
 import json
+import os
 import re
 import shutil
+import stat
 import sys
+import threading
 from datetime import datetime, timezone
 from pathlib import Path
 
 from constants import LOGIN_FLAGS
 from paths import (
-    get_binary_path, get_config_file, get_token_dir, get_token_files,
+    _is_token_file_name, _token_prefixes_for_provider, get_binary_path, get_config_file,
+    get_token_dir, get_token_index_path,
 )
 
+TOKEN_INDEX_VERSION = 1
+_TOKEN_INDEX_MEMO = {}        # index path -> (index file stamp, index) for this process
+_TOKEN_INDEX_LOCK = threading.Lock()
+_WATCHED_TOKEN_DIRS = set()   # token dirs an inotify watcher keeps the index current for
+
+
+def _write_config_if_changed(config_path, old, new):
+    """Leave config.yaml (and its mtime) alone when a rewrite changes nothing."""
+    if new != old:
+        config_path.write_text(new, encoding="utf-8")
+
 
 def rewrite_port_in_config(config_path, port):
-    text = config_path.read_text(encoding="utf-8")
+    orig = text = config_path.read_text(encoding="utf-8")
     if re.search(r"^\s*port\s*:\s*\d+", text, re.MULTILINE):
         text = re.sub(r"(?m)^(\s*port\s*:\s*)\d+", r"\g<1>{}".format(port), text)
     else:
         text = "port: {}\n".format(port) + text
-    config_path.write_text(text, encoding="utf-8")
+    _write_config_if_changed(config_path, orig, text)
 
 
 def rewrite_auth_dir_in_config(config_path, auth_dir):
-    text = config_path.read_text(encoding="utf-8")
+    orig = text = config_path.read_text(encoding="utf-8")
     auth_dir_str = str(Path(auth_dir).expanduser().resolve()).replace("\\", "/")
     if re.search(r"^\s*auth-dir\s*:", text, re.MULTILINE):
         def _replace_auth_dir(m):
@@ -39,7 +61,7 @@ def rewrite_auth_dir_in_config(config_path, auth_dir):
         )
     else:
         text = 'auth-dir: "{}"\n'.format(auth_dir_str) + text
-    config_path.write_text(text, encoding="utf-8")
+    _write_config_if_changed(config_path, orig, text)
 
 
 def rewrite_secret_in_config(config_path, secret):
@@ -115,60 +137,233 @@ def _parse_token_expiry(expiry_str):
         return None
 
 
-def get_token_infos(base_dir, provider):
-    """Return list of dicts with token file info for a provider."""
-    results = []
-    now = datetime.now(timezone.utc)
-    for token_path in get_token_files(base_dir, provider):
-        info = {
-            "file": token_path.name,
-            "path": str(token_path),
-            "email": None,
-            "status": "unknown",
-            "expiry": None,
-        }
-        try:
-            with open(token_path, encoding="utf-8") as f:
-                data = json.load(f)
-            info["email"] = data.get("email")
-            if data.get("disabled"):
-                info["status"] = "disabled"
-            else:
-                # Both formats use a timestamp string for expiry:
-                # - claude/antigravity/codex: top-level "expired" field (timestamp str)
-                # - gemini: "token.expiry" field (timestamp str)
-                expiry_str = data.get("expired") or data.get("token", {}).get("expiry")
-                if expiry_str:
-                    exp = _parse_token_expiry(expiry_str)
-                    info["expiry"] = exp
-                    if exp is None:
-                        info["status"] = "unknown"
-                    elif exp < now:
-                        info["status"] = "expired"
-                    else:
-                        mins = int((exp - now).total_seconds() / 60)
-                        info["status"] = "ok (expires in {}m)".format(mins) if mins < 120 else "ok"
+def _read_token_fields(path):
+    """Parse one token file into the fields get_token_infos() reports."""
+    fields = {"email": None, "disabled": False, "expiry": None, "expiry_bad": False, "error": None}
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        fields["email"] = data.get("email")
+        if data.get("disabled"):
+            fields["disabled"] = True
+        else:
+            # Both formats use a timestamp string for expiry:
+            # - claude/antigravity/codex: top-level "expired" field (timestamp str)
+            # - gemini: "token.expiry" field (timestamp str)
+            expiry_str = data.get("expired") or data.get("token", {}).get("expiry")
+            if expiry_str:
+                exp = _parse_token_expiry(expiry_str)
+                if exp is None:
+                    fields["expiry_bad"] = True
                 else:
-                    info["status"] = "ok"
-        except Exception as e:
-            info["status"] = "error ({})".format(e)
-        results.append(info)
+                    fields["expiry"] = exp.timestamp()
+    except Exception as e:
+        fields["error"] = str(e)
+    return fields
+
+
+def _load_token_index(base_dir):
+    path = str(get_token_index_path(base_dir))
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    memo = _TOKEN_INDEX_MEMO.get(path)
+    if memo and memo[0] == stamp:
+        return memo[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or index.get("version") != TOKEN_INDEX_VERSION:
+        return {}
+    _TOKEN_INDEX_MEMO[path] = (stamp, index)
+    return index
+
+
+def _save_token_index(base_dir, index):
+    path = get_token_index_path(base_dir)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp, str(path))
+        st = os.stat(str(path))
+        _TOKEN_INDEX_MEMO[str(path)] = ((st.st_ino, st.st_mtime_ns, st.st_size), index)
+    except OSError:
+        pass
+
+
+def _index_name_ok(name):
+    return name.endswith(".json") and not name.startswith(".")
+
+
+def _stat_key(st):
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+def _commit_token_index(base_dir, index, token_dir, files):
+    index = {"version": TOKEN_INDEX_VERSION, "token_dir": token_dir,
+             "generation": int(index.get("generation") or 0) + 1, "files": files}
+    _save_token_index(base_dir, index)
+    return index
+
+
+def refresh_token_index(base_dir):
+    """Bring the token index up to date with one scandir pass of the token dir.
+
+    Returns {"version", "token_dir", "generation", "files": {name: fields + "stat"}}.
+    Only files whose stat changed are parsed; the file is rewritten only when
+    something changed.
+    """
+    token_dir = str(get_token_dir(base_dir, create=False))
+    with _TOKEN_INDEX_LOCK:
+        index = _load_token_index(base_dir)
+        same_dir = index.get("token_dir") == token_dir
+        if same_dir and token_dir in _WATCHED_TOKEN_DIRS:
+            return index
+        old = index.get("files", {}) if same_dir else {}
+        files = {}
+        changed = not same_dir
+        try:
+            with os.scandir(token_dir) as it:
+                for entry in it:
+                    if not _index_name_ok(entry.name):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        key = _stat_key(entry.stat())
+                    except OSError:
+                        continue
+                    prev = old.get(entry.name)
+                    if prev and prev.get("stat") == key:
+                        files[entry.name] = prev
+                        continue
+                    fields = _read_token_fields(entry.path)
+                    fields["stat"] = key
+                    files[entry.name] = fields
+                    changed = True
+        except OSError:
+            pass
+        if not changed and len(files) == len(old):
+            return index
+        return _commit_token_index(base_dir, index, token_dir, files)
+
+
+def update_token_index(base_dir, names):
+    """Re-check only the token files *names* (e.g. from inotify) → set of names that changed."""
+    token_dir = str(get_token_dir(base_dir, create=False))
+    with _TOKEN_INDEX_LOCK:
+        index = _load_token_index(base_dir)
+        if index.get("token_dir") != token_dir:
+            index = None
+        else:
+            files = dict(index.get("files", {}))
+            changed = set()
+            for name in names:
+                if not _index_name_ok(name):
+                    continue
+                path = os.path.join(token_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    st = None
+                if st is None or not stat.S_ISREG(st.st_mode):
+                    if files.pop(name, None) is not None:
+                        changed.add(name)
+                    continue
+                key = _stat_key(st)
+                prev = files.get(name)
+                if prev and prev.get("stat") == key:
+                    continue
+                fields = _read_token_fields(path)
+                fields["stat"] = key
+                files[name] = fields
+                changed.add(name)
+            if changed:
+                _commit_token_index(base_dir, index, token_dir, files)
+            return changed
+    # no index for this token dir yet: build it, everything counts as changed
+    return set(refresh_token_index(base_dir)["files"])
+
+
+def set_token_dir_watched(token_dir, watched):
+    """Mark *token_dir* as kept current by a watcher; refresh_token_index() then skips scanning."""
+    if watched:
+        _WATCHED_TOKEN_DIRS.add(str(token_dir))
+    else:
+        _WATCHED_TOKEN_DIRS.discard(str(token_dir))
+
+
+def token_index_generation(base_dir):
+    """Counter that changes whenever any token file is added, changed or removed."""
+    return refresh_token_index(base_dir)["generation"]
+
+
+def _token_status(fields, now):
+    """(status, expiry datetime) for indexed token fields, relative to *now*."""
+    if fields.get("error") is not None:
+        return "error ({})".format(fields["error"]), None
+    if fields.get("disabled"):
+        return "disabled", None
+    if fields.get("expiry_bad"):
+        return "unknown", None
+    if fields.get("expiry") is None:
+        return "ok", None
+    exp = datetime.fromtimestamp(fields["expiry"], timezone.utc)
+    if exp < now:
+        return "expired", exp
+    mins = int((exp - now).total_seconds() / 60)
+    return ("ok (expires in {}m)".format(mins) if mins < 120 else "ok"), exp
+
+
+def get_token_infos(base_dir, provider, index=None):
+    """Return list of dicts with token file info for a provider, newest file first.
+
+    *index* is a refresh_token_index() result the caller already holds.
+    """
+    if index is None:
+        index = refresh_token_index(base_dir)
+    token_dir = Path(index.get("token_dir") or get_token_dir(base_dir, create=False))
+    prefixes = _token_prefixes_for_provider(provider)
+    now = datetime.now(timezone.utc)
+    names = [name for name in index.get("files", {}) if _is_token_file_name(name, prefixes)]
+    names.sort(key=lambda name: (index["files"][name]["stat"][1], name), reverse=True)
+    results = []
+    for name in names:
+        fields = index["files"][name]
+        status, expiry = _token_status(fields, now)
+        results.append({
+            "file": name,
+            "path": str(token_dir / name),
+            "email": fields.get("email"),
+            "status": status,
+            "expiry": expiry,
+        })
     return results
 
 
 def ensure_tokens(base_dir, provider):
-    exe = get_binary_path(base_dir)
-    login_flag = LOGIN_FLAGS[provider]
-    auth_hint = "  {} -config configs/{}/config.yaml {}".format(
-        exe.name, provider, login_flag)
-
     token_dir = get_token_dir(base_dir, create=True)
 
     config_path = get_config_file(base_dir, provider)
     if config_path.exists():
         rewrite_auth_dir_in_config(config_path, token_dir)
 
-    tokens = get_token_infos(base_dir, provider)
+    print_token_summary(base_dir, provider, get_token_infos(base_dir, provider), token_dir)
+    return True
+
+
+def print_token_summary(base_dir, provider, tokens, token_dir):
+    """The token table (or the no-token hint) printed before claude launches."""
+    exe = get_binary_path(base_dir)
+    login_flag = LOGIN_FLAGS[provider]
+    auth_hint = "  {} -config configs/{}/config.yaml {}".format(
+        exe.name, provider, login_flag)
 
     if not tokens:
         print("[cc-proxy] WARNING: No token files found for '{}'.".format(provider))
@@ -176,7 +371,7 @@ def ensure_tokens(base_dir, provider):
         print("[cc-proxy] To authenticate, run:")
         print("[cc-proxy] {}".format(auth_hint))
         print("[cc-proxy] Proceeding anyway...")
-        return True
+        return
 
     # Print token status table so user can see auth state before claude launches
     any_expired = any("expired" in t["status"] for t in tokens)
@@ -189,4 +384,3 @@ def ensure_tokens(base_dir, provider):
     if any_expired:
         print("[cc-proxy] WARNING: Some tokens are expired. To re-authenticate:")
         print("[cc-proxy] {}".format(auth_hint))
-    return True
@@ -36,9 +36,27 @@ LOGIN_FLAGS = {
 TOKEN_DIR_ENV = "CC_PROXY_TOKEN_DIR"
 TOKEN_DIR_META_FILE = ".token-dir"
 INSTALL_META_JSON_NAME = ".install-meta.json"
+USAGE_LEDGER_NAME = "usage-ledger.sqlite3"
+DAEMON_SOCKET_NAME = "cc-proxyd.sock"
+DAEMON_ENV = "CC_PROXY_DAEMON"  # "0" disables the cc-proxyd client hop
+STOP_GRACE_ENV = "CC_PROXY_STOP_GRACE"  # seconds between SIGTERM and SIGKILL on stop
+RESTART_MODE_ENV = "CC_PROXY_RESTART_MODE"  # "bluegreen" restarts through the forwarding shim
+DRAIN_TIMEOUT_ENV = "CC_PROXY_DRAIN_TIMEOUT"  # seconds an old blue/green instance may keep serving
+BLUEGREEN_STATE_NAME = ".bluegreen.json"
+RELOAD_CACHE_NAME = ".reload-strategy.json"  # winning account-reload strategy per binary version
+TOKEN_INDEX_NAME = ".token-index.json"       # parsed token metadata keyed by file stat
+FAST_RUN_ENV = "CC_PROXY_FAST_RUN"  # "0" makes `run` always take the full prepare path
+RUN_STATE_NAME = ".run-state.json"  # what the last successful `run` prepared, per provider
+OVERLAP_START_ENV = "CC_PROXY_OVERLAP_START"  # "1" launches claude while a cold proxy starts
+ACTIVATOR_STATE_NAME = ".activator.json"  # on-demand activator pid and per-provider backends
+IDLE_TIMEOUT_ENV = "CC_PROXY_IDLE_TIMEOUT"  # seconds without traffic before the activator stops a provider
+SUPERVISOR_STATE_NAME = ".supervisor.json"  # supervisor pid, per-provider restarts/uptime/breaker
+SUPERVISOR_RESUME_NAME = ".supervisor.resume"  # flag file: `start` asks the supervisor to resume stopped providers
+CRASH_LOOP_LIMIT_ENV = "CC_PROXY_CRASH_LOOP_LIMIT"  # failures within 5 min before the supervisor gives up
 
 # Schema versions
 QUOTA_CACHE_TTL = 60  # seconds
+QUOTA_CACHE_MAX_STALE = 900  # seconds; older entries are refetched before display
 USAGE_SNAPSHOT_SCHEMA_VERSION = 1
 USAGE_CUMULATIVE_SCHEMA_VERSION = 1
 
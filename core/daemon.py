@@ -0,0 +1,327 @@
+"""
+cc-proxyd: optional long-running helper that keeps cc-proxy state warm.
+
+A plain `cc_proxy.py status` pays for interpreter start, importing every
+core module and rediscovering pids, secrets and token files on each call.
+`cc_proxy.py daemon start` runs one process that has all of that loaded
+(prefetch engine, pooled management connections, port→pid and quota caches)
+and serves status / check / start / stop and `run` preparation over a Unix
+domain socket under configs/.  cc_proxy.py tries the socket first through
+client_dispatch() and falls back to running the command itself when no
+daemon answers.  POSIX only.
+
+Wire format: the client sends one JSON line
+  {"argv": [...], "env": {...}}
+and reads one JSON document until EOF:
+  {"rc": int, "stdout": str, "stderr": str[, "exec": {"argv": [...], "env": {...}}]}
+"exec" (for run) tells the client to exec claude itself, so claude stays
+attached to the user's terminal.
+
+The client half needs only os/sys + constants until a socket file exists
+(json/socket load after that), so the hop costs nothing when no daemon is
+set up; server-side modules are imported only when serving.
+Depends on: constants (server side: paths, cc_proxy, commands; client side: commands
+only when claude is missing)
+"""
+
+import os
+import sys
+
+from constants import (
+    DAEMON_ENV, DAEMON_SOCKET_NAME, DRAIN_TIMEOUT_ENV, OVERLAP_START_ENV, RESTART_MODE_ENV,
+    STOP_GRACE_ENV,
+)
+
+DAEMON_COMMANDS = ("status", "check", "start", "stop", "run")
+DAEMON_CONNECT_TIMEOUT = 0.5   # seconds; a dead daemon must not delay the fallback
+DAEMON_REQUEST_TIMEOUT = 300.0  # start/run can wait for several proxies to get healthy
+DAEMON_START_TIMEOUT = 5.0
+# Client environment the served command may depend on (colors, secrets, token dir,
+# ssh, and the per-invocation stop/restart knobs)
+DAEMON_FORWARD_ENV = (
+    "TERM", "COLORTERM", "CC_PROXY_SECRET", "CC_PROXY_TOKEN_DIR",
+    "SSH_CONNECTION", "SSH_TTY", "DISPLAY", "WAYLAND_DISPLAY",
+    STOP_GRACE_ENV, DRAIN_TIMEOUT_ENV, RESTART_MODE_ENV,
+)
+
+
+def _default_socket_path():
+    # same as paths.get_daemon_socket_path(get_base_dir()) without importing pathlib
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, "configs", DAEMON_SOCKET_NAME)
+
+
+def _request(sock_path, payload, timeout=DAEMON_REQUEST_TIMEOUT):
+    """Send one request; returns the decoded response or None if no daemon answered."""
+    import json
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+        sock.connect(sock_path)
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except OSError:
+        return None
+    finally:
+        sock.close()
+    try:
+        return json.loads(b"".join(chunks).decode("utf-8"))
+    except ValueError:
+        return None
+
+
+def _client_env():
+    env = {k: os.environ[k] for k in DAEMON_FORWARD_ENV if k in os.environ}
+    try:
+        size = os.get_terminal_size(sys.stdout.fileno())
+        env["COLUMNS"], env["LINES"] = str(size.columns), str(size.lines)
+    except (OSError, ValueError):
+        for k in ("COLUMNS", "LINES"):
+            if k in os.environ:
+                env[k] = os.environ[k]
+    return env
+
+
+def client_dispatch(argv, sock_path=None):
+    """Run *argv* through a running cc-proxyd; returns its exit code, or None to run locally."""
+    if not argv or argv[0] not in DAEMON_COMMANDS:
+        return None
+    if os.environ.get(DAEMON_ENV) == "0" or sys.platform == "win32":
+        return None
+    if argv[0] == "run" and os.environ.get(OVERLAP_START_ENV) == "1":
+        return None   # the overlapped start needs claude to be our child (overlap.py)
+    sock_path = sock_path or _default_socket_path()
+    if not os.path.exists(sock_path):
+        return None
+    resp = _request(sock_path, {"argv": list(argv), "env": _client_env()})
+    if not isinstance(resp, dict) or "rc" not in resp:
+        return None
+
+    if resp.get("stdout"):
+        sys.stdout.write(resp["stdout"])
+    if resp.get("stderr"):
+        sys.stderr.write(resp["stderr"])
+    spec = resp.get("exec")
+    if not spec:
+        return resp["rc"]
+
+    os.environ.update(spec["env"])
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        os.execvp(spec["argv"][0], spec["argv"])
+    except OSError:
+        from commands import _claude_not_found   # failure path only: keep the exec path light
+        return _claude_not_found()
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+def _make_server(base_dir, sock_path):
+    import io
+    import json
+    import socketserver
+    import threading
+    import time
+    import traceback
+    from contextlib import redirect_stderr, redirect_stdout
+
+    import cc_proxy
+    from commands import claude_env_overrides
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                req = json.loads(self.rfile.readline().decode("utf-8"))
+                resp = self.server.execute(req.get("argv") or [], req.get("env") or {})
+            except Exception:
+                resp = {"rc": 1, "stdout": "", "stderr": traceback.format_exc()}
+            self.wfile.write(json.dumps(resp).encode("utf-8"))
+
+    class DaemonServer(socketserver.UnixStreamServer):
+        """Serves one request at a time: commands print to a redirected stdout
+        and read os.environ, so they must not interleave."""
+
+        def __init__(self):
+            self.base_dir = base_dir
+            self.started_at = time.time()
+            self.requests = 0
+            self.main = cc_proxy.main
+            self.prepare_run = cc_proxy.prepare_run
+            self._lock = threading.Lock()
+            if os.path.exists(str(sock_path)):
+                os.unlink(str(sock_path))
+            old_umask = os.umask(0o177)
+            try:
+                super().__init__(str(sock_path), Handler)
+            finally:
+                os.umask(old_umask)
+
+        def execute(self, argv, env):
+            if argv == ["__ping__"]:
+                return {"rc": 0, "pid": os.getpid(), "uptime": time.time() - self.started_at,
+                        "requests": self.requests}
+            if argv == ["__shutdown__"]:
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {"rc": 0}
+            if not argv or argv[0] not in DAEMON_COMMANDS:
+                return {"rc": 1, "stdout": "", "stderr": "[cc-proxyd] unsupported command\n"}
+            with self._lock:
+                self.requests += 1
+                return self._run(argv, env)
+
+        def _run(self, argv, env):
+            out, err = io.StringIO(), io.StringIO()
+            saved = {k: os.environ.get(k) for k in set(env) | set(DAEMON_FORWARD_ENV) | {"COLUMNS", "LINES"}}
+            for k in saved:
+                os.environ.pop(k, None)
+            os.environ.update(env)
+            resp = {}
+            try:
+                with redirect_stdout(out), redirect_stderr(err):
+                    try:
+                        if argv[0] == "run":
+                            rc, spec = self.prepare_run(self.base_dir, argv[1:])
+                            if spec is not None:
+                                provider, opus, sonnet, haiku, claude_args = spec
+                                resp["exec"] = {
+                                    "argv": ["claude"] + list(claude_args),
+                                    "env": claude_env_overrides(provider, opus, sonnet, haiku),
+                                }
+                        else:
+                            rc = self.main(argv)
+                    except SystemExit as e:
+                        rc = e.code if isinstance(e.code, int) else 1
+                    except Exception:
+                        traceback.print_exc()
+                        rc = 1
+            finally:
+                for k, v in saved.items():
+                    if v is None:
+                        os.environ.pop(k, None)
+                    else:
+                        os.environ[k] = v
+            resp.update({"rc": rc if isinstance(rc, int) else 0,
+                         "stdout": out.getvalue(), "stderr": err.getvalue()})
+            return resp
+
+        def service_actions(self):
+            # Proxies started here are our children: reap the ones that exit so a
+            # zombie never looks alive to is_pid_alive().  Requests run on this
+            # thread, so no subprocess.run() is waiting on a child right now.
+            while True:
+                try:
+                    pid, _ = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    return
+                if pid == 0:
+                    return
+
+        def server_close(self):
+            super().server_close()
+            try:
+                os.unlink(str(sock_path))
+            except OSError:
+                pass
+
+    return DaemonServer()
+
+
+def serve(base_dir, sock_path=None):
+    """Run the daemon in the foreground until `daemon stop` (or SIGTERM)."""
+    import signal
+    from paths import get_daemon_socket_path
+
+    sock_path = sock_path or get_daemon_socket_path(base_dir)
+    os.makedirs(os.path.dirname(str(sock_path)), exist_ok=True)
+    server = _make_server(base_dir, sock_path)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.server_close()
+    return 0
+
+
+def daemon_ping(sock_path):
+    resp = _request(str(sock_path), {"argv": ["__ping__"]}, timeout=DAEMON_CONNECT_TIMEOUT)
+    return resp if isinstance(resp, dict) and "pid" in resp else None
+
+
+def cmd_daemon(base_dir, action):
+    """`cc_proxy.py daemon start|stop|status|serve`."""
+    import socket
+    import subprocess
+    import time
+    from paths import get_daemon_socket_path
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("[cc-proxy] cc-proxyd needs Unix domain sockets (not available here).", file=sys.stderr)
+        return 1
+    sock_path = get_daemon_socket_path(base_dir)
+
+    if action == "serve":
+        return serve(base_dir, sock_path)
+
+    info = daemon_ping(sock_path)
+    if action == "status":
+        if not info:
+            print("[cc-proxy] cc-proxyd: not running")
+            return 1
+        print("[cc-proxy] cc-proxyd: running (pid={}, uptime={}s, requests={})".format(
+            info["pid"], int(info["uptime"]), info["requests"]))
+        return 0
+
+    if action == "stop":
+        if not info:
+            print("[cc-proxy] cc-proxyd: not running")
+            return 0
+        _request(str(sock_path), {"argv": ["__shutdown__"]}, timeout=DAEMON_CONNECT_TIMEOUT)
+        deadline = time.monotonic() + DAEMON_START_TIMEOUT
+        while os.path.exists(str(sock_path)) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        print("[cc-proxy] cc-proxyd stopped (pid={}).".format(info["pid"]))
+        return 0
+
+    if action == "start":
+        if info:
+            print("[cc-proxy] cc-proxyd already running (pid={}).".format(info["pid"]))
+            return 0
+        sock_path.parent.mkdir(parents=True, exist_ok=True)
+        log_path = sock_path.parent / "cc-proxyd.log"
+        env = dict(os.environ)
+        env[DAEMON_ENV] = "0"
+        with open(str(log_path), "a") as log:
+            proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), str(base_dir)],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                env=env, start_new_session=True,
+            )
+        deadline = time.monotonic() + DAEMON_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if daemon_ping(sock_path):
+                print("[cc-proxy] cc-proxyd started (pid={}, socket={}).".format(proc.pid, sock_path))
+                return 0
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        print("[cc-proxy] cc-proxyd failed to start; see {}".format(log_path), file=sys.stderr)
+        return 1
+
+    print("[cc-proxy] Usage: daemon start|stop|status", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    from pathlib import Path
+    sys.exit(serve(Path(sys.argv[1])))
@@ -1,31 +1,25 @@
 """
 ANSI formatting, box drawing, account helpers, and status dashboard rendering.
-Depends on: constants, paths, config, api, quota, usage, proxy
+Depends on: constants, paths, config, usage
+(_prefetch_provider_data delegates to prefetch, imported lazily)
 """
 
 import json
 import os
 import re
 import shutil
+import time
 import unicodedata
-import urllib.error
-import urllib.parse
 from datetime import datetime, timezone
 
 from constants import (
-    _C_BOLD, _C_DIM, _C_GREEN, _C_RED, _C_RESET,
+    _C_BOLD, _C_DIM, _C_GREEN, _C_RED, _C_RESET, _C_YELLOW,
     _PROVIDER_BRAND_COLORS,
     PORTS, PROVIDERS,
 )
 from paths import get_token_dir, _token_prefixes_for_provider
 from config import _parse_iso
-from api import _management_api, _proxy_api, _read_secret_key
-from quota import _QUOTA_FETCHERS, _quota_cache_load, _quota_cache_save
-from usage import (
-    _usage_cumulative_apply_to_usage_data, _usage_cumulative_update_from_live,
-    _usage_snapshot_load,
-)
-from proxy import get_status
+from usage import UsageAggregator
 
 # Module-level mutable state for box drawing edge color
 _BOX_EDGE_COLOR = ""
@@ -52,7 +46,11 @@ def _time_ago(iso_str):
     now = datetime.now(timezone.utc)
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
-    delta = (now - dt).total_seconds()
+    return _fmt_age((now - dt).total_seconds())
+
+
+def _fmt_age(delta):
+    """Seconds → 'just now', '23m ago', '2h ago'"""
     if delta < 60:
         return "just now"
     if delta < 3600:
@@ -62,6 +60,37 @@ def _time_ago(iso_str):
     return "{}d ago".format(int(delta / 86400))
 
 
+def _fmt_duration(seconds):
+    """Seconds → '45s', '12m', '2h05m', '3d04h'"""
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return "{}s".format(seconds)
+    if seconds < 3600:
+        return "{}m".format(seconds // 60)
+    if seconds < 86400:
+        return "{}h{:02d}m".format(seconds // 3600, seconds % 3600 // 60)
+    return "{}d{:02d}h".format(seconds // 86400, seconds % 86400 // 3600)
+
+
+def _fmt_supervision(info, now=None):
+    """Supervisor entry from get_status()["supervised"] → dashboard header suffix."""
+    now = time.time() if now is None else now
+    restarts = info.get("restarts", 0)
+    count = "{} restart{}".format(restarts, "" if restarts == 1 else "s")
+    state = info.get("state")
+    if state == "running":
+        return "  supervised, up {}, {}".format(_fmt_duration(now - (info.get("since") or now)), count)
+    if state == "broken":
+        return "  " + _C_RED + "crash loop" + _C_RESET + " ({} failures, last: {})".format(
+            info.get("failures", 0), info.get("last_exit") or "?")
+    if state == "backoff":
+        wait = _fmt_duration((info.get("next_start") or now) - now)
+        return "  " + _C_YELLOW + "restarting in {}".format(wait) + _C_RESET + " ({})".format(count)
+    if state == "starting":
+        return "  supervised, starting ({})".format(count)
+    return "  " + _C_DIM + "supervision paused" + _C_RESET
+
+
 def _fmt_local_dt(iso_str):
     """ISO timestamp → local time 'YYYY-MM-DD HH:MM:SS'."""
     dt = _parse_iso(iso_str)
@@ -295,143 +324,25 @@ def _dedupe_auth_files(auth_data, provider=None):
 # Data aggregation
 # ---------------------------------------------------------------------------
 
-def _aggregate_per_account(usage_data):
-    """Aggregate usage stats per account from /v0/management/usage response."""
-    account_stats = {}
-    if not usage_data:
-        return account_stats
-    for api_data in usage_data.get("usage", {}).get("apis", {}).values():
-        for model_data in api_data.get("models", {}).values():
-            for detail in model_data.get("details", []):
-                src = detail.get("source", "unknown")
-                tokens = detail.get("tokens", {})
-                tok = tokens.get("total_tokens", 0)
-                ts  = detail.get("timestamp", "")
-                failed = detail.get("failed", False)
-                if src not in account_stats:
-                    account_stats[src] = {
-                        "requests": 0, "tokens": 0, "fails": 0,
-                        "input": 0, "output": 0, "reasoning": 0,
-                        "last_time": "", "last_tok": 0,
-                        "last_input": 0, "last_output": 0, "last_reasoning": 0,
-                    }
-                account_stats[src]["requests"] += 1
-                account_stats[src]["tokens"] += tok
-                account_stats[src]["input"] += int(tokens.get("input_tokens", 0) or 0)
-                account_stats[src]["output"] += int(tokens.get("output_tokens", 0) or 0)
-                account_stats[src]["reasoning"] += int(tokens.get("reasoning_tokens", 0) or 0)
-                if failed:
-                    account_stats[src]["fails"] += 1
-                if ts > account_stats[src]["last_time"]:
-                    account_stats[src]["last_time"] = ts
-                    account_stats[src]["last_tok"] = tok
-                    account_stats[src]["last_input"] = int(tokens.get("input_tokens", 0) or 0)
-                    account_stats[src]["last_output"] = int(tokens.get("output_tokens", 0) or 0)
-                    account_stats[src]["last_reasoning"] = int(tokens.get("reasoning_tokens", 0) or 0)
-    return account_stats
+def _aggregate_usage(usage_data):
+    """One-shot rollups (daily/models/accounts) from a /v0/management/usage response."""
+    agg = UsageAggregator()
+    agg.update(usage_data)
+    return agg.rollups()
 
 
 def _prefetch_provider_data(base_dir, provider, fetch_quota=False, fetch_check=False):
-    """Fetch all management data for a provider (designed for parallel threading).
+    """Fetch all management data for a provider.
 
     fetch_quota: also call upstream provider quota APIs (slower, ~3-5s per account)
     fetch_check: also fetch per-account model lists from management API
-    """
-    import threading
-    result = {
-        "status": None, "auth_data": None, "usage_data": None,
-        "auth_error": False, "models_per_account": {},
-        "quota_data": {},   # {account_name: quota_dict or None}
-        "proxy_models": None,
-        "usage_source": "none",            # live | snapshot | none
-        "usage_snapshot_at": None,          # ISO string when source=snapshot
-    }
-    result["status"] = get_status(base_dir, provider)
-    if result["status"]["running"] and result["status"]["healthy"]:
-        try:
-            secret = _read_secret_key(base_dir, provider)
-            result["auth_data"] = _dedupe_auth_files(
-                _management_api(provider, "auth-files", secret), provider=provider)
-            result["usage_data"] = _management_api(provider, "usage", secret)
-            if isinstance(result["usage_data"], dict):
-                _usage_cumulative_update_from_live(provider, result["usage_data"])
-                result["usage_data"] = _usage_cumulative_apply_to_usage_data(provider, result["usage_data"])
-                result["usage_source"] = "live"
-        except urllib.error.HTTPError as e:
-            if e.code == 401:
-                result["auth_error"] = True
-        except Exception:
-            pass
 
-        if result["auth_data"] and not result["auth_error"]:
-            files = result["auth_data"].get("files", [])
-            secret = _read_secret_key(base_dir, provider)
-            threads = []
-
-            # per-account model lists (for routing-pool detection)
-            if fetch_check:
-                mpa = result["models_per_account"]
-
-                def _fetch_models(f, out, _pvd=provider, _sec=secret):
-                    name = f.get("name") or f.get("id") or ""
-                    if not name:
-                        return
-                    try:
-                        qs = "auth-files/models?name={}".format(
-                            urllib.parse.quote(name, safe="@.-_")
-                        )
-                        data = _management_api(_pvd, qs, _sec)
-                        out[name] = data.get("models", [])
-                    except Exception:
-                        out[name] = None
-
-                threads += [threading.Thread(target=_fetch_models, args=(f, mpa))
-                            for f in files]
-
-            # per-account upstream quota
-            if fetch_quota and provider in _QUOTA_FETCHERS:
-                fetcher = _QUOTA_FETCHERS[provider]
-                qpa = result["quota_data"]
-
-                def _fetch_quota_one(f, out, _pvd=provider, _sec=secret, _fn=fetcher):
-                    name = f.get("name") or f.get("id") or ""
-                    auth_index = f.get("auth_index", "")
-                    if not name or not auth_index:
-                        return
-                    cached = _quota_cache_load(_pvd, auth_index)
-                    if cached is not None:
-                        out[name] = cached
-                        return
-                    data = _fn(_pvd, _sec, auth_index)
-                    if data is not None:
-                        _quota_cache_save(_pvd, auth_index, data)
-                    out[name] = data
-
-                threads += [threading.Thread(target=_fetch_quota_one, args=(f, qpa))
-                            for f in files]
-
-            # proxy model list (for check panel)
-            if fetch_check:
-                def _fetch_proxy_models(_pvd=provider):
-                    try:
-                        result["proxy_models"] = _proxy_api(_pvd, "v1/models")
-                    except Exception:
-                        pass
-                threads.append(threading.Thread(target=_fetch_proxy_models))
-
-            for t in threads:
-                t.start()
-            for t in threads:
-                t.join(timeout=10)
-
-    if result["usage_source"] == "none":
-        snap = _usage_snapshot_load(provider)
-        if snap:
-            result["usage_data"] = _usage_cumulative_apply_to_usage_data(provider, snap.get("usage_data"))
-            result["usage_source"] = "snapshot"
-            result["usage_snapshot_at"] = snap.get("captured_at_iso")
-
-    return result
+    Runs on the shared asyncio prefetch engine; use prefetch.prefetch_providers()
+    to fetch several providers in one pass.
+    """
+    from prefetch import prefetch_providers
+    return prefetch_providers(base_dir, [provider],
+                              fetch_quota=fetch_quota, fetch_check=fetch_check)[provider]
 
 
 # ---------------------------------------------------------------------------
@@ -446,12 +357,17 @@ def _print_status_dashboard(base_dir, provider, status, W,
                             selected_account_key=None,
                             frame_color="",
                             usage_source="none",
-                            usage_snapshot_at=None):
+                            usage_snapshot_at=None,
+                            usage_rollups=None,
+                            staged_account_keys=None):
     global _BOX_EDGE_COLOR
     """Print rich dashboard panel for a provider.
 
     quota_data:    {account_name: quota_dict} — show Quota section when present
+    usage_rollups: ledger_rollups() / UsageAggregator.rollups() result for the
+                   Daily/Models/Per-account sections (computed from usage_data if omitted)
     show_check:    show Account Validation + Available Models section (replaces cc-proxy-check)
+    staged_account_keys: account identities with a toggle staged in the TUI (marked *)
     """
     running = status["running"]
     healthy = status["healthy"]
@@ -462,10 +378,12 @@ def _print_status_dashboard(base_dir, provider, status, W,
         state_str = "running"
     else:
         dot_str = _C_DIM + "\u25cb" + _C_RESET
-        state_str = _C_DIM + "stopped" + _C_RESET
+        state_str = _C_DIM + ("on demand" if status.get("on_demand") else "stopped") + _C_RESET
 
     files = auth_data.get("files", []) if auth_data else []
     acct_suffix = "  {} accounts".format(len(files)) if files else ""
+    if status.get("supervised"):
+        state_str += _fmt_supervision(status["supervised"])
     header = "  {}  :{}   {} {}{}".format(provider, port, dot_str, state_str, acct_suffix)
     prev_edge_color = _BOX_EDGE_COLOR
     if frame_color:
@@ -539,8 +457,10 @@ def _print_status_dashboard(base_dir, provider, status, W,
             else:
                 is_selected = bool(selected_account_name and name == selected_account_name)
             cursor = "\u25b8" if is_selected else " "
-            row = "{} {:<26}  {:>9}  {:>8}  {} {}".format(
-                cursor, label[:26], mc_str, time_str, indicator, acct_status
+            staged = bool(staged_account_keys) and _account_identity(f) in staged_account_keys
+            mark = _C_YELLOW + "*" + _C_RESET if staged else " "
+            row = "{}{}{:<26}  {:>9}  {:>8}  {} {}".format(
+                cursor, mark, label[:26], mc_str, time_str, indicator, acct_status
             )
             print(_box_line(row, W))
 
@@ -573,36 +493,11 @@ def _print_status_dashboard(base_dir, provider, status, W,
     print(_box_line(summary, W))
 
     # Models
-    apis = u.get("apis", {})
-    model_stats = {}
-    for api_data in apis.values():
-        for model_name, model_data in api_data.get("models", {}).items():
-            details = model_data.get("details", [])
-            if model_name not in model_stats:
-                model_stats[model_name] = {
-                    "requests": 0, "fails": 0,
-                    "input": 0, "output": 0, "reasoning": 0,
-                    "last_time": "",
-                    "last_input": 0, "last_output": 0, "last_reasoning": 0,
-                }
-            s = model_stats[model_name]
-            for d in details:
-                toks = d.get("tokens", {})
-                s["requests"] += 1
-                s["input"]    += int(toks.get("input_tokens",     0) or 0)
-                s["output"]   += int(toks.get("output_tokens",    0) or 0)
-                s["reasoning"] += int(toks.get("reasoning_tokens", 0) or 0)
-                if d.get("failed", False):
-                    s["fails"] += 1
-                ts = d.get("timestamp", "")
-                if ts > s["last_time"]:
-                    s["last_time"]      = ts
-                    s["last_input"]     = int(toks.get("input_tokens",     0) or 0)
-                    s["last_output"]    = int(toks.get("output_tokens",    0) or 0)
-                    s["last_reasoning"] = int(toks.get("reasoning_tokens", 0) or 0)
+    if not usage_rollups:
+        usage_rollups = _aggregate_usage(usage_data)
+    model_stats = usage_rollups["models"]
 
     _C_CYAN   = "\033[36m"
-    _C_YELLOW = "\033[33m"
     _C_TEAL   = "\033[38;5;73m"   # muted blue-green for input
     _C_PURPLE = "\033[38;5;139m" # muted purple for output
     _DOT      = " \u00b7 "
@@ -620,8 +515,13 @@ def _print_status_dashboard(base_dir, provider, status, W,
         return "i{}/o{}/r{}".format(i_s, o_s, r_s)
 
     # Daily stats (shown before models)
-    requests_by_day = u.get("requests_by_day", {})
-    tokens_by_day = u.get("tokens_by_day", {})
+    requests_by_day = dict(u.get("requests_by_day", {}))
+    tokens_by_day = dict(u.get("tokens_by_day", {}))
+    # the ledger keeps days from before the last proxy restart; the live
+    # counters may include requests whose details the server dropped
+    for day, d in usage_rollups["daily"].items():
+        requests_by_day[day] = max(requests_by_day.get(day, 0), d["requests"])
+        tokens_by_day[day] = max(tokens_by_day.get(day, 0), d["tokens"])
     all_days = sorted(set(list(requests_by_day.keys()) + list(tokens_by_day.keys())))
     if all_days:
         print(_box_line("", W))
@@ -670,7 +570,7 @@ def _print_status_dashboard(base_dir, provider, status, W,
 
 
     # Per-account stats
-    acct_stats = _aggregate_per_account(usage_data)
+    acct_stats = usage_rollups["accounts"]
     if acct_stats:
         print(_box_line("", W))
         print(_box_line("  Per-account:", W))
@@ -741,13 +641,20 @@ def _print_status_dashboard(base_dir, provider, status, W,
                 print(_box_line("  {}  {}\u00d7 {}{}".format(
                     label[:26], _C_RED, msg[:35], _C_RESET), W))
                 continue
-            if not qd:
+            stale = qd.get("__stale__")
+            if not [k for k in qd if k != "__stale__"]:
                 print(_box_line("  {}  {}(no quota data){}".format(
                     label[:26], _C_DIM, _C_RESET), W))
                 continue
-            print(_box_line("  {}".format(label[:34]), W))
+            if stale:
+                print(_box_line("  {}  {}(stale, {}){}".format(
+                    label[:34], _C_DIM, _fmt_age(stale.get("age", 0)), _C_RESET), W))
+            else:
+                print(_box_line("  {}".format(label[:34]), W))
             items = []
             for model_id, info in qd.items():
+                if model_id == "__stale__":
+                    continue
                 if shown_models and model_id not in shown_models:
                     continue
                 items.append((model_id, info))
@@ -0,0 +1,153 @@
+"""
+Fast path for `run <preset>`: exec claude straight away when nothing the
+full path (cc_proxy.prepare_run) would touch has changed since last time.
+
+After a successful prepare_run() the state it left behind is recorded in
+configs/<provider>/.run-state.json:
+
+  config_sha256     config.yaml content (port and auth-dir already rewritten)
+  token_dir         the token directory in effect
+  token_generation  config.refresh_token_index() generation
+  pid, pid_started  the proxy from the pid file and its /proc start time
+
+The next `run` recomputes the same values -- one config read, one token
+dir scandir, the pid file and /proc/<pid>/stat, no file writes and no
+subprocesses -- and when they all match it prints the usual token table
+and execs claude.  Anything different (proxy restarted or stopped, token
+added/changed/removed, config edited, another CC_PROXY_TOKEN_DIR) falls
+back to the full path, which records the new state.  POSIX only;
+CC_PROXY_FAST_RUN=0 turns it off.
+Depends on: constants, paths, config (commands only when claude is missing)
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+from constants import FAST_RUN_ENV, HOST, IS_WINDOWS, PORTS, PRESETS
+from paths import get_base_dir, get_config_file, get_pid_file, get_run_state_file
+from config import get_token_infos, print_token_summary, refresh_token_index
+
+
+def claude_env_overrides(provider, opus, sonnet, haiku, port=None):
+    """Environment variables that point claude at the provider's proxy (or *port* in front of it)."""
+    return {
+        "ANTHROPIC_BASE_URL": "http://{}:{}".format(HOST, PORTS[provider] if port is None else port),
+        "ANTHROPIC_AUTH_TOKEN": "sk-dummy",
+        "ANTHROPIC_DEFAULT_OPUS_MODEL": opus,
+        "ANTHROPIC_DEFAULT_SONNET_MODEL": sonnet,
+        "ANTHROPIC_DEFAULT_HAIKU_MODEL": haiku,
+    }
+
+
+def _config_digest(base_dir, provider):
+    try:
+        with open(str(get_config_file(base_dir, provider)), "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _read_pid(base_dir, provider):
+    # process.read_pid without loading process (subprocess, socket, ...)
+    try:
+        txt = get_pid_file(base_dir, provider).read_text().strip()
+        return int(txt) if txt else None
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def _pid_start_time(pid):
+    """Start time of *pid* (clock ticks since boot) so a reused pid never matches.
+
+    "" where there is no /proc (macOS); None if the process is gone.
+    """
+    try:
+        with open("/proc/{}/stat".format(pid), "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None if os.path.isdir("/proc/self") else ""
+    except OSError:
+        return None
+    fields = raw[raw.rfind(b")") + 2:].split()   # comm may contain spaces
+    return fields[19].decode() if len(fields) > 19 else None
+
+
+def _current_state(base_dir, provider, index):
+    pid = _read_pid(base_dir, provider)
+    return {
+        "config_sha256": _config_digest(base_dir, provider),
+        "token_dir": index.get("token_dir"),
+        "token_generation": index.get("generation"),
+        "pid": pid,
+        "pid_started": _pid_start_time(pid) if pid else None,
+    }
+
+
+def record_run_state(base_dir, provider):
+    """Remember what a successful prepare_run() left behind, for the next fast run."""
+    if IS_WINDOWS:
+        return
+    state = _current_state(base_dir, provider, refresh_token_index(base_dir))
+    if not state["config_sha256"] or not state["pid"] or state["pid_started"] is None:
+        return
+    path = get_run_state_file(base_dir, provider)
+    try:
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, str(path))
+    except OSError:
+        pass
+
+
+def fast_run_spec(base_dir, args):
+    """(provider, opus, sonnet, haiku, claude_args) if `run *args*` may skip prepare_run, else None."""
+    if IS_WINDOWS or os.environ.get(FAST_RUN_ENV) == "0" or not args or args[0] not in PRESETS:
+        return None
+    provider, opus, sonnet, haiku = PRESETS[args[0]]
+    try:
+        with open(str(get_run_state_file(base_dir, provider)), "r") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(saved, dict) or not saved.get("pid") or not _pid_alive(saved["pid"]):
+        return None
+    index = refresh_token_index(base_dir)
+    if _current_state(base_dir, provider, index) != saved:
+        return None
+
+    print_token_summary(base_dir, provider, get_token_infos(base_dir, provider, index), index["token_dir"])
+    print("[cc-proxy] Reusing healthy proxy for {} (pid={})".format(provider, saved["pid"]))
+    rest = args[1:]
+    claude_args = rest[rest.index("--") + 1:] if "--" in rest else rest
+    return provider, opus, sonnet, haiku, claude_args
+
+
+def exec_claude(provider, opus, sonnet, haiku, claude_args):
+    """Replace this process with claude pointed at *provider*'s proxy; returns only on failure."""
+    os.environ.update(claude_env_overrides(provider, opus, sonnet, haiku))
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        os.execvp("claude", ["claude"] + list(claude_args))
+    except OSError:
+        from commands import _claude_not_found   # failure path only: keep the exec path light
+        return _claude_not_found()
+
+
+def fast_run(args, base_dir=None):
+    """Exec claude for `run *args*` when the fast path applies; None means take the full path."""
+    spec = fast_run_spec(base_dir or get_base_dir(), args)
+    if spec is None:
+        return None
+    return exec_claude(*spec)
@@ -0,0 +1,174 @@
+"""
+Apply an account enable/disable to a running provider with the cheapest
+strategy that works for the installed binary:
+
+  api      PATCH /v0/management/auth-files/status {"name", "disabled"}
+  watch    touch the token file and wait for the binary's file watcher
+  restart  proxy.restart_many (blue/green when enabled)
+
+api and watch count only once GET /v0/management/auth-files reports the new
+state.  The strategy that worked is cached per binary version in
+configs/.reload-strategy.json, so later toggles go straight to it: a few
+milliseconds instead of a restart.  A cached strategy that stops working is
+dropped and the chain runs again.
+Depends on: paths, api, proxy
+"""
+
+import json
+import os
+import time
+
+from paths import get_binary_path, get_reload_cache_path
+from api import _management_api, _management_api_request, _read_secret_key
+from proxy import get_binary_version, restart_many
+
+RELOAD_STRATEGIES = ("api", "watch", "restart")
+RELOAD_VERIFY_TIMEOUT = 1.5   # seconds to wait for auth-files to reflect a change
+RELOAD_VERIFY_INTERVAL = 0.05
+
+
+class _Unverifiable(Exception):
+    """auth-files could not be read, so api/watch cannot be confirmed (or cached)."""
+
+
+def _load_cache(base_dir):
+    try:
+        with open(str(get_reload_cache_path(base_dir)), "r") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(base_dir, cache):
+    path = get_reload_cache_path(base_dir)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = str(path) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, str(path))
+    except OSError:
+        pass
+
+
+def binary_version_key(base_dir, cache):
+    """Version string of the installed binary; `-h` runs only when the file changed."""
+    exe = get_binary_path(base_dir)
+    try:
+        st = exe.stat()
+    except OSError:
+        return None
+    stamp = "{}:{}".format(st.st_mtime_ns, st.st_size)
+    binary = cache.get("binary") or {}
+    if binary.get("stamp") != stamp:
+        binary = {"stamp": stamp, "version": get_binary_version(base_dir)}
+        cache["binary"] = binary
+    version = binary["version"]
+    return version if version.startswith("CLIProxyAPI Version:") else None
+
+
+def _entry_disabled(entry):
+    return bool(entry.get("disabled")) or entry.get("status") == "disabled"
+
+
+def _reported_states(provider, secret):
+    """The binary's view: {account file name: disabled} from GET auth-files."""
+    try:
+        data = _management_api(provider, "auth-files", secret)
+    except Exception as e:
+        raise _Unverifiable(str(e))
+    files = data.get("files") if isinstance(data, dict) else None
+    if not isinstance(files, list):
+        raise _Unverifiable("unexpected auth-files response")
+    states = {}
+    for entry in files:
+        if not isinstance(entry, dict):
+            continue
+        disabled = _entry_disabled(entry)
+        if entry.get("name"):
+            states[entry["name"]] = disabled
+        if entry.get("path"):
+            states.setdefault(os.path.basename(entry["path"]), disabled)
+    return states
+
+
+def _wait_reported(provider, secret, changes, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        states = _reported_states(provider, secret)
+        if all(states.get(path.name) == disabled for path, disabled in changes):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(RELOAD_VERIFY_INTERVAL)
+
+
+def _try_api(base_dir, provider, secret, changes):
+    for path, disabled in changes:
+        try:
+            _management_api_request(provider, "auth-files/status", secret, method="PATCH",
+                                    payload={"name": path.name, "disabled": disabled}, timeout=3)
+        except Exception:
+            return False  # endpoint missing in this binary version (404/405) or rejected
+    return _wait_reported(provider, secret, changes, RELOAD_VERIFY_TIMEOUT)
+
+
+def _try_watch(base_dir, provider, secret, changes):
+    for path, _ in changes:
+        try:
+            os.utime(str(path), None)
+        except OSError:
+            return False
+    return _wait_reported(provider, secret, changes, RELOAD_VERIFY_TIMEOUT)
+
+
+def _try_restart(base_dir, provider, secret, changes):
+    return bool(restart_many(base_dir, [provider], quiet=True)[provider]["ok"])
+
+
+_STRATEGY_FUNCS = {"api": _try_api, "watch": _try_watch, "restart": _try_restart}
+
+
+def reload_accounts(base_dir, provider, changes, progress_cb=None):
+    """Make the running *provider* pick up rewritten token files.
+
+    *changes* is [(token file Path, disabled), ...]; every change goes
+    through one strategy together, so a batch costs at most one restart.
+    Returns the strategy name that worked, or None if even the restart failed.
+    """
+    cache = _load_cache(base_dir)
+    known_binary = cache.get("binary")
+    version = binary_version_key(base_dir, cache)
+    if cache.get("binary") != known_binary:
+        _save_cache(base_dir, cache)
+    strategies = cache.setdefault("strategies", {})
+    cached = strategies.get(version) if version else None
+    order = list(RELOAD_STRATEGIES)
+    if cached in order:
+        order.remove(cached)
+        order.insert(0, cached)
+    secret = _read_secret_key(base_dir, provider)
+
+    for name in order:
+        if progress_cb:
+            progress_cb(name)
+        try:
+            ok = _STRATEGY_FUNCS[name](base_dir, provider, secret, changes)
+        except _Unverifiable:
+            # Cannot confirm a hot reload here; restart without learning anything.
+            return "restart" if _try_restart(base_dir, provider, secret, changes) else None
+        if ok:
+            if version and strategies.get(version) != name:
+                strategies[version] = name
+                _save_cache(base_dir, cache)
+            return name
+        if name == cached:
+            strategies.pop(version, None)
+            _save_cache(base_dir, cache)
+    return None
+
+
+def reload_account(base_dir, provider, file_path, disabled, progress_cb=None):
+    """Single-file form of reload_accounts()."""
+    return reload_accounts(base_dir, provider, [(file_path, disabled)], progress_cb=progress_cb)
@@ -0,0 +1,278 @@
+"""
+Shared HTTP/1.1 keep-alive connection pool for local provider ports.
+
+The request encoder and the response parser are sans-IO (the parser is a
+generator that asks for a line, n bytes or the rest of the stream), so the
+blocking pool here and prefetch's asyncio pool share one implementation and
+only differ in how they feed it.  Errors use the http.client exception types.
+Depends on: constants
+"""
+
+import http.client
+import socket
+import threading
+import time
+import urllib.error
+
+from constants import HOST
+
+POOL_MAX_PER_HOST = 8        # concurrent connections per provider port
+POOL_IDLE_TIMEOUT = 30.0     # seconds an idle connection is kept around
+_MAX_LINE = 65536            # status / header / chunk-size line limit (as http.client)
+_MAX_HEADERS = 100
+
+# Errors that mean a reused keep-alive socket was closed by the server while
+# it sat idle in the pool.  An idempotent request is retried once on a fresh
+# socket; anything else (e.g. a POST api-call) may already have been acted on.
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+# Parser read requests
+_READ_LINE = "line"     # one line including its newline (b"" at EOF)
+_READ_EXACT = "exact"   # exactly n bytes (the feeder raises IncompleteRead if short)
+_READ_REST = "rest"     # everything until the server closes
+
+
+def _encode_request(host, port, method, path, body=None, headers=None):
+    """Request head + body as bytes (Host and Content-Length filled in like http.client)."""
+    lines = ["{} {} HTTP/1.1".format(method, path), "Host: {}:{}".format(host, port),
+             "Accept-Encoding: identity"]
+    names = set()
+    for k, v in (headers or {}).items():
+        names.add(k.lower())
+        lines.append("{}: {}".format(k, v))
+    if body is not None or method in ("POST", "PUT", "PATCH"):
+        if "content-length" not in names:
+            lines.append("Content-Length: {}".format(len(body or b"")))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+
+def _parse_response(method):
+    """Sans-IO response parser: yields read requests, returns (status, reason, headers, body, will_close).
+
+    Drive it with gen.send(); *headers* is an http.client.HTTPMessage.
+    """
+    line = yield (_READ_LINE,)
+    if not line:
+        raise http.client.RemoteDisconnected("Remote end closed connection without response")
+    if len(line) > _MAX_LINE:
+        raise http.client.LineTooLong("status line")
+    parts = line.decode("iso-8859-1").rstrip("\r\n").split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+        raise http.client.BadStatusLine(line.decode("iso-8859-1"))
+    version, status, reason = parts[0], int(parts[1]), parts[2] if len(parts) > 2 else ""
+
+    head = []
+    while True:
+        line = yield (_READ_LINE,)
+        if len(line) > _MAX_LINE:
+            raise http.client.LineTooLong("header line")
+        if line in (b"\r\n", b"\n", b""):
+            break
+        head.append(line)
+        if len(head) > _MAX_HEADERS:
+            raise http.client.HTTPException("got more than {} headers".format(_MAX_HEADERS))
+    headers = http.client.parse_headers(_LinesFile(head))
+
+    conn = (headers.get("connection") or "").lower()
+    will_close = "close" in conn or (version == "HTTP/1.0" and "keep-alive" not in conn)
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        return status, reason, headers, b"", will_close
+    if "chunked" in (headers.get("transfer-encoding") or "").lower():
+        chunks = []
+        while True:
+            line = yield (_READ_LINE,)
+            if len(line) > _MAX_LINE:
+                raise http.client.LineTooLong("chunk size")
+            try:
+                size = int(line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise http.client.IncompleteRead(b"".join(chunks))
+            if size == 0:
+                while (yield (_READ_LINE,)) not in (b"\r\n", b"\n", b""):
+                    pass   # trailers
+                break
+            chunks.append((yield (_READ_EXACT, size)))
+            yield (_READ_EXACT, 2)
+        return status, reason, headers, b"".join(chunks), will_close
+    length = headers.get("content-length")
+    if length is not None:
+        try:
+            n = int(length)
+        except ValueError:
+            n = -1
+        if n < 0:
+            raise http.client.HTTPException("bad Content-Length: {!r}".format(length))
+        return status, reason, headers, (yield (_READ_EXACT, n)), will_close
+    return status, reason, headers, (yield (_READ_REST,)), True
+
+
+class _LinesFile(object):
+    """readline() over already-read header lines, for http.client.parse_headers()."""
+
+    def __init__(self, lines):
+        self._lines = list(lines) + [b"\r\n"]
+
+    def readline(self, limit=-1):
+        return self._lines.pop(0) if self._lines else b""
+
+
+def _feed_blocking(parser, rfile):
+    """Run *parser* against a buffered binary file (socket.makefile("rb"))."""
+    data = None
+    try:
+        while True:
+            op = parser.send(data)
+            if op[0] == _READ_LINE:
+                data = rfile.readline(_MAX_LINE + 1)
+            elif op[0] == _READ_EXACT:
+                data = rfile.read(op[1])
+                if len(data) < op[1]:
+                    raise http.client.IncompleteRead(data, op[1] - len(data))
+            else:
+                data = rfile.read()
+    except StopIteration as done:
+        return done.value
+
+
+class _Connection(object):
+    """One keep-alive socket to HOST:port plus its buffered reader."""
+
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rfile = self.sock.makefile("rb")
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive sockets keyed by port.
+
+    - at most max_per_host connections (idle + in use) per port
+    - idle connections older than idle_timeout are closed on next acquire
+    - an idempotent request on a reused socket that fails with a stale-socket
+      error is retried once on a brand-new connection
+    """
+
+    def __init__(self, host=HOST, max_per_host=POOL_MAX_PER_HOST, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.host = host
+        self.max_per_host = max(1, int(max_per_host))
+        self.idle_timeout = float(idle_timeout)
+        self._cond = threading.Condition()
+        self._idle = {}     # port -> [(conn, last_used)]
+        self._in_use = {}   # port -> int
+        self.created = 0    # total connections opened (diagnostics/tests)
+
+    def _evict_idle_locked(self, port, now):
+        idle = self._idle.get(port)
+        if not idle:
+            return
+        keep = []
+        for conn, last_used in idle:
+            if now - last_used > self.idle_timeout:
+                conn.close()
+            else:
+                keep.append((conn, last_used))
+        self._idle[port] = keep
+
+    def _acquire(self, port, timeout):
+        """→ (connection or None to open one, reused)."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle_locked(port, now)
+                idle = self._idle.get(port)
+                if idle:
+                    conn, _ = idle.pop()
+                    self._in_use[port] = self._in_use.get(port, 0) + 1
+                    return conn, True
+                if self._in_use.get(port, 0) < self.max_per_host:
+                    self._in_use[port] = self._in_use.get(port, 0) + 1
+                    self.created += 1
+                    return None, False
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise socket.timeout("connection pool exhausted for port {}".format(port))
+                self._cond.wait(remaining)
+
+    def _release(self, port, conn, reusable):
+        with self._cond:
+            self._in_use[port] = max(0, self._in_use.get(port, 0) - 1)
+            if conn is not None:
+                if reusable:
+                    self._idle.setdefault(port, []).append((conn, time.monotonic()))
+                else:
+                    conn.close()
+            self._cond.notify()
+
+    def request(self, port, method, path, body=None, headers=None, timeout=5):
+        """Send one request → (status, reason, headers, body_bytes).
+
+        Raises OSError / http.client.HTTPException on transport failure.
+        """
+        raw = _encode_request(self.host, port, method, path, body, headers)
+        attempts = 2 if method.upper() in _IDEMPOTENT_METHODS else 1
+        while True:
+            attempts -= 1
+            conn, reused = self._acquire(port, timeout)
+            try:
+                if conn is None:
+                    conn = _Connection(self.host, port, timeout)
+                conn.sock.settimeout(timeout)
+                conn.sock.sendall(raw)
+                status, reason, resp_headers, data, will_close = _feed_blocking(
+                    _parse_response(method.upper()), conn.rfile)
+            except _STALE_ERRORS:
+                self._release(port, conn, False)
+                if reused and attempts > 0:
+                    continue
+                raise
+            except Exception:
+                self._release(port, conn, False)
+                raise
+            self._release(port, conn, not will_close)
+            return status, reason, resp_headers, data
+
+    def clear(self, port=None):
+        """Close idle connections (for one port, or all) — e.g. after a restart."""
+        with self._cond:
+            ports = [port] if port is not None else list(self._idle.keys())
+            for p in ports:
+                for conn, _ in self._idle.pop(p, []):
+                    conn.close()
+
+    def idle_count(self, port):
+        with self._cond:
+            return len(self._idle.get(port, []))
+
+
+_POOL = ConnectionPool()
+
+
+def get_pool():
+    return _POOL
+
+
+def pooled_request(port, method, path, body=None, headers=None, timeout=5):
+    """Request through the shared pool; raises urllib.error.HTTPError on >= 400.
+
+    HTTPError keeps the urlopen() error contract callers already rely on
+    (e.g. 401 detection in display._prefetch_provider_data).
+    """
+    path = "/" + path.lstrip("/")
+    status, reason, resp_headers, data = _POOL.request(
+        port, method.upper(), path, body=body, headers=headers, timeout=timeout)
+    if status >= 400:
+        url = "http://{}:{}{}".format(_POOL.host, port, path)
+        raise urllib.error.HTTPError(url, status, reason, resp_headers, None)
+    return status, data
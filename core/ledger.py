@@ -0,0 +1,174 @@
+"""
+Persistent usage ledger: one SQLite row per request detail from
+/v0/management/usage, kept under the base dir so history survives proxy
+restarts and reboots.  The dashboard's daily / model / per-account sections
+read rollups from here instead of re-aggregating the live details list.
+Depends on: config (_parse_iso), paths
+"""
+
+import sqlite3
+import threading
+from datetime import timezone
+
+from config import _parse_iso
+from paths import get_usage_ledger_path
+
+LEDGER_DAILY_DAYS = 7  # days of daily rollup returned to the dashboard
+
+_LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id               INTEGER PRIMARY KEY,
+    provider         TEXT    NOT NULL,
+    api              TEXT    NOT NULL,
+    model            TEXT    NOT NULL,
+    source           TEXT    NOT NULL,
+    ts               TEXT    NOT NULL,
+    day              TEXT    NOT NULL,
+    input_tokens     INTEGER NOT NULL DEFAULT 0,
+    output_tokens    INTEGER NOT NULL DEFAULT 0,
+    reasoning_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens     INTEGER NOT NULL DEFAULT 0,
+    failed           INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (provider, source, model, ts, total_tokens)
+);
+CREATE INDEX IF NOT EXISTS requests_ts     ON requests (provider, ts);
+CREATE INDEX IF NOT EXISTS requests_day    ON requests (provider, day);
+CREATE INDEX IF NOT EXISTS requests_model  ON requests (provider, model, ts);
+CREATE INDEX IF NOT EXISTS requests_source ON requests (provider, source, ts);
+"""
+
+_INSERT = (
+    "INSERT OR IGNORE INTO requests (provider, api, model, source, ts, day, input_tokens,"
+    " output_tokens, reasoning_tokens, total_tokens, failed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_ledger_local = threading.local()
+
+
+def _ledger_db(base_dir):
+    """Per-thread connection to the base dir's ledger (created on first use)."""
+    path = str(get_usage_ledger_path(base_dir))
+    conns = getattr(_ledger_local, "conns", None)
+    if conns is None:
+        conns = _ledger_local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        get_usage_ledger_path(base_dir).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_LEDGER_SCHEMA)
+        conns[path] = conn
+    return conn
+
+
+def _ledger_close():
+    """Close this thread's ledger connections (tests, short-lived workers)."""
+    for conn in (getattr(_ledger_local, "conns", None) or {}).values():
+        conn.close()
+    _ledger_local.conns = {}
+
+
+def _local_day(ts):
+    """Detail timestamp → local 'YYYY-MM-DD' (matches the server's *_by_day keys)."""
+    dt = _parse_iso(ts)
+    if dt is None:
+        return ts[:10]
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone().strftime("%Y-%m-%d")
+
+
+def _iter_details(usage_data):
+    """usage_data["usage"]["apis"][api]["models"][model]["details"] → (api, model, detail)."""
+    apis = ((usage_data or {}).get("usage") or {}).get("apis") or {}
+    for api_name, api_data in apis.items():
+        for model_name, model_data in (api_data.get("models") or {}).items():
+            for detail in model_data.get("details") or []:
+                yield api_name, model_name, detail
+
+
+def _ledger_rows(provider, details):
+    for api_name, model_name, detail in details:
+        ts = detail.get("timestamp") or ""
+        if not ts:
+            continue
+        toks = detail.get("tokens") or {}
+        yield (
+            provider, api_name, model_name, detail.get("source") or "unknown",
+            ts, _local_day(ts),
+            int(toks.get("input_tokens", 0) or 0),
+            int(toks.get("output_tokens", 0) or 0),
+            int(toks.get("reasoning_tokens", 0) or 0),
+            int(toks.get("total_tokens", 0) or 0),
+            1 if detail.get("failed", False) else 0,
+        )
+
+
+def ledger_ingest(base_dir, provider, usage_data):
+    """Insert every request detail not yet recorded; returns the number of new rows.
+
+    Rows are deduplicated on (provider, source, model, timestamp, total_tokens),
+    so re-reading the same /usage payload is a no-op.  Never raises.
+    """
+    return ledger_ingest_details(base_dir, provider, _iter_details(usage_data))
+
+
+def ledger_ingest_details(base_dir, provider, details):
+    """ledger_ingest() for an iterable of (api, model, detail), e.g. UsageAggregator.update()."""
+    rows = list(_ledger_rows(provider, details))
+    if not rows:
+        return 0
+    try:
+        conn = _ledger_db(base_dir)
+        before = conn.total_changes
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(_INSERT, rows)
+        return conn.total_changes - before
+    except (sqlite3.Error, OSError):
+        return 0
+
+
+def _stats_from_row(row):
+    requests, fails, inp, out, rsn, tok, last_time, l_in, l_out, l_rsn, l_tok = row
+    return {
+        "requests": requests, "fails": fails or 0, "tokens": tok or 0,
+        "input": inp or 0, "output": out or 0, "reasoning": rsn or 0,
+        "last_time": last_time or "", "last_tok": l_tok or 0,
+        "last_input": l_in or 0, "last_output": l_out or 0, "last_reasoning": l_rsn or 0,
+    }
+
+
+# SQLite fills bare columns of a MAX() aggregate from the row holding the max,
+# which gives the "last request" token counts without a second query.
+_GROUPED_STATS = (
+    "SELECT {key}, COUNT(*), SUM(failed), SUM(input_tokens), SUM(output_tokens),"
+    " SUM(reasoning_tokens), SUM(total_tokens), MAX(ts), input_tokens, output_tokens,"
+    " reasoning_tokens, total_tokens FROM requests WHERE provider = ? GROUP BY {key}"
+)
+
+
+def ledger_rollups(base_dir, provider, days=LEDGER_DAILY_DAYS):
+    """Aggregates for the dashboard, or None if the ledger is unavailable or empty.
+
+    Returns {"daily": {day: {"requests", "tokens"}} (last *days* days with data),
+             "models": {model: stats}, "accounts": {source: stats}}
+    where stats has the same keys as usage.UsageAggregator rollups.
+    """
+    try:
+        conn = _ledger_db(base_dir)
+        daily = conn.execute(
+            "SELECT day, COUNT(*), SUM(total_tokens) FROM requests WHERE provider = ?"
+            " GROUP BY day ORDER BY day DESC LIMIT ?", (provider, days)).fetchall()
+        models = conn.execute(_GROUPED_STATS.format(key="model"), (provider,)).fetchall()
+        accounts = conn.execute(_GROUPED_STATS.format(key="source"), (provider,)).fetchall()
+    except (sqlite3.Error, OSError):
+        return None
+    if not models:
+        return None
+    return {
+        "daily": {day: {"requests": req, "tokens": tok or 0} for day, req, tok in daily},
+        "models": {row[0]: _stats_from_row(row[1:]) for row in models},
+        "accounts": {row[0]: _stats_from_row(row[1:]) for row in accounts},
+    }
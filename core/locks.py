@@ -0,0 +1,146 @@
+"""
+Cross-process advisory locks (fcntl.flock) for shared cache files.
+
+Several cc-proxy processes (status in a watch loop, the TUI, a second
+terminal) share the /tmp quota and usage caches.  A lock file next to the
+cache lets one process do the upstream fetch while the others wait and then
+read the result it wrote.  Windows has no fcntl: locks degrade to no-ops.
+No imports from other core modules — leaf node in dependency DAG.
+"""
+
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LOCK_WAIT_TIMEOUT = 10.0  # seconds a waiter blocks before fetching on its own
+LOCK_STALE_AFTER = 30.0   # seconds after which a held lock is considered hung
+LOCK_POLL_INTERVAL = 0.05
+
+
+class LockTimeout(OSError):
+    """`with FileLock(...)` could not get the lock within LOCK_WAIT_TIMEOUT."""
+
+
+class FileLock:
+    """Exclusive advisory lock on *path*.
+
+    The holder writes "<pid> <unix_time>" into the file.  flock is released
+    by the kernel when the holder exits, so a dead holder never blocks; a
+    holder that is alive but hung past *stale_after* is broken by unlinking
+    the lock file (the next acquirer locks a fresh inode).
+    """
+
+    def __init__(self, path, stale_after=LOCK_STALE_AFTER):
+        self.path = str(path)
+        self.stale_after = stale_after
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """Non-blocking attempt; True when the lock is now held by this object."""
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            self._fd = -1
+            return True
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            self._break_if_stale()
+            return False
+        # the file may have been unlinked (stale break) between open and flock
+        try:
+            if os.fstat(fd).st_ino != os.stat(self.path).st_ino:
+                os.close(fd)
+                return False
+        except OSError:
+            os.close(fd)
+            return False
+        try:
+            os.ftruncate(fd, 0)
+            os.write(fd, "{} {:.3f}\n".format(os.getpid(), time.time()).encode())
+        except OSError:
+            pass
+        self._fd = fd
+        return True
+
+    def acquire(self, timeout=None):
+        """Poll until the lock is held or *timeout* (LOCK_WAIT_TIMEOUT) elapses; returns True if held."""
+        deadline = time.monotonic() + (LOCK_WAIT_TIMEOUT if timeout is None else timeout)
+        while True:
+            if self.try_acquire():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    async def acquire_async(self, timeout=None):
+        """acquire() for event-loop callers: waits with asyncio.sleep instead of blocking."""
+        import asyncio
+        deadline = time.monotonic() + (LOCK_WAIT_TIMEOUT if timeout is None else timeout)
+        while True:
+            if self.try_acquire():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is None or fd < 0:
+            return
+        try:
+            os.ftruncate(fd, 0)
+        except OSError:
+            pass
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _break_if_stale(self):
+        """Unlink the lock file when its recorded holder is older than stale_after.
+
+        The file is read through one fd and only unlinked if the path still
+        names that same file (inode and mtime), so a lock file another
+        process has just recreated after its own break is left alone.
+        """
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            seen = os.fstat(fd)
+            started = float(os.read(fd, 256).decode().split()[1])
+            if time.time() - started < self.stale_after:
+                return False
+            now = os.stat(self.path)
+            if (now.st_dev, now.st_ino, now.st_mtime_ns) != (seen.st_dev, seen.st_ino, seen.st_mtime_ns):
+                return False
+            os.unlink(self.path)
+            return True
+        except (OSError, IndexError, ValueError, UnicodeDecodeError):
+            return False
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        """Hold the lock for the block; raises LockTimeout rather than running it unlocked."""
+        if not self.acquire():
+            raise LockTimeout("lock not acquired within {:.0f}s: {}".format(LOCK_WAIT_TIMEOUT, self.path))
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
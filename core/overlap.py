@@ -0,0 +1,145 @@
+"""
+Overlapped cold start for `run` (opt in with CC_PROXY_OVERLAP_START=1).
+
+When `run <preset>` finds nothing listening on the provider's port, the
+proxy is started on a background thread and claude is launched at once,
+pointed at a StartGate instead of the provider port: a loopback listener
+on a spare port that accepts claude's connections, holds them until the
+proxy reports healthy and then pipes them through to the provider port.
+The binary has to bind the provider port itself, so the gate cannot sit
+there.  Only that one claude session goes through the gate; the next
+`run` finds the proxy up and talks to it directly.  If the proxy fails
+to start, held connections are closed and the reason is printed once
+claude exits.
+
+    pending = start_overlapped(base_dir, provider)   # None: port already in use
+    ... launch claude against pending.gate.port ...
+    result = pending.finish()                         # start_many() result
+Depends on: constants, proxy, fastrun, shim
+"""
+
+import os
+import socket
+import threading
+
+from constants import HOST, OVERLAP_START_ENV, PORTS
+from proxy import START_READY_TIMEOUT, start_many
+from fastrun import record_run_state
+from shim import relay
+
+GATE_HOLD_TIMEOUT = START_READY_TIMEOUT + 5.0  # seconds a held connection waits for the proxy
+GATE_CONNECT_TIMEOUT = 2.0
+GATE_ACCEPT_INTERVAL = 0.5
+PORT_PROBE_TIMEOUT = 0.2
+
+
+def overlap_start_enabled():
+    return os.environ.get(OVERLAP_START_ENV) == "1"
+
+
+def port_accepting(port):
+    """True if something accepts connections on HOST:*port* right now."""
+    try:
+        with socket.create_connection((HOST, port), timeout=PORT_PROBE_TIMEOUT):
+            return True
+    except OSError:
+        return False
+
+
+class StartGate(object):
+    """Loopback listener that holds connections until release(), then forwards them to *target_port*."""
+
+    def __init__(self, target_port, hold_timeout=GATE_HOLD_TIMEOUT):
+        self.target_port = target_port
+        self.hold_timeout = hold_timeout
+        self.ok = False
+        self.held = 0   # connections that arrived before release()
+        self._released = threading.Event()
+        self._closed = False
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind((HOST, 0))
+        self.sock.listen(128)
+        self.port = self.sock.getsockname()[1]
+
+    def start(self):
+        self.sock.settimeout(GATE_ACCEPT_INTERVAL)
+        threading.Thread(target=self._serve, name="cc-proxy-start-gate", daemon=True).start()
+        return self
+
+    def release(self, ok):
+        """Let held and future connections through (*ok*) or close them (not *ok*)."""
+        self.ok = ok
+        self._released.set()
+
+    def close(self):
+        """Stop accepting; connections already forwarding keep going."""
+        self._closed = True
+        self._released.set()
+        self.sock.close()
+
+    def _serve(self):
+        while not self._closed:
+            try:
+                client, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not self._released.is_set():
+                self.held += 1
+            threading.Thread(target=self._forward, args=(client,), daemon=True).start()
+
+    def _forward(self, client):
+        upstream = None
+        try:
+            if not self._released.wait(self.hold_timeout) or not self.ok:
+                return
+            upstream = socket.create_connection((HOST, self.target_port), timeout=GATE_CONNECT_TIMEOUT)
+            upstream.settimeout(None)
+            client.settimeout(None)
+            relay(client, upstream)
+        except OSError:
+            pass
+        finally:
+            client.close()
+            if upstream is not None:
+                upstream.close()
+
+
+class OverlappedStart(object):
+    """start_many() for one provider on a thread, with a StartGate opened when it finishes."""
+
+    def __init__(self, base_dir, provider):
+        self.base_dir = base_dir
+        self.provider = provider
+        self.gate = StartGate(PORTS[provider])
+        self.result = None
+        self._thread = threading.Thread(target=self._run, name="cc-proxy-overlap-start", daemon=True)
+
+    def begin(self):
+        self.gate.start()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            # quiet: claude owns the terminal by now
+            self.result = start_many(self.base_dir, [self.provider], quiet=True)[self.provider]
+        except Exception as e:
+            self.result = {"ok": False, "reason": str(e)}
+        if self.result["ok"]:
+            record_run_state(self.base_dir, self.provider)
+        self.gate.release(self.result["ok"])
+
+    def finish(self, timeout=None):
+        """Wait for the start to end, close the gate and return the start_many() result."""
+        self._thread.join(timeout)
+        self.gate.close()
+        return self.result or {"ok": False, "reason": "still starting"}
+
+
+def start_overlapped(base_dir, provider):
+    """Begin starting *provider* behind a gate → OverlappedStart, or None if its port already answers."""
+    if port_accepting(PORTS[provider]):
+        return None
+    return OverlappedStart(base_dir, provider).begin()
@@ -7,7 +7,11 @@ import os
 import platform
 from pathlib import Path
 
-from constants import IS_WINDOWS, TOKEN_DIR_ENV, TOKEN_DIR_META_FILE
+from constants import (
+    ACTIVATOR_STATE_NAME, BLUEGREEN_STATE_NAME, DAEMON_SOCKET_NAME, IS_WINDOWS, RELOAD_CACHE_NAME,
+    RUN_STATE_NAME, SUPERVISOR_RESUME_NAME, SUPERVISOR_STATE_NAME, TOKEN_DIR_ENV, TOKEN_DIR_META_FILE,
+    TOKEN_INDEX_NAME, USAGE_LEDGER_NAME,
+)
 
 
 def get_base_dir():
@@ -54,14 +58,6 @@ def _token_prefixes_for_provider(provider):
     return [provider]
 
 
-def _token_file_sort_key(path_obj):
-    try:
-        st = path_obj.stat()
-        return (st.st_mtime, path_obj.name)
-    except Exception:
-        return (0, path_obj.name)
-
-
 def _resolve_token_root(base_dir):
     """Resolve shared token directory.
 
@@ -102,17 +98,29 @@ def _save_token_dir_metadata(base_dir, token_dir):
     os.replace(tmp, str(meta_path))
 
 
+def _is_token_file_name(name, prefixes):
+    return name.endswith(".json") and any(name.startswith(pfx + "-") for pfx in prefixes)
+
+
 def get_token_files(base_dir, provider):
-    """Return token file paths for a provider from the shared token directory."""
+    """Return token file paths for a provider from the shared token directory, newest first."""
     token_dir = get_token_dir(base_dir, create=False)
     prefixes = _token_prefixes_for_provider(provider)
-    token_files = []
-    for pfx in prefixes:
-        for p in token_dir.glob("{}-*.json".format(pfx)):
-            if p.is_file():
-                token_files.append(p)
-    token_files.sort(key=_token_file_sort_key, reverse=True)
-    return token_files
+    found = []
+    try:
+        with os.scandir(str(token_dir)) as it:
+            for entry in it:
+                if not _is_token_file_name(entry.name, prefixes):
+                    continue
+                try:
+                    if entry.is_file():
+                        found.append((entry.stat().st_mtime, entry.name))
+                except OSError:
+                    continue
+    except OSError:
+        return []
+    found.sort(reverse=True)
+    return [token_dir / name for _, name in found]
 
 
 def _is_path_under(path_obj, root_obj):
@@ -146,5 +154,41 @@ def get_pid_file(base_dir, provider):
     return get_provider_dir(base_dir, provider) / ".proxy.pid"
 
 
+def get_bluegreen_state_file(base_dir, provider):
+    return get_provider_dir(base_dir, provider) / BLUEGREEN_STATE_NAME
+
+
+def get_run_state_file(base_dir, provider):
+    return get_provider_dir(base_dir, provider) / RUN_STATE_NAME
+
+
 def get_config_file(base_dir, provider):
     return get_provider_dir(base_dir, provider) / "config.yaml"
+
+
+def get_usage_ledger_path(base_dir):
+    return base_dir / "configs" / USAGE_LEDGER_NAME
+
+
+def get_reload_cache_path(base_dir):
+    return base_dir / "configs" / RELOAD_CACHE_NAME
+
+
+def get_token_index_path(base_dir):
+    return base_dir / "configs" / TOKEN_INDEX_NAME
+
+
+def get_daemon_socket_path(base_dir):
+    return base_dir / "configs" / DAEMON_SOCKET_NAME
+
+
+def get_activator_state_file(base_dir):
+    return base_dir / "configs" / ACTIVATOR_STATE_NAME
+
+
+def get_supervisor_state_file(base_dir):
+    return base_dir / "configs" / SUPERVISOR_STATE_NAME
+
+
+def get_supervisor_resume_file(base_dir):
+    return base_dir / "configs" / SUPERVISOR_RESUME_NAME
@@ -0,0 +1,464 @@
+"""
+asyncio prefetch engine for status/ui dashboards.
+
+One event loop (on a background thread) is shared by every caller in the
+process.  Management and api-call requests go over keep-alive asyncio
+streams on that loop, encoded and parsed by httppool's sans-IO request
+encoder and response parser (the same code the blocking pool runs), so
+hundreds of per-account fetches cost no extra OS threads; only blocking
+local work (pid/health lookup, cache files) uses a small executor.
+
+Depends on: constants, httppool, locks, api, quota, usage, ledger, proxy, display
+"""
+
+import asyncio
+import functools
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from constants import HOST, PORTS, QUOTA_CACHE_TTL
+from httppool import (
+    _IDEMPOTENT_METHODS, _MAX_LINE, _READ_EXACT, _READ_LINE, _STALE_ERRORS, POOL_IDLE_TIMEOUT,
+    _encode_request, _parse_response,
+)
+from locks import FileLock
+from api import _decode_management_body, _read_secret_key
+from quota import (
+    _QUOTA_SPECS, _api_call_decode, _api_call_payload,
+    _quota_cache_load, _quota_cache_load_many, _quota_cache_save,
+    _quota_lock_path, _quota_mark_stale,
+)
+from usage import (
+    _usage_cumulative_apply_to_usage_data, _usage_cumulative_update_from_live,
+    _usage_snapshot_load, UsageAggregator,
+)
+from ledger import ledger_ingest_details, ledger_rollups
+from proxy import get_status
+from display import _dedupe_auth_files
+
+PREFETCH_MAX_CONCURRENCY = 64     # in-flight HTTP requests, all providers
+PREFETCH_PROVIDER_CONCURRENCY = 16  # in-flight HTTP requests per provider
+PREFETCH_BLOCKING_WORKERS = 4     # executor threads for local blocking work
+PREFETCH_ACCOUNT_TIMEOUT = 10     # seconds per account fetch (was thread join timeout)
+PREFETCH_REVALIDATE_GRACE = 5     # seconds `status` waits for stale-quota refreshes before exit
+PREFETCH_TIMEOUT_GRACE = 5        # extra seconds for cancelled fetches to unwind after the timeout
+
+
+def _empty_result():
+    return {
+        "status": None, "auth_data": None, "usage_data": None,
+        "auth_error": False, "models_per_account": {},
+        "quota_data": {},   # {account_name: quota_dict or None}
+        "proxy_models": None,
+        "usage_source": "none",            # live | snapshot | none
+        "usage_snapshot_at": None,          # ISO string when source=snapshot
+        "usage_rollups": None,              # ledger.ledger_rollups() or None
+    }
+
+
+# ---------------------------------------------------------------------------
+# Keep-alive HTTP/1.1 over asyncio streams (httppool's encoder and parser)
+# ---------------------------------------------------------------------------
+
+async def _feed_stream(parser, reader):
+    """Run an httppool._parse_response() parser against an asyncio StreamReader."""
+    data = None
+    try:
+        while True:
+            op = parser.send(data)
+            if op[0] == _READ_LINE:
+                try:
+                    data = await reader.readline()
+                except ValueError:
+                    raise http.client.LineTooLong("response line")
+            elif op[0] == _READ_EXACT:
+                try:
+                    data = await reader.readexactly(op[1])
+                except asyncio.IncompleteReadError as e:
+                    raise http.client.IncompleteRead(e.partial, op[1] - len(e.partial))
+            else:
+                data = await reader.read()
+    except StopIteration as done:
+        return done.value
+
+
+class _AsyncConnectionPool:
+    """httppool.ConnectionPool's asyncio twin: keep-alive streams keyed by port (loop-affine).
+
+    Connection counts are bounded by the engine's semaphores; the stale-socket
+    retry follows the same idempotent-only rule as the blocking pool.
+    """
+
+    def __init__(self, host=HOST, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.host = host
+        self.idle_timeout = idle_timeout
+        self._idle = {}   # port -> [(reader, writer, last_used)]
+        self.created = 0  # total connections opened (diagnostics/tests)
+
+    async def _acquire(self, port, timeout):
+        idle = self._idle.get(port) or []
+        now = time.monotonic()
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if now - last_used <= self.idle_timeout and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, port, limit=_MAX_LINE + 1), timeout)
+        self.created += 1
+        return reader, writer, False
+
+    async def _roundtrip(self, reader, writer, method, raw):
+        writer.write(raw)
+        await writer.drain()
+        return await _feed_stream(_parse_response(method), reader)
+
+    async def request(self, port, method, path, body=None, headers=None, timeout=8):
+        """Send one request → (status, reason, headers, body_bytes), like ConnectionPool.request."""
+        method = method.upper()
+        raw = _encode_request(self.host, port, method, path, body, headers)
+        attempts = 2 if method in _IDEMPOTENT_METHODS else 1
+        while True:
+            attempts -= 1
+            reader, writer, reused = await self._acquire(port, timeout)
+            try:
+                status, reason, resp_headers, data, will_close = await asyncio.wait_for(
+                    self._roundtrip(reader, writer, method, raw), timeout)
+            except _STALE_ERRORS:
+                writer.close()
+                if reused and attempts > 0:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if will_close:
+                writer.close()
+            else:
+                self._idle.setdefault(port, []).append((reader, writer, time.monotonic()))
+            return status, reason, resp_headers, data
+
+    def close(self):
+        for conns in self._idle.values():
+            for _, writer, _ in conns:
+                writer.close()
+        self._idle.clear()
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class PrefetchEngine:
+    def __init__(self, max_concurrency=PREFETCH_MAX_CONCURRENCY,
+                 provider_concurrency=PREFETCH_PROVIDER_CONCURRENCY,
+                 blocking_workers=PREFETCH_BLOCKING_WORKERS):
+        self.max_concurrency = max_concurrency
+        self.provider_concurrency = provider_concurrency
+        self._blocking_workers = blocking_workers
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._executor = None
+        self._http = None
+        self._global_sem = None
+        self._provider_sems = {}
+        self._revalidating = {}  # (provider, auth_index) -> asyncio.Task (loop-affine)
+        self._aggregators = {}   # provider -> UsageAggregator (lives as long as the engine)
+
+    # -- loop lifecycle --------------------------------------------------
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                ready.set()
+                loop.run_forever()
+
+            self._executor = ThreadPoolExecutor(max_workers=self._blocking_workers,
+                                                thread_name_prefix="cc-prefetch")
+            self._thread = threading.Thread(target=_run, name="cc-prefetch-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the shared loop from any (non-loop) thread."""
+        loop = self._ensure_loop()
+        fut = asyncio.run_coroutine_threadsafe(coro, loop)
+        return fut.result(timeout)
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def _shutdown():
+            for task in list(self._revalidating.values()):
+                task.cancel()
+            self._revalidating.clear()
+            if self._http is not None:
+                self._http.close()
+            self._http = None
+
+        asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
+        self._executor.shutdown(wait=False)
+        self._global_sem = None
+        self._provider_sems = {}
+
+    # -- primitives (loop thread only) -----------------------------------
+
+    def _sem_for(self, provider):
+        if self._global_sem is None:
+            self._global_sem = asyncio.Semaphore(self.max_concurrency)
+            self._http = _AsyncConnectionPool()
+        sem = self._provider_sems.get(provider)
+        if sem is None:
+            sem = self._provider_sems[provider] = asyncio.Semaphore(self.provider_concurrency)
+        return sem
+
+    async def _blocking(self, fn, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def _http_request(self, provider, method, path, headers=None, body=None, timeout=8):
+        psem = self._sem_for(provider)
+        async with self._global_sem:
+            async with psem:
+                status, _, _, data = await self._http.request(
+                    PORTS[provider], method, path, body=body, headers=headers, timeout=timeout)
+        if status >= 400:
+            url = "http://{}:{}{}".format(HOST, PORTS[provider], path)
+            raise urllib.error.HTTPError(url, status, "HTTP {}".format(status), {}, None)
+        return data
+
+    async def _management(self, provider, secret, endpoint, timeout=5):
+        data = await self._http_request(
+            provider, "GET", "/v0/management/{}".format(endpoint.lstrip("/")),
+            headers={"Authorization": "Bearer {}".format(secret)}, timeout=timeout)
+        return _decode_management_body(data)
+
+    # -- per-provider pipeline -------------------------------------------
+
+    async def _fetch_models(self, provider, secret, f, out):
+        name = f.get("name") or f.get("id") or ""
+        if not name:
+            return
+        try:
+            qs = "auth-files/models?name={}".format(urllib.parse.quote(name, safe="@.-_"))
+            data = await self._management(provider, secret, qs)
+            out[name] = data.get("models", [])
+        except Exception:
+            out[name] = None
+
+    def _aggregator(self, provider):
+        with self._lock:
+            agg = self._aggregators.get(provider)
+            if agg is None:
+                agg = self._aggregators[provider] = UsageAggregator()
+            return agg
+
+    async def _fetch_quota_upstream(self, provider, secret, auth_index):
+        """api-call round trip for one account; caches and returns the parsed quota dict.
+
+        Runs under the entry's cross-process lock: a process that waited on
+        another one's fetch returns the freshly cached result instead.
+        """
+        lock = FileLock(_quota_lock_path(provider, auth_index))
+        try:
+            if await lock.acquire_async():
+                cached = await self._blocking(_quota_cache_load, provider, auth_index)
+                if cached is not None:
+                    return cached
+            (method, url, headers, body), parse = _QUOTA_SPECS[provider]
+            try:
+                raw = await self._http_request(
+                    provider, "POST", "/v0/management/api-call",
+                    headers={"Authorization": "Bearer " + secret, "Content-Type": "application/json"},
+                    body=_api_call_payload(auth_index, method, url, headers, body), timeout=8)
+                data = parse(*_api_call_decode(raw))
+            except Exception:
+                data = None
+            if data is not None:
+                await self._blocking(_quota_cache_save, provider, auth_index, data)
+            return data
+        finally:
+            lock.release()
+
+    def _revalidate_quota(self, provider, secret, auth_index):
+        """Start a background refresh of one cached quota entry (single-flight per account)."""
+        key = (provider, auth_index)
+        if key in self._revalidating:
+            return
+        task = asyncio.ensure_future(asyncio.wait_for(
+            self._fetch_quota_upstream(provider, secret, auth_index), PREFETCH_ACCOUNT_TIMEOUT))
+        self._revalidating[key] = task
+        task.add_done_callback(lambda t: self._revalidating.pop(key, None))
+
+    async def _fetch_quota(self, provider, secret, f, out, cache):
+        """Fill out[name] for one account; *cache* is the provider's bulk-loaded store rows."""
+        name = f.get("name") or f.get("id") or ""
+        auth_index = f.get("auth_index", "")
+        if not name or not auth_index:
+            return
+        cached, age = cache.get(auth_index, (None, None))
+        if cached is not None:
+            if age < QUOTA_CACHE_TTL:
+                out[name] = cached
+            else:
+                # stale-while-revalidate: serve now, refresh in the background
+                out[name] = _quota_mark_stale(cached, age)
+                self._revalidate_quota(provider, secret, auth_index)
+            return
+        out[name] = await self._fetch_quota_upstream(provider, secret, auth_index)
+
+    async def _fetch_proxy_models(self, provider, result):
+        try:
+            raw = await self._http_request(provider, "GET", "/v1/models", timeout=5)
+            result["proxy_models"] = json.loads(raw.decode("utf-8"))
+        except Exception:
+            pass
+
+    async def _prefetch_provider(self, base_dir, provider, fetch_quota, fetch_check, result):
+        """Fill *result* (an _empty_result()) step by step, so a timeout keeps what arrived."""
+        result["status"] = await self._blocking(get_status, base_dir, provider)
+        if result["status"]["running"] and result["status"]["healthy"]:
+            secret = await self._blocking(_read_secret_key, base_dir, provider)
+            try:
+                result["auth_data"] = _dedupe_auth_files(
+                    await self._management(provider, secret, "auth-files"), provider=provider)
+                result["usage_data"] = await self._management(provider, secret, "usage")
+                if isinstance(result["usage_data"], dict):
+                    new_details = await self._blocking(
+                        self._aggregator(provider).update, result["usage_data"])
+                    await self._blocking(ledger_ingest_details, base_dir, provider, new_details)
+                    await self._blocking(_usage_cumulative_update_from_live, provider, result["usage_data"])
+                    result["usage_data"] = await self._blocking(
+                        _usage_cumulative_apply_to_usage_data, provider, result["usage_data"])
+                    result["usage_source"] = "live"
+            except urllib.error.HTTPError as e:
+                if e.code == 401:
+                    result["auth_error"] = True
+            except Exception:
+                pass
+
+            if result["auth_data"] and not result["auth_error"]:
+                files = result["auth_data"].get("files", [])
+                tasks = []
+                if fetch_check:
+                    tasks += [self._fetch_models(provider, secret, f, result["models_per_account"])
+                              for f in files]
+                if fetch_quota and provider in _QUOTA_SPECS:
+                    cache = await self._blocking(
+                        _quota_cache_load_many, provider,
+                        [f.get("auth_index") for f in files if f.get("auth_index")])
+                    tasks += [self._fetch_quota(provider, secret, f, result["quota_data"], cache)
+                              for f in files]
+                if fetch_check:
+                    tasks.append(self._fetch_proxy_models(provider, result))
+                if tasks:
+                    await asyncio.gather(
+                        *[asyncio.wait_for(t, PREFETCH_ACCOUNT_TIMEOUT) for t in tasks],
+                        return_exceptions=True,
+                    )
+
+        if result["usage_source"] == "none":
+            snap = await self._blocking(_usage_snapshot_load, provider)
+            if snap:
+                result["usage_data"] = await self._blocking(
+                    _usage_cumulative_apply_to_usage_data, provider, snap.get("usage_data"))
+                result["usage_source"] = "snapshot"
+                result["usage_snapshot_at"] = snap.get("captured_at_iso")
+        result["usage_rollups"] = await self._blocking(ledger_rollups, base_dir, provider)
+        if result["usage_rollups"] is None and provider in self._aggregators:
+            result["usage_rollups"] = self._aggregators[provider].rollups()
+        return result
+
+    async def _prefetch_many(self, base_dir, providers, fetch_quota, fetch_check, timeout=None):
+        partial = {pvd: _empty_result() for pvd in providers}
+        tasks = {pvd: asyncio.ensure_future(
+                     self._prefetch_provider(base_dir, pvd, fetch_quota, fetch_check, partial[pvd]))
+                 for pvd in providers}
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(list(tasks.values()), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        results = {}
+        for pvd, task in tasks.items():
+            if task in pending:
+                results[pvd] = partial[pvd]   # timed out: whatever it fetched so far
+                continue
+            out = task.exception() or task.result()
+            if isinstance(out, BaseException):
+                out = _empty_result()
+                try:
+                    out["status"] = await self._blocking(get_status, base_dir, pvd)
+                except Exception:
+                    out["status"] = None
+            results[pvd] = out
+        return results
+
+    def prefetch(self, base_dir, providers, fetch_quota=False, fetch_check=False, timeout=30):
+        """Fetch dashboard data for several providers → {provider: result dict}.
+
+        Result dicts have the same shape as display._prefetch_provider_data().
+        A provider still fetching after *timeout* seconds is returned with the
+        parts it has (status None if not even that); the others are complete.
+        """
+        providers = list(providers)
+        return self.run(self._prefetch_many(base_dir, providers, fetch_quota, fetch_check, timeout),
+                        timeout=None if timeout is None else timeout + PREFETCH_TIMEOUT_GRACE)
+
+    def wait_revalidations(self, timeout=PREFETCH_REVALIDATE_GRACE):
+        """Block until pending background quota refreshes finish (or *timeout*).
+
+        Returns the number still pending.  Short-lived commands call this
+        before exiting so a stale read still refreshes the cache.
+        """
+        if self._loop is None:
+            return 0
+
+        async def _wait():
+            pending = list(self._revalidating.values())
+            if pending:
+                await asyncio.wait(pending, timeout=timeout)
+            return len(self._revalidating)
+
+        try:
+            return self.run(_wait(), timeout=timeout + 1)
+        except Exception:
+            return len(self._revalidating)
+
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine; the event loop is started on first use."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = PrefetchEngine()
+        return _ENGINE
+
+
+def prefetch_providers(base_dir, providers, fetch_quota=False, fetch_check=False, timeout=30):
+    return get_engine().prefetch(base_dir, providers, fetch_quota=fetch_quota,
+                                 fetch_check=fetch_check, timeout=timeout)
@@ -1,8 +1,9 @@
 """
 PID/process management, port resolution, health check, and clipboard utilities.
-Depends on: constants, paths
+Depends on: constants, paths, httppool
 """
 
+import json
 import os
 import re
 import signal
@@ -12,8 +13,10 @@ import subprocess
 import sys
 import time
 
-from constants import IS_WINDOWS, HOST, PORTS
-from paths import get_pid_file
+from constants import IS_WINDOWS, HOST, PORTS, STOP_GRACE_ENV
+from paths import (
+    get_activator_state_file, get_pid_file, get_supervisor_resume_file, get_supervisor_state_file,
+)
 
 
 def read_pid(base_dir, provider):
@@ -36,6 +39,48 @@ def remove_pid(base_dir, provider):
         pass
 
 
+def read_activator_state(base_dir):
+    """configs/.activator.json written by a running activator.py, or {}."""
+    try:
+        with open(str(get_activator_state_file(base_dir)), "r") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def activator_pid(base_dir):
+    """PID of the live on-demand activator that owns the provider ports, else None."""
+    pid = read_activator_state(base_dir).get("pid")
+    return pid if pid and is_pid_alive(pid) else None
+
+
+def read_supervisor_state(base_dir):
+    """configs/.supervisor.json written by a running supervisor.py, or {}."""
+    try:
+        with open(str(get_supervisor_state_file(base_dir)), "r") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def supervisor_pid(base_dir):
+    """PID of the live provider supervisor, else None."""
+    pid = read_supervisor_state(base_dir).get("pid")
+    return pid if pid and is_pid_alive(pid) else None
+
+
+def request_supervisor_resume(base_dir):
+    """Ask the running supervisor to restart its stopped providers on its next tick.
+
+    A flag file rather than SIGHUP, so it works the same on Windows.
+    """
+    path = get_supervisor_resume_file(base_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
 def is_pid_alive(pid):
     if IS_WINDOWS:
         try:
@@ -90,10 +135,129 @@ def resolve_pid_by_port(port):
             pass
         return None
     else:
-        pid = _resolve_pid_ss(port)
-        if pid is None:
-            pid = _resolve_pid_lsof(port)
-        return pid
+        return resolve_pids_by_ports([port]).get(port)
+
+
+# ---------------------------------------------------------------------------
+# Batched port → pid resolution (Linux /proc, ss/lsof fallback)
+# ---------------------------------------------------------------------------
+
+PORT_PID_CACHE_TTL = 1.0  # seconds
+
+_PROC_ROOT = "/proc"
+_TCP_LISTEN = "0A"
+_PORT_PID_CACHE = {"at": 0.0, "map": {}}
+
+
+def _parse_proc_net_tcp(text, ports):
+    """/proc/net/tcp{,6} text → {inode: port} for LISTEN sockets on *ports*."""
+    out = {}
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 10 or fields[3] != _TCP_LISTEN:
+            continue
+        try:
+            port = int(fields[1].rsplit(":", 1)[1], 16)
+        except (IndexError, ValueError):
+            continue
+        if port in ports and fields[9] != "0":
+            out[fields[9]] = port
+    return out
+
+
+def _procfs_listen_inodes(ports):
+    """Read /proc/net/tcp and tcp6 once → {inode: port}. Raises OSError if neither is readable."""
+    inodes = {}
+    readable = False
+    for name in ("tcp", "tcp6"):
+        try:
+            with open(os.path.join(_PROC_ROOT, "net", name), "r") as f:
+                text = f.read()
+        except OSError:
+            continue
+        readable = True
+        inodes.update(_parse_proc_net_tcp(text, ports))
+    if not readable:
+        raise OSError("/proc/net/tcp unreadable")
+    return inodes
+
+
+def _procfs_inode_pids(inodes):
+    """Walk /proc/<pid>/fd once → {inode: pid} for the given socket inodes."""
+    wanted = {"socket:[{}]".format(ino): ino for ino in inodes}
+    found = {}
+    try:
+        entries = os.listdir(_PROC_ROOT)
+    except OSError:
+        return found
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        fd_dir = os.path.join(_PROC_ROOT, entry, "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue  # exited, or another user's process
+        for fd in fds:
+            try:
+                target = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            ino = wanted.get(target)
+            if ino is not None and ino not in found:
+                found[ino] = int(entry)
+        if len(found) == len(wanted):
+            break
+    return found
+
+
+def _resolve_pids_procfs(ports):
+    inodes = _procfs_listen_inodes(ports)
+    by_inode = _procfs_inode_pids(inodes) if inodes else {}
+    out = {port: None for port in ports}
+    for ino, port in inodes.items():
+        pid = by_inode.get(ino)
+        if pid is not None and out.get(port) is None:
+            out[port] = pid
+    return out
+
+
+def invalidate_port_pid_cache():
+    """Forget cached port → pid results (call after starting/stopping a process)."""
+    _PORT_PID_CACHE["at"] = 0.0
+    _PORT_PID_CACHE["map"] = {}
+
+
+def resolve_pids_by_ports(ports=None, max_age=PORT_PID_CACHE_TTL):
+    """Return {port: pid or None} for *ports* (default: all provider PORTS) in one pass.
+
+    Linux reads /proc/net/tcp{,6} and /proc/*/fd once for every port and
+    keeps the result for *max_age* seconds; ss/lsof are forked only when
+    /proc is unreadable.  Other platforms resolve port by port.
+    """
+    wanted = set(ports) if ports is not None else set(PORTS.values())
+    now = time.monotonic()
+    cached = _PORT_PID_CACHE["map"]
+    if (now - _PORT_PID_CACHE["at"]) < max_age and wanted.issubset(cached):
+        return {port: cached[port] for port in wanted}
+
+    scan = wanted | set(PORTS.values())
+    if IS_WINDOWS:
+        return {port: resolve_pid_by_port(port) for port in wanted}
+
+    try:
+        result = _resolve_pids_procfs(scan)
+    except OSError:
+        result = {}
+        for port in scan:
+            pid = _resolve_pid_ss(port)
+            if pid is None:
+                pid = _resolve_pid_lsof(port)
+            result[port] = pid
+
+    _PORT_PID_CACHE["map"] = result
+    _PORT_PID_CACHE["at"] = time.monotonic()
+    return {port: result.get(port) for port in wanted}
 
 
 def _resolve_pid_ss(port):
@@ -124,6 +288,179 @@ def _resolve_pid_lsof(port):
         return None
 
 
+# ---------------------------------------------------------------------------
+# Graceful stop: SIGTERM everything at once, wait on exit, escalate, verify ports
+# ---------------------------------------------------------------------------
+
+STOP_GRACE_DEFAULT = 3.0   # seconds between SIGTERM and SIGKILL
+STOP_KILL_WAIT = 1.0       # seconds to wait for SIGKILLed processes to vanish
+STOP_PORT_WAIT = 1.0       # seconds to wait for listening sockets to close after exit
+_STOP_POLL_MIN = 0.005
+_STOP_POLL_MAX = 0.05
+
+
+def stop_grace_period():
+    """SIGTERM → SIGKILL grace in seconds ($CC_PROXY_STOP_GRACE, default 3)."""
+    try:
+        return max(0.0, float(os.environ.get(STOP_GRACE_ENV, STOP_GRACE_DEFAULT)))
+    except ValueError:
+        return STOP_GRACE_DEFAULT
+
+
+def _pid_exited(pid):
+    """True once *pid* is gone (reaping it if it is our child) or a zombie."""
+    try:
+        reaped, _ = os.waitpid(pid, os.WNOHANG)
+        if reaped == pid:
+            return True
+    except ChildProcessError:
+        pass
+    except OSError:
+        pass
+    if IS_WINDOWS:
+        return not is_pid_alive(pid)
+    try:
+        with open(os.path.join(_PROC_ROOT, str(pid), "stat"), "r") as f:
+            stat = f.read()
+        return stat[stat.rindex(")") + 2:][:1] in ("Z", "X")
+    except FileNotFoundError:
+        return True
+    except (OSError, ValueError):
+        return not is_pid_alive(pid)
+
+
+def _open_pidfds(pids):
+    """{pidfd: pid} via os.pidfd_open (Linux >= 5.3, Python >= 3.9); {} when unsupported."""
+    if not hasattr(os, "pidfd_open"):
+        return {}
+    fds = {}
+    for pid in pids:
+        try:
+            fds[os.pidfd_open(pid)] = pid
+        except ProcessLookupError:
+            continue
+        except OSError:
+            for fd in fds:
+                os.close(fd)
+            return {}
+    return fds
+
+
+def wait_pids_exit(pids, timeout):
+    """Wait until every pid in *pids* has exited; returns the set still alive at *timeout*.
+
+    Uses pidfds + select where the kernel supports them, so the wait ends
+    the moment the last process exits; otherwise polls /proc (or kill -0)
+    on a short backoff.
+    """
+    alive = {pid for pid in pids if not _pid_exited(pid)}
+    deadline = time.monotonic() + timeout
+    fds = _open_pidfds(alive) if not IS_WINDOWS else {}
+    try:
+        if fds:
+            import select
+            alive = set(fds.values())
+            while alive:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                ready, _, _ = select.select(list(fds), [], [], remaining)
+                for fd in ready:
+                    pid = fds.pop(fd)
+                    os.close(fd)
+                    _pid_exited(pid)  # reap if it was our child
+                    alive.discard(pid)
+            return alive
+        delay = _STOP_POLL_MIN
+        while alive:
+            alive = {pid for pid in alive if not _pid_exited(pid)}
+            remaining = deadline - time.monotonic()
+            if not alive or remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, _STOP_POLL_MAX)
+        return alive
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def terminate_pids(pids, grace=None):
+    """SIGTERM all *pids* at once, SIGKILL whatever outlives *grace*.
+
+    Returns {"killed": [pids that needed SIGKILL], "alive": [pids that survived even that]}.
+    """
+    grace = stop_grace_period() if grace is None else grace
+    pids = sorted(set(p for p in pids if p and p != os.getpid()))
+    if not pids:
+        return {"killed": [], "alive": []}
+    for pid in pids:
+        kill_pid(pid)
+    left = wait_pids_exit(pids, grace)
+    killed = sorted(left)
+    if left and not IS_WINDOWS:
+        for pid in left:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        left = wait_pids_exit(left, STOP_KILL_WAIT)
+    return {"killed": killed, "alive": sorted(left)}
+
+
+def _port_listening(port):
+    try:
+        return bool(_procfs_listen_inodes({port}))
+    except OSError:
+        pass
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.2)
+        return s.connect_ex((HOST, port)) == 0
+
+
+def wait_ports_free(ports, timeout=STOP_PORT_WAIT):
+    """Wait until nothing listens on *ports*; returns the ports still held at *timeout*."""
+    held = set(ports)
+    deadline = time.monotonic() + timeout
+    delay = _STOP_POLL_MIN
+    while held:
+        held = {port for port in held if _port_listening(port)}
+        remaining = deadline - time.monotonic()
+        if not held or remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, _STOP_POLL_MAX)
+    return held
+
+
+def find_proxy_pids():
+    """PIDs of every running cli-proxy-api binary (what `pkill -f cli-proxy-api` aimed at).
+
+    Linux only (reads /proc/*/cmdline); returns None elsewhere so callers can
+    fall back to kill_all_proxies().
+    """
+    try:
+        entries = os.listdir(_PROC_ROOT)
+    except OSError:
+        return None
+    if IS_WINDOWS or not os.path.isdir(os.path.join(_PROC_ROOT, "self")):
+        return None
+    me = os.getpid()
+    found = []
+    for entry in entries:
+        if not entry.isdigit() or int(entry) == me:
+            continue
+        try:
+            with open(os.path.join(_PROC_ROOT, entry, "cmdline"), "rb") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        # argv[0] is the binary, or argv[1] when it is a script run by an interpreter
+        if any(os.path.basename(arg).startswith(b"cli-proxy-api") for arg in cmdline.split(b"\0")[:2]):
+            found.append(int(entry))
+    return found
+
+
 def find_free_port(start=3000, end=3020):
     for port in range(start, end + 1):
         try:
@@ -135,14 +472,21 @@ def find_free_port(start=3000, end=3020):
     return start
 
 
+def get_pool():
+    # httppool (http.client, email.*) costs more than the rest of this module;
+    # load it on the first health check instead of on every import.
+    from httppool import get_pool as _get_pool
+    return _get_pool()
+
+
 def check_health(provider):
-    import urllib.request
-    import urllib.error
-    port = PORTS[provider]
-    url = "http://{}:{}/".format(HOST, port)
+    return check_port_health(PORTS[provider])
+
+
+def check_port_health(port):
     try:
-        with urllib.request.urlopen(url, timeout=1) as resp:
-            return resp.status < 500
+        status, _, _, _ = get_pool().request(port, "GET", "/", timeout=1)
+        return status < 400
     except Exception:
         return False
 
@@ -1,32 +1,62 @@
 """
 Proxy lifecycle (start/stop/status).
-Also provides _capture_usage_snapshot_before_stop (called from stop_proxy).
-Depends on: constants, paths, process, config, api, usage
+Also provides _capture_usage_snapshot_before_stop (called from stop_many).
+api / usage / ledger / httppool are imported where used: `stop` with nothing
+running, the most common cold call, never needs HTTP or SQLite.
+Depends on: constants, paths, process, config, api, usage, ledger, httppool
+(bluegreen for CC_PROXY_RESTART_MODE=bluegreen restarts)
+
+When the on-demand activator (activator.py) owns the provider ports, its
+pid is never taken for a provider's: status reports an idle provider as
+stopped with "on_demand", stop leaves the activator listening (except
+`stop` of everything), and start wakes the provider with one request.
+
+Under the supervisor (supervisor.py) status carries its restart count and
+uptime as "supervised", stop removes pid files before signalling so the
+exit is not taken for a crash (`stop` of everything stops the supervisor
+too), and start of a stopped supervised provider asks the supervisor to
+relaunch it (configs/.supervisor.resume) instead of starting an
+unsupervised binary.
 """
 
+import errno
 import json
 import os
+import re
+import select
 import shutil
+import socket
 import subprocess
 import sys
 import time
 from pathlib import Path
 
-from constants import HOST, IS_WINDOWS, PORTS, PROVIDERS
+from constants import HOST, IS_WINDOWS, PORTS, PROVIDERS, RESTART_MODE_ENV
 from paths import (
     get_binary_path, get_config_file, get_provider_dir, get_token_dir,
 )
 from process import (
-    check_health, is_pid_alive, kill_all_proxies, kill_pid,
-    read_pid, remove_pid, resolve_pid_by_port, write_pid,
+    activator_pid, check_health, check_port_health, find_proxy_pids, is_pid_alive, kill_all_proxies,
+    invalidate_port_pid_cache, read_pid, read_supervisor_state, remove_pid, resolve_pid_by_port,
+    request_supervisor_resume, resolve_pids_by_ports, supervisor_pid, terminate_pids, wait_ports_free, write_pid,
 )
 from config import (
     get_token_infos, rewrite_auth_dir_in_config, rewrite_port_in_config,
 )
-from api import _management_api, _read_secret_key
-from usage import (
-    _usage_cumulative_apply_to_usage_data, _usage_snapshot_save,
-)
+
+START_READY_TIMEOUT = 3.5   # seconds; shared deadline for every provider in one start_many()
+START_BACKOFF_MIN = 0.005   # first wait between port probes; doubles up to START_BACKOFF_MAX
+START_BACKOFF_MAX = 0.05
+
+# main.log lines from cli-proxy-api.  READY only short-circuits the backoff
+# (the port probe still decides); FATAL (fatal/panic level, or a bind failure
+# on the provider's own port) fails the start with that line.  Anything else,
+# e.g. a sub-component that "failed to start", waits for the process to exit.
+_LOG_READY_RE = re.compile(r"(?i)listening|server started|started successfully")
+_LOG_FATAL_RE = re.compile(r"(?i)level=(?:fatal|panic)\b|\[(?:fatal|panic)\]|^panic: ")
+_LOG_BIND_RE = re.compile(r"(?i)bind: |address already in use")
+_CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY,
+                    getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK)}
 
 
 def get_binary_version(base_dir):
@@ -56,15 +86,18 @@ def should_open_auth_browser():
 
 def get_status(base_dir, provider):
     pid = read_pid(base_dir, provider)
+    on_demand = False
     if not pid:
         pid = resolve_pid_by_port(PORTS[provider])
-        if pid:
+        if pid and pid == activator_pid(base_dir):
+            pid, on_demand = None, True   # idle: the activator starts it on the next request
+        elif pid:
             write_pid(base_dir, provider, pid)
 
     running = bool(pid and is_pid_alive(pid))
     healthy = check_health(provider) if running else False
     tokens = get_token_infos(base_dir, provider)
-    return {
+    status = {
         "provider": provider,
         "running": running,
         "pid": pid if running else None,
@@ -72,6 +105,20 @@ def get_status(base_dir, provider):
         "url": "http://{}:{}".format(HOST, PORTS[provider]),
         "tokens": tokens,
     }
+    if on_demand:
+        status["on_demand"] = True
+    supervised = _supervised_info(base_dir, provider)
+    if supervised:
+        status["supervised"] = supervised
+    return status
+
+
+def _supervised_info(base_dir, provider):
+    """The running supervisor's entry for *provider* (state, restarts, since, ...), or None."""
+    info = (read_supervisor_state(base_dir).get("providers") or {}).get(provider)
+    if info and supervisor_pid(base_dir):
+        return info
+    return None
 
 
 def _capture_usage_snapshot_before_stop(base_dir, provider, quiet=False):
@@ -80,10 +127,14 @@ def _capture_usage_snapshot_before_stop(base_dir, provider, quiet=False):
         status = get_status(base_dir, provider)
         if not status.get("running"):
             return False
+        from api import _management_api, _read_secret_key
+        from ledger import ledger_ingest
+        from usage import _usage_snapshot_save
         secret = _read_secret_key(base_dir, provider)
         usage_data = _management_api(provider, "usage", secret)
         if not isinstance(usage_data, dict):
             return False
+        ledger_ingest(base_dir, provider, usage_data)
         ok = _usage_snapshot_save(provider, usage_data, reason="stop")
         if (not quiet) and ok:
             print("[cc-proxy] Saved usage snapshot: {}".format(provider))
@@ -92,12 +143,13 @@ def _capture_usage_snapshot_before_stop(base_dir, provider, quiet=False):
         return False
 
 
-def start_proxy(base_dir, provider, quiet=False):
+def _prepare_config(base_dir, provider, quiet):
+    """Binary and config.yaml (port and auth-dir rewritten) → (exe, config_path, wd) or a result dict."""
     exe = get_binary_path(base_dir)
     if not exe.exists():
         if not quiet:
             print("[cc-proxy] Binary not found: {}".format(exe), file=sys.stderr)
-        return False
+        return {"ok": False, "reason": "binary not found"}
 
     wd = get_provider_dir(base_dir, provider)
     if not wd.is_dir():
@@ -109,88 +161,365 @@ def start_proxy(base_dir, provider, quiet=False):
         if not root_bootstrap.exists():
             if not quiet:
                 print("[cc-proxy] No config.yaml found for {}".format(provider), file=sys.stderr)
-            return False
+            return {"ok": False, "reason": "no config.yaml"}
         shutil.copy(root_bootstrap, config_path)
 
     token_dir = get_token_dir(base_dir, create=True)
     rewrite_port_in_config(config_path, PORTS[provider])
     rewrite_auth_dir_in_config(config_path, token_dir)
+    return exe, config_path, wd
+
+
+def _prepare_start(base_dir, provider, quiet):
+    """Config/port checks before launching; returns (exe, config_path, wd) or a result dict."""
+    prepared = _prepare_config(base_dir, provider, quiet)
+    if isinstance(prepared, dict):
+        return prepared
 
     existing_pid = resolve_pid_by_port(PORTS[provider])
+    if existing_pid and existing_pid == activator_pid(base_dir):
+        # the activator holds the port: a request through it starts the binary
+        return _wait_started_by(base_dir, provider, "activator", quiet)
+    supervisor = supervisor_pid(base_dir)
+    if not existing_pid and supervisor and _supervised_info(base_dir, provider):
+        request_supervisor_resume(base_dir)   # the supervisor relaunches it
+        return _wait_started_by(base_dir, provider, "supervisor", quiet)
     if existing_pid:
         write_pid(base_dir, provider, existing_pid)
         if check_health(provider):
             if not quiet:
                 print("[cc-proxy] Reusing healthy proxy for {} (pid={})".format(provider, existing_pid))
-            return True
+            return {"ok": True, "pid": existing_pid, "reused": True}
         if not quiet:
             print("[cc-proxy] Process on port {} is unhealthy. Stop it first.".format(PORTS[provider]), file=sys.stderr)
-        return False
+        return {"ok": False, "pid": existing_pid, "reason": "port held by unhealthy process"}
+    return prepared
+
+
+def _wait_started_by(base_dir, provider, who, quiet, timeout=START_READY_TIMEOUT + 2.0):
+    """Wait for the activator/supervisor (*who*) to bring *provider* up → start result dict."""
+    deadline = time.monotonic() + timeout
+    healthy = check_health(provider)
+    while not healthy and time.monotonic() < deadline:
+        time.sleep(0.05)
+        healthy = check_health(provider)
+    if healthy:
+        pid = read_pid(base_dir, provider)
+        if not quiet:
+            print("[cc-proxy] {} started by the {} (pid={})".format(provider, who, pid))
+        return {"ok": True, "pid": pid, "reused": True}
+    if not quiet:
+        print("[cc-proxy] The {} could not start {}; see configs/{}.log".format(who, provider, who),
+              file=sys.stderr)
+    return {"ok": False, "reason": "{} start failed".format(who)}
+
+
+class _LogTail(object):
+    """Reads lines appended to a provider's main.log since construction."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        try:
+            self.offset = os.path.getsize(self.path)
+        except OSError:
+            self.offset = 0
+        self.partial = ""
+        self.last_line = ""
+
+    def scan(self, port=None):
+        """Return ("fatal"|"ready", line) for the most telling new line, or (None, None).
+
+        A bind failure is fatal only when it names *port*.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read()
+        except OSError:
+            return None, None
+        if not data:
+            return None, None
+        self.offset += len(data)
+        lines = (self.partial + data.decode("utf-8", "replace")).split("\n")
+        self.partial = lines.pop()
+        event = (None, None)
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            self.last_line = line
+            if _LOG_FATAL_RE.search(line) or (
+                    port is not None and _LOG_BIND_RE.search(line)
+                    and re.search(r":{}\b".format(port), line)):
+                return "fatal", line
+            if _LOG_READY_RE.search(line):
+                event = ("ready", line)
+        return event
+
+
+def _probe_port(port):
+    """Non-blocking connect to HOST:port: True (accepting), False (refused) or a pending socket."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        rc = sock.connect_ex((HOST, port))
+    except OSError:
+        rc = errno.ECONNREFUSED
+    if rc in _CONNECT_PENDING:
+        return sock
+    sock.close()
+    return rc == 0
 
+
+def _wait_pending_connects(connecting, timeout):
+    """Wait up to *timeout* for pending connects ({sock: provider}).
+
+    Returns the providers whose port accepted; every socket is closed before
+    returning so the proxy is free to answer the health check.  Sleeps out
+    the rest of *timeout* when nothing connected (refusals come back at once).
+    """
+    end = time.monotonic() + timeout
+    accepted = []
+    if connecting:
+        try:
+            _, writable, _ = select.select([], list(connecting), [], timeout)
+        except (OSError, ValueError):
+            writable = []
+        accepted = [connecting[s] for s in writable
+                    if s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0]
+        for sock in connecting:
+            sock.close()
+    if not accepted:
+        remaining = end - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+    return accepted
+
+
+def _spawn_proxy(exe, config_path, wd):
     log_path = str(wd / "main.log")
     if IS_WINDOWS:
         CREATE_NO_WINDOW = 0x08000000
-        proc = subprocess.Popen(
+        return subprocess.Popen(
             [str(exe), "-config", str(config_path)],
             cwd=str(wd),
             stdout=open(log_path, "a"),
             stderr=subprocess.STDOUT,
             creationflags=CREATE_NO_WINDOW,
         )
-    else:
-        log_file = open(log_path, "a")
-        proc = subprocess.Popen(
-            [str(exe), "-config", str(config_path)],
-            cwd=str(wd),
-            stdout=log_file,
-            stderr=subprocess.STDOUT,
-            start_new_session=True,
-        )
+    log_file = open(log_path, "a")
+    proc = subprocess.Popen(
+        [str(exe), "-config", str(config_path)],
+        cwd=str(wd),
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+    log_file.close()  # the child holds its own copy (matters in cc-proxyd)
+    return proc
+
+
+def wait_ready(launched, t0, timeout=START_READY_TIMEOUT):
+    """Wait for launched binaries: {key: (proc, port, log_tail)} → {key: {"ok", "elapsed", "reason"?}}.
+
+    Each round probes every pending port with a non-blocking connect()
+    (backoff 5 ms doubling to 50 ms, reset when main.log says the server is
+    listening) and confirms with a health check once a port accepts; a fatal
+    main.log line (fatal/panic level, or a bind failure on *port*) ends that
+    key at once, other error lines only once the process exits.  *t0* is the
+    monotonic time "elapsed" is measured from; *timeout* is one shared deadline.
+    """
+    results = {}
+
+    def finish(key, ok, reason=None):
+        results[key] = {"ok": ok, "elapsed": time.monotonic() - t0}
+        if reason:
+            results[key]["reason"] = reason
+        pending.remove(key)
 
-    time.sleep(0.3)
-    actual_pid = resolve_pid_by_port(PORTS[provider])
-    write_pid(base_dir, provider, actual_pid if actual_pid else proc.pid)
+    deadline = time.monotonic() + timeout
+    pending = list(launched)
+    backoff = START_BACKOFF_MIN
+    while pending:
+        connecting = {}
+        for key in list(pending):
+            proc, port, tail = launched[key]
+            event, line = tail.scan(port)
+            code = proc.poll()
+            if event == "fatal":
+                if code is None:
+                    proc.terminate()
+                finish(key, False, line[:200])
+            elif code is not None:
+                reason = "exited with code {}".format(code)
+                if tail.last_line:
+                    reason += ": " + tail.last_line[:200]
+                finish(key, False, reason)
+            else:
+                if event == "ready":
+                    backoff = START_BACKOFF_MIN
+                probe = _probe_port(port)
+                if probe is True:
+                    if check_port_health(port):
+                        finish(key, True)
+                elif probe is not False:
+                    connecting[probe] = key
+        now = time.monotonic()
+        if not pending or now >= deadline:
+            for sock in connecting:
+                sock.close()
+            break
+        for key in _wait_pending_connects(connecting, min(backoff, deadline - now)):
+            if key in pending and check_port_health(launched[key][1]):
+                finish(key, True)
+        backoff = min(backoff * 2, START_BACKOFF_MAX)
+    for key in pending:
+        results[key] = {"ok": False, "elapsed": time.monotonic() - t0,
+                        "reason": "not healthy after {:.1f}s".format(timeout)}
+    return results
+
+
+def start_many(base_dir, providers, quiet=False, timeout=START_READY_TIMEOUT):
+    """Start *providers* together: launch every binary first, then wait for all of them.
+
+    Readiness (see wait_ready) is tracked across all launched ports against
+    one shared deadline, so N providers take about as long as the slowest
+    one instead of the sum.  Returns
+    {provider: {"ok", "elapsed", "pid", "reused"?, "reason"?}};
+    one provider failing does not stop the others.
+    """
+    t0 = time.monotonic()
+    results = {}
+    launched = {}
+    for pvd in providers:
+        prepared = _prepare_start(base_dir, pvd, quiet)
+        if isinstance(prepared, dict):
+            prepared["elapsed"] = time.monotonic() - t0
+            results[pvd] = prepared
+            continue
+        tail = _LogTail(prepared[2] / "main.log")
+        launched[pvd] = (_spawn_proxy(*prepared), PORTS[pvd], tail)
+        if not quiet:
+            print("[cc-proxy] Starting {} proxy...".format(pvd))
+    invalidate_port_pid_cache()
+    results.update(wait_ready(launched, t0, timeout))
+
+    if launched:
+        pids = resolve_pids_by_ports([PORTS[pvd] for pvd in launched], max_age=0)
+        for pvd, (proc, _, _) in launched.items():
+            pid = pids.get(PORTS[pvd]) or proc.pid
+            write_pid(base_dir, pvd, pid)
+            results[pvd]["pid"] = pid
 
     if not quiet:
-        print("[cc-proxy] Starting {} proxy...".format(provider))
-    for _ in range(15):
-        if check_health(provider):
-            if not quiet:
-                print("[cc-proxy] Proxy ready at http://{}:{}/".format(HOST, PORTS[provider]))
-            return True
-        time.sleep(0.2)
+        for pvd in launched:
+            r = results[pvd]
+            url = "http://{}:{}/".format(HOST, PORTS[pvd])
+            if r["ok"]:
+                print("[cc-proxy] Proxy ready at {} ({}, {:.2f}s)".format(url, pvd, r["elapsed"]))
+            else:
+                print("[cc-proxy] Failed to become healthy at {} ({}: {})".format(url, pvd, r["reason"]),
+                      file=sys.stderr)
+        if len(providers) > 1:
+            n_ok = sum(1 for r in results.values() if r["ok"])
+            print("[cc-proxy] {}/{} providers ready in {:.2f}s".format(n_ok, len(providers), time.monotonic() - t0))
+    return results
+
+
+def start_proxy(base_dir, provider, quiet=False):
+    return start_many(base_dir, [provider], quiet=quiet)[provider]["ok"]
+
+
+def _clear_pool(port=None):
+    """Drop pooled connections to stopped proxies (nothing to do if never loaded)."""
+    httppool = sys.modules.get("httppool")
+    if httppool is not None:
+        httppool.get_pool().clear(port)
+
+
+def stop_many(base_dir, providers, quiet=False, grace=None, sweep=False):
+    """Stop *providers* together and return once their ports are free.
+
+    Every target pid (pid file + whoever listens on the port) gets SIGTERM at
+    once; process.terminate_pids waits on their exit and SIGKILLs whatever is
+    still alive after *grace* seconds ($CC_PROXY_STOP_GRACE).  *sweep* also
+    stops stray cli-proxy-api processes (stop all), the activator and the
+    supervisor; otherwise an activator keeps listening on the ports.  Pid
+    files go before any signal, which tells a supervisor the exits are
+    intentional.  Returns
+    {provider: {"pids", "killed", "port_free"}}.
+    """
+    for pvd in providers:
+        _capture_usage_snapshot_before_stop(base_dir, pvd, quiet=quiet or len(providers) > 1)
+
+    ports = [PORTS[pvd] for pvd in providers]
+    by_port = resolve_pids_by_ports(ports, max_age=0)
+    keep = None if sweep else activator_pid(base_dir)
+    targets = {}
+    for pvd in providers:
+        pids = set()
+        pid = read_pid(base_dir, pvd)
+        if pid and is_pid_alive(pid):
+            pids.add(pid)
+        if by_port.get(PORTS[pvd]) and by_port[PORTS[pvd]] != keep:
+            pids.add(by_port[PORTS[pvd]])
+        targets[pvd] = pids
+    all_pids = set().union(*targets.values()) if targets else set()
+    for pvd in providers:
+        remove_pid(base_dir, pvd)
+    if sweep:
+        all_pids.add(supervisor_pid(base_dir))
+        strays = find_proxy_pids()
+        if strays is None:
+            kill_all_proxies()
+        else:
+            all_pids.update(strays)
+
+    outcome = terminate_pids(all_pids, grace)
+    held = wait_ports_free([port for port in ports if not keep or by_port.get(port) != keep])
+
+    results = {}
+    for pvd in providers:
+        results[pvd] = {
+            "pids": sorted(targets[pvd]),
+            "killed": bool(targets[pvd] & set(outcome["killed"])),
+            "port_free": PORTS[pvd] not in held,
+        }
+        _clear_pool(PORTS[pvd])
+    invalidate_port_pid_cache()
 
     if not quiet:
-        print("[cc-proxy] Failed to become healthy at http://{}:{}/".format(HOST, PORTS[provider]), file=sys.stderr)
-    return False
+        for pvd in providers:
+            r = results[pvd]
+            if not r["port_free"]:
+                print("[cc-proxy] Port {} ({}) is still in use after stop.".format(PORTS[pvd], pvd),
+                      file=sys.stderr)
+            elif r["killed"]:
+                print("[cc-proxy] {} did not exit within the grace period; killed.".format(pvd))
+        if sweep:
+            print("[cc-proxy] All proxies stopped.")
+        else:
+            for pvd in providers:
+                print("[cc-proxy] Stopped {}.".format(pvd))
+    return results
+
+
+def restart_many(base_dir, providers, quiet=False):
+    """Restart *providers*; returns {provider: start result}.
+
+    Stops them together and starts them together, or with
+    CC_PROXY_RESTART_MODE=bluegreen (POSIX) swaps each one over to a fresh
+    instance behind the forwarding shim without closing its port.
+    """
+    if os.environ.get(RESTART_MODE_ENV, "").strip().lower() == "bluegreen" and not IS_WINDOWS:
+        from bluegreen import bluegreen_restart
+        return {pvd: bluegreen_restart(base_dir, pvd, quiet=quiet) for pvd in providers}
+    stop_many(base_dir, providers, quiet=quiet)
+    return start_many(base_dir, providers, quiet=quiet)
 
 
 def stop_proxy(base_dir, provider, quiet=False):
     if provider:
-        _capture_usage_snapshot_before_stop(base_dir, provider, quiet=quiet)
-        pid = read_pid(base_dir, provider)
-        if pid and is_pid_alive(pid):
-            kill_pid(pid)
-            time.sleep(0.25)
-        remove_pid(base_dir, provider)
-        pid2 = resolve_pid_by_port(PORTS[provider])
-        if pid2:
-            kill_pid(pid2)
-            time.sleep(0.25)
-        if not quiet:
-            print("[cc-proxy] Stopped {}.".format(provider))
+        stop_many(base_dir, [provider], quiet=quiet)
     else:
-        for pvd in PROVIDERS:
-            _capture_usage_snapshot_before_stop(base_dir, pvd, quiet=True)
-            pid = read_pid(base_dir, pvd)
-            if pid and is_pid_alive(pid):
-                kill_pid(pid)
-            remove_pid(base_dir, pvd)
-            pid2 = resolve_pid_by_port(PORTS[pvd])
-            if pid2:
-                kill_pid(pid2)
-        kill_all_proxies()
-        time.sleep(0.25)
-        if not quiet:
-            print("[cc-proxy] All proxies stopped.")
-
+        stop_many(base_dir, list(PROVIDERS), quiet=quiet, sweep=True)
@@ -1,59 +1,84 @@
 """
-Quota fetching (upstream provider APIs) and result caching.
+Quota fetching (upstream provider APIs) and result caching (SQLite store in the temp dir).
 Depends on: constants, config (_fmt_reset_time)
 """
 
 import json
+import os
+import sqlite3
+import tempfile
+import threading
 import time
 
-from constants import PORTS, QUOTA_CACHE_TTL
+from constants import QUOTA_CACHE_MAX_STALE, QUOTA_CACHE_TTL
 from config import _fmt_reset_time
 
 
-def _management_api_call(provider, secret, auth_index, method, url, headers, body=None):
-    """POST /v0/management/api-call → (upstream_status_code, parsed_body_dict).
-
-    Returns (None, None) on network/management error.
-    Upstream 4xx/5xx returned as-is so callers can handle them.
-    """
-    import urllib.request
-    import urllib.error
-    port = PORTS[provider]
-    endpoint = "http://127.0.0.1:{}/v0/management/api-call".format(port)
+def _api_call_payload(auth_index, method, url, headers, body=None):
+    """Build the JSON body for POST /v0/management/api-call."""
     payload = {"authIndex": auth_index, "method": method, "url": url, "header": headers}
     if body:
         payload["data"] = body
-    raw = json.dumps(payload).encode()
-    req = urllib.request.Request(endpoint, data=raw,
-                                 headers={"Authorization": "Bearer " + secret,
-                                          "Content-Type": "application/json"})
+    return json.dumps(payload).encode()
+
+
+def _api_call_decode(resp_body):
+    """api-call response bytes → (upstream_status_code, parsed_body_dict)."""
+    outer = json.loads(resp_body)
+    status_code = outer.get("status_code", 0)
     try:
-        with urllib.request.urlopen(req, timeout=8) as resp:
-            outer = json.loads(resp.read())
-        status_code = outer.get("status_code", 0)
-        try:
-            parsed_body = json.loads(outer.get("body", "{}"))
-        except Exception:
-            parsed_body = {}
-        return status_code, parsed_body
+        parsed_body = json.loads(outer.get("body", "{}"))
     except Exception:
-        return None, None
+        parsed_body = {}
+    return status_code, parsed_body
 
 
-def _fetch_quota_antigravity(provider, secret, auth_index):
-    """fetchAvailableModels → {model_id: {"used_pct": int, "reset_str": str}}"""
-    url = "https://cloudcode-pa.googleapis.com/v1internal:fetchAvailableModels"
-    headers = {
+def _quota_error(status_code, data):
+    err = (data.get("error") or {}).get("message", "HTTP {}".format(status_code))
+    return {"__error__": {"display": "error", "used_pct": 100, "reset_str": err[:40]}}
+
+
+# Upstream request per provider: (method, url, headers, body)
+_QUOTA_REQUEST_ANTIGRAVITY = (
+    "POST",
+    "https://cloudcode-pa.googleapis.com/v1internal:fetchAvailableModels",
+    {
         "Authorization": "Bearer $TOKEN$",
         "Content-Type": "application/json",
         "User-Agent": "antigravity/1.11.5 windows/amd64",
-    }
-    status_code, data = _management_api_call(provider, secret, auth_index, "POST", url, headers, "{}")
+    },
+    "{}",
+)
+
+_QUOTA_REQUEST_CLAUDE = (
+    "GET",
+    "https://api.anthropic.com/api/oauth/usage",
+    {
+        "Authorization": "Bearer $TOKEN$",
+        "Content-Type": "application/json",
+        "anthropic-beta": "oauth-2025-04-20",
+    },
+    None,
+)
+
+_QUOTA_REQUEST_CODEX = (
+    "GET",
+    "https://chatgpt.com/backend-api/wham/usage",
+    {
+        "Authorization": "Bearer $TOKEN$",
+        "Content-Type": "application/json",
+        "User-Agent": "codex_cli_rs/0.76.0 (Debian 13.0.0; x86_64) WindowsTerminal",
+    },
+    None,
+)
+
+
+def _parse_quota_antigravity(status_code, data):
+    """fetchAvailableModels → {model_id: {"used_pct": int, "reset_str": str}}"""
     if data is None:
         return None
     if status_code != 200:
-        err = (data.get("error") or {}).get("message", "HTTP {}".format(status_code))
-        return {"__error__": {"display": "error", "used_pct": 100, "reset_str": err[:40]}}
+        return _quota_error(status_code, data)
     result = {}
     for model_id, minfo in data.get("models", {}).items():
         qi = minfo.get("quotaInfo", {})
@@ -70,20 +95,12 @@ def _fetch_quota_antigravity(provider, secret, auth_index):
     return result
 
 
-def _fetch_quota_claude(provider, secret, auth_index):
+def _parse_quota_claude(status_code, data):
     """oauth/usage → {window_name: {"used_pct": int, "reset_str": str}}"""
-    url = "https://api.anthropic.com/api/oauth/usage"
-    headers = {
-        "Authorization": "Bearer $TOKEN$",
-        "Content-Type": "application/json",
-        "anthropic-beta": "oauth-2025-04-20",
-    }
-    status_code, data = _management_api_call(provider, secret, auth_index, "GET", url, headers)
     if data is None:
         return None
     if status_code != 200:
-        err = (data.get("error") or {}).get("message", "HTTP {}".format(status_code))
-        return {"__error__": {"display": "error", "used_pct": 100, "reset_str": err[:40]}}
+        return _quota_error(status_code, data)
     result = {}
     window_labels = {
         "five_hour":        "5h window",
@@ -104,20 +121,12 @@ def _fetch_quota_claude(provider, secret, auth_index):
     return result
 
 
-def _fetch_quota_codex(provider, secret, auth_index):
+def _parse_quota_codex(status_code, data):
     """wham/usage → {window: {"used_pct": int, "reset_str": str}}"""
-    url = "https://chatgpt.com/backend-api/wham/usage"
-    headers = {
-        "Authorization": "Bearer $TOKEN$",
-        "Content-Type": "application/json",
-        "User-Agent": "codex_cli_rs/0.76.0 (Debian 13.0.0; x86_64) WindowsTerminal",
-    }
-    status_code, data = _management_api_call(provider, secret, auth_index, "GET", url, headers)
     if data is None:
         return None
     if status_code != 200:
-        err = (data.get("error") or {}).get("message", "HTTP {}".format(status_code))
-        return {"__error__": {"display": "error", "used_pct": 100, "reset_str": err[:40]}}
+        return _quota_error(status_code, data)
     result = {}
     rl = data.get("rate_limit", {})
     for wkey, label in [("primary_window", "5h window"), ("secondary_window", "7d window")]:
@@ -130,39 +139,195 @@ def _fetch_quota_codex(provider, secret, auth_index):
     return result
 
 
-_QUOTA_FETCHERS = {
-    "antigravity": _fetch_quota_antigravity,
-    "claude":      _fetch_quota_claude,
-    "codex":       _fetch_quota_codex,
-    "openai":      _fetch_quota_codex,
+# Upstream request and response parser per provider; the prefetch engine
+# runs the api-call itself.
+_QUOTA_SPECS = {
+    "antigravity": (_QUOTA_REQUEST_ANTIGRAVITY, _parse_quota_antigravity),
+    "claude":      (_QUOTA_REQUEST_CLAUDE,      _parse_quota_claude),
+    "codex":       (_QUOTA_REQUEST_CODEX,       _parse_quota_codex),
+    "openai":      (_QUOTA_REQUEST_CODEX,       _parse_quota_codex),
 }
 
 
-def _quota_cache_path(provider, auth_index):
-    """Return /tmp cache file path for a given provider + auth_index."""
+# ---------------------------------------------------------------------------
+# Quota cache: one SQLite store in the temp dir, keyed by (provider, auth_index)
+# ---------------------------------------------------------------------------
+
+QUOTA_DB_NAME = "cc-proxy-quota.sqlite3"
+QUOTA_LOCK_DIR_NAME = "cc-proxy-quota-locks"
+
+_QUOTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota (
+    provider   TEXT NOT NULL,
+    auth_index TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    data       TEXT NOT NULL,
+    PRIMARY KEY (provider, auth_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS quota_fetched_at ON quota (fetched_at);
+"""
+
+_quota_db_local = threading.local()
+
+
+def _quota_db_path():
+    return os.path.join(tempfile.gettempdir(), QUOTA_DB_NAME)
+
+
+def _quota_db():
+    """Per-thread connection to the quota store (opened, migrated and evicted on first use)."""
+    path = _quota_db_path()
+    conn = getattr(_quota_db_local, "conn", None)
+    if conn is not None:
+        if _quota_db_local.path == path:
+            return conn
+        conn.close()
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_QUOTA_SCHEMA)
+    _quota_db_local.conn = conn
+    _quota_db_local.path = path
+    _quota_cache_evict(conn)
+    return conn
+
+
+def _quota_legacy_path(provider, auth_index):
+    """Pre-SQLite per-account cache file (read once for migration, then removed)."""
     import hashlib
     key = hashlib.md5("{}:{}".format(provider, auth_index).encode()).hexdigest()[:12]
-    return "/tmp/cc-proxy-quota-{}-{}.json".format(provider, key)
+    return os.path.join(tempfile.gettempdir(), "cc-proxy-quota-{}-{}.json".format(provider, key))
 
 
-def _quota_cache_load(provider, auth_index):
-    """Return cached quota dict if fresh (< TTL), else None."""
-    path = _quota_cache_path(provider, auth_index)
+def _quota_migrate_legacy(conn, provider, auth_indexes):
+    """Import legacy JSON cache files for *auth_indexes* into the store and delete them."""
+    for auth_index in auth_indexes:
+        path = _quota_legacy_path(provider, auth_index)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            conn.execute(
+                "INSERT OR IGNORE INTO quota (provider, auth_index, fetched_at, data) VALUES (?, ?, ?, ?)",
+                (provider, auth_index, float(cached.get("fetched_at", 0)), json.dumps(cached["data"])))
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        try:
+            os.remove(path)
+            os.remove(path + ".lock")
+        except OSError:
+            pass
+
+
+def _quota_cache_evict(conn=None, max_age=QUOTA_CACHE_MAX_STALE):
+    """Drop entries (and legacy files / lock files) older than *max_age*; never raises."""
+    cutoff = time.time() - max_age
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            cached = json.load(f)
-        if time.time() - cached.get("fetched_at", 0) < QUOTA_CACHE_TTL:
-            return cached["data"]
-    except Exception:
+        (conn or _quota_db()).execute("DELETE FROM quota WHERE fetched_at < ?", (cutoff,))
+    except sqlite3.Error:
         pass
-    return None
+    tmp = tempfile.gettempdir()
+    candidates = [os.path.join(tmp, n) for n in _listdir(tmp)
+                  if n.startswith("cc-proxy-quota-") and (n.endswith(".json") or n.endswith(".json.lock"))]
+    lock_dir = os.path.join(tmp, QUOTA_LOCK_DIR_NAME)
+    candidates += [os.path.join(lock_dir, n) for n in _listdir(lock_dir)]
+    for path in candidates:
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+def _quota_lock_path(provider, auth_index):
+    """Lock file guarding the upstream fetch for one cache entry (see locks.FileLock)."""
+    import hashlib
+    lock_dir = os.path.join(tempfile.gettempdir(), QUOTA_LOCK_DIR_NAME)
+    try:
+        os.makedirs(lock_dir, exist_ok=True)
+    except OSError:
+        pass
+    key = hashlib.md5("{}:{}".format(provider, auth_index).encode()).hexdigest()[:12]
+    return os.path.join(lock_dir, "{}-{}.lock".format(provider, key))
+
+
+def _quota_cache_load_many(provider, auth_indexes=None, max_stale=QUOTA_CACHE_MAX_STALE):
+    """One query for a provider's cached quotas → {auth_index: (quota_dict, age_seconds)}.
+
+    Entries older than *max_stale* are omitted.  When *auth_indexes* is given,
+    accounts missing from the store are looked up in legacy JSON files first.
+    """
+    now = time.time()
+    try:
+        conn = _quota_db()
+        if auth_indexes:
+            rows = dict(conn.execute(
+                "SELECT auth_index, 1 FROM quota WHERE provider = ?", (provider,)).fetchall())
+            missing = [a for a in auth_indexes if a not in rows]
+            if missing:
+                _quota_migrate_legacy(conn, provider, missing)
+        rows = conn.execute(
+            "SELECT auth_index, fetched_at, data FROM quota WHERE provider = ? AND fetched_at >= ?",
+            (provider, now - max_stale)).fetchall()
+    except sqlite3.Error:
+        return {}
+    out = {}
+    for auth_index, fetched_at, data in rows:
+        try:
+            out[auth_index] = (json.loads(data), max(0.0, now - fetched_at))
+        except ValueError:
+            continue
+    return out
+
+
+def _quota_cache_load_entry(provider, auth_index, max_stale=QUOTA_CACHE_MAX_STALE):
+    """Return (quota_dict, age_seconds) if cached within *max_stale*, else (None, None)."""
+    now = time.time()
+    try:
+        conn = _quota_db()
+        row = conn.execute(
+            "SELECT fetched_at, data FROM quota WHERE provider = ? AND auth_index = ?",
+            (provider, auth_index)).fetchone()
+        if row is None:
+            _quota_migrate_legacy(conn, provider, [auth_index])
+            row = conn.execute(
+                "SELECT fetched_at, data FROM quota WHERE provider = ? AND auth_index = ?",
+                (provider, auth_index)).fetchone()
+        if row is not None:
+            age = max(0.0, now - row[0])
+            if age < max_stale:
+                return json.loads(row[1]), age
+    except (sqlite3.Error, ValueError):
+        pass
+    return None, None
+
+
+def _quota_cache_load(provider, auth_index):
+    """Return cached quota dict if fresh (< TTL), else None."""
+    data, _ = _quota_cache_load_entry(provider, auth_index, max_stale=QUOTA_CACHE_TTL)
+    return data
+
+
+def _quota_mark_stale(data, age):
+    """Copy of a cached quota dict tagged for display as stale (served while revalidating)."""
+    if not isinstance(data, dict):
+        return data
+    marked = dict(data)
+    marked["__stale__"] = {"age": int(age)}
+    return marked
 
 
 def _quota_cache_save(provider, auth_index, data):
-    """Persist quota dict to cache file with current timestamp."""
-    path = _quota_cache_path(provider, auth_index)
+    """Upsert quota dict with current timestamp (single atomic statement); never raises."""
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({"fetched_at": time.time(), "data": data}, f)
-    except Exception:
+        _quota_db().execute(
+            "INSERT OR REPLACE INTO quota (provider, auth_index, fetched_at, data) VALUES (?, ?, ?, ?)",
+            (provider, auth_index, time.time(), json.dumps(data)))
+    except (sqlite3.Error, TypeError, ValueError):
         pass
@@ -0,0 +1,196 @@
+"""
+Forwarding shim for blue/green restarts (see bluegreen.py).
+
+Listens on a provider's canonical port and pipes every connection to the
+backend port named in the state file (configs/<provider>/.bluegreen.json).
+The file is re-read whenever it is replaced, checked on each accept, so
+os.replace() of the state file is the atomic swap: connections already
+open keep talking to the old instance, new ones reach the new one.
+Backends listed under "retire" get SIGTERM once their last connection
+closes (connections idle for SHIM_DRAIN_IDLE seconds are cut, long
+streaming responses are not) or their drain deadline passes.  On SIGTERM
+the shim stops its backends too, so stopping the port owner stops
+everything.
+
+relay() is the shared two-way socket copy loop; the activator and the
+overlapped-start gate pipe their connections through it as well.
+
+Run as: python shim.py <listen_port> <state_file>
+Depends on: constants, process
+"""
+
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+from constants import HOST, IS_WINDOWS
+from process import kill_pid, wait_pids_exit
+
+SHIM_DRAIN_IDLE = 5.0         # seconds without traffic before a retiring connection is cut
+SHIM_HOUSEKEEP_INTERVAL = 0.5
+SHIM_CONNECT_TIMEOUT = 2.0
+SHIM_STOP_WAIT = 2.0          # seconds to wait for backends on shutdown
+_BUF_SIZE = 65536
+
+
+def _log(msg):
+    print("[cc-proxy-shim] {}".format(msg), flush=True)
+
+
+def relay(a, b, on_data=None, on_idle=None, poll=None):
+    """Copy bytes both ways between connected sockets *a* and *b* until both sides close.
+
+    on_data() runs after every forwarded chunk.  With *poll* set, on_idle(idle)
+    runs whenever *poll* seconds pass without data (idle = seconds since the
+    last chunk); a true return cuts the relay.
+    """
+    peer = {a: b, b: a}
+    readers = [a, b]
+    last = time.monotonic()
+    while readers:
+        ready, _, _ = select.select(readers, [], [], poll)
+        if not ready:
+            if on_idle is not None and on_idle(time.monotonic() - last):
+                return
+            continue
+        for s in ready:
+            data = s.recv(_BUF_SIZE)
+            if data:
+                peer[s].sendall(data)
+                last = time.monotonic()
+                if on_data is not None:
+                    on_data()
+                continue
+            readers.remove(s)
+            try:
+                peer[s].shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+
+class Shim(object):
+    def __init__(self, listen_port, state_path):
+        self.listen_port = listen_port
+        self.state_path = state_path
+        self.state_key = None
+        self.backend = None
+        self.backend_pid = None
+        self.retiring = {}   # port -> {"pid", "deadline"}
+        self.active = {}     # port -> open connections
+        self.lock = threading.Lock()
+        self.last_housekeep = 0.0
+        self.reload()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if not IS_WINDOWS:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((HOST, listen_port))
+        self.sock.listen(128)
+        _log("listening on {}:{} -> {}".format(HOST, listen_port, self.backend))
+
+    def reload(self):
+        """Adopt the state file if it changed (new inode after os.replace, or new mtime)."""
+        try:
+            st = os.stat(self.state_path)
+        except OSError:
+            return
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self.state_key:
+            return
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            backend = int(state["backend"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self.state_key = key
+        with self.lock:
+            if backend != self.backend:
+                _log("backend {} -> {}".format(self.backend, backend))
+            self.backend = backend
+            self.backend_pid = state.get("backend_pid")
+            for r in state.get("retire") or []:
+                port = int(r["port"])
+                if port != backend and port not in self.retiring:
+                    self.retiring[port] = {"pid": r.get("pid"), "deadline": float(r["deadline"])}
+
+    def housekeep(self):
+        """Stop retiring backends that have drained or run out of time."""
+        self.last_housekeep = time.monotonic()
+        self.reload()
+        now = time.time()
+        done = []
+        with self.lock:
+            for port, r in list(self.retiring.items()):
+                if self.active.get(port, 0) == 0 or now >= r["deadline"]:
+                    done.append((port, r["pid"], self.active.get(port, 0)))
+                    del self.retiring[port]
+        for port, pid, left in done:
+            _log("retiring backend {} (pid={}, open connections={})".format(port, pid, left))
+            if pid:
+                kill_pid(pid)
+
+    def serve(self):
+        self.sock.settimeout(SHIM_HOUSEKEEP_INTERVAL)
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except socket.timeout:
+                self.housekeep()
+                continue
+            client.settimeout(None)
+            self.reload()
+            with self.lock:
+                port = self.backend
+                self.active[port] = self.active.get(port, 0) + 1
+            threading.Thread(target=self.pipe, args=(client, port), daemon=True).start()
+            if time.monotonic() - self.last_housekeep >= SHIM_HOUSEKEEP_INTERVAL:
+                self.housekeep()
+
+    def pipe(self, client, port):
+        upstream = None
+        try:
+            upstream = socket.create_connection((HOST, port), timeout=SHIM_CONNECT_TIMEOUT)
+            upstream.settimeout(None)
+            relay(client, upstream, poll=1.0,
+                  on_idle=lambda idle: port in self.retiring and idle > SHIM_DRAIN_IDLE)
+        except OSError:
+            pass
+        finally:
+            client.close()
+            if upstream is not None:
+                upstream.close()
+            with self.lock:
+                self.active[port] -= 1
+                drained = port in self.retiring and self.active[port] == 0
+            if drained:
+                self.housekeep()
+
+    def shutdown(self):
+        self.sock.close()
+        with self.lock:
+            pids = [r["pid"] for r in self.retiring.values() if r["pid"]]
+            if self.backend_pid:
+                pids.append(self.backend_pid)
+        for pid in pids:
+            kill_pid(pid)
+        wait_pids_exit(pids, SHIM_STOP_WAIT)
+
+
+def main(argv):
+    shim = Shim(int(argv[0]), argv[1])
+    if not IS_WINDOWS:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        shim.serve()
+    finally:
+        shim.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,494 @@
+"""
+Provider supervisor: one process that starts the cli-proxy-api binaries
+itself, keeps their handles and restarts whichever one dies.
+
+Exits are noticed through a pidfd per child where the kernel has them
+(Linux >= 5.3, Python >= 3.9), otherwise by polling once per tick, and
+reaped with os.waitpid so the exit status is known.  A binary that stops
+answering health checks is snapshotted, terminated and treated as crashed.
+Restarts back off exponentially with jitter (1s doubling up to 60s, reset
+after a minute of uptime); CC_PROXY_CRASH_LOOP_LIMIT failures (default 5)
+within five minutes open the crash-loop breaker, which stops restarting
+that provider and makes one more attempt after a cooldown.
+
+A provider whose pid file disappears before its binary exits was stopped
+on purpose (stop_many removes pid files first) and is left stopped;
+`start <provider>` or `supervise start` resume it by creating
+configs/.supervisor.resume, which the next tick consumes (SIGHUP does
+the same on POSIX).  `stop` of everything
+stops the supervisor too.  configs/.supervisor.json holds the supervisor
+pid and each provider's state, restart count, uptime and last exit, which
+status shows.
+
+  cc_proxy.py supervise start [provider ...|all]
+  cc_proxy.py supervise serve [provider ...|all]   (foreground)
+  cc_proxy.py supervise stop | status
+Depends on: constants, paths, process, proxy
+"""
+
+import collections
+import json
+import os
+import random
+import selectors
+import signal
+import subprocess
+import sys
+import time
+
+from constants import CRASH_LOOP_LIMIT_ENV, IS_WINDOWS, PORTS, PROVIDERS
+from paths import get_supervisor_resume_file, get_supervisor_state_file
+from process import (
+    _open_pidfds, check_port_health, invalidate_port_pid_cache, is_pid_alive,
+    read_pid, read_supervisor_state, remove_pid, request_supervisor_resume, resolve_pid_by_port,
+    supervisor_pid, terminate_pids, write_pid,
+)
+from proxy import (
+    _LogTail, _capture_usage_snapshot_before_stop, _clear_pool, _prepare_config, _spawn_proxy,
+    wait_ready,
+)
+
+SUPERVISE_TICK = 1.0             # longest sleep; also the exit poll interval without pidfds
+SUPERVISE_HEALTH_INTERVAL = 10.0
+SUPERVISE_HEALTH_MISSES = 3      # failed health checks in a row before a live binary counts as crashed
+SUPERVISE_GRACE = 3.0            # SIGTERM → SIGKILL for a binary the supervisor takes down
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+STABLE_UPTIME = 60.0             # a run this long resets the backoff and closes a half-open breaker
+CRASH_LOOP_LIMIT_DEFAULT = 5
+CRASH_LOOP_WINDOW = 300.0
+BREAKER_COOLDOWN = 600.0         # open breaker → one more attempt after this long
+SUPERVISE_START_TIMEOUT = 10.0   # `supervise start` waits this long for the first launch
+SUPERVISE_STOP_WAIT = 15.0       # `supervise stop`: snapshots and binary shutdown happen first
+
+
+def _log(msg):
+    print("[cc-proxy-supervisor] {}".format(msg), flush=True)
+
+
+def crash_loop_limit():
+    try:
+        return max(1, int(os.environ.get(CRASH_LOOP_LIMIT_ENV, CRASH_LOOP_LIMIT_DEFAULT)))
+    except ValueError:
+        return CRASH_LOOP_LIMIT_DEFAULT
+
+
+def backoff_delay(attempt, rng=random):
+    """Delay before restart number *attempt* (1, 2, ...): half the capped exponential plus jitter."""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(0, attempt - 1)))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def _exit_status(proc):
+    """Reap *proc* if it has exited → "exited with code N" / "killed by signal N", or None if alive."""
+    if IS_WINDOWS:
+        code = proc.poll()
+        return None if code is None else "exited with code {}".format(code)
+    if proc.returncode is not None:
+        return "exited with code {}".format(proc.returncode)
+    try:
+        pid, status = os.waitpid(proc.pid, os.WNOHANG)
+    except ChildProcessError:
+        proc.returncode = 0
+        return "exited"   # reaped elsewhere
+    if pid == 0:
+        return None
+    if os.WIFSIGNALED(status):
+        proc.returncode = -os.WTERMSIG(status)
+        return "killed by signal {}".format(os.WTERMSIG(status))
+    proc.returncode = os.WEXITSTATUS(status)
+    return "exited with code {}".format(proc.returncode)
+
+
+class _Child(object):
+    """One supervised provider: its binary, restart bookkeeping and breaker."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.state = "starting"   # starting | running | backoff | broken | stopped
+        self.proc = None
+        self.pidfd = None
+        self.since = None         # wall clock, current run
+        self.started = None       # monotonic, current run
+        self.launches = 0
+        self.restarts = 0
+        self.consecutive = 0      # failures since the last stable run (backoff exponent)
+        self.failures = collections.deque()   # monotonic times inside CRASH_LOOP_WINDOW
+        self.half_open = False    # breaker letting one attempt through
+        self.next_start = time.monotonic()
+        self.next_health = None
+        self.health_misses = 0
+        self.last_exit = None
+
+
+class Supervisor(object):
+    def __init__(self, base_dir, providers, rng=random):
+        self.base_dir = base_dir
+        self.children = collections.OrderedDict((pvd, _Child(pvd)) for pvd in providers)
+        self.limit = crash_loop_limit()
+        self.rng = rng
+        self.started = time.time()
+        self._closed = False
+        self._resume = False
+        self._launching = {}   # provider -> binary spawned by _launch, not yet handed to its child
+        self._sel = selectors.DefaultSelector()
+        self._resume_requested()   # drop a request left over from an earlier supervisor
+        self._write_state()
+
+    # -- state file ---------------------------------------------------------
+
+    def _write_state(self):
+        now, wall = time.monotonic(), time.time()
+        state = {"pid": os.getpid(), "started": self.started, "providers": {}}
+        for pvd, child in self.children.items():
+            proc = child.proc or self._launching.get(pvd)
+            state["providers"][pvd] = {
+                "state": child.state,
+                "pid": proc.pid if proc is not None else None,
+                "since": child.since,
+                "restarts": child.restarts,
+                "failures": len(child.failures),
+                "last_exit": child.last_exit,
+                "next_start": wall + (child.next_start - now) if child.state in ("backoff", "broken") else None,
+            }
+        path = str(get_supervisor_state_file(self.base_dir))
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    # -- launching ----------------------------------------------------------
+
+    def _launch(self, children):
+        """Start every child in *children* together, as start_many does, and wait for them."""
+        t0 = time.monotonic()
+        launched = {}
+        invalidate_port_pid_cache()
+        for child in children:
+            pvd = child.provider
+            owner = resolve_pid_by_port(PORTS[pvd])
+            if owner:
+                child.state = "stopped"
+                _log("not supervising {}: port {} held by pid {}".format(pvd, PORTS[pvd], owner))
+                continue
+            prepared = _prepare_config(self.base_dir, pvd, quiet=True)
+            if isinstance(prepared, dict):
+                child.state = "stopped"
+                _log("cannot start {}: {}".format(pvd, prepared["reason"]))
+                continue
+            exe, config_path, wd = prepared
+            child.state = "starting"
+            proc = self._launching[pvd] = _spawn_proxy(exe, config_path, wd)
+            launched[pvd] = (proc, PORTS[pvd], _LogTail(wd / "main.log"))
+        if not launched:
+            return
+        self._write_state()
+        invalidate_port_pid_cache()
+        results = wait_ready(launched, t0)
+        for pvd, (proc, _, _) in launched.items():
+            del self._launching[pvd]
+            child = self.children[pvd]
+            if child.launches:
+                child.restarts += 1
+            child.launches += 1
+            if not results[pvd]["ok"]:
+                if _exit_status(proc) is None:
+                    terminate_pids([proc.pid], grace=1.0)
+                    _exit_status(proc)
+                self._failed(child, results[pvd]["reason"])
+                continue
+            child.proc = proc
+            child.since, child.started = time.time(), time.monotonic()
+            child.state = "running"
+            child.health_misses = 0
+            child.next_health = child.started + SUPERVISE_HEALTH_INTERVAL
+            write_pid(self.base_dir, pvd, proc.pid)
+            fds = _open_pidfds([proc.pid]) if not IS_WINDOWS else {}
+            for fd in fds:
+                child.pidfd = fd
+                self._sel.register(fd, selectors.EVENT_READ, child)
+            _log("started {} (pid={}, {:.2f}s{})".format(
+                pvd, proc.pid, results[pvd]["elapsed"],
+                ", restart {}".format(child.restarts) if child.restarts else ""))
+
+    def _failed(self, child, reason):
+        """Schedule the next attempt for *child* after a crash or failed start, or open the breaker."""
+        now = time.monotonic()
+        child.last_exit = reason
+        child.consecutive += 1
+        child.failures.append(now)
+        while child.failures and now - child.failures[0] > CRASH_LOOP_WINDOW:
+            child.failures.popleft()
+        if child.half_open or len(child.failures) >= self.limit:
+            child.state = "broken"
+            child.half_open = False
+            child.next_start = now + BREAKER_COOLDOWN
+            _log("{} crash loop ({} failures in {:.0f}s, last: {}); not restarting for {:.0f}s".format(
+                child.provider, len(child.failures), CRASH_LOOP_WINDOW, reason, BREAKER_COOLDOWN))
+        else:
+            delay = backoff_delay(child.consecutive, self.rng)
+            child.state = "backoff"
+            child.next_start = now + delay
+            _log("{} {}; restarting in {:.1f}s".format(child.provider, reason, delay))
+        self._write_state()
+
+    # -- exits and health ---------------------------------------------------
+
+    def _forget(self, child):
+        if child.pidfd is not None:
+            self._sel.unregister(child.pidfd)
+            os.close(child.pidfd)
+            child.pidfd = None
+        child.proc = None
+        child.since = child.started = child.next_health = None
+        _clear_pool(PORTS[child.provider])
+
+    def _reap(self, child):
+        """Handle *child*'s binary if it has exited; True if it had."""
+        reason = _exit_status(child.proc)
+        if reason is None:
+            return False
+        pid = child.proc.pid
+        self._forget(child)
+        if self._closed or read_pid(self.base_dir, child.provider) != pid:
+            child.state = "stopped"   # stop_many removed the pid file first: stopped on purpose
+            child.last_exit = reason
+            _log("{} stopped ({})".format(child.provider, reason))
+            self._write_state()
+            return True
+        remove_pid(self.base_dir, child.provider)
+        self._failed(child, reason)
+        return True
+
+    def _check_health(self, child, now):
+        child.next_health = now + SUPERVISE_HEALTH_INTERVAL
+        if check_port_health(PORTS[child.provider]):
+            child.health_misses = 0
+            return
+        child.health_misses += 1
+        if child.health_misses < SUPERVISE_HEALTH_MISSES:
+            return
+        pid = child.proc.pid
+        _capture_usage_snapshot_before_stop(self.base_dir, child.provider, quiet=True)
+        terminate_pids([pid], grace=SUPERVISE_GRACE)
+        _exit_status(child.proc)
+        self._forget(child)
+        remove_pid(self.base_dir, child.provider)
+        self._failed(child, "unresponsive ({} health checks failed)".format(child.health_misses))
+
+    def resume(self):
+        """Ask serve() to restart stopped providers and close open breakers (SIGHUP, resume file)."""
+        self._resume = True
+
+    def _resume_requested(self):
+        """Consume the resume flag file (how `start` asks on Windows); True if it was there."""
+        try:
+            os.unlink(str(get_supervisor_resume_file(self.base_dir)))
+            return True
+        except OSError:
+            return False
+
+    def _do_resume(self):
+        self._resume = False
+        now = time.monotonic()
+        for child in self.children.values():
+            if child.state in ("stopped", "broken", "backoff"):
+                child.state = "backoff"
+                child.half_open = False
+                child.consecutive = 0
+                child.failures.clear()
+                child.next_start = now
+        _log("resuming stopped providers")
+
+    def tick(self):
+        """Reap exits, run due health checks and (re)start due providers."""
+        for child in self.children.values():
+            if child.proc is not None:
+                self._reap(child)
+        if self._resume_requested() or self._resume:
+            self._do_resume()
+        now = time.monotonic()
+        due = []
+        for child in self.children.values():
+            if child.state == "running":
+                if child.consecutive and now - child.started >= STABLE_UPTIME:
+                    child.consecutive = 0
+                    child.half_open = False
+                if now >= child.next_health:
+                    self._check_health(child, now)
+            elif child.state in ("starting", "backoff", "broken") and now >= child.next_start:
+                if child.state == "broken":
+                    child.half_open = True
+                    _log("{}: trying once more after the crash-loop cooldown".format(child.provider))
+                due.append(child)
+        if due:
+            self._launch(due)
+        self._write_state()
+
+    def _timeout(self):
+        now = time.monotonic()
+        waits = [SUPERVISE_TICK]
+        for child in self.children.values():
+            if child.state in ("starting", "backoff", "broken"):
+                waits.append(child.next_start - now)
+        return max(0.0, min(waits))
+
+    def serve(self):
+        _log("supervising {} (crash-loop limit {} in {:.0f}s)".format(
+            ", ".join(self.children), self.limit, CRASH_LOOP_WINDOW))
+        while not self._closed:
+            self.tick()
+            if self._closed:
+                break
+            for key, _ in self._sel.select(self._timeout()):
+                self._reap(key.data)
+
+    def stop(self):
+        """Make serve() return within one tick."""
+        self._closed = True
+
+    def shutdown(self):
+        """Snapshot and stop every running binary, then remove the state file.
+
+        Binaries still starting (a SIGTERM during _launch's wait) are stopped too.
+        """
+        self._closed = True
+        running = [c for c in self.children.values() if c.proc is not None and _exit_status(c.proc) is None]
+        launching = [p for p in self._launching.values() if _exit_status(p) is None]
+        for child in running:
+            _capture_usage_snapshot_before_stop(self.base_dir, child.provider, quiet=True)
+        for child in running:
+            remove_pid(self.base_dir, child.provider)
+        terminate_pids([c.proc.pid for c in running] + [p.pid for p in launching], grace=SUPERVISE_GRACE)
+        for proc in launching:
+            _exit_status(proc)
+        self._launching.clear()
+        for child in self.children.values():
+            if child.proc is not None:
+                _exit_status(child.proc)
+                self._forget(child)
+        self._sel.close()
+        try:
+            get_supervisor_state_file(self.base_dir).unlink()
+        except OSError:
+            pass
+
+
+def serve(base_dir, providers):
+    """Run the supervisor in the foreground until SIGTERM / Ctrl-C."""
+    pid = supervisor_pid(base_dir)
+    if pid:
+        print("[cc-proxy] The supervisor is already running (pid={}).".format(pid), file=sys.stderr)
+        return 1
+    supervisor = Supervisor(base_dir, providers)
+    if not IS_WINDOWS:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        signal.signal(signal.SIGHUP, lambda signum, frame: supervisor.resume())
+    try:
+        supervisor.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.shutdown()
+    return 0
+
+
+def _parse_args(args):
+    """[provider ...|all] → providers, or None after printing why."""
+    providers = []
+    for arg in args:
+        if arg == "all":
+            providers = list(PROVIDERS)
+        elif arg in PROVIDERS:
+            if arg not in providers:
+                providers.append(arg)
+        else:
+            print("[cc-proxy] Usage: supervise start|serve [provider ...|all]", file=sys.stderr)
+            return None
+    return providers or list(PROVIDERS)
+
+
+def _fmt_uptime(seconds):
+    seconds = int(seconds)
+    if seconds < 3600:
+        return "{}m{:02d}s".format(seconds // 60, seconds % 60)
+    return "{}h{:02d}m".format(seconds // 3600, seconds % 3600 // 60)
+
+
+def cmd_supervise(base_dir, args):
+    """`cc_proxy.py supervise start|serve|stop|status ...`."""
+    action, rest = (args[0], args[1:]) if args else ("", [])
+
+    if action == "serve":
+        providers = _parse_args(rest)
+        return serve(base_dir, providers) if providers else 1
+
+    pid = supervisor_pid(base_dir)
+    if action == "status":
+        if not pid:
+            print("[cc-proxy] supervisor: not running")
+            return 1
+        state = read_supervisor_state(base_dir)
+        print("[cc-proxy] supervisor: running (pid={}, up {})".format(
+            pid, _fmt_uptime(time.time() - (state.get("started") or time.time()))))
+        for pvd, info in (state.get("providers") or {}).items():
+            line = "  {:<12} :{:<5}  {:<8}  restarts {}".format(
+                pvd, PORTS.get(pvd, 0), info.get("state"), info.get("restarts", 0))
+            if info.get("state") == "running":
+                line += "  (pid={}, up {})".format(info.get("pid"), _fmt_uptime(time.time() - info.get("since", 0)))
+            elif info.get("next_start"):
+                line += "  (next attempt in {:.0f}s)".format(max(0, info["next_start"] - time.time()))
+            if info.get("last_exit"):
+                line += "  last exit: {}".format(info["last_exit"])
+            print(line)
+        return 0
+
+    if action == "stop":
+        if not pid:
+            print("[cc-proxy] supervisor: not running")
+            return 0
+        state = read_supervisor_state(base_dir).get("providers") or {}
+        children = set(read_pid(base_dir, pvd) for pvd in PROVIDERS)
+        children.update(info.get("pid") for info in state.values())   # includes binaries still starting
+        children = [p for p in children if p and is_pid_alive(p)]
+        terminate_pids([pid], grace=SUPERVISE_STOP_WAIT)
+        terminate_pids([p for p in children if is_pid_alive(p)])   # left over if it had to be killed
+        print("[cc-proxy] supervisor stopped (pid={}).".format(pid))
+        return 0
+
+    if action == "start":
+        providers = _parse_args(rest)
+        if not providers:
+            return 1
+        if pid:
+            request_supervisor_resume(base_dir)
+            print("[cc-proxy] supervisor already running (pid={}); resuming stopped providers.".format(pid))
+            return 0
+        log_path = get_supervisor_state_file(base_dir).parent / "supervisor.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        cc_proxy_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cc_proxy.py")
+        argv = [sys.executable, cc_proxy_py, "supervise", "serve"] + providers
+        kwargs = {"creationflags": 0x08000000} if IS_WINDOWS else {"start_new_session": True}
+        with open(str(log_path), "a") as log:
+            proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **kwargs)
+        deadline = time.monotonic() + SUPERVISE_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if supervisor_pid(base_dir) == proc.pid:
+                states = read_supervisor_state(base_dir).get("providers", {})
+                if all(info.get("state") != "starting" for info in states.values()):
+                    up = [pvd for pvd, info in states.items() if info.get("state") == "running"]
+                    print("[cc-proxy] supervisor started (pid={}); running: {}".format(
+                        proc.pid, ", ".join(up) or "none"))
+                    return 0 if up else 1
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+        print("[cc-proxy] supervisor failed to start; see {}".format(log_path), file=sys.stderr)
+        return 1
+
+    print("[cc-proxy] Usage: supervise start|serve [provider ...|all] | stop | status", file=sys.stderr)
+    return 1
@@ -0,0 +1,196 @@
+"""
+Token directory watcher: keeps the token index (config.py) current from
+filesystem events and tells a listener which token files changed.
+
+On Linux the directory from paths.get_token_dir() is watched with inotify
+(through ctypes, no extra packages); each burst of events re-checks only
+the named files (config.update_token_index) and, while the watch is up,
+get_token_infos() skips its scandir pass entirely.  Elsewhere, or when
+inotify is unavailable (no directory yet, watch limit reached), the
+directory is polled with refresh_token_index() every poll_interval seconds.
+If the watched directory goes away the watcher drops to polling.
+
+    watcher = TokenWatcher(base_dir, on_change).start()
+    ...
+    watcher.stop()
+
+on_change(names) runs on the watcher thread with the set of changed token
+file names, or None when the whole index had to be rebuilt.
+Depends on: paths, config
+"""
+
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+
+from paths import get_token_dir
+from config import refresh_token_index, set_token_dir_watched, update_token_index
+
+TOKEN_POLL_INTERVAL = 1.0   # seconds between scans without inotify
+TOKEN_EVENT_SETTLE = 0.02   # gather an atomic write's create/close/rename into one update
+
+# <sys/inotify.h>
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+               | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")   # wd, mask, cookie, len; name follows
+
+
+def _inotify_open(path):
+    """inotify fd watching directory *path*, or None when inotify cannot be used."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        init1 = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    fd = init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if fd < 0:
+        return None
+    if add_watch(fd, os.fsencode(path), _WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _read_events(fd):
+    """Drain pending events → (file names, overflowed, watch gone)."""
+    names, overflow, gone = set(), False, False
+    while True:
+        try:
+            buf = os.read(fd, 65536)
+        except BlockingIOError:
+            break
+        except OSError:
+            return names, overflow, True
+        if not buf:
+            break
+        off = 0
+        while off + _EVENT.size <= len(buf):
+            _, mask, _, length = _EVENT.unpack_from(buf, off)
+            name = buf[off + _EVENT.size:off + _EVENT.size + length].split(b"\0", 1)[0]
+            off += _EVENT.size + length
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                gone = True
+            if name:
+                names.add(os.fsdecode(name))
+    return names, overflow, gone
+
+
+class TokenWatcher(object):
+    def __init__(self, base_dir, on_change, poll_interval=TOKEN_POLL_INTERVAL):
+        self.base_dir = base_dir
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.mode = None   # "inotify" or "poll"
+        self.token_dir = None
+        self._fd = None
+        self._stop = threading.Event()
+        self._stop_r = self._stop_w = None
+        self._thread = None
+        self._files = {}   # index entries last reported (polling)
+
+    def start(self):
+        self.token_dir = str(get_token_dir(self.base_dir, create=False))
+        self._fd = _inotify_open(self.token_dir)
+        self._files = refresh_token_index(self.base_dir).get("files", {})   # baseline
+        if self._fd is not None:
+            self.mode = "inotify"
+            self._stop_r, self._stop_w = os.pipe()
+            set_token_dir_watched(self.token_dir, True)
+        else:
+            self.mode = "poll"
+        self._thread = threading.Thread(target=self._run, name="cc-proxy-token-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._stop_w is not None:
+            try:
+                os.write(self._stop_w, b"x")
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._unwatch()
+        for fd in (self._stop_r, self._stop_w):
+            if fd is not None:
+                os.close(fd)
+        self._stop_r = self._stop_w = None
+
+    def _unwatch(self):
+        if self._fd is not None:
+            set_token_dir_watched(self.token_dir, False)
+            os.close(self._fd)
+            self._fd = None
+
+    def _notify(self, names):
+        try:
+            self.on_change(names)
+        except Exception:
+            pass
+
+    def _run(self):
+        if self.mode == "inotify":
+            self._run_inotify()
+        if not self._stop.is_set():
+            self._run_poll()
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([self._fd, self._stop_r], [], [])
+            except (OSError, ValueError):
+                break
+            if self._stop_r in ready:
+                return
+            self._stop.wait(TOKEN_EVENT_SETTLE)
+            names, overflow, gone = _read_events(self._fd)
+            if overflow or gone:
+                # events were lost: rescan before trusting the index again
+                set_token_dir_watched(self.token_dir, False)
+                self._files = refresh_token_index(self.base_dir).get("files", {})
+                self._notify(None)
+                if gone:
+                    break
+                set_token_dir_watched(self.token_dir, True)
+                continue
+            changed = update_token_index(self.base_dir, names)
+            if changed:
+                self._notify(changed)
+        self._unwatch()
+        self.mode = "poll"
+
+    def _run_poll(self):
+        files = self._files
+        while not self._stop.wait(self.poll_interval):
+            index = refresh_token_index(self.base_dir)
+            fresh = index.get("files", {})
+            if fresh is files:
+                continue
+            changed = set(name for name in set(files) | set(fresh)
+                          if (files.get(name) or {}).get("stat") != (fresh.get(name) or {}).get("stat"))
+            files = self._files = fresh
+            if changed:
+                self._notify(changed)
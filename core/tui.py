@@ -1,34 +1,45 @@
 """
-Terminal UI: key input handling, rendering loop, and account toggle.
-Depends on: constants, paths, process, proxy, display
+Terminal UI: key input handling, differential rendering loop, and account toggle.
+Token file changes (new login, re-auth, delete) reach the loop from a
+tokenwatch.TokenWatcher and refresh only the providers they belong to.
+Depends on: constants, paths, process, proxy, hotreload, display, prefetch, tokenwatch
 """
 
+import codecs
 import json
 import os
+import queue
 import re
 import shutil
+import signal
 import sys
+import threading
 import time
 import unicodedata
 from datetime import datetime
 
 from constants import (
-    _C_BOLD, _C_DIM, _C_GREEN, _C_RED, _C_RESET,
+    _C_BOLD, _C_DIM, _C_GREEN, _C_RED, _C_RESET, _C_YELLOW,
     _TUI_ALT_OFF, _TUI_ALT_ON,
-    _TUI_CLEAR, _TUI_CURSOR_HIDE, _TUI_CURSOR_SHOW, _TUI_HOME,
+    _TUI_CLEAR, _TUI_CLEAR_EOS, _TUI_CURSOR_HIDE, _TUI_CURSOR_SHOW, _TUI_HOME,
     _TUI_KEY_DOWN, _TUI_KEY_ESC, _TUI_KEY_LEFT, _TUI_KEY_RIGHT, _TUI_KEY_UP,
     IS_WINDOWS, PROVIDERS,
 )
-from paths import resolve_account_file_path
-from proxy import get_status, start_proxy, stop_proxy
+from paths import _is_token_file_name, _token_prefixes_for_provider, resolve_account_file_path
+from proxy import get_status
+from hotreload import reload_accounts
 from display import (
     _account_identity, _box_bottom, _box_line, _box_sep, _box_top,
     _dedupe_auth_files, _prefetch_provider_data, _print_status_dashboard,
     _provider_frame_color,
 )
+from prefetch import prefetch_providers
+from tokenwatch import TokenWatcher
 
-# Module-level stdin buffers for key reading
-_TUI_STDIN_BUF = ""
+_TUI_SPINNER = "|/-\\"
+_TUI_TOKEN_RECHECK = 0.5   # seconds; second look after a token change, once the binary has reloaded it
+
+# Module-level key buffer for the Windows console reader
 _TUI_WIN_BUF = []
 
 
@@ -44,6 +55,74 @@ def _tui_flush():
     sys.stdout.flush()
 
 
+class ScreenBuffer:
+    """Differential renderer: keeps the last frame and rewrites only changed lines.
+
+    Each frame goes out as a single os.write of cursor-positioned line
+    rewrites.  A terminal size change (or invalidate()) forces a full repaint.
+    Frames taller than the terminal are clipped, keeping the last
+    *pin_bottom* lines (status message + key help) on screen.
+    """
+
+    def __init__(self, fd=None, pin_bottom=3):
+        self.fd = fd
+        self.pin_bottom = pin_bottom
+        self.bytes_written = 0
+        self.frames = 0
+        self.invalidate()
+
+    def invalidate(self):
+        self._lines = []
+        self._size = None
+
+    def size_changed(self):
+        return self._size is not None and _terminal_size() != self._size
+
+    def _fit(self, lines, rows):
+        if len(lines) <= rows:
+            return lines
+        keep = min(self.pin_bottom, rows)
+        return lines[:rows - keep] + lines[len(lines) - keep:]
+
+    def diff(self, text, size):
+        """Escape sequence that turns the previous frame into *text* (updates state)."""
+        lines = self._fit(text.rstrip("\n").split("\n"), size[1])
+        full = size != self._size
+        prev = [] if full else self._lines
+        out = [_TUI_HOME + _TUI_CLEAR] if full else []
+        for i, line in enumerate(lines):
+            if i < len(prev) and prev[i] == line:
+                continue
+            out.append("\033[{};1H{}\033[K".format(i + 1, line))
+        if len(lines) < len(prev):
+            out.append("\033[{};1H{}".format(len(lines) + 1, _TUI_CLEAR_EOS))
+        self._lines = lines
+        self._size = size
+        return "".join(out)
+
+    def render(self, text, size=None):
+        """Draw *text*; returns the number of bytes written."""
+        out = self.diff(text, size or _terminal_size())
+        data = out.encode("utf-8")
+        if self.fd is None and IS_WINDOWS:
+            # console code page may not be UTF-8; let sys.stdout encode
+            _tui_write(out)
+            _tui_flush()
+        else:
+            fd = self.fd if self.fd is not None else sys.stdout.fileno()
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        self.bytes_written += len(data)
+        self.frames += 1
+        return len(data)
+
+
+def _terminal_size():
+    size = shutil.get_terminal_size(fallback=(100, 24))
+    return (size.columns, size.lines)
+
+
 def _tui_enter_screen():
     _tui_write(_TUI_ALT_ON + _TUI_CURSOR_HIDE + _TUI_HOME + _TUI_CLEAR)
     _tui_flush()
@@ -67,10 +146,12 @@ def _tui_key_to_action(key):
         return _TUI_KEY_ESC
     if key == " ":
         return "toggle"
+    if key in ("\r", "\n"):
+        return "commit"
 
     lk = unicodedata.normalize("NFKC", key.lower())
     # Support Korean 2-set layout without switching to English:
-    # ㅁ/ㄴ/ㅈ/ㅇ → a/s/w/d, ㄱ/ㅂ → r/q
+    # ㅁ/ㄴ/ㅈ/ㅇ → a/s/w/d, ㄱ/ㅂ → r/q, ㅊ/ㅌ → c/x
     lk = {
         "ㅁ": "a", "\u1106": "a",
         "ㄴ": "s", "\u1102": "s",
@@ -78,10 +159,16 @@ def _tui_key_to_action(key):
         "ㅇ": "d", "\u110b": "d",
         "ㄱ": "r", "\u1100": "r",
         "ㅂ": "q", "\u1107": "q",
+        "ㅊ": "c", "\u110e": "c",
+        "ㅌ": "x", "\u1110": "x",
     }.get(lk, lk)
 
     if lk in ("q", "r"):
         return lk
+    if lk == "c":
+        return "commit"
+    if lk == "x":
+        return "discard"
     if lk in ("a", "s", "w", "d"):
         return {
             "a": _TUI_KEY_LEFT,
@@ -94,163 +181,238 @@ def _tui_key_to_action(key):
     return None
 
 
+_TUI_ESC_SEQS = {
+    "\x1b[A": _TUI_KEY_UP,
+    "\x1b[B": _TUI_KEY_DOWN,
+    "\x1b[C": _TUI_KEY_RIGHT,
+    "\x1b[D": _TUI_KEY_LEFT,
+    "\x1bOA": _TUI_KEY_UP,
+    "\x1bOB": _TUI_KEY_DOWN,
+    "\x1bOC": _TUI_KEY_RIGHT,
+    "\x1bOD": _TUI_KEY_LEFT,
+}
+_TUI_ESC_WAIT = 0.03  # seconds to wait for the rest of an escape sequence
+
+
+def _tui_parse_keys(buf):
+    """Split decoded terminal input into keys (arrow sequences → _TUI_KEY_*)."""
+    keys = []
+    while buf:
+        for seq, key in _TUI_ESC_SEQS.items():
+            if buf.startswith(seq):
+                keys.append(key)
+                buf = buf[len(seq):]
+                break
+        else:
+            keys.append(_TUI_KEY_ESC if buf[0] == "\x1b" else buf[0])
+            buf = buf[1:]
+    return keys
+
+
 def _read_key_timeout(timeout_sec=0.5):
-    global _TUI_STDIN_BUF, _TUI_WIN_BUF
-
-    if IS_WINDOWS:
-        import msvcrt
-
-        # return buffered key first (preserve exact order)
-        if _TUI_WIN_BUF:
-            return _TUI_WIN_BUF.pop(0)
-
-        end = time.time() + max(0.0, timeout_sec)
-        while time.time() < end:
-            if msvcrt.kbhit():
-                ch = msvcrt.getch()
-                action = None
-                if ch in (b"\x00", b"\xe0"):
-                    ch2 = msvcrt.getch()
-                    mapping = {
+    """Windows console: poll msvcrt for up to *timeout_sec*; one key or None."""
+    global _TUI_WIN_BUF
+    import msvcrt
+
+    # return buffered key first (preserve exact order)
+    if _TUI_WIN_BUF:
+        return _TUI_WIN_BUF.pop(0)
+
+    end = time.time() + max(0.0, timeout_sec)
+    while time.time() < end:
+        if msvcrt.kbhit():
+            ch = msvcrt.getch()
+            action = None
+            if ch in (b"\x00", b"\xe0"):
+                ch2 = msvcrt.getch()
+                mapping = {
+                    b"K": _TUI_KEY_LEFT,
+                    b"M": _TUI_KEY_RIGHT,
+                    b"H": _TUI_KEY_UP,
+                    b"P": _TUI_KEY_DOWN,
+                }
+                action = mapping.get(ch2)
+            elif ch == b"\x1b":
+                action = _TUI_KEY_ESC
+            else:
+                try:
+                    action = ch.decode("utf-8", errors="ignore")
+                except Exception:
+                    action = None
+
+            if action is not None:
+                _TUI_WIN_BUF.append(action)
+
+            # drain additional pending keys quickly into buffer
+            drain_deadline = time.time() + 0.01
+            while time.time() < drain_deadline and msvcrt.kbhit():
+                chx = msvcrt.getch()
+                ax = None
+                if chx in (b"\x00", b"\xe0"):
+                    chx2 = msvcrt.getch()
+                    ax = {
                         b"K": _TUI_KEY_LEFT,
                         b"M": _TUI_KEY_RIGHT,
                         b"H": _TUI_KEY_UP,
                         b"P": _TUI_KEY_DOWN,
-                    }
-                    action = mapping.get(ch2)
-                elif ch == b"\x1b":
-                    action = _TUI_KEY_ESC
+                    }.get(chx2)
+                elif chx == b"\x1b":
+                    ax = _TUI_KEY_ESC
                 else:
                     try:
-                        action = ch.decode("utf-8", errors="ignore")
+                        ax = chx.decode("utf-8", errors="ignore")
                     except Exception:
-                        action = None
-
-                if action is not None:
-                    _TUI_WIN_BUF.append(action)
-
-                # drain additional pending keys quickly into buffer
-                drain_deadline = time.time() + 0.01
-                while time.time() < drain_deadline and msvcrt.kbhit():
-                    chx = msvcrt.getch()
-                    ax = None
-                    if chx in (b"\x00", b"\xe0"):
-                        chx2 = msvcrt.getch()
-                        ax = {
-                            b"K": _TUI_KEY_LEFT,
-                            b"M": _TUI_KEY_RIGHT,
-                            b"H": _TUI_KEY_UP,
-                            b"P": _TUI_KEY_DOWN,
-                        }.get(chx2)
-                    elif chx == b"\x1b":
-                        ax = _TUI_KEY_ESC
-                    else:
-                        try:
-                            ax = chx.decode("utf-8", errors="ignore")
-                        except Exception:
-                            ax = None
-                    if ax is not None:
-                        _TUI_WIN_BUF.append(ax)
-
-                return _TUI_WIN_BUF.pop(0) if _TUI_WIN_BUF else None
-
-            time.sleep(0.002)
-
-        return None
-
-    import termios
-    import tty
-    import select
-
-    fd = sys.stdin.fileno()
-    old = termios.tcgetattr(fd)
-    try:
-        tty.setcbreak(fd)
+                        ax = None
+                if ax is not None:
+                    _TUI_WIN_BUF.append(ax)
 
-        r, _, _ = select.select([sys.stdin], [], [], max(0.0, timeout_sec))
-        if r:
-            while True:
-                r2, _, _ = select.select([sys.stdin], [], [], 0)
-                if not r2:
-                    break
-                _TUI_STDIN_BUF += sys.stdin.read(1)
-
-        if not _TUI_STDIN_BUF:
-            return None
-
-        # If ESC starts a sequence, wait a tiny bit for the remaining bytes.
-        if _TUI_STDIN_BUF.startswith("\x1b") and len(_TUI_STDIN_BUF) == 1:
-            r3, _, _ = select.select([sys.stdin], [], [], 0.03)
-            if r3:
-                _TUI_STDIN_BUF += sys.stdin.read(1)
-                while True:
-                    r4, _, _ = select.select([sys.stdin], [], [], 0)
-                    if not r4:
-                        break
-                    _TUI_STDIN_BUF += sys.stdin.read(1)
-
-        seq_map = {
-            "\x1b[A": _TUI_KEY_UP,
-            "\x1b[B": _TUI_KEY_DOWN,
-            "\x1b[C": _TUI_KEY_RIGHT,
-            "\x1b[D": _TUI_KEY_LEFT,
-            "\x1bOA": _TUI_KEY_UP,
-            "\x1bOB": _TUI_KEY_DOWN,
-            "\x1bOC": _TUI_KEY_RIGHT,
-            "\x1bOD": _TUI_KEY_LEFT,
-        }
-        for seq in sorted(seq_map.keys(), key=len, reverse=True):
-            if _TUI_STDIN_BUF.startswith(seq):
-                _TUI_STDIN_BUF = _TUI_STDIN_BUF[len(seq):]
-                return seq_map[seq]
-
-        ch = _TUI_STDIN_BUF[0]
-        _TUI_STDIN_BUF = _TUI_STDIN_BUF[1:]
-        if ch == "\x1b":
-            return _TUI_KEY_ESC
-        return ch
-    finally:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old)
+            return _TUI_WIN_BUF.pop(0) if _TUI_WIN_BUF else None
 
+        time.sleep(0.002)
 
-def _tui_clear_input_buffer():
-    global _TUI_STDIN_BUF, _TUI_WIN_BUF
-    _TUI_STDIN_BUF = ""
-    _TUI_WIN_BUF = []
+    return None
 
 
-def _tui_discard_pending_input(settle_ms=0):
-    """Discard queued key events (local + OS buffer).
+class TuiInput:
+    """Event source for the TUI loop: keys, wake() calls and terminal resizes.
 
-    settle_ms>0이면 짧은 시간 동안 반복적으로 비워서 토글 직후 key repeat 꼬임을 줄인다.
+    On POSIX the terminal is put in cbreak mode once for the whole session
+    and wait() blocks in a single selector over stdin and a self-pipe; the
+    worker thread and the SIGWINCH handler write a byte into the pipe to end
+    the wait.  stdin is read in bulk with os.read.  Windows consoles cannot
+    be selected on, so wait() falls back to polling msvcrt.
     """
-    _tui_clear_input_buffer()
 
-    def _flush_once():
+    def __init__(self, fd=None):
+        self.fd = fd
+        self.wakeups = 0
+        self._buf = ""
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._old_attrs = None
+        self._old_winch = None
+        self._sel = None
+        self._wake_r = None
+        self._wake_w = None
+
+    def open(self):
+        if IS_WINDOWS:
+            return self
+        import selectors
+        import termios
+        import tty
+
+        if self.fd is None:
+            self.fd = sys.stdin.fileno()
         try:
-            if IS_WINDOWS:
-                import msvcrt
-                while msvcrt.kbhit():
-                    msvcrt.getch()
-            else:
-                import termios
-                termios.tcflush(sys.stdin.fileno(), termios.TCIFLUSH)
-        except Exception:
+            self._old_attrs = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+        except termios.error:
+            self._old_attrs = None  # not a tty
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self.fd, selectors.EVENT_READ, "key")
+        self._sel.register(self._wake_r, selectors.EVENT_READ, "wake")
+        if hasattr(signal, "SIGWINCH") and threading.current_thread() is threading.main_thread():
+            self._old_winch = signal.signal(signal.SIGWINCH, lambda signum, frame: self._poke(b"W"))
+        return self
+
+    def close(self):
+        if self._sel is None:
+            return
+        if self._old_winch is not None:
+            signal.signal(signal.SIGWINCH, self._old_winch)
+            self._old_winch = None
+        self._sel.close()
+        self._sel = None
+        for fd in (self._wake_r, self._wake_w):
+            os.close(fd)
+        self._wake_r = self._wake_w = None
+        if self._old_attrs is not None:
+            import termios
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._old_attrs)
+            self._old_attrs = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def wake(self):
+        """End a pending wait() from another thread."""
+        self._poke(b"R")
+
+    def _poke(self, byte):
+        try:
+            os.write(self._wake_w, byte)
+        except (OSError, TypeError):
+            pass  # pipe full (a wakeup is already pending) or closed
+
+    def wait(self, timeout=None):
+        """Block until input, wake() or SIGWINCH, or *timeout* seconds (None = forever).
+
+        Returns (keys, resized).  Stdin EOF is reported as a "q" key.
+        """
+        self.wakeups += 1
+        if IS_WINDOWS:
+            key = _read_key_timeout(0.03 if timeout is None else min(timeout, 0.03))
+            return ([key] if key else []), False
+
+        keys, resized = [], False
+        for sel_key, _ in self._sel.select(timeout):
+            if sel_key.data == "wake":
+                resized = self._drain_wake() or resized
+            elif not self._read_stdin():
+                keys.append("q")
+        if self._buf == "\x1b" and self._stdin_ready(_TUI_ESC_WAIT):
+            self._read_stdin()
+        keys[:0], self._buf = _tui_parse_keys(self._buf), ""
+        return keys, resized
+
+    def _drain_wake(self):
+        data = b""
+        try:
+            while True:
+                chunk = os.read(self._wake_r, 512)
+                if not chunk:
+                    break
+                data += chunk
+        except BlockingIOError:
             pass
-        _tui_clear_input_buffer()
+        return b"W" in data
+
+    def _read_stdin(self):
+        try:
+            chunk = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return True
+        if not chunk:
+            self._sel.unregister(self.fd)
+            return False
+        self._buf += self._decoder.decode(chunk)
+        return True
 
-    _flush_once()
-    if settle_ms and settle_ms > 0:
-        end = time.time() + (float(settle_ms) / 1000.0)
-        while time.time() < end:
-            _flush_once()
-            time.sleep(0.005)
+    def _stdin_ready(self, timeout):
+        import select
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(r)
 
 
 # ---------------------------------------------------------------------------
 # Data fetch helpers
 # ---------------------------------------------------------------------------
 
+def _tui_placeholder(provider):
+    """Provider data shown until the background worker delivers the first fetch."""
+    return {
+        "status": {"provider": provider, "running": False, "pid": None, "healthy": False,
+                   "url": "", "tokens": []},
+        "auth_data": None,
+    }
+
+
 def _tui_fetch_provider(base_dir, provider):
     d = _prefetch_provider_data(
         base_dir,
@@ -278,55 +440,47 @@ def _tui_fetch_provider_light(base_dir, provider):
 # Account toggle
 # ---------------------------------------------------------------------------
 
-def _tui_toggle_account(base_dir, provider, account, progress_cb=None):
-    """Toggle disabled flag by directly editing the selected account JSON file.
+def _tui_write_toggle(base_dir, provider, account):
+    """Flip the disabled flag in the selected account's JSON file → (ok, message, path, disabled).
 
     원칙:
     - 반드시 선택된 account의 path 파일만 수정
     - runtime-only/non-file 계정은 수정하지 않음
     - atomic write(임시파일 + replace)로 파일 손상 방지
     """
-    def _progress(msg):
-        if progress_cb:
-            try:
-                progress_cb(msg)
-            except Exception:
-                pass
-
     if not account:
-        return False, "no account selected"
+        return False, "no account selected", None, None
 
     if account.get("runtime_only"):
-        return False, "toggle unsupported: runtime-only account"
+        return False, "toggle unsupported: runtime-only account", None, None
     if account.get("source") and account.get("source") != "file":
-        return False, "toggle unsupported: non-file account"
+        return False, "toggle unsupported: non-file account", None, None
 
     rel_path = (account.get("path") or "").strip()
     if not rel_path:
-        return False, "toggle unsupported: no file path"
+        return False, "toggle unsupported: no file path", None, None
 
     file_path, err = resolve_account_file_path(base_dir, provider, rel_path)
     if err:
-        return False, "toggle blocked: {}".format(err)
+        return False, "toggle blocked: {}".format(err), None, None
     if file_path is None:
-        return False, "toggle unsupported: file path resolve failed"
+        return False, "toggle unsupported: file path resolve failed", None, None
 
     if not file_path.exists() or not file_path.is_file():
-        return False, "toggle unsupported: file not found"
+        return False, "toggle unsupported: file not found", None, None
 
-    _progress(_C_DIM + "파일 읽는 중..." + _C_RESET)
     try:
         raw = file_path.read_text(encoding="utf-8")
     except Exception as e:
-        return False, "read failed: {}".format(e)
+        return False, "read failed: {}".format(e), None, None
 
     try:
         obj = json.loads(raw)
     except Exception as e:
-        return False, "json parse failed: {}".format(e)
+        return False, "json parse failed: {}".format(e), None, None
 
     if not isinstance(obj, dict):
-        return False, "json shape invalid"
+        return False, "json shape invalid", None, None
 
     obj["disabled"] = not bool(obj.get("disabled", False))
 
@@ -334,7 +488,6 @@ def _tui_toggle_account(base_dir, provider, account, progress_cb=None):
     if not payload.endswith("\n"):
         payload += "\n"
 
-    _progress(_C_DIM + "파일 저장 중..." + _C_RESET)
     tmp = file_path.with_name(file_path.name + ".tmp")
     try:
         tmp.write_text(payload, encoding="utf-8")
@@ -345,27 +498,72 @@ def _tui_toggle_account(base_dir, provider, account, progress_cb=None):
                 tmp.unlink()
         except Exception:
             pass
-        return False, "write failed: {}".format(e)
+        return False, "write failed: {}".format(e), None, None
 
-    # binary가 파일 변경을 즉시 반영하지 않는 환경이 있어 provider 재기동으로 확정 반영
-    try:
-        status = get_status(base_dir, provider)
-        if status.get("running"):
-            _progress(_C_DIM + "provider 재시작 중..." + _C_RESET)
-            stop_proxy(base_dir, provider, quiet=True)
-            if not start_proxy(base_dir, provider, quiet=True):
-                return False, "toggle saved but restart failed"
-    except Exception as e:
-        return False, "toggle saved but reload failed: {}".format(e)
+    return True, "saved", file_path, obj["disabled"]
+
+
+def _tui_apply_toggles(base_dir, batch, progress_cb=None):
+    """Commit staged toggles: write every token file, then one reload per provider.
 
-    return True, "toggled"
+    batch: [(provider, account), ...] → {provider: (ok, message)}.
+    Providers reload in parallel; each goes through hotreload with all of its
+    changed files at once, so a batch costs at most one restart per provider.
+    """
+    def _progress(msg):
+        if progress_cb:
+            try:
+                progress_cb(_C_DIM + msg + _C_RESET)
+            except Exception:
+                pass
+
+    changes = {}
+    errors = {}
+    for i, (pvd, account) in enumerate(batch):
+        label = _tui_account_label(account or {})[:24]
+        _progress("[1/3] writing {}/{}: {}".format(i + 1, len(batch), label))
+        ok, m, file_path, disabled = _tui_write_toggle(base_dir, pvd, account)
+        if ok:
+            changes.setdefault(pvd, []).append((file_path, disabled))
+        else:
+            errors.setdefault(pvd, []).append("{}: {}".format(label, m))
+
+    results = {}
+    lock = threading.Lock()
+
+    # binary 버전에 따라 management API → 파일 watcher → 재기동 순으로 반영 (hotreload)
+    def _reload(pvd):
+        try:
+            if get_status(base_dir, pvd).get("running"):
+                strategy = reload_accounts(base_dir, pvd, changes[pvd])
+                res = (True, strategy) if strategy else (False, "saved but reload failed")
+            else:
+                res = (True, "saved")
+        except Exception as e:
+            res = (False, "saved but reload failed: {}".format(e))
+        with lock:
+            results[pvd] = res
+            _progress("[2/3] reloaded {}/{} provider(s)".format(len(results), len(changes)))
+
+    _progress("[2/3] reloading {}...".format(", ".join(sorted(changes))) if changes else "[2/3] nothing to reload")
+    threads = [threading.Thread(target=_reload, args=(pvd,), daemon=True) for pvd in changes]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for pvd, errs in errors.items():
+        msgs = ([results[pvd][1]] if pvd in results else []) + errs
+        results[pvd] = (False, "; ".join(msgs))
+    return results
 
 
 # ---------------------------------------------------------------------------
 # Render
 # ---------------------------------------------------------------------------
 
-def _tui_render(base_dir, state):
+def _tui_frame(base_dir, state):
+    """Build the full dashboard frame as text → (text, selected_account)."""
     provider = state["providers"][state["provider_idx"]]
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     term_w = shutil.get_terminal_size(fallback=(100, 24)).columns
@@ -373,8 +571,8 @@ def _tui_render(base_dir, state):
 
     data = state["data"].get(provider)
     if data is None:
-        data = _tui_fetch_provider(base_dir, provider)
-        state["data"][provider] = data
+        # first fetch still in flight on the worker: draw an empty dashboard
+        data = _tui_placeholder(provider)
 
     files = (data.get("auth_data") or {}).get("files", [])
     if files:
@@ -396,11 +594,19 @@ def _tui_render(base_dir, state):
         tabs.append(label)
     tab_line = "  " + "   ".join(tabs)
 
-    footer_keys = "  a/d provider   w/s account   space toggle   r refresh   q quit"
+    footer_keys = "  a/d provider  w/s account  space mark  enter apply  x clear  r refresh  q quit"
+    pending = state.get("pending") or {}
+    staged = state.get("staged") or {}
     if state.get("message"):
         msg = "  " + state["message"]
+    elif staged:
+        msg = "  " + _tui_staged_message(staged)
+    elif pending:
+        msg = "  " + _C_DIM + ", ".join("{} {}".format(label, pvd) for pvd, label in sorted(pending.items())) + _C_RESET
     else:
         msg = "  " + _C_DIM + "ready" + _C_RESET
+    if pending:
+        msg += " " + _TUI_SPINNER[state.get("spin", 0) % len(_TUI_SPINNER)]
 
     import io
     from contextlib import redirect_stdout
@@ -433,12 +639,14 @@ def _tui_render(base_dir, state):
             auth_error=data.get("auth_error", False),
             usage_source=data.get("usage_source", "none"),
             usage_snapshot_at=data.get("usage_snapshot_at"),
+            usage_rollups=data.get("usage_rollups"),
             models_per_account=data.get("models_per_account"),
             quota_data=data.get("quota_data"),
             proxy_models=data.get("proxy_models"),
             show_check=True,
             selected_account_name=selected_name,
             selected_account_key=selected_key,
+            staged_account_keys=set(key for pvd, key in staged if pvd == provider),
             frame_color=frame_color,
         )
 
@@ -455,16 +663,161 @@ def _tui_render(base_dir, state):
             print(_box_line(footer_keys, W))
             print(_box_bottom(W))
 
-    rendered = buf.getvalue()
+    return buf.getvalue(), selected
 
-    # Full-frame repaint for stable terminal compatibility.
-    _tui_write(_TUI_HOME + _TUI_CLEAR)
-    _tui_write(rendered)
-    _tui_flush()
 
+def _tui_render(base_dir, state):
+    text, selected = _tui_frame(base_dir, state)
+    screen = state.get("screen")
+    if screen is None:
+        screen = state["screen"] = ScreenBuffer()
+    screen.render(text)
     return selected
 
 
+# ---------------------------------------------------------------------------
+# Background worker
+# ---------------------------------------------------------------------------
+
+class _TuiWorker:
+    """Runs fetches and toggles off the key loop.
+
+    Jobs go in through submit(); completed results come back on a queue that
+    the render loop drains, so keypresses never wait on the network or on a
+    provider restart.  Identical jobs already queued or running are dropped.
+    """
+
+    def __init__(self, base_dir, notify=None):
+        self.base_dir = base_dir
+        self.notify = notify  # called after each posted result (e.g. TuiInput.wake)
+        self.results = queue.Queue()
+        self._jobs = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="cc-proxy-ui-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, *args):
+        key = (kind,) + tuple(a for a in args if isinstance(a, (str, bool)))
+        with self._lock:
+            if key in self._queued:
+                return False
+            self._queued.add(key)
+        self._jobs.put((key, kind, args))
+        return True
+
+    def drain(self):
+        out = []
+        while True:
+            try:
+                out.append(self.results.get_nowait())
+            except queue.Empty:
+                return out
+
+    def stop(self):
+        self._jobs.put(None)
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            key, kind, args = job
+            try:
+                result = getattr(self, "_do_" + kind)(*args)
+            except Exception as e:
+                result = ("error", kind, self._error_providers(kind, args), str(e))
+            finally:
+                with self._lock:
+                    self._queued.discard(key)
+            self._post(result)
+
+    @staticmethod
+    def _error_providers(kind, args):
+        """Providers a failed job was working on (their spinners get cleared)."""
+        if kind == "commit":
+            return sorted(set(pvd for pvd, _ in args[0]))
+        if kind == "refresh_all":
+            return list(args[0])
+        return [args[0]] if args else []
+
+    def _post(self, result):
+        self.results.put(result)
+        if self.notify is not None:
+            self.notify()
+
+    def _do_refresh(self, pvd, heavy):
+        fetch = _tui_fetch_provider if heavy else _tui_fetch_provider_light
+        return ("data", pvd, heavy, fetch(self.base_dir, pvd), time.time())
+
+    def _do_refresh_all(self, providers):
+        results = prefetch_providers(self.base_dir, providers, fetch_quota=True, fetch_check=True)
+        return ("data_all", results, time.time())
+
+    def _do_commit(self, batch):
+        results = _tui_apply_toggles(
+            self.base_dir, batch,
+            progress_cb=lambda msg: self._post(("message", msg)))
+        providers = sorted(set(pvd for pvd, _ in batch))
+        self._post(("message", _C_DIM + "[3/3] refreshing {}...".format(", ".join(providers)) + _C_RESET))
+        data = prefetch_providers(self.base_dir, providers, fetch_quota=True, fetch_check=True)
+        return ("committed", batch, results, data, time.time())
+
+
+def _tui_apply_error(state, result):
+    """("error", job, providers, message) from the worker: stop those spinners, show the error."""
+    _, job, providers, err = result
+    for pvd in providers:
+        state["pending"].pop(pvd, None)
+    state["message"] = _C_RED + "{} failed: {}".format(job, err)[:60] + _C_RESET
+
+
+def _tui_merge_light(cur, fresh):
+    """Keep previously fetched heavy sections (quota/models) across a light refresh."""
+    for key in ("quota_data", "models_per_account", "proxy_models"):
+        if cur.get(key) and not fresh.get(key):
+            fresh[key] = cur.get(key)
+    return fresh
+
+
+def _tui_token_providers(providers, names):
+    """Providers whose token files are among *names* (None = all of them)."""
+    if names is None:
+        return list(providers)
+    return [pvd for pvd in providers
+            if any(_is_token_file_name(n, _token_prefixes_for_provider(pvd)) for n in names)]
+
+
+def _tui_restore_cursor(state, pvd, target, fallback_idx):
+    """After a toggle, put the cursor back on the toggled account (identity, then email)."""
+    files = (state["data"].get(pvd, {}).get("auth_data") or {}).get("files", [])
+    if not files:
+        return
+    target_key = _account_identity(target)
+    target_email = _tui_account_label(target)
+    for i, f in enumerate(files):
+        if _account_identity(f) == target_key:
+            state["account_idx"] = i
+            return
+    for i, f in enumerate(files):
+        if _tui_account_label(f) == target_email:
+            state["account_idx"] = i
+            return
+    state["account_idx"] = min(fallback_idx, len(files) - 1)
+
+
+def _tui_account_label(account):
+    return account.get("email") or account.get("account") or account.get("name") or "?"
+
+
+def _tui_staged_message(staged):
+    if not staged:
+        return _C_DIM + "no staged changes" + _C_RESET
+    return _C_YELLOW + "{} staged: {} - enter apply, x clear".format(
+        len(staged), ", ".join(_tui_account_label(a)[:16] for a in staged.values())) + _C_RESET
+
+
 # ---------------------------------------------------------------------------
 # Main loop
 # ---------------------------------------------------------------------------
@@ -477,200 +830,199 @@ def _tui_main_loop(base_dir, provider=None):
         "data": {},
         "last_fetch": {},
         "message": "",
-        "busy": False,
-        "toggle_cooldown_until": 0.0,
+        "pending": {},   # provider -> label of in-flight work (spinner)
+        "spin": 0,
+        "staged": {},    # (provider, account identity) -> account; applied together on enter
+        "recheck": {},   # provider -> time of a follow-up refresh after a token change
     }
 
-    def _mark_busy(on):
-        state["busy"] = bool(on)
-
     refresh_interval = 5.0
-
-    def _refresh_provider(pvd, force=False, heavy=False):
-        last = state["last_fetch"].get(pvd, 0)
-        if force or (time.time() - last) >= refresh_interval:
+    spin_interval = 0.1
+    worker = _TuiWorker(base_dir)
+
+    def _current():
+        return state["providers"][state["provider_idx"]]
+
+    def _request_refresh(pvd, heavy=False):
+        if worker.submit("refresh", pvd, heavy):
+            state["pending"].setdefault(pvd, "refreshing")
+
+    def _apply(result):
+        kind = result[0]
+        if kind == "data":
+            _, pvd, heavy, fresh, ts = result
+            if not heavy:
+                fresh = _tui_merge_light(state["data"].get(pvd, {}), fresh)
+            state["data"][pvd] = fresh
+            state["last_fetch"][pvd] = ts
+            if state["pending"].get(pvd) == "refreshing":
+                state["pending"].pop(pvd)
             if heavy:
-                fresh = _tui_fetch_provider(base_dir, pvd)
-                state["data"][pvd] = fresh
-            else:
-                fresh = _tui_fetch_provider_light(base_dir, pvd)
-                cur = state["data"].get(pvd, {})
-                # keep previously fetched heavy sections (quota/models) to avoid flicker/latency
-                if cur.get("quota_data") and not fresh.get("quota_data"):
-                    fresh["quota_data"] = cur.get("quota_data")
-                if cur.get("models_per_account") and not fresh.get("models_per_account"):
-                    fresh["models_per_account"] = cur.get("models_per_account")
-                if cur.get("proxy_models") and not fresh.get("proxy_models"):
-                    fresh["proxy_models"] = cur.get("proxy_models")
-                state["data"][pvd] = fresh
-            state["last_fetch"][pvd] = time.time()
-            return True
-        return False
-
-    def _refresh_current(force=False, heavy=False):
-        pvd = state["providers"][state["provider_idx"]]
-        return _refresh_provider(pvd, force=force, heavy=heavy)
-
-    def _prefetch_all_once():
-        import threading
-
-        results = {}
-        ts = time.time()
-
-        def _one(pvd):
-            try:
-                results[pvd] = _tui_fetch_provider(base_dir, pvd)
-            except Exception:
-                results[pvd] = {"status": get_status(base_dir, pvd)}
-
-        threads = [threading.Thread(target=_one, args=(pvd,)) for pvd in state["providers"]]
-        for t in threads:
-            t.start()
-        for t in threads:
-            t.join(timeout=20)
-
-        for pvd in state["providers"]:
-            if pvd in results:
-                state["data"][pvd] = results[pvd]
+                state["message"] = _C_DIM + "refreshed" + _C_RESET
+        elif kind == "data_all":
+            _, results, ts = result
+            for pvd in state["providers"]:
+                if pvd in results:
+                    state["data"][pvd] = results[pvd]
+                    state["last_fetch"][pvd] = ts
+            state["pending"].clear()
+        elif kind == "message":
+            state["message"] = result[1]
+        elif kind == "tokens":
+            # token files changed on disk: refresh now, and once more after the binary's own reload
+            for pvd in _tui_token_providers(state["providers"], result[1]):
+                _request_refresh(pvd)
+                state["recheck"][pvd] = time.time() + _TUI_TOKEN_RECHECK
+        elif kind == "committed":
+            _, batch, results, fresh, ts = result
+            for pvd, data in fresh.items():
+                state["data"][pvd] = data
                 state["last_fetch"][pvd] = ts
-
+            for pvd, _ in batch:
+                state["pending"].pop(pvd, None)
+            current = [acct for pvd, acct in batch if pvd == _current()]
+            if current:
+                _tui_restore_cursor(state, _current(), current[-1], state["account_idx"])
+            failed = sorted(pvd for pvd, (ok, _) in results.items() if not ok)
+            if failed:
+                state["message"] = _C_RED + "; ".join(
+                    "{}: {}".format(pvd, results[pvd][1]) for pvd in failed) + _C_RESET
+            else:
+                state["message"] = _C_GREEN + "[3/3] applied {} change(s) ({})".format(
+                    len(batch), ", ".join("{}: {}".format(pvd, m) for pvd, (_, m) in sorted(results.items()))) + _C_RESET
+        elif kind == "error":
+            _tui_apply_error(state, result)
+
+    def _handle(action):
+        """Apply one key action to state; returns True if the frame changed."""
+        pvd = _current()
+        dirty = False
+        if action == _TUI_KEY_ESC:
+            # Windows Terminal에서 화살표 시퀀스가 ESC로 축약되는 경우가 있어
+            # 오동작 종료를 방지하기 위해 ESC 단독 종료는 임시 비활성화.
+            state["message"] = _C_DIM + "press q to quit" + _C_RESET
+            dirty = True
+        elif action in (_TUI_KEY_LEFT, _TUI_KEY_RIGHT):
+            step = -1 if action == _TUI_KEY_LEFT else 1
+            state["provider_idx"] = (state["provider_idx"] + step) % len(state["providers"])
+            state["account_idx"] = 0
+            state["message"] = ""
+            _request_refresh(_current())
+            dirty = True
+        elif action == _TUI_KEY_UP:
+            prev = state["account_idx"]
+            state["account_idx"] = max(0, state["account_idx"] - 1)
+            state["message"] = ""
+            dirty = state["account_idx"] != prev
+        elif action == _TUI_KEY_DOWN:
+            files = (state["data"].get(pvd, {}).get("auth_data") or {}).get("files", [])
+            prev = state["account_idx"]
+            if files:
+                state["account_idx"] = min(len(files) - 1, state["account_idx"] + 1)
+            state["message"] = ""
+            dirty = state["account_idx"] != prev
+        elif action in ("1", "2", "3", "4"):
+            idx = int(action) - 1
+            if idx < len(state["providers"]) and idx != state["provider_idx"]:
+                state["provider_idx"] = idx
+                state["account_idx"] = 0
+                state["message"] = ""
+                _request_refresh(_current())
+                dirty = True
+        elif action == "r":
+            if state["pending"].get(pvd) == "applying":
+                state["message"] = _C_DIM + "apply in progress..." + _C_RESET
+            else:
+                _request_refresh(pvd, heavy=True)
+                state["message"] = ""
+            dirty = True
+        elif action == "toggle":
+            files = (state["data"].get(pvd, {}).get("auth_data") or {}).get("files", [])
+            if state["pending"].get(pvd) == "applying":
+                state["message"] = _C_DIM + "apply in progress..." + _C_RESET
+            elif not files:
+                state["message"] = _C_DIM + "no account" + _C_RESET
+            else:
+                target = files[max(0, min(state["account_idx"], len(files) - 1))]
+                key = (pvd, _account_identity(target))
+                if state["staged"].pop(key, None) is None:
+                    state["staged"][key] = target
+                state["message"] = _tui_staged_message(state["staged"])
+            dirty = True
+        elif action == "commit":
+            batch = [(p, acct) for (p, _), acct in state["staged"].items()]
+            if not batch:
+                state["message"] = _C_DIM + "nothing staged (space to mark)" + _C_RESET
+            elif worker.submit("commit", batch):
+                for p, _ in batch:
+                    state["pending"][p] = "applying"
+                state["staged"].clear()
+                state["message"] = _C_DIM + "[1/3] applying {} change(s)...".format(len(batch)) + _C_RESET
+            else:
+                state["message"] = _C_DIM + "apply in progress..." + _C_RESET
+            dirty = True
+        elif action == "discard":
+            n = len(state["staged"])
+            state["staged"].clear()
+            state["message"] = _C_DIM + "discarded {} staged change(s)".format(n) + _C_RESET
+            dirty = True
+        return dirty
+
+    def _next_timeout():
+        """Seconds until the loop has timed work to do (None = only events)."""
+        waits = []
+        pvd = _current()
+        if pvd not in state["pending"]:
+            waits.append(state["last_fetch"].get(pvd, 0) + refresh_interval - time.time())
+            if pvd in state["recheck"]:
+                waits.append(state["recheck"][pvd] - time.time())
+        if state["pending"]:
+            waits.append(spin_interval)
+        return max(0.0, min(waits)) if waits else None
+
+    watcher = TokenWatcher(base_dir, lambda names: worker._post(("tokens", names)))
     _tui_enter_screen()
     try:
-        _prefetch_all_once()
-        selected = _tui_render(base_dir, state)
+        with TuiInput() as inp:
+            worker.notify = inp.wake
+            watcher.start()
+            worker.submit("refresh_all", tuple(state["providers"]))
+            for pvd in state["providers"]:
+                state["pending"][pvd] = "loading"
+            _tui_render(base_dir, state)
+            last_spin = time.time()
 
-        while True:
-            action = _tui_key_to_action(_read_key_timeout(0.03))
-            dirty = False
+            while True:
+                keys, resized = inp.wait(_next_timeout())
+                dirty = resized or state["screen"].size_changed()
 
-            if not state.get("busy"):
-                if _refresh_current(force=False, heavy=False):
+                for result in worker.drain():
+                    _apply(result)
                     dirty = True
 
-            if action is None:
-                if dirty:
-                    selected = _tui_render(base_dir, state)
-                continue
+                pvd = _current()
+                if pvd not in state["pending"] and (time.time() - state["last_fetch"].get(pvd, 0)) >= refresh_interval:
+                    _request_refresh(pvd)
+                elif pvd not in state["pending"] and time.time() >= state["recheck"].get(pvd, float("inf")):
+                    state["recheck"].pop(pvd)
+                    _request_refresh(pvd)
 
-            if action == "q":
-                return 0
-            if action == _TUI_KEY_ESC:
-                # Windows Terminal에서 화살표 시퀀스가 ESC로 축약되는 경우가 있어
-                # 오동작 종료를 방지하기 위해 ESC 단독 종료는 임시 비활성화.
-                state["message"] = _C_DIM + "press q to quit" + _C_RESET
-                dirty = True
+                if state["pending"] and time.time() - last_spin >= spin_interval:
+                    state["spin"] += 1
+                    last_spin = time.time()
+                    dirty = True
 
-            # when busy (toggle in-flight), ignore all inputs except quit.
-            if state.get("busy"):
-                state["message"] = _C_DIM + "toggle in progress..." + _C_RESET
-                dirty = True
-                if dirty:
-                    selected = _tui_render(base_dir, state)
-                continue
+                for key in keys:
+                    action = _tui_key_to_action(key)
+                    if action == "q":
+                        return 0
+                    if action is not None:
+                        dirty = _handle(action) or dirty
 
-            if action == _TUI_KEY_LEFT:
-                state["provider_idx"] = (state["provider_idx"] - 1) % len(state["providers"])
-                state["account_idx"] = 0
-                state["message"] = ""
-                _refresh_current(force=True, heavy=False)
-                dirty = True
-            elif action == _TUI_KEY_RIGHT:
-                state["provider_idx"] = (state["provider_idx"] + 1) % len(state["providers"])
-                state["account_idx"] = 0
-                state["message"] = ""
-                _refresh_current(force=True, heavy=False)
-                dirty = True
-            elif action == _TUI_KEY_UP:
-                prev = state["account_idx"]
-                state["account_idx"] = max(0, state["account_idx"] - 1)
-                state["message"] = ""
-                dirty = (state["account_idx"] != prev)
-            elif action == _TUI_KEY_DOWN:
-                pvd = state["providers"][state["provider_idx"]]
-                files = (state["data"].get(pvd, {}).get("auth_data") or {}).get("files", [])
-                prev = state["account_idx"]
-                if files:
-                    state["account_idx"] = min(len(files) - 1, state["account_idx"] + 1)
-                state["message"] = ""
-                dirty = (state["account_idx"] != prev)
-            elif action in ("1", "2", "3", "4"):
-                idx = int(action) - 1
-                if idx < len(state["providers"]) and idx != state["provider_idx"]:
-                    state["provider_idx"] = idx
-                    state["account_idx"] = 0
-                    state["message"] = ""
-                    _refresh_current(force=True, heavy=False)
-                    dirty = True
-            elif action == "r":
-                _mark_busy(True)
-                _tui_discard_pending_input(settle_ms=20)
-                _refresh_current(force=True, heavy=True)
-                _tui_discard_pending_input(settle_ms=20)
-                _mark_busy(False)
-                state["message"] = _C_DIM + "refreshed" + _C_RESET
-                dirty = True
-            elif action == "toggle":
-                now = time.time()
-                if now < state.get("toggle_cooldown_until", 0.0):
-                    state["message"] = _C_DIM + "toggle cooldown..." + _C_RESET
-                    dirty = True
-                else:
-                    pvd = state["providers"][state["provider_idx"]]
-                    files = (state["data"].get(pvd, {}).get("auth_data") or {}).get("files", [])
-                    if not files:
-                        state["message"] = _C_DIM + "no account" + _C_RESET
-                        dirty = True
-                    else:
-                        idx = max(0, min(state["account_idx"], len(files) - 1))
-                        target = files[idx]
-                        target_key = _account_identity(target)
-                        target_email = target.get("email") or target.get("account") or target.get("name") or "?"
-
-                        _mark_busy(True)
-                        state["toggle_cooldown_until"] = time.time() + 1.0
-
-                        try:
-                            def _progress(msg):
-                                state["message"] = msg
-                                _tui_render(base_dir, state)
-
-                            state["message"] = _C_DIM + "[1/3] toggling file: {}".format(target_email[:24]) + _C_RESET
-                            selected = _tui_render(base_dir, state)
-                            ok, m = _tui_toggle_account(base_dir, pvd, target, progress_cb=_progress)
-
-                            state["message"] = _C_DIM + "[2/3] refreshing provider data..." + _C_RESET
-                            selected = _tui_render(base_dir, state)
-
-                            _refresh_current(force=True, heavy=True)
-                            files2 = (state["data"].get(pvd, {}).get("auth_data") or {}).get("files", [])
-                            if files2:
-                                restored = None
-                                for i2, f2 in enumerate(files2):
-                                    if _account_identity(f2) == target_key:
-                                        restored = i2
-                                        break
-                                if restored is None:
-                                    for i2, f2 in enumerate(files2):
-                                        em2 = f2.get("email") or f2.get("account") or f2.get("name") or ""
-                                        if em2 == target_email:
-                                            restored = i2
-                                            break
-                                if restored is not None:
-                                    state["account_idx"] = restored
-                                else:
-                                    state["account_idx"] = min(idx, len(files2) - 1)
-
-                            if ok:
-                                state["message"] = _C_GREEN + "[3/3] toggled: {}".format(target_email[:24]) + _C_RESET
-                            else:
-                                state["message"] = _C_RED + m + _C_RESET
-                            dirty = True
-                        finally:
-                            _tui_discard_pending_input(settle_ms=120)
-                            _mark_busy(False)
-
-            if dirty:
-                selected = _tui_render(base_dir, state)
+                if dirty:
+                    _tui_render(base_dir, state)
 
     finally:
+        watcher.stop()
+        worker.stop()
         _tui_leave_screen()
@@ -1,15 +1,18 @@
 """
-Usage tracking: snapshots and cumulative totals.
-Depends on: constants
+Usage tracking: snapshots, cumulative totals and incremental detail rollups.
+Depends on: constants, locks, ledger
 """
 
 import json
 import os
 import tempfile
+import threading
 import time
 from datetime import datetime, timezone
 
 from constants import USAGE_SNAPSHOT_SCHEMA_VERSION, USAGE_CUMULATIVE_SCHEMA_VERSION
+from ledger import LEDGER_DAILY_DAYS, _local_day
+from locks import FileLock, LockTimeout
 
 
 def _usage_snapshot_path(provider):
@@ -150,11 +153,24 @@ def _usage_cumulative_clear(provider):
 
 
 def _usage_cumulative_update_from_live(provider, usage_data):
-    """Update cumulative totals by adding positive delta from current live totals."""
+    """Update cumulative totals by adding positive delta from current live totals.
+
+    The load/compute/save sequence runs under a cross-process lock so two
+    concurrent dashboards cannot both add the same delta.  If the lock stays
+    busy the update is skipped; the next one picks up the delta.
+    """
     current = _usage_totals_extract(usage_data)
     if current is None:
         return False
 
+    try:
+        with FileLock(_usage_cumulative_path(provider) + ".lock"):
+            return _usage_cumulative_merge(provider, current)
+    except LockTimeout:
+        return False
+
+
+def _usage_cumulative_merge(provider, current):
     prev = _usage_cumulative_load(provider)
     prev_live = prev.get("last_live_totals") if prev else None
     prev_total = prev.get("totals") if prev else None
@@ -202,3 +218,135 @@ def _usage_cumulative_apply_to_usage_data(provider, usage_data):
         if k in totals:
             u[k] = int(totals.get(k, 0) or 0)
     return usage_data
+
+
+# ---------------------------------------------------------------------------
+# Incremental aggregation over /usage request details
+# ---------------------------------------------------------------------------
+
+def _new_usage_stats():
+    return {
+        "requests": 0, "tokens": 0, "fails": 0,
+        "input": 0, "output": 0, "reasoning": 0,
+        "last_time": "", "last_tok": 0,
+        "last_input": 0, "last_output": 0, "last_reasoning": 0,
+    }
+
+
+def _fold_detail(stats, detail):
+    toks = detail.get("tokens") or {}
+    inp = int(toks.get("input_tokens", 0) or 0)
+    out = int(toks.get("output_tokens", 0) or 0)
+    rsn = int(toks.get("reasoning_tokens", 0) or 0)
+    tok = int(toks.get("total_tokens", 0) or 0)
+    stats["requests"] += 1
+    stats["tokens"] += tok
+    stats["input"] += inp
+    stats["output"] += out
+    stats["reasoning"] += rsn
+    if detail.get("failed", False):
+        stats["fails"] += 1
+    ts = detail.get("timestamp", "")
+    if ts > stats["last_time"]:
+        stats["last_time"] = ts
+        stats["last_tok"] = tok
+        stats["last_input"] = inp
+        stats["last_output"] = out
+        stats["last_reasoning"] = rsn
+
+
+class UsageAggregator:
+    """Model / account / daily rollups over a provider's /usage details, updated incrementally.
+
+    The server appends to usage.apis[api].models[model].details, so each
+    update() walks every list backwards only until it reaches the watermark
+    (last timestamp seen for that (api, model)).  A binary restart shows up
+    as total_requests or a details list going backwards; the aggregator then
+    resets and rebuilds from the new payload.  Feed it the raw /usage payload,
+    before _usage_cumulative_apply_to_usage_data overlays cumulative totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._marks = {}  # (api, model) -> (last_ts, n_details_at_last_ts, list_len)
+        self._total_requests = 0
+        self.models = {}
+        self.accounts = {}
+        self.daily = {}
+        self.restarts = 0
+
+    def _new_details(self, key, details):
+        """Details appended since the last update for one (api, model) list."""
+        last_ts, seen_eq, seen_len = self._marks.get(key, ("", 0, 0))
+        newer = []
+        eq = []
+        i = len(details) - 1
+        while i >= 0:
+            ts = details[i].get("timestamp", "")
+            if ts > last_ts:
+                newer.append(details[i])
+            elif ts == last_ts:
+                eq.append(details[i])
+            else:
+                break
+            i -= 1
+        newer.reverse()
+        eq.reverse()
+        fresh = eq[seen_eq:] if last_ts else eq
+        new = fresh + newer
+        if new:
+            top = max(d.get("timestamp", "") for d in new)
+            n_top = sum(1 for d in details[i + 1:] if d.get("timestamp", "") == top)
+            self._marks[key] = (top, n_top, len(details))
+        else:
+            self._marks[key] = (last_ts, seen_eq, len(details))
+        return new
+
+    def _went_backwards(self, u):
+        if int(u.get("total_requests", 0) or 0) < self._total_requests:
+            return True
+        for api_name, api_data in (u.get("apis") or {}).items():
+            for model_name, model_data in (api_data.get("models") or {}).items():
+                mark = self._marks.get((api_name, model_name))
+                if mark and len(model_data.get("details") or []) < mark[2]:
+                    return True
+        return False
+
+    def update(self, usage_data):
+        """Fold new details in; returns [(api, model, detail)] that were new this call."""
+        u = (usage_data or {}).get("usage") if isinstance(usage_data, dict) else None
+        if not isinstance(u, dict):
+            return []
+        with self._lock:
+            if self._went_backwards(u):
+                restarts = self.restarts + 1
+                self.reset()
+                self.restarts = restarts
+            self._total_requests = int(u.get("total_requests", 0) or 0)
+            added = []
+            for api_name, api_data in (u.get("apis") or {}).items():
+                for model_name, model_data in (api_data.get("models") or {}).items():
+                    mstats = self.models.setdefault(model_name, _new_usage_stats())
+                    for d in self._new_details((api_name, model_name), model_data.get("details") or []):
+                        _fold_detail(mstats, d)
+                        _fold_detail(self.accounts.setdefault(d.get("source", "unknown"),
+                                                              _new_usage_stats()), d)
+                        ts = d.get("timestamp", "")
+                        if ts:
+                            day = self.daily.setdefault(_local_day(ts), {"requests": 0, "tokens": 0})
+                            day["requests"] += 1
+                            day["tokens"] += int((d.get("tokens") or {}).get("total_tokens", 0) or 0)
+                        added.append((api_name, model_name, d))
+            return added
+
+    def rollups(self, days=LEDGER_DAILY_DAYS):
+        """Same shape and daily window as ledger.ledger_rollups() (copies, safe to hand to the renderer)."""
+        with self._lock:
+            return {
+                "daily": {k: dict(self.daily[k]) for k in sorted(self.daily, reverse=True)[:days]},
+                "models": {k: dict(v) for k, v in self.models.items()},
+                "accounts": {k: dict(v) for k, v in self.accounts.items()},
+            }
@@ -47,12 +47,25 @@ CORE_FILES = {
     "core/process.py": "core/process.py",
     "core/config.py": "core/config.py",
     "core/api.py": "core/api.py",
+    "core/httppool.py": "core/httppool.py",
+    "core/locks.py": "core/locks.py",
     "core/quota.py": "core/quota.py",
     "core/usage.py": "core/usage.py",
+    "core/ledger.py": "core/ledger.py",
     "core/proxy.py": "core/proxy.py",
     "core/display.py": "core/display.py",
+    "core/prefetch.py": "core/prefetch.py",
     "core/tui.py": "core/tui.py",
     "core/commands.py": "core/commands.py",
+    "core/daemon.py": "core/daemon.py",
+    "core/bluegreen.py": "core/bluegreen.py",
+    "core/shim.py": "core/shim.py",
+    "core/hotreload.py": "core/hotreload.py",
+    "core/tokenwatch.py": "core/tokenwatch.py",
+    "core/fastrun.py": "core/fastrun.py",
+    "core/overlap.py": "core/overlap.py",
+    "core/activator.py": "core/activator.py",
+    "core/supervisor.py": "core/supervisor.py",
     "core/updater.py": "core/updater.py",
     "core/binary_updater.py": "core/binary_updater.py",
 }
@@ -537,7 +550,11 @@ def write_install_metadata(
     print(f"Wrote installed tag file: {INSTALLED_TAG_FILE}")
 
 
-def setup_autostart(system: str, uninstall: bool = False) -> None:
+def setup_autostart(system: str, uninstall: bool = False, mode: str = "always") -> None:
+    """Start proxies at login: every provider (`start all`, *mode* "always"), the
+    activator (`activate serve all`, "on-demand"), which starts each provider on
+    first use, or the supervisor (`supervise serve all`, "supervised"), which
+    restarts providers that crash."""
     import os
     if system == "linux":
         systemd_user_dir = Path.home() / ".config" / "systemd" / "user"
@@ -557,22 +574,32 @@ def setup_autostart(system: str, uninstall: bool = False) -> None:
         python_exe = sys.executable
         cc_proxy_py = INSTALL_DIR / "core" / "cc_proxy.py"
         
+        if mode in ("on-demand", "supervised"):
+            service_cmd = "activate" if mode == "on-demand" else "supervise"
+            service_body = f"""Type=simple
+ExecStart={python_exe} {cc_proxy_py} {service_cmd} serve all
+ExecStop={python_exe} {cc_proxy_py} {service_cmd} stop
+Restart=on-failure"""
+        else:
+            service_body = f"""Type=oneshot
+RemainAfterExit=yes
+ExecStart={python_exe} {cc_proxy_py} start all
+ExecStop={python_exe} {cc_proxy_py} stop"""
         service_content = f"""[Unit]
 Description=CLIProxy API Service
 After=network.target
 
 [Service]
-Type=oneshot
-RemainAfterExit=yes
-ExecStart={python_exe} {cc_proxy_py} start all
-ExecStop={python_exe} {cc_proxy_py} stop
+{service_body}
 
 [Install]
 WantedBy=default.target
 """
         service_file.write_text(service_content, encoding="utf-8")
         subprocess.run(["systemctl", "--user", "daemon-reload"], check=False, capture_output=True)
-        subprocess.run(["systemctl", "--user", "enable", "--now", "cli-proxy.service"], check=False, capture_output=True)
+        # on-demand/supervised: start_proxies_after_install() hands the providers over now
+        enable = ["enable", "--now"] if mode == "always" else ["enable"]
+        subprocess.run(["systemctl", "--user"] + enable + ["cli-proxy.service"], check=False, capture_output=True)
         print(f"Enabled Linux systemd autostart: {service_file}")
 
     elif system == "windows":
@@ -600,8 +627,9 @@ WantedBy=default.target
             if Path(pythonw_exe).exists():
                 python_exe = pythonw_exe
 
+        command = {"on-demand": "activate serve all", "supervised": "supervise serve all"}.get(mode, "start all")
         vbs_content = f'Set WshShell = CreateObject("WScript.Shell")\n'
-        vbs_content += f'WshShell.Run chr(34) & "{python_exe}" & chr(34) & " " & chr(34) & "{cc_proxy_py}" & chr(34) & " start all", 0, False\n'
+        vbs_content += f'WshShell.Run chr(34) & "{python_exe}" & chr(34) & " " & chr(34) & "{cc_proxy_py}" & chr(34) & " {command}", 0, False\n'
         
         vbs_path.write_text(vbs_content, encoding="utf-8")
         print(f"Enabled Windows autostart: {vbs_path}")
@@ -640,6 +668,14 @@ def parse_args() -> argparse.Namespace:
         action='store_true',
         help='Disable OS boot autostart integration (systemd/Startup folder)',
     )
+    parser.add_argument(
+        '--autostart-mode',
+        choices=('always', 'on-demand', 'supervised'),
+        default='always',
+        help='always: start every provider at login; on-demand: run the activator, '
+             'which starts a provider on first use and stops it when idle; '
+             'supervised: run the supervisor, which restarts providers that crash',
+    )
     return parser.parse_args()
 
 
@@ -770,13 +806,20 @@ def stop_existing_proxies() -> None:
         except Exception:
             pass
 
-def start_proxies_after_install() -> None:
+def start_proxies_after_install(mode: str = "always") -> None:
     import subprocess
     cc_proxy_py = INSTALL_DIR / "core" / "cc_proxy.py"
     if cc_proxy_py.exists():
-        print("Starting proxies...")
+        print({"on-demand": "Starting on-demand activator...",
+               "supervised": "Starting supervised proxies..."}.get(mode, "Starting proxies..."))
         try:
-            subprocess.run([sys.executable, str(cc_proxy_py), "start", "all"], check=False)
+            if mode in ("on-demand", "supervised"):
+                # binaries started elsewhere hold the ports the activator/supervisor needs
+                service_cmd = "activate" if mode == "on-demand" else "supervise"
+                subprocess.run([sys.executable, str(cc_proxy_py), "stop"], check=False)
+                subprocess.run([sys.executable, str(cc_proxy_py), service_cmd, "start", "all"], check=False)
+            else:
+                subprocess.run([sys.executable, str(cc_proxy_py), "start", "all"], check=False)
         except Exception:
             pass
 
@@ -868,13 +911,14 @@ def main() -> None:
     write_install_metadata(args.repo, args.tag, platform_key, source_mode, local_root)
     setup_profile()
 
+    mode = "always" if args.no_autostart else args.autostart_mode
     if not args.no_autostart:
-        setup_autostart(system, uninstall=False)
+        setup_autostart(system, uninstall=False, mode=mode)
     else:
         setup_autostart(system, uninstall=True)
 
     print("\nInstallation complete!")
-    start_proxies_after_install()
+    start_proxies_after_install(mode=mode)
 
 
 if __name__ == "__main__":
@@ -54,6 +54,9 @@ cc-proxy-set-secret()  { _cc_proxy set-secret   "$@"; }
 cc-proxy-version()     { _cc_proxy version      "$@"; }
 cc-proxy-update()      { _cc_proxy update        "$@"; }
 cc-proxy-usage-clear() { _cc_proxy usage-clear  "$@"; }
+cc-proxyd()            { _cc_proxy daemon "${1:-start}"; }  # start|stop|status (warm status/start/stop/run)
+cc-proxy-activate()    { _cc_proxy activate     "$@"; }  # start|serve|stop|status (on-demand start, idle stop)
+cc-proxy-supervise()   { _cc_proxy supervise    "$@"; }  # start|serve|stop|status (restart crashed providers)
 cc_proxy_install_profile() { _cc_proxy install-profile; }
 
 # Profile hint on first source
@@ -73,6 +73,8 @@ function cc-proxy-set-secret   { _cc_proxy set-secret   @args }
 function cc-proxy-usage-clear  { _cc_proxy usage-clear  @args }
 function cc-proxy-version      { _cc_proxy version      @args }
 function cc-proxy-update       { _cc_proxy update        @args }
+function cc-proxy-activate     { _cc_proxy activate     @args }  # start|serve|stop|status (on-demand start, idle stop)
+function cc-proxy-supervise    { _cc_proxy supervise    @args }  # start|serve|stop|status (restart crashed providers)
 function Install-CCProxyProfile { _cc_proxy install-profile }
 
 # Profile hint on first dot-source
@@ -0,0 +1,154 @@
+"""
+Local stand-in for a CLIProxyAPI provider's management API.
+Shared by tests and benchmarks; stdlib only.
+
+    with ManagementStub(accounts=5, latency=0.01) as stub:
+        stub.port, stub.hits["api-call"], stub.connections
+"""
+
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _make_files(provider_prefix, n):
+    return [
+        {
+            "name": "{}-user{}@example.com.json".format(provider_prefix, i),
+            "email": "user{}@example.com".format(i),
+            "auth_index": "idx{}".format(i),
+            "status": "active",
+            "source": "file",
+        }
+        for i in range(n)
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        stub = self.server.stub
+        with stub.lock:
+            stub.connections += 1
+
+    def _send(self, code, obj):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method):
+        stub = self.server.stub
+        parsed = urllib.parse.urlparse(self.path)
+        path = parsed.path
+        key = path.replace("/v0/management/", "") if path.startswith("/v0/management/") else path
+        with stub.lock:
+            stub.hits[key] = stub.hits.get(key, 0) + 1
+            stub.in_flight += 1
+            stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+        try:
+            if stub.latency:
+                time.sleep(stub.latency)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if path.startswith("/v0/management/"):
+                if self.headers.get("Authorization") != "Bearer {}".format(stub.secret):
+                    return self._send(401, {"error": "unauthorized"})
+            if path == "/":
+                return self._send(200, {"message": "ok"})
+            if path == "/v1/models":
+                return self._send(200, {"data": [{"id": "model-a"}, {"id": "model-b"}]})
+            if key == "auth-files":
+                return self._send(200, {"files": stub.files})
+            if key == "auth-files/models":
+                return self._send(200, {"models": [{"id": "model-a"}]})
+            if key == "usage":
+                return self._send(200, stub.usage)
+            if key == "api-call" and method == "POST":
+                req = json.loads(body or b"{}")
+                with stub.lock:
+                    idx = req.get("authIndex")
+                    stub.api_calls[idx] = stub.api_calls.get(idx, 0) + 1
+                upstream = {"five_hour": {"utilization": 12, "resets_at": ""}}
+                return self._send(200, {"status_code": 200, "body": json.dumps(upstream)})
+            return self._send(404, {"error": "not found"})
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+
+class ManagementStub:
+    def __init__(self, accounts=3, latency=0.0, secret="cc", prefix="claude", usage=None):
+        self.latency = latency
+        self.secret = secret
+        self.files = _make_files(prefix, accounts)
+        self.usage = usage if usage is not None else {
+            "usage": {"total_requests": 3, "success_count": 3, "failure_count": 0,
+                      "total_tokens": 300, "apis": {}},
+        }
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.api_calls = {}
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def start(self):
+        self.httpd = _Server(("127.0.0.1", 0), _Handler)
+        self.httpd.stub = self
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    """Serve stubs in a separate process: prints {"<prefix>": port, ...} as one
+    JSON line, then runs until stdin closes (used by benchmarks)."""
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser()
+    parser.add_argument("prefixes", nargs="+")
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    stubs = {p: ManagementStub(accounts=args.accounts, latency=args.latency, prefix=p).start()
+             for p in args.prefixes}
+    print(json.dumps({p: s.port for p, s in stubs.items()}), flush=True)
+    sys.stdin.read()
+    for s in stubs.values():
+        s.stop()
+
+
+if __name__ == "__main__":
+    main()
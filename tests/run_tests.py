@@ -33,6 +33,22 @@ UNIT_MODULES = [
     "test_process",
     "test_proxy",
     "test_api",
+    "test_httppool",
+    "test_locks",
+    "test_quota",
+    "test_ledger",
+    "test_usage",
+    "test_prefetch",
+    "test_tui",
+    "test_daemon",
+    "test_bluegreen",
+    "test_hotreload",
+    "test_tokenwatch",
+    "test_fastrun",
+    "test_overlap",
+    "test_activator",
+    "test_supervisor",
+    "test_cc_proxy",
     "test_commands",
     "test_updater",
     "test_binary_updater",
@@ -0,0 +1,238 @@
+"""
+Tests for core/activator.py — providers started on first connection behind
+the activator, held connections during start, idle shutdown with a usage
+snapshot, and how status/start/stop treat the activator's ports (fake
+cli-proxy-api).
+"""
+
+import http.client
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import activator
+import constants
+import process
+from activator import Activator, _is_housekeeping
+from constants import IS_WINDOWS, PORTS, PROVIDERS
+from process import activator_pid, read_activator_state, read_pid
+from proxy import get_status, start_proxy, stop_many
+
+# Stand-in for cli-proxy-api: `fake-delay` seconds before binding, then
+# GET answers with the binary's pid.
+_FAKE_BINARY = textwrap.dedent("""\
+    #!{python}
+    import http.server, os, re, sys, time
+    cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+    get = lambda key, default: (re.search(r"(?m)^" + key + r":\\s*(\\S+)", cfg) or [None, default])[1]
+    time.sleep(float(get("fake-delay", "0")))
+
+    class H(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = str(os.getpid()).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", int(get("port", "0"))), H)
+    print("API server started successfully on: 127.0.0.1:" + get("port", "0"), flush=True)
+    server.serve_forever()
+""")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port, path="/v1/models"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        return resp.status, resp.read().decode()
+    finally:
+        conn.close()
+
+
+class TestIsHousekeeping(unittest.TestCase):
+    def test_classifies_request_lines(self):
+        self.assertTrue(_is_housekeeping(b"GET / HTTP/1.1\r\nHost: x\r\n"))
+        self.assertTrue(_is_housekeeping(b"GET /v0/management/usage HTTP/1.1\r\n"))
+        self.assertFalse(_is_housekeeping(b"POST /v1/messages HTTP/1.1\r\n"))
+        self.assertFalse(_is_housekeeping(b""))
+
+
+@unittest.skipIf(IS_WINDOWS, "fake binary is a POSIX script")
+class TestActivator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_act_"))
+        exe = self.tmp / "cli-proxy-api"
+        exe.write_text(_FAKE_BINARY.format(python=sys.executable))
+        exe.chmod(0o755)
+        (self.tmp / "config.yaml").write_text("port: 0\nauth-dir: x\n")
+        self.orig_ports = dict(PORTS)
+        for pvd in PROVIDERS:
+            constants.PORTS[pvd] = _free_port()
+        process.invalidate_port_pid_cache()
+        self.snapshots = []
+        self.patches = [
+            patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(self.tmp / "tokens")}),
+            patch("activator._capture_usage_snapshot_before_stop",
+                  side_effect=lambda base_dir, pvd, quiet=False: self.snapshots.append(pvd)),
+            patch.object(activator, "ACTIVATE_HOUSEKEEP_INTERVAL", 0.05),
+        ]
+        for p in self.patches:
+            p.start()
+        self.act = None
+
+    def tearDown(self):
+        if self.act is not None:
+            self.act.stop()
+            self.thread.join(5)
+            self.act.shutdown()
+        for p in reversed(self.patches):
+            p.stop()
+        for pvd in PROVIDERS:
+            pid = read_pid(self.tmp, pvd)
+            if pid:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+        constants.PORTS.update(self.orig_ports)
+        process.invalidate_port_pid_cache()
+        shutil.rmtree(str(self.tmp))
+
+    def _config(self, extra):
+        d = self.tmp / "configs" / "claude"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "config.yaml").write_text("port: 0\nauth-dir: x\n" + extra)
+
+    def _serve(self, idle=60.0):
+        self.act = Activator(self.tmp, ["claude"], idle)
+        self.thread = threading.Thread(target=self.act.serve, daemon=True)
+        self.thread.start()
+        return self.act
+
+    def _wait(self, cond, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not cond():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.02)
+
+    def test_first_connection_starts_provider(self):
+        self._config("")
+        self._serve()
+        self.assertIsNone(read_pid(self.tmp, "claude"))
+        self.assertEqual(activator_pid(self.tmp), os.getpid())
+        status, body = _get(PORTS["claude"])
+        self.assertEqual(status, 200)
+        self.assertEqual(int(body), read_pid(self.tmp, "claude"))
+        info = read_activator_state(self.tmp)["providers"]["claude"]
+        self.assertEqual(info["state"], "running")
+        self.assertEqual(info["pid"], int(body))
+        self.assertTrue(get_status(self.tmp, "claude")["running"])
+
+    def test_connections_during_start_are_held_not_refused(self):
+        self._config("fake-delay: 0.4\n")
+        self._serve()
+        replies = []
+        threads = [threading.Thread(target=lambda: replies.append(_get(PORTS["claude"])))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+        self.assertEqual(len(replies), 4)
+        self.assertEqual(len(set(body for _, body in replies)), 1)   # one binary served them all
+
+    def test_idle_provider_stopped_after_snapshot(self):
+        self._config("")
+        self._serve(idle=0.3)
+        _, body = _get(PORTS["claude"])
+        self._wait(lambda: read_activator_state(self.tmp)["providers"]["claude"]["state"] == "idle")
+        self.assertEqual(self.snapshots, ["claude"])
+        self.assertFalse(process.is_pid_alive(int(body)))
+        self.assertIsNone(read_pid(self.tmp, "claude"))
+        process.invalidate_port_pid_cache()
+        status = get_status(self.tmp, "claude")
+        self.assertFalse(status["running"])
+        self.assertTrue(status["on_demand"])
+        # and the next request starts it again
+        _, body2 = _get(PORTS["claude"])
+        self.assertNotEqual(body, body2)
+
+    def test_health_checks_do_not_keep_provider_alive(self):
+        self._config("")
+        self._serve(idle=0.4)
+        _get(PORTS["claude"])
+        deadline = time.monotonic() + 3.0
+        while not self.snapshots:   # (a health check to an idle provider wakes it again)
+            self.assertLess(time.monotonic(), deadline, "health checks kept the provider alive")
+            _get(PORTS["claude"], "/")
+            time.sleep(0.05)
+
+    def test_health_check_after_crash_restarts_provider(self):
+        self._config("")
+        with patch.object(Activator, "housekeep"):   # the crash is found by the connection, not housekeeping
+            self._serve()
+            _, body = _get(PORTS["claude"])
+            slot = self.act.slots["claude"]
+            slot.proc.kill()
+            slot.proc.wait()
+            status, body2 = _get(PORTS["claude"], "/")
+        self.assertEqual(status, 200)
+        self.assertNotEqual(body, body2)
+
+    def test_open_client_connection_keeps_provider_alive(self):
+        self._config("")
+        self._serve(idle=0.2)
+        conn = http.client.HTTPConnection("127.0.0.1", PORTS["claude"], timeout=10)
+        try:
+            conn.request("GET", "/v1/models")
+            conn.getresponse().read()
+            time.sleep(0.6)
+            self.assertEqual(read_activator_state(self.tmp)["providers"]["claude"]["state"], "running")
+        finally:
+            conn.close()
+        self._wait(lambda: read_activator_state(self.tmp)["providers"]["claude"]["state"] == "idle")
+
+    def test_stop_provider_keeps_activator_and_start_wakes_it(self):
+        self._config("")
+        self._serve()
+        _, body = _get(PORTS["claude"])
+        with patch("proxy._capture_usage_snapshot_before_stop"):
+            res = stop_many(self.tmp, ["claude"], quiet=True)
+        self.assertEqual(res["claude"]["pids"], [int(body)])
+        self.assertTrue(res["claude"]["port_free"])
+        self._wait(lambda: read_activator_state(self.tmp)["providers"]["claude"]["state"] == "idle")
+        self.assertEqual(activator_pid(self.tmp), os.getpid())
+
+        process.invalidate_port_pid_cache()
+        self.assertTrue(start_proxy(self.tmp, "claude", quiet=True))
+        pid = read_pid(self.tmp, "claude")
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(_get(PORTS["claude"])[1], str(pid))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,50 +9,45 @@ import sys
 import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
 
 from api import _management_api_request, _management_api, _proxy_api, _read_secret_key
 
 
-# api.py imports urllib.request inside functions, so we patch the global module
+# api.py routes every call through the shared keep-alive pool
 class TestManagementApiRequest(unittest.TestCase):
-    @patch("urllib.request.urlopen")
-    def test_get_json_response(self, mock_urlopen):
-        body = json.dumps({"status": "ok"}).encode("utf-8")
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = body
-        mock_resp.__enter__ = MagicMock(return_value=mock_resp)
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
+    @patch("api.pooled_request")
+    def test_get_json_response(self, mock_req):
+        mock_req.return_value = (200, json.dumps({"status": "ok"}).encode("utf-8"))
 
         result = _management_api_request("claude", "usage", "secret123")
         self.assertEqual(result, {"status": "ok"})
+        args, kwargs = mock_req.call_args
+        self.assertEqual(args[1], "GET")
+        self.assertEqual(args[2], "/v0/management/usage")
+        self.assertEqual(kwargs["headers"]["Authorization"], "Bearer secret123")
 
-    @patch("urllib.request.urlopen")
-    def test_empty_body(self, mock_urlopen):
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = b""
-        mock_resp.__enter__ = MagicMock(return_value=mock_resp)
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
-
+    @patch("api.pooled_request", return_value=(200, b""))
+    def test_empty_body(self, _):
         result = _management_api_request("claude", "usage")
         self.assertEqual(result, {})
 
-    @patch("urllib.request.urlopen")
-    def test_non_json_body(self, mock_urlopen):
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = b"plain text response"
-        mock_resp.__enter__ = MagicMock(return_value=mock_resp)
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
-
+    @patch("api.pooled_request", return_value=(200, b"plain text response"))
+    def test_non_json_body(self, _):
         result = _management_api_request("claude", "health")
         self.assertIn("raw", result)
 
-    @patch("urllib.request.urlopen", side_effect=Exception("connection refused"))
+    @patch("api.pooled_request")
+    def test_post_payload_is_json(self, mock_req):
+        mock_req.return_value = (200, b"{}")
+        _management_api_request("claude", "auth-files", method="POST", payload={"a": 1})
+        kwargs = mock_req.call_args[1]
+        self.assertEqual(json.loads(kwargs["body"]), {"a": 1})
+        self.assertEqual(kwargs["headers"]["Content-Type"], "application/json")
+
+    @patch("api.pooled_request", side_effect=Exception("connection refused"))
     def test_connection_error(self, _):
         with self.assertRaises(Exception):
             _management_api_request("claude", "usage")
@@ -67,14 +62,9 @@ class TestManagementApi(unittest.TestCase):
 
 
 class TestProxyApi(unittest.TestCase):
-    @patch("urllib.request.urlopen")
-    def test_get_models(self, mock_urlopen):
-        body = json.dumps({"data": [{"id": "claude-3"}]}).encode("utf-8")
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = body
-        mock_resp.__enter__ = MagicMock(return_value=mock_resp)
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
+    @patch("api.pooled_request")
+    def test_get_models(self, mock_req):
+        mock_req.return_value = (200, json.dumps({"data": [{"id": "claude-3"}]}).encode("utf-8"))
 
         result = _proxy_api("claude", "v1/models")
         self.assertIn("data", result)
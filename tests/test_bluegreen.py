@@ -0,0 +1,184 @@
+"""
+Tests for core/bluegreen.py and core/shim.py — blue/green restart behind the
+forwarding shim, against a fake cli-proxy-api that can stream slowly.
+"""
+
+import http.client
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import constants
+import process
+from bluegreen import read_state, shim_pid
+from constants import IS_WINDOWS, PORTS, PROVIDERS
+from proxy import restart_many, start_many, stop_many
+
+# Threaded stand-in for cli-proxy-api: GET / answers with its own pid,
+# GET /slow streams ten chunks over about a second.
+_FAKE_BINARY = textwrap.dedent("""\
+    #!{python}
+    import http.server, os, re, sys, time
+    cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+    port = int(re.search(r"(?m)^port:\\s*(\\d+)", cfg).group(1))
+
+    class H(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path == "/slow":
+                self.send_response(200)
+                self.send_header("Content-Length", "10")
+                self.end_headers()
+                for _ in range(10):
+                    self.wfile.write(b"x")
+                    self.wfile.flush()
+                    time.sleep(0.1)
+                return
+            body = str(os.getpid()).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), H)
+    print("API server started successfully on: 127.0.0.1:%d" % port, flush=True)
+    server.serve_forever()
+""")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port, path="/"):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+@unittest.skipIf(IS_WINDOWS, "blue/green restart is POSIX only")
+class TestBlueGreenRestart(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_bg_"))
+        exe = self.tmp / "cli-proxy-api"
+        exe.write_text(_FAKE_BINARY.format(python=sys.executable))
+        exe.chmod(0o755)
+        (self.tmp / "config.yaml").write_text("port: 0\nauth-dir: x\n")
+        self.orig_ports = dict(PORTS)
+        for pvd in PROVIDERS:
+            constants.PORTS[pvd] = _free_port()
+        process.invalidate_port_pid_cache()
+        self.pids = set()
+        self.env = patch.dict(os.environ, {
+            "CC_PROXY_TOKEN_DIR": str(self.tmp / "tokens"),
+            "CC_PROXY_RESTART_MODE": "bluegreen",
+        })
+        self.env.start()
+        self.snapshot = patch("proxy._capture_usage_snapshot_before_stop")
+        self.snapshot.start()
+
+    def tearDown(self):
+        self.snapshot.stop()
+        state = read_state(self.tmp, "claude")
+        self.pids.update(p for p in (state.get("shim_pid"), state.get("backend_pid")) if p)
+        for pid in self.pids:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        process.wait_pids_exit(self.pids, 2.0)
+        self.env.stop()
+        constants.PORTS.update(self.orig_ports)
+        process.invalidate_port_pid_cache()
+        shutil.rmtree(str(self.tmp))
+
+    def _restart(self):
+        res = restart_many(self.tmp, ["claude"], quiet=True)["claude"]
+        self.assertTrue(res["ok"], res)
+        self.pids.add(res["pid"])
+        return res
+
+    def test_migrate_then_swap_without_dropping_requests(self):
+        port = PORTS["claude"]
+        first = start_many(self.tmp, ["claude"], quiet=True)["claude"]
+        self.assertTrue(first["ok"])
+        self.pids.add(first["pid"])
+
+        blue = self._restart()
+        self.assertTrue(blue["migrated"])
+        self.assertNotEqual(blue["backend"], port)
+        self.assertTrue(process.wait_pids_exit([first["pid"]], 2.0) == set())
+        shim = shim_pid(self.tmp, "claude")
+        self.assertIsNotNone(shim)
+        self.assertEqual(_get(port), (200, str(blue["pid"]).encode()))
+
+        slow = {}
+        slow_thread = threading.Thread(target=lambda: slow.update(res=_get(port, "/slow")))
+        slow_thread.start()
+        time.sleep(0.2)  # the stream is open against the blue instance
+
+        errors, served_by = [], set()
+        stop_polling = threading.Event()
+
+        def poll():
+            while not stop_polling.is_set():
+                try:
+                    served_by.add(_get(port)[1])
+                except OSError as e:
+                    errors.append(e)
+                time.sleep(0.01)
+
+        poller = threading.Thread(target=poll)
+        poller.start()
+        green = self._restart()
+        time.sleep(0.1)
+        stop_polling.set()
+        poller.join()
+        slow_thread.join(5)
+
+        self.assertNotIn("migrated", green)
+        self.assertEqual(errors, [])
+        self.assertIn(str(green["pid"]).encode(), served_by)
+        self.assertEqual(slow["res"], (200, b"x" * 10))  # the stream outlived the swap
+        self.assertEqual(shim_pid(self.tmp, "claude"), shim)
+        self.assertEqual(_get(port), (200, str(green["pid"]).encode()))
+        # the shim stops the drained blue instance on its own
+        self.assertEqual(process.wait_pids_exit([blue["pid"]], 3.0), set())
+
+        out = stop_many(self.tmp, ["claude"], quiet=True, grace=1.0)
+        self.assertTrue(out["claude"]["port_free"])
+        self.assertEqual(process.wait_pids_exit([shim, green["pid"]], 3.0), set())
+
+    def test_failed_new_instance_keeps_old_one(self):
+        first = start_many(self.tmp, ["claude"], quiet=True)["claude"]
+        self.pids.add(first["pid"])
+        (self.tmp / "cli-proxy-api").write_text("#!/bin/sh\necho 'bind: address already in use'\nexit 1\n")
+        res = restart_many(self.tmp, ["claude"], quiet=True)["claude"]
+        self.assertFalse(res["ok"])
+        self.assertIn("address already in use", res["reason"])
+        self.assertEqual(_get(PORTS["claude"]), (200, str(first["pid"]).encode()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests for core/cc_proxy.py — per-command lazy imports, the
+CC_PROXY_IMPORT_PROFILE report and a cold-start budget for `stop`.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+import unittest
+from pathlib import Path
+
+CORE_DIR = Path(__file__).resolve().parent.parent / "core"
+sys.path.insert(0, str(CORE_DIR))
+
+# Cold `cc_proxy.py stop` (interpreter start included) must stay under this.
+STOP_BUDGET_MS = float(os.environ.get("CC_PROXY_STARTUP_BUDGET_MS", "250"))
+
+# Modules `stop` must never load: TUI, asyncio engine, dashboard, SQLite, HTTP.
+HEAVY_MODULES = ("tui", "display", "prefetch", "commands", "asyncio", "sqlite3", "http.client", "ledger")
+
+# Runs `cc_proxy.main(["stop"])` cold with stop_proxy stubbed out, so the test
+# measures dispatch + imports without touching real proxies on this machine.
+_STOP_DRIVER = textwrap.dedent("""
+    import json, sys
+    sys.path.insert(0, sys.argv[1])
+    import cc_proxy, proxy
+    calls = []
+    proxy.stop_proxy = lambda base_dir, provider=None, quiet=False: calls.append(provider)
+    rc = cc_proxy.main(["stop"])
+    print(json.dumps({"rc": rc, "calls": calls, "modules": sorted(sys.modules)}))
+""")
+
+
+def _env(**extra):
+    env = dict(os.environ, CC_PROXY_DAEMON="0")
+    env.pop("CC_PROXY_IMPORT_PROFILE", None)
+    env.update(extra)
+    return env
+
+
+class TestLazyImports(unittest.TestCase):
+    def _run_stop(self):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", _STOP_DRIVER, str(CORE_DIR)],
+                             env=_env(), capture_output=True, text=True, timeout=30)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self.assertEqual(out.returncode, 0, out.stderr)
+        return json.loads(out.stdout), elapsed_ms
+
+    def test_stop_loads_no_heavy_modules(self):
+        res, _ = self._run_stop()
+        self.assertEqual(res["rc"], 0)
+        self.assertEqual(res["calls"], [None])
+        loaded = [m for m in HEAVY_MODULES if m in res["modules"]]
+        self.assertEqual(loaded, [])
+
+    def test_stop_cold_start_within_budget(self):
+        best = min(self._run_stop()[1] for _ in range(3))
+        self.assertLess(best, STOP_BUDGET_MS,
+                        "cold `stop` took {:.0f} ms (budget {:.0f} ms)".format(best, STOP_BUDGET_MS))
+
+    def test_every_command_has_a_handler(self):
+        import cc_proxy
+        for line in cc_proxy.__doc__.splitlines():
+            line = line.strip()
+            if line.startswith("python3 core/cc_proxy.py "):
+                self.assertIn(line.split()[2], cc_proxy._COMMANDS)
+
+    def test_unknown_command(self):
+        out = subprocess.run([sys.executable, str(CORE_DIR / "cc_proxy.py"), "nope"],
+                             env=_env(), capture_output=True, text=True, timeout=30)
+        self.assertEqual(out.returncode, 1)
+        self.assertIn("Unknown command: nope", out.stderr)
+
+
+class TestImportProfile(unittest.TestCase):
+    def test_profile_report_on_stderr(self):
+        out = subprocess.run([sys.executable, str(CORE_DIR / "cc_proxy.py"), "token-list", "nope"],
+                             env=_env(CC_PROXY_IMPORT_PROFILE="1"), capture_output=True, text=True, timeout=30)
+        lines = [l for l in out.stderr.splitlines() if l.startswith("import time:")]
+        self.assertEqual(lines[0], "import time: self [us] | cumulative | imported package")
+        self.assertTrue(lines[-1].startswith("import time: total "))
+        names = [l.split("|")[2].strip() for l in lines[1:-1]]
+        self.assertIn("constants", names)
+        self.assertIn("paths", names)
+        self.assertNotIn("commands", names)  # invalid provider is rejected before importing commands
+
+    def test_no_report_without_env(self):
+        out = subprocess.run([sys.executable, str(CORE_DIR / "cc_proxy.py"), "token-list", "nope"],
+                             env=_env(), capture_output=True, text=True, timeout=30)
+        self.assertNotIn("import time:", out.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 """
-Tests for core/config.py — YAML rewriting, token parsing, and time formatting.
+Tests for core/config.py — YAML rewriting, token parsing, the token
+metadata index, and time formatting.
 """
 
 import json
@@ -10,9 +11,11 @@ import tempfile
 import unittest
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from unittest.mock import patch
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
 
+import config
 from config import (
     rewrite_port_in_config,
     rewrite_auth_dir_in_config,
@@ -20,7 +23,10 @@ from config import (
     _parse_token_expiry,
     _fmt_reset_time,
     get_token_infos,
+    refresh_token_index,
+    token_index_generation,
 )
+from paths import get_token_index_path
 
 
 class TestRewritePortInConfig(unittest.TestCase):
@@ -51,6 +57,14 @@ class TestRewritePortInConfig(unittest.TestCase):
         self.assertIn("debug: true", text)
         self.assertIn("host:", text)
 
+    def test_unchanged_port_leaves_file_alone(self):
+        auth_dir = str(self.tmp.resolve()).replace("\\", "/")
+        self.cfg.write_text('port: 18418\nauth-dir: "{}"\n'.format(auth_dir), encoding="utf-8")
+        os.utime(str(self.cfg), ns=(1, 1))
+        rewrite_port_in_config(self.cfg, 18418)
+        rewrite_auth_dir_in_config(self.cfg, self.tmp)
+        self.assertEqual(self.cfg.stat().st_mtime_ns, 1)
+
 
 class TestRewriteAuthDirInConfig(unittest.TestCase):
     def setUp(self):
@@ -184,5 +198,71 @@ class TestGetTokenInfos(unittest.TestCase):
         self.assertEqual(infos, [])
 
 
+
+class TestTokenIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_tix_"))
+        os.environ.pop("CC_PROXY_TOKEN_DIR", None)
+        self.token_dir = self.tmp / "tokens"
+        self.token_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(3):
+            self._write("claude-u{}.json".format(i), {"email": "u{}@test.com".format(i)})
+        self._write("gemini-g.json", {"email": "g@test.com"})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, name, data):
+        # atomic replace, like the binary and the TUI toggle
+        tmp = self.token_dir / (name + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(str(tmp), str(self.token_dir / name))
+
+    def _parses(self, fn):
+        with patch("config._read_token_fields", wraps=config._read_token_fields) as read:
+            result = fn()
+        return result, read.call_count
+
+    def test_unchanged_files_are_not_parsed_again(self):
+        _, n = self._parses(lambda: get_token_infos(self.tmp, "claude"))
+        self.assertEqual(n, 4)
+        index_stat = os.stat(str(get_token_index_path(self.tmp)))
+        infos, n = self._parses(lambda: get_token_infos(self.tmp, "claude"))
+        self.assertEqual(n, 0)
+        self.assertEqual(sorted(i["email"] for i in infos), ["u0@test.com", "u1@test.com", "u2@test.com"])
+        self.assertEqual(os.stat(str(get_token_index_path(self.tmp))).st_mtime_ns, index_stat.st_mtime_ns)
+
+    def test_only_changed_file_is_reparsed(self):
+        gen = token_index_generation(self.tmp)
+        self._write("claude-u1.json", {"email": "u1@test.com", "disabled": True})
+        infos, n = self._parses(lambda: get_token_infos(self.tmp, "claude"))
+        self.assertEqual(n, 1)
+        self.assertEqual({i["email"]: i["status"] for i in infos}["u1@test.com"], "disabled")
+        self.assertEqual(token_index_generation(self.tmp), gen + 1)
+
+    def test_removed_file_drops_out(self):
+        gen = token_index_generation(self.tmp)
+        (self.token_dir / "claude-u0.json").unlink()
+        self.assertEqual(len(get_token_infos(self.tmp, "claude")), 2)
+        self.assertEqual(token_index_generation(self.tmp), gen + 1)
+        self.assertEqual(token_index_generation(self.tmp), gen + 1)
+
+    def test_index_survives_a_new_process(self):
+        refresh_token_index(self.tmp)
+        config._TOKEN_INDEX_MEMO.clear()
+        _, n = self._parses(lambda: get_token_infos(self.tmp, "gemini"))
+        self.assertEqual(n, 0)
+
+    def test_token_dir_change_rebuilds_index(self):
+        refresh_token_index(self.tmp)
+        other = self.tmp / "other"
+        other.mkdir()
+        (other / "claude-x.json").write_text(json.dumps({"email": "x@test.com"}), encoding="utf-8")
+        with patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(other)}):
+            infos = get_token_infos(self.tmp, "claude")
+        self.assertEqual([i["email"] for i in infos], ["x@test.com"])
+        self.assertEqual(infos[0]["path"], str(other.resolve() / "claude-x.json"))
+
+
 if __name__ == "__main__":
     unittest.main()
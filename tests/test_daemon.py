@@ -0,0 +1,159 @@
+"""
+Tests for core/daemon.py — cc-proxyd request serving and the client hop
+used by cc_proxy.main.
+"""
+
+import io
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import daemon
+from commands import claude_env_overrides
+from daemon import _make_server, client_dispatch, daemon_ping
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix domain sockets not available")
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="ccpd_")
+        self.sock_path = os.path.join(self.tmp, "d.sock")
+        self.server = _make_server(Path(self.tmp), self.sock_path)
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05})
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join(5)
+        self.server.server_close()
+        shutil.rmtree(self.tmp)
+
+    def _dispatch(self, argv, env=None):
+        out, err = io.StringIO(), io.StringIO()
+        with patch.dict(os.environ, env or {}), patch("sys.stdout", out), patch("sys.stderr", err):
+            rc = client_dispatch(argv, self.sock_path)
+        return rc, out.getvalue(), err.getvalue()
+
+    def test_output_and_exit_code_are_relayed(self):
+        def fake_main(argv):
+            print("status for {}".format(" ".join(argv)))
+            print("warn", file=sys.stderr)
+            return 3
+
+        self.server.main = fake_main
+        self.assertEqual(self._dispatch(["status", "-s"]), (3, "status for status -s\n", "warn\n"))
+        self.assertEqual(daemon_ping(self.sock_path)["requests"], 1)
+
+    def test_client_env_applied_per_request_and_restored(self):
+        seen = {}
+
+        def fake_main(argv):
+            seen["columns"] = os.environ.get("COLUMNS")
+            seen["secret"] = os.environ.get("CC_PROXY_SECRET")
+            return 0
+
+        self.server.main = fake_main
+        with patch.dict(os.environ, {"CC_PROXY_SECRET": "outer"}):
+            os.environ.pop("COLUMNS", None)
+            self._dispatch(["status"], {"COLUMNS": "123", "CC_PROXY_SECRET": "s3"})
+            self.assertEqual(seen, {"columns": "123", "secret": "s3"})
+            self.assertEqual(os.environ.get("CC_PROXY_SECRET"), "outer")
+            self.assertNotIn("COLUMNS", os.environ)
+
+    def test_stop_knobs_reach_the_served_command(self):
+        from bluegreen import drain_timeout
+        from process import stop_grace_period
+        seen = {}
+
+        def fake_main(argv):
+            seen["grace"], seen["drain"] = stop_grace_period(), drain_timeout()
+            return 0
+
+        def daemon_env_request(sock_path, payload, **kwargs):
+            # the daemon's own environment (same process here) never had the knobs
+            os.environ.pop("CC_PROXY_STOP_GRACE", None)
+            os.environ.pop("CC_PROXY_DRAIN_TIMEOUT", None)
+            return real_request(sock_path, payload, **kwargs)
+
+        real_request = daemon._request
+        self.server.main = fake_main
+        with patch.dict(os.environ), patch("daemon._request", side_effect=daemon_env_request):
+            self._dispatch(["stop"], {"CC_PROXY_STOP_GRACE": "1", "CC_PROXY_DRAIN_TIMEOUT": "7"})
+        self.assertEqual(seen, {"grace": 1.0, "drain": 7.0})
+
+    def test_run_returns_exec_spec_for_client(self):
+        self.server.prepare_run = lambda base_dir, args: (0, ("claude", "o", "s", "h", ["--resume"]))
+        seen = {}
+        with patch("daemon.os.execvp", side_effect=lambda f, a: seen.update(os.environ)) as execvp:
+            self._dispatch(["run", "claude", "--", "--resume"])
+        execvp.assert_called_once_with("claude", ["claude", "--resume"])
+        for key, value in claude_env_overrides("claude", "o", "s", "h").items():
+            self.assertEqual(seen[key], value)
+
+    def test_failed_run_preparation_does_not_exec(self):
+        def fail(base_dir, args):
+            print("[cc-proxy] Unknown preset: x", file=sys.stderr)
+            return 1, None
+
+        self.server.prepare_run = fail
+        with patch("daemon.os.execvp") as execvp:
+            rc, _, err = self._dispatch(["run", "x"])
+        self.assertEqual(rc, 1)
+        self.assertIn("Unknown preset", err)
+        execvp.assert_not_called()
+
+    def test_exception_in_command_is_reported(self):
+        def boom(argv):
+            raise RuntimeError("boom")
+
+        self.server.main = boom
+        rc, _, err = self._dispatch(["stop"])
+        self.assertEqual(rc, 1)
+        self.assertIn("RuntimeError: boom", err)
+
+    def test_local_only_commands_and_opt_out_skip_daemon(self):
+        self.server.main = lambda argv: self.fail("should not be served")
+        self.assertIsNone(self._dispatch(["ui"])[0])
+        self.assertIsNone(self._dispatch(["token-list"])[0])
+        self.assertIsNone(self._dispatch(["status"], {daemon.DAEMON_ENV: "0"})[0])
+        self.server.prepare_run = lambda base_dir, args: self.fail("should not be served")
+        self.assertIsNone(self._dispatch(["run", "claude"], {daemon.OVERLAP_START_ENV: "1"})[0])
+
+    def test_shutdown_removes_socket(self):
+        self.assertIsNotNone(daemon_ping(self.sock_path))
+        daemon._request(self.sock_path, {"argv": ["__shutdown__"]})
+        self.thread.join(5)
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.sock_path))
+        self.assertIsNone(self._dispatch(["status"])[0])
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix domain sockets not available")
+class TestClientFallback(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="ccpd_")
+        self.sock_path = os.path.join(self.tmp, "d.sock")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_no_socket_runs_locally(self):
+        self.assertIsNone(client_dispatch(["status"], self.sock_path))
+
+    def test_stale_socket_runs_locally(self):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(self.sock_path)
+        s.close()  # file remains, nobody listening
+        self.assertIsNone(client_dispatch(["status"], self.sock_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
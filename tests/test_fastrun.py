@@ -0,0 +1,128 @@
+"""
+Tests for core/fastrun.py — the `run` fast path: recorded run state, every
+input that must send `run` back to the full path, and that the fast path
+writes no files and starts no subprocesses.
+"""
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import cc_proxy
+from constants import IS_WINDOWS
+from fastrun import exec_claude, fast_run_spec, record_run_state
+from paths import get_config_file, get_pid_file, get_provider_dir, get_run_state_file
+
+
+@unittest.skipIf(IS_WINDOWS, "fast path is POSIX only")
+class TestFastRun(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_fr_"))
+        self.token_dir = self.tmp / "tokens"
+        self.token_dir.mkdir()
+        (self.token_dir / "claude-a.json").write_text(json.dumps({"email": "a@test.com"}))
+        get_provider_dir(self.tmp, "claude").mkdir(parents=True)
+        get_config_file(self.tmp, "claude").write_text('port: 18418\nauth-dir: "x"\n')
+        self.proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        get_pid_file(self.tmp, "claude").write_text(str(self.proc.pid))
+        self.env = patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(self.token_dir)})
+        self.env.start()
+        os.environ.pop("CC_PROXY_FAST_RUN", None)
+        record_run_state(self.tmp, "claude")
+
+    def tearDown(self):
+        self.env.stop()
+        self.proc.kill()
+        self.proc.wait()
+        shutil.rmtree(str(self.tmp))
+
+    def _spec(self, args=("claude", "--", "-p", "hi")):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            spec = fast_run_spec(self.tmp, list(args))
+        return spec, out.getvalue()
+
+    def test_unchanged_state_takes_fast_path(self):
+        spec, out = self._spec()
+        self.assertEqual(spec[0], "claude")
+        self.assertEqual(spec[4], ["-p", "hi"])
+        self.assertIn("a@test.com", out)
+        self.assertIn("Reusing healthy proxy for claude (pid={})".format(self.proc.pid), out)
+
+    def test_fast_path_writes_nothing_and_spawns_nothing(self):
+        def snapshot():
+            return {str(p): p.stat().st_mtime_ns for p in self.tmp.rglob("*")}
+
+        before = snapshot()
+        with patch("subprocess.Popen", side_effect=AssertionError("subprocess started")):
+            spec, _ = self._spec()
+        self.assertIsNotNone(spec)
+        self.assertEqual(snapshot(), before)
+
+    def test_config_edit_falls_back(self):
+        get_config_file(self.tmp, "claude").write_text('port: 18418\nauth-dir: "y"\n')
+        self.assertIsNone(self._spec()[0])
+
+    def test_token_change_falls_back(self):
+        (self.token_dir / "claude-b.json").write_text(json.dumps({"email": "b@test.com"}))
+        self.assertIsNone(self._spec()[0])
+
+    def test_other_token_dir_falls_back(self):
+        other = self.tmp / "other"
+        other.mkdir()
+        with patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(other)}):
+            self.assertIsNone(self._spec()[0])
+
+    def test_dead_or_replaced_proxy_falls_back(self):
+        other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        try:
+            get_pid_file(self.tmp, "claude").write_text(str(other.pid))
+            self.assertIsNone(self._spec()[0])
+        finally:
+            other.kill()
+            other.wait()
+        get_pid_file(self.tmp, "claude").write_text(str(self.proc.pid))
+        self.assertIsNotNone(self._spec()[0])
+        self.proc.kill()
+        self.proc.wait()
+        self.assertIsNone(self._spec()[0])
+
+    def test_disabled_by_env_and_unknown_preset(self):
+        with patch.dict(os.environ, {"CC_PROXY_FAST_RUN": "0"}):
+            self.assertIsNone(self._spec()[0])
+        self.assertIsNone(self._spec(["nope"])[0])
+        self.assertIsNone(self._spec([])[0])
+
+    def test_prepare_run_records_state(self):
+        get_run_state_file(self.tmp, "claude").unlink()
+        with patch("config.ensure_tokens", return_value=True), \
+                patch("proxy.start_proxy", return_value=True), redirect_stdout(io.StringIO()):
+            rc, spec = cc_proxy.prepare_run(self.tmp, ["claude"])
+        self.assertEqual(rc, 0)
+        state = json.loads(get_run_state_file(self.tmp, "claude").read_text())
+        self.assertEqual(state["pid"], self.proc.pid)
+        self.assertIsNotNone(self._spec()[0])
+
+
+class TestExecClaude(unittest.TestCase):
+    def test_missing_claude_prints_install_hint(self):
+        err = io.StringIO()
+        with patch.dict(os.environ), redirect_stderr(err), \
+                patch("fastrun.os.execvp", side_effect=FileNotFoundError):
+            rc = exec_claude("claude", "o", "s", "h", [])
+        self.assertEqual(rc, 1)
+        self.assertIn("'claude' CLI not found", err.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Tests for core/hotreload.py — reload strategy order, verification through
+auth-files and the per-binary-version strategy cache.  Management API and
+restarts are mocked.
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+import urllib.error
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+from hotreload import binary_version_key, reload_account, reload_accounts
+from paths import get_reload_cache_path
+
+VERSION = "CLIProxyAPI Version: 6.8.55, Commit: abc, BuiltAt: 2026-01-01"
+NAME = "claude-a@example.com.json"
+
+
+def _listing(disabled):
+    return {"files": [{"name": "claude-b@example.com.json", "status": "active"},
+                      {"name": NAME, "status": "disabled" if disabled else "active", "disabled": disabled}]}
+
+
+def _http_error(code):
+    return urllib.error.HTTPError("http://127.0.0.1/", code, "err", {}, None)
+
+
+class TestReloadAccount(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_hr_"))
+        (self.tmp / "cli-proxy-api").write_text("fake")
+        self.token = self.tmp / NAME
+        self.token.write_text('{"disabled": true}\n')
+        patch("hotreload.get_binary_version", return_value=VERSION).start()
+        patch("hotreload._read_secret_key", return_value="cc").start()
+        patch("hotreload.RELOAD_VERIFY_TIMEOUT", 0.2).start()
+        patch("hotreload.RELOAD_VERIFY_INTERVAL", 0.01).start()
+        self.restart = patch("hotreload.restart_many", return_value={"claude": {"ok": True}}).start()
+
+    def tearDown(self):
+        patch.stopall()
+        shutil.rmtree(str(self.tmp))
+
+    def _cached(self):
+        return json.loads(get_reload_cache_path(self.tmp).read_text()).get("strategies", {}).get(VERSION)
+
+    def test_api_strategy_verified_and_cached(self):
+        with patch("hotreload._management_api_request") as req, \
+                patch("hotreload._management_api", return_value=_listing(True)):
+            self.assertEqual(reload_account(self.tmp, "claude", self.token, True), "api")
+        req.assert_called_once_with("claude", "auth-files/status", "cc", method="PATCH",
+                                    payload={"name": NAME, "disabled": True}, timeout=3)
+        self.assertEqual(self._cached(), "api")
+        self.restart.assert_not_called()
+
+    def test_falls_back_to_file_watch_when_api_missing(self):
+        listings = iter([_listing(False), _listing(False), _listing(True)])
+        with patch("hotreload._management_api_request", side_effect=_http_error(404)), \
+                patch("hotreload._management_api", side_effect=lambda *a: next(listings)):
+            self.assertEqual(reload_account(self.tmp, "claude", self.token, True), "watch")
+        self.assertEqual(self._cached(), "watch")
+
+    def test_cached_strategy_is_tried_first(self):
+        with patch("hotreload._management_api_request", side_effect=_http_error(404)), \
+                patch("hotreload._management_api", return_value=_listing(True)):
+            reload_account(self.tmp, "claude", self.token, True)
+        with patch("hotreload._management_api_request") as req, \
+                patch("hotreload._management_api", return_value=_listing(True)):
+            self.assertEqual(reload_account(self.tmp, "claude", self.token, True), "watch")
+        req.assert_not_called()
+
+    def test_restart_as_last_resort_then_cached(self):
+        with patch("hotreload._management_api_request", side_effect=_http_error(404)), \
+                patch("hotreload._management_api", return_value=_listing(False)):
+            self.assertEqual(reload_account(self.tmp, "claude", self.token, True), "restart")
+        self.restart.assert_called_once_with(self.tmp, ["claude"], quiet=True)
+        self.assertEqual(self._cached(), "restart")
+
+    def test_stale_cached_strategy_is_dropped(self):
+        with patch("hotreload._management_api_request"), \
+                patch("hotreload._management_api", return_value=_listing(True)):
+            reload_account(self.tmp, "claude", self.token, True)
+        self.assertEqual(self._cached(), "api")
+        with patch("hotreload._management_api_request", side_effect=_http_error(405)), \
+                patch("hotreload._management_api", return_value=_listing(True)):
+            self.assertEqual(reload_account(self.tmp, "claude", self.token, False), "restart")
+        self.assertEqual(self._cached(), "restart")
+
+    def test_unverifiable_restarts_without_caching(self):
+        with patch("hotreload._management_api_request"), \
+                patch("hotreload._management_api", side_effect=_http_error(401)):
+            self.assertEqual(reload_account(self.tmp, "claude", self.token, True), "restart")
+        self.assertIsNone(self._cached())
+
+    def test_batch_goes_through_one_strategy(self):
+        other = self.tmp / "claude-b@example.com.json"
+        other.write_text('{"disabled": true}\n')
+        listing = {"files": [{"name": other.name, "disabled": True}, {"name": NAME, "disabled": False}]}
+        with patch("hotreload._management_api_request", side_effect=_http_error(404)) as req, \
+                patch("hotreload._management_api", return_value=listing):
+            self.assertEqual(reload_accounts(self.tmp, "claude", [(self.token, False), (other, True)]), "watch")
+        self.assertEqual(req.call_count, 1)  # the first missing endpoint ends the api attempt
+        self.restart.assert_not_called()
+
+    def test_failed_restart_reports_none(self):
+        self.restart.return_value = {"claude": {"ok": False}}
+        with patch("hotreload._management_api_request", side_effect=_http_error(404)), \
+                patch("hotreload._management_api", return_value=_listing(False)):
+            self.assertIsNone(reload_account(self.tmp, "claude", self.token, True))
+
+
+class TestBinaryVersionKey(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_hr_"))
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmp))
+
+    def test_version_read_once_per_binary_file(self):
+        (self.tmp / "cli-proxy-api").write_text("fake")
+        cache = {}
+        with patch("hotreload.get_binary_version", return_value=VERSION) as ver:
+            self.assertEqual(binary_version_key(self.tmp, cache), VERSION)
+            self.assertEqual(binary_version_key(self.tmp, cache), VERSION)
+            self.assertEqual(ver.call_count, 1)
+            (self.tmp / "cli-proxy-api").write_text("newer binary")
+            binary_version_key(self.tmp, cache)
+            self.assertEqual(ver.call_count, 2)
+
+    def test_unknown_version_is_not_a_key(self):
+        (self.tmp / "cli-proxy-api").write_text("fake")
+        with patch("hotreload.get_binary_version", return_value="Unknown"):
+            self.assertIsNone(binary_version_key(self.tmp, {}))
+        self.assertIsNone(binary_version_key(Path(tempfile.gettempdir()) / "nope-ccproxy", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Tests for core/httppool.py — keep-alive reuse, per-host limits, idle eviction,
+stale-socket retry. Runs against a local HTTP/1.1 stand-in server.
+"""
+
+import http.client
+import json
+import socket
+import sys
+import threading
+import unittest
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+from httppool import ConnectionPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for part in (b"hello ", b"chunked ", b"world"):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        if self.path == "/missing":
+            body = b"nope"
+            self.send_response(404)
+        else:
+            body = json.dumps({"path": self.path}).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server:
+    def __enter__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.connections = 0
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_sequential_requests_reuse_one_connection(self):
+        with _Server() as srv:
+            pool = ConnectionPool("127.0.0.1")
+            for i in range(10):
+                status, _, _, body = pool.request(srv.port, "GET", "/x{}".format(i))
+                self.assertEqual(status, 200)
+                self.assertEqual(json.loads(body)["path"], "/x{}".format(i))
+            self.assertEqual(pool.created, 1)
+            self.assertEqual(srv.httpd.connections, 1)
+            pool.clear()
+
+    def test_per_host_limit_bounds_connections(self):
+        with _Server() as srv:
+            pool = ConnectionPool("127.0.0.1", max_per_host=2)
+            errors = []
+
+            def _worker():
+                try:
+                    for _ in range(5):
+                        pool.request(srv.port, "GET", "/")
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=_worker) for _ in range(6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(timeout=10)
+            self.assertEqual(errors, [])
+            self.assertLessEqual(pool.created, 2)
+            pool.clear()
+
+    def test_idle_connections_are_evicted(self):
+        with _Server() as srv:
+            pool = ConnectionPool("127.0.0.1", idle_timeout=0)
+            pool.request(srv.port, "GET", "/")
+            pool.request(srv.port, "GET", "/")
+            self.assertEqual(pool.created, 2)
+            pool.clear()
+
+    def test_stale_socket_is_retried(self):
+        with _Server() as srv:
+            pool = ConnectionPool("127.0.0.1")
+            pool.request(srv.port, "GET", "/")
+            # Simulate the server dropping the idle keep-alive socket.
+            conn = pool._idle[srv.port][0][0]
+            conn.sock.shutdown(socket.SHUT_RDWR)
+            status, _, _, _ = pool.request(srv.port, "GET", "/again")
+            self.assertEqual(status, 200)
+            self.assertEqual(pool.created, 2)
+            pool.clear()
+
+    def test_stale_socket_is_not_retried_for_post(self):
+        with _Server() as srv:
+            pool = ConnectionPool("127.0.0.1")
+            pool.request(srv.port, "GET", "/")
+            conn = pool._idle[srv.port][0][0]
+            conn.sock.shutdown(socket.SHUT_RDWR)
+            with self.assertRaises((OSError, http.client.HTTPException)):
+                pool.request(srv.port, "POST", "/v0/management/api-call", body=b"{}")
+            self.assertEqual(pool.created, 1)
+            pool.clear()
+
+    def test_chunked_body_is_decoded_and_connection_kept(self):
+        with _Server() as srv:
+            pool = ConnectionPool("127.0.0.1")
+            status, _, headers, body = pool.request(srv.port, "GET", "/chunked")
+            self.assertEqual((status, body), (200, b"hello chunked world"))
+            self.assertEqual(headers["Transfer-Encoding"], "chunked")
+            pool.request(srv.port, "GET", "/after")
+            self.assertEqual(pool.created, 1)
+            pool.clear()
+
+    def test_error_status_is_returned_and_connection_kept(self):
+        with _Server() as srv:
+            pool = ConnectionPool("127.0.0.1")
+            status, _, _, _ = pool.request(srv.port, "GET", "/missing")
+            self.assertEqual(status, 404)
+            self.assertEqual(pool.idle_count(srv.port), 1)
+            pool.clear()
+
+    def test_connection_refused_raises(self):
+        with _Server() as srv:
+            port = srv.port
+        pool = ConnectionPool("127.0.0.1")
+        with self.assertRaises(OSError):
+            pool.request(port, "GET", "/", timeout=1)
+        self.assertEqual(pool.idle_count(port), 0)
+
+
+class TestPooledRequest(unittest.TestCase):
+    def test_raises_http_error_on_4xx(self):
+        import httppool
+        with _Server() as srv:
+            orig = httppool._POOL
+            httppool._POOL = ConnectionPool("127.0.0.1")
+            try:
+                with self.assertRaises(urllib.error.HTTPError) as ctx:
+                    httppool.pooled_request(srv.port, "GET", "missing")
+                self.assertEqual(ctx.exception.code, 404)
+                status, body = httppool.pooled_request(srv.port, "GET", "ok")
+                self.assertEqual(status, 200)
+                self.assertEqual(json.loads(body)["path"], "/ok")
+            finally:
+                httppool._POOL.clear()
+                httppool._POOL = orig
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for core/ledger.py — persistent SQLite usage ledger.
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+from ledger import LEDGER_DAILY_DAYS, _ledger_close, _ledger_db, ledger_ingest, ledger_rollups
+from usage import UsageAggregator
+
+
+def _detail(ts, source="a@example.com", inp=10, out=5, rsn=0, failed=False):
+    return {"timestamp": ts, "source": source, "failed": failed,
+            "tokens": {"input_tokens": inp, "output_tokens": out, "reasoning_tokens": rsn,
+                       "total_tokens": inp + out + rsn}}
+
+
+def _usage(models):
+    """{model: [details]} → /v0/management/usage payload with one api key."""
+    return {"usage": {"apis": {"key1": {"models": {
+        m: {"details": d} for m, d in models.items()}}}}}
+
+
+class TestLedger(unittest.TestCase):
+    def setUp(self):
+        self.base = Path(tempfile.mkdtemp(prefix="ccproxy_ledger_"))
+
+    def tearDown(self):
+        _ledger_close()
+        shutil.rmtree(str(self.base))
+
+    def test_ingest_is_idempotent(self):
+        data = _usage({"m1": [_detail("2026-03-01T10:00:00Z"), _detail("2026-03-01T11:00:00Z")]})
+        self.assertEqual(ledger_ingest(self.base, "claude", data), 2)
+        self.assertEqual(ledger_ingest(self.base, "claude", data), 0)
+        self.assertTrue((self.base / "configs" / "usage-ledger.sqlite3").exists())
+
+    def test_history_survives_restart(self):
+        # details before restart, then the binary restarts and only reports new ones
+        ledger_ingest(self.base, "claude", _usage({"m1": [_detail("2026-03-01T10:00:00Z")]}))
+        _ledger_close()
+        ledger_ingest(self.base, "claude", _usage({"m1": [_detail("2026-03-02T10:00:00Z", inp=1, out=1)]}))
+        roll = ledger_rollups(self.base, "claude")
+        self.assertEqual(roll["models"]["m1"]["requests"], 2)
+        self.assertEqual(roll["models"]["m1"]["last_input"], 1)
+        self.assertEqual(len(roll["daily"]), 2)
+
+    def test_rollups_per_model_and_account(self):
+        ledger_ingest(self.base, "claude", _usage({
+            "m1": [_detail("2026-03-01T10:00:00Z", source="a", inp=100, out=10),
+                   _detail("2026-03-01T12:00:00Z", source="b", inp=7, out=3, failed=True)],
+            "m2": [_detail("2026-03-01T11:00:00Z", source="a", inp=1, out=2, rsn=3)],
+        }))
+        ledger_ingest(self.base, "codex", _usage({"m9": [_detail("2026-03-01T10:00:00Z")]}))
+        roll = ledger_rollups(self.base, "claude")
+        self.assertEqual(set(roll["models"]), {"m1", "m2"})
+        m1 = roll["models"]["m1"]
+        self.assertEqual((m1["requests"], m1["fails"], m1["input"], m1["output"]), (2, 1, 107, 13))
+        self.assertEqual((m1["last_time"], m1["last_input"], m1["last_output"]),
+                         ("2026-03-01T12:00:00Z", 7, 3))
+        a = roll["accounts"]["a"]
+        self.assertEqual((a["requests"], a["tokens"], a["reasoning"]), (2, 116, 3))
+        self.assertEqual(a["last_tok"], 6)
+        self.assertEqual(sum(d["requests"] for d in roll["daily"].values()), 3)
+
+    def test_empty_ledger_returns_none(self):
+        self.assertIsNone(ledger_rollups(self.base, "claude"))
+
+    def test_indexes_exist(self):
+        ledger_ingest(self.base, "claude", _usage({"m1": [_detail("2026-03-01T10:00:00Z")]}))
+        names = {r[0] for r in _ledger_db(self.base).execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({"requests_ts", "requests_model", "requests_source"} <= names)
+
+    def test_rollups_fast_on_months_of_history(self):
+        details = [_detail("2026-{:02d}-{:02d}T{:02d}:00:00Z".format(1 + i // 672, 1 + (i // 24) % 28, i % 24),
+                           source="acct{}".format(i % 20))
+                   for i in range(20000)]
+        ledger_ingest(self.base, "claude", _usage({"m{}".format(k): details[k::5] for k in range(5)}))
+        start = time.perf_counter()
+        roll = ledger_rollups(self.base, "claude")
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(sum(m["requests"] for m in roll["models"].values()), 20000)
+        self.assertEqual(len(roll["daily"]), 7)
+
+    def test_rollups_match_live_aggregator(self):
+        # the dashboard shows either source; both must apply the same daily window
+        data = _usage({
+            "m1": [_detail("2026-03-{:02d}T10:00:00Z".format(day), source="a", inp=day) for day in range(1, 11)],
+            "m2": [_detail("2026-03-{:02d}T11:00:00Z".format(day), source="b") for day in range(3, 13)],
+        })
+        ledger_ingest(self.base, "claude", data)
+        agg = UsageAggregator()
+        agg.update(data)
+        roll = ledger_rollups(self.base, "claude")
+        self.assertEqual(len(roll["daily"]), LEDGER_DAILY_DAYS)
+        self.assertEqual(agg.rollups(), roll)
+
+
+if __name__ == "__main__":
+    unittest.main()
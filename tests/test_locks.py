@@ -0,0 +1,162 @@
+"""
+Tests for core/locks.py — cross-process file locks, and the quota
+single-flight they provide across concurrent cc-proxy processes.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+CORE_DIR = Path(__file__).resolve().parent.parent / "core"
+sys.path.insert(0, str(CORE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import locks
+from locks import FileLock, LockTimeout
+from mgmt_stub import ManagementStub
+
+_HOLD_LOCK = textwrap.dedent("""
+    import sys, time
+    sys.path.insert(0, sys.argv[1])
+    from locks import FileLock
+    lock = FileLock(sys.argv[2])
+    assert lock.acquire(5)
+    print("held", flush=True)
+    time.sleep(float(sys.argv[3]))
+""")
+
+_PREFETCH_QUOTA = textwrap.dedent("""
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, sys.argv[1])
+    import constants
+    constants.PORTS["claude"] = int(sys.argv[2])
+    from prefetch import prefetch_providers
+    res = prefetch_providers(Path(sys.argv[3]), ["claude"], fetch_quota=True)["claude"]
+    assert all(q and q["five_hour"]["used_pct"] == 12 for q in res["quota_data"].values()), res
+    assert len(res["quota_data"]) == int(sys.argv[4]), res
+""")
+
+
+@unittest.skipIf(locks.fcntl is None, "fcntl not available")
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="ccproxy_lock_")
+        self.path = os.path.join(self.tmp, "x.lock")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _hold_in_child(self, seconds):
+        proc = subprocess.Popen([sys.executable, "-c", _HOLD_LOCK, str(CORE_DIR), self.path, str(seconds)],
+                                stdout=subprocess.PIPE, text=True)
+        self.assertEqual(proc.stdout.readline().strip(), "held")
+        return proc
+
+    def test_exclusive_across_processes(self):
+        proc = self._hold_in_child(0.5)
+        try:
+            self.assertFalse(FileLock(self.path).try_acquire())
+            lock = FileLock(self.path)
+            self.assertTrue(lock.acquire(timeout=5))
+            lock.release()
+        finally:
+            proc.wait()
+
+    def test_dead_holder_releases_lock(self):
+        proc = self._hold_in_child(30)
+        proc.kill()
+        proc.wait()
+        lock = FileLock(self.path)
+        self.assertTrue(lock.try_acquire())
+        lock.release()
+
+    def test_hung_holder_is_broken_after_stale_after(self):
+        proc = self._hold_in_child(30)
+        try:
+            with open(self.path, "w") as f:
+                f.write("{} {:.3f}\n".format(proc.pid, time.time() - 60))
+            lock = FileLock(self.path, stale_after=30)
+            self.assertTrue(lock.acquire(timeout=2))
+            with open(self.path) as f:
+                self.assertEqual(int(f.read().split()[0]), os.getpid())
+            lock.release()
+        finally:
+            proc.kill()
+            proc.wait()
+
+    def test_context_manager_raises_instead_of_running_unlocked(self):
+        first = FileLock(self.path)
+        self.assertTrue(first.try_acquire())
+        ran = []
+        try:
+            with patch.object(locks, "LOCK_WAIT_TIMEOUT", 0.1):
+                with self.assertRaises(LockTimeout):
+                    with FileLock(self.path):
+                        ran.append(True)
+        finally:
+            first.release()
+        self.assertEqual(ran, [])
+
+    def test_stale_break_leaves_a_recreated_lock_file(self):
+        with open(self.path, "w") as f:
+            f.write("{} {:.3f}\n".format(os.getpid(), time.time() - 60))
+        real_fstat = os.fstat
+
+        def fstat_then_recreate(fd):
+            st = real_fstat(fd)
+            # another process breaks the lock and takes a fresh one meanwhile
+            os.unlink(self.path)
+            with open(self.path, "w") as f:
+                f.write("{} {:.3f}\n".format(os.getpid(), time.time()))
+            return st
+
+        with patch("locks.os.fstat", side_effect=fstat_then_recreate):
+            self.assertFalse(FileLock(self.path, stale_after=30)._break_if_stale())
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_timeout_when_held(self):
+        first = FileLock(self.path)
+        self.assertTrue(first.try_acquire())
+        try:
+            start = time.monotonic()
+            self.assertFalse(FileLock(self.path).acquire(timeout=0.2))
+            self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        finally:
+            first.release()
+
+
+@unittest.skipIf(locks.fcntl is None, "fcntl not available")
+class TestQuotaSingleFlightAcrossProcesses(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_sf_"))
+        (self.tmp / "configs" / "claude").mkdir(parents=True)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmp))
+
+    def test_concurrent_processes_fetch_each_account_once(self):
+        n_procs, n_accounts = 6, 3
+        env = dict(os.environ, TMPDIR=str(self.tmp), CC_PROXY_SECRET="cc")
+        with ManagementStub(accounts=n_accounts, latency=0.2) as stub:
+            procs = [
+                subprocess.Popen([sys.executable, "-c", _PREFETCH_QUOTA, str(CORE_DIR),
+                                  str(stub.port), str(self.tmp), str(n_accounts)],
+                                 env=env, stderr=subprocess.PIPE, text=True)
+                for _ in range(n_procs)
+            ]
+            for p in procs:
+                _, err = p.communicate(timeout=60)
+                self.assertEqual(p.returncode, 0, err)
+            self.assertEqual(stub.api_calls, {"idx{}".format(i): 1 for i in range(n_accounts)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+"""
+Tests for core/overlap.py — the start gate holding connections until the
+proxy is ready, and `run` launching claude while a cold proxy starts
+(fake cli-proxy-api with a startup delay).
+"""
+
+import http.client
+import io
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import cc_proxy
+import constants
+import process
+from constants import IS_WINDOWS, PORTS, PROVIDERS
+from overlap import StartGate, port_accepting, start_overlapped
+from paths import get_run_state_file
+
+# Stand-in for cli-proxy-api that takes `fake-delay` seconds to bind its port.
+_FAKE_BINARY = textwrap.dedent("""\
+    #!{python}
+    import http.server, re, sys, time
+    cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+    get = lambda key, default: (re.search(r"(?m)^" + key + r":\\s*(\\S+)", cfg) or [None, default])[1]
+    time.sleep(float(get("fake-delay", "0")))
+    if get("fake-exit", None):
+        sys.exit(1)
+
+    class H(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *a):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", int(get("port", "0"))), H)
+    print("API server started successfully on: 127.0.0.1:" + get("port", "0"), flush=True)
+    server.serve_forever()
+""")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Backend(object):
+    """One-shot TCP server answering "pong:" + whatever it receives."""
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        try:
+            conn, _ = self.sock.accept()
+        except OSError:
+            return
+        with conn:
+            conn.sendall(b"pong:" + conn.recv(100))
+
+    def close(self):
+        self.sock.close()
+
+
+class TestStartGate(unittest.TestCase):
+    def setUp(self):
+        self.backend = _Backend()
+        self.gate = StartGate(self.backend.port, hold_timeout=5.0).start()
+
+    def tearDown(self):
+        self.gate.close()
+        self.backend.close()
+
+    def test_holds_until_released_then_forwards(self):
+        client = socket.create_connection(("127.0.0.1", self.gate.port), timeout=5)
+        with client:
+            client.sendall(b"hi")
+            client.settimeout(0.2)
+            with self.assertRaises(socket.timeout):
+                client.recv(100)
+            self.assertEqual(self.gate.held, 1)
+            self.gate.release(True)
+            client.settimeout(5)
+            self.assertEqual(client.recv(100), b"pong:hi")
+
+    def test_failed_start_closes_held_connections(self):
+        client = socket.create_connection(("127.0.0.1", self.gate.port), timeout=5)
+        with client:
+            time.sleep(0.05)
+            self.gate.release(False)
+            self.assertEqual(client.recv(100), b"")
+
+    def test_start_overlapped_skips_busy_port(self):
+        orig = dict(PORTS)
+        constants.PORTS["claude"] = self.backend.port
+        try:
+            self.assertTrue(port_accepting(self.backend.port))
+            self.assertIsNone(start_overlapped(Path(tempfile.gettempdir()), "claude"))
+        finally:
+            constants.PORTS.update(orig)
+
+
+@unittest.skipIf(IS_WINDOWS, "fake binary is a POSIX script")
+class TestOverlappedRun(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_ov_"))
+        exe = self.tmp / "cli-proxy-api"
+        exe.write_text(_FAKE_BINARY.format(python=sys.executable))
+        exe.chmod(0o755)
+        (self.tmp / "config.yaml").write_text("port: 0\nauth-dir: x\n")
+        self.orig_ports = dict(PORTS)
+        for pvd in PROVIDERS:
+            constants.PORTS[pvd] = _free_port()
+        process.invalidate_port_pid_cache()
+        self.env = patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(self.tmp / "tokens"),
+                                           "CC_PROXY_OVERLAP_START": "1"})
+        self.env.start()
+
+    def tearDown(self):
+        pid = process.read_pid(self.tmp, "claude")
+        if pid:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.env.stop()
+        constants.PORTS.update(self.orig_ports)
+        process.invalidate_port_pid_cache()
+        shutil.rmtree(str(self.tmp))
+
+    def _config(self, extra):
+        d = self.tmp / "configs" / "claude"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "config.yaml").write_text("port: 0\nauth-dir: x\n" + extra)
+
+    def _run(self, fake_claude):
+        out, err = io.StringIO(), io.StringIO()
+        with patch("commands.invoke_claude", side_effect=fake_claude), \
+                redirect_stdout(out), redirect_stderr(err):
+            rc = cc_proxy._cmd_run(self.tmp, ["claude", "--", "-p", "hi"])
+        return rc, out.getvalue(), err.getvalue()
+
+    def test_claude_starts_before_proxy_and_first_request_waits(self):
+        self._config("fake-delay: 0.4\n")
+        seen = {}
+
+        def fake_claude(provider, opus, sonnet, haiku, claude_args, port=None):
+            seen["launched_cold"] = not port_accepting(PORTS["claude"])
+            seen["args"] = claude_args
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            conn.request("GET", "/")
+            resp = conn.getresponse()
+            seen["reply"] = (resp.status, resp.read())
+            conn.close()
+            return 7
+
+        t0 = time.monotonic()
+        rc, out, _ = self._run(fake_claude)
+        self.assertEqual(rc, 7)
+        self.assertTrue(seen["launched_cold"])
+        self.assertEqual(seen["args"], ["-p", "hi"])
+        self.assertEqual(seen["reply"], (200, b"ok"))
+        self.assertLess(time.monotonic() - t0, 3.0)
+        self.assertIn("alongside claude", out)
+        self.assertTrue(port_accepting(PORTS["claude"]))
+        self.assertTrue(get_run_state_file(self.tmp, "claude").exists())
+
+    def test_running_proxy_is_used_directly(self):
+        self._config("")
+        self._run(lambda *a, **kw: 0)
+        ports = []
+        rc, out, _ = self._run(lambda *a, **kw: ports.append(kw.get("port")) or 0)
+        self.assertEqual(rc, 0)
+        self.assertEqual(ports, [None])
+        self.assertNotIn("alongside claude", out)
+
+    def test_start_failure_reported_after_claude_exits(self):
+        self._config("fake-exit: 1\n")
+        replies = []
+
+        def fake_claude(*a, **kw):
+            s = socket.create_connection(("127.0.0.1", kw["port"]), timeout=10)
+            with s:
+                s.sendall(b"GET / HTTP/1.0\r\n\r\n")
+                try:
+                    replies.append(s.recv(100))
+                except ConnectionResetError:   # closed with our request unread
+                    replies.append(b"")
+            return 0
+
+        rc, _, err = self._run(fake_claude)
+        self.assertEqual(rc, 0)
+        self.assertEqual(replies, [b""])
+        self.assertIn("claude proxy failed to start", err)
+
+
+if __name__ == "__main__":
+    unittest.main()
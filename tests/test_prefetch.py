@@ -0,0 +1,190 @@
+"""
+Tests for core/prefetch.py — asyncio prefetch engine against a stand-in
+management server (tests/mgmt_stub.py).
+"""
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import constants
+from mgmt_stub import ManagementStub
+from prefetch import PrefetchEngine
+
+
+def _running(base_dir, provider):
+    return {"provider": provider, "running": True, "healthy": True, "pid": 1,
+            "url": "", "tokens": []}
+
+
+class _EngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self._orig_port = constants.PORTS["claude"]
+        self.patches = [
+            patch("prefetch.get_status", side_effect=_running),
+            patch("prefetch._read_secret_key", return_value="cc"),
+            patch("prefetch._quota_cache_load_many", return_value={}),
+            patch("prefetch._quota_cache_load", return_value=None),
+            patch("prefetch._quota_cache_save"),
+            patch("prefetch._usage_cumulative_update_from_live"),
+            patch("prefetch.ledger_ingest_details"),
+            patch("prefetch.ledger_rollups", return_value=None),
+            patch("prefetch._usage_cumulative_apply_to_usage_data", side_effect=lambda p, d: d),
+        ]
+        for p in self.patches:
+            p.start()
+        self.engine = PrefetchEngine(max_concurrency=8, provider_concurrency=4)
+
+    def tearDown(self):
+        self.engine.close()
+        for p in self.patches:
+            p.stop()
+        constants.PORTS["claude"] = self._orig_port
+
+
+class TestPrefetchEngine(_EngineTestCase):
+    def test_result_shape_matches_dashboard_contract(self):
+        with ManagementStub(accounts=3) as stub:
+            constants.PORTS["claude"] = stub.port
+            res = self.engine.prefetch(Path("."), ["claude"], fetch_quota=True, fetch_check=True)["claude"]
+        for key in ("status", "auth_data", "usage_data", "auth_error", "models_per_account",
+                    "quota_data", "proxy_models", "usage_source", "usage_snapshot_at"):
+            self.assertIn(key, res)
+        self.assertEqual(res["usage_source"], "live")
+        self.assertEqual(len(res["auth_data"]["files"]), 3)
+        self.assertEqual(len(res["models_per_account"]), 3)
+        self.assertEqual(len(res["quota_data"]), 3)
+        for q in res["quota_data"].values():
+            self.assertEqual(q["five_hour"]["used_pct"], 12)
+        self.assertEqual(len(res["proxy_models"]["data"]), 2)
+
+    def test_provider_concurrency_limit_is_respected(self):
+        with ManagementStub(accounts=20, latency=0.02) as stub:
+            constants.PORTS["claude"] = stub.port
+            self.engine.prefetch(Path("."), ["claude"], fetch_quota=True, fetch_check=True)
+            self.assertLessEqual(stub.peak_in_flight, 4)
+            self.assertEqual(sum(stub.api_calls.values()), 20)
+
+    def test_no_thread_per_account(self):
+        before = threading.active_count()
+        with ManagementStub(accounts=30, latency=0.01) as stub:
+            constants.PORTS["claude"] = stub.port
+            peak = [0]
+            done = threading.Event()
+
+            def _sample():
+                while not done.is_set():
+                    peak[0] = max(peak[0], threading.active_count())
+                    done.wait(0.002)
+
+            sampler = threading.Thread(target=_sample)
+            sampler.start()
+            try:
+                self.engine.prefetch(Path("."), ["claude"], fetch_quota=True, fetch_check=True)
+            finally:
+                done.set()
+                sampler.join()
+        # client side: loop thread + small executor; the stub server adds
+        # one thread per connection, bounded by provider_concurrency.
+        self.assertLess(peak[0] - before, 30)
+
+    def test_unauthorized_sets_auth_error(self):
+        with ManagementStub(accounts=1, secret="other") as stub:
+            constants.PORTS["claude"] = stub.port
+            res = self.engine.prefetch(Path("."), ["claude"])["claude"]
+        self.assertTrue(res["auth_error"])
+        self.assertIsNone(res["auth_data"])
+
+    def test_stopped_provider_falls_back_to_snapshot(self):
+        stopped = {"provider": "claude", "running": False, "healthy": False}
+        snap = {"usage_data": {"usage": {"total_requests": 1}}, "captured_at_iso": "2026-01-01T00:00:00+00:00"}
+        with patch("prefetch.get_status", return_value=stopped), \
+                patch("prefetch._usage_snapshot_load", return_value=snap):
+            res = self.engine.prefetch(Path("."), ["claude"])["claude"]
+        self.assertEqual(res["usage_source"], "snapshot")
+        self.assertEqual(res["usage_snapshot_at"], "2026-01-01T00:00:00+00:00")
+
+
+    def test_timeout_keeps_completed_providers(self):
+        def _status(base_dir, provider):
+            if provider == "openai":
+                time.sleep(2)
+            return _running(base_dir, provider)
+
+        with ManagementStub(accounts=2) as stub, \
+                patch("prefetch.get_status", side_effect=_status):
+            constants.PORTS["claude"] = stub.port
+            t0 = time.monotonic()
+            res = self.engine.prefetch(Path("."), ["claude", "openai"], timeout=0.5)
+        self.assertLess(time.monotonic() - t0, 1.5)
+        self.assertEqual(res["claude"]["usage_source"], "live")
+        self.assertEqual(len(res["claude"]["auth_data"]["files"]), 2)
+        self.assertIsNone(res["openai"]["status"])
+        self.assertIsNone(res["openai"]["auth_data"])
+
+
+class TestKeepAlive(_EngineTestCase):
+    def test_requests_share_pooled_connection(self):
+        with ManagementStub() as stub:
+            constants.PORTS["claude"] = stub.port
+
+            async def _many():
+                return [await self.engine._management("claude", "cc", "usage") for _ in range(5)]
+
+            results = self.engine.run(_many(), timeout=10)
+            self.assertEqual(len(results), 5)
+            self.assertEqual(self.engine._http.created, 1)
+            self.assertEqual(stub.connections, 1)
+
+
+class TestStaleWhileRevalidate(_EngineTestCase):
+    def _prefetch_quota(self, stub):
+        constants.PORTS["claude"] = stub.port
+        return self.engine.prefetch(Path("."), ["claude"], fetch_quota=True)["claude"]
+
+    def test_fresh_cache_skips_upstream(self):
+        cached = {"five_hour": {"display": "5h", "used_pct": 40, "reset_str": ""}}
+        with patch("prefetch._quota_cache_load_many",
+                   return_value={"idx0": (cached, 5.0), "idx1": (cached, 5.0)}), \
+                ManagementStub(accounts=2) as stub:
+            res = self._prefetch_quota(stub)
+            self.assertEqual(self.engine.wait_revalidations(timeout=2), 0)
+            self.assertEqual(stub.api_calls, {})
+        self.assertTrue(all(q == cached for q in res["quota_data"].values()))
+
+    def test_stale_entry_served_and_revalidated_once(self):
+        cached = {"five_hour": {"display": "5h", "used_pct": 40, "reset_str": ""}}
+        age = constants.QUOTA_CACHE_TTL + 30
+        with patch("prefetch._quota_cache_load_many",
+                   return_value={"idx0": (cached, age), "idx1": (cached, age)}), \
+                patch("prefetch._quota_cache_save") as save, \
+                ManagementStub(accounts=2, latency=0.05) as stub:
+            # two concurrent dashboard refreshes collapse into one revalidation per account
+            second = threading.Thread(target=self._prefetch_quota, args=(stub,))
+            second.start()
+            res = self._prefetch_quota(stub)
+            second.join()
+            self.assertEqual(self.engine.wait_revalidations(timeout=5), 0)
+            self.assertEqual(stub.api_calls, {"idx0": 1, "idx1": 1})
+        for q in res["quota_data"].values():
+            self.assertEqual(q["__stale__"], {"age": int(age)})
+            self.assertEqual(q["five_hour"]["used_pct"], 40)
+        self.assertEqual(save.call_count, 2)
+        self.assertEqual(save.call_args[0][2]["five_hour"]["used_pct"], 12)
+
+    def test_entry_past_max_stale_fetches_synchronously(self):
+        with ManagementStub(accounts=1) as stub:
+            res = self._prefetch_quota(stub)
+        q = res["quota_data"]["claude-user0@example.com.json"]
+        self.assertNotIn("__stale__", q)
+        self.assertEqual(q["five_hour"]["used_pct"], 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
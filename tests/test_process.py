@@ -5,8 +5,13 @@ Uses mocks for external process commands.
 
 import os
 import shutil
+import signal
+import socket
+import subprocess
 import sys
 import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import patch, MagicMock
@@ -19,10 +24,18 @@ from process import (
     remove_pid,
     is_pid_alive,
     resolve_pid_by_port,
+    resolve_pids_by_ports,
+    invalidate_port_pid_cache,
     check_health,
     is_ssh_session,
+    find_proxy_pids,
+    stop_grace_period,
+    terminate_pids,
+    wait_pids_exit,
+    wait_ports_free,
 )
 from constants import IS_WINDOWS
+import process
 
 
 class TestPidFileOperations(unittest.TestCase):
@@ -88,27 +101,95 @@ class TestResolvePidByPort(unittest.TestCase):
         self.assertIsNone(pid)
 
 
+_NET_TCP_HEADER = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+
+
+def _net_tcp_line(port, inode, state="0A"):
+    return "   0: 0100007F:{:04X} 00000000:0000 {} 00000000:00000000 00:00000000 00000000  1000        0 {} 1 0 100 0 0 10 0\n".format(
+        port, state, inode)
+
+
+class TestResolvePidsByPortsProcfs(unittest.TestCase):
+    """Batched resolution against a fake /proc tree (Linux code path)."""
+
+    def setUp(self):
+        if IS_WINDOWS:
+            self.skipTest("Linux-only test")
+        self.root = Path(tempfile.mkdtemp(prefix="ccproxy_proc_"))
+        (self.root / "net").mkdir()
+        (self.root / "net" / "tcp").write_text(
+            _NET_TCP_HEADER
+            + _net_tcp_line(18417, 1001)
+            + _net_tcp_line(18418, 1002, state="01")  # ESTABLISHED, ignored
+            + _net_tcp_line(9999, 1003))
+        (self.root / "net" / "tcp6").write_text(_NET_TCP_HEADER + _net_tcp_line(18418, 1004))
+        self._add_proc(4242, ["socket:[1001]", "/dev/null"])
+        self._add_proc(4343, ["socket:[1004]"])
+        self._add_proc(4444, ["socket:[1003]"])
+        (self.root / "self").mkdir()
+        self.proc_patch = patch.object(process, "_PROC_ROOT", str(self.root))
+        self.proc_patch.start()
+        invalidate_port_pid_cache()
+
+    def tearDown(self):
+        self.proc_patch.stop()
+        invalidate_port_pid_cache()
+        shutil.rmtree(self.root)
+
+    def _add_proc(self, pid, targets):
+        fd_dir = self.root / str(pid) / "fd"
+        fd_dir.mkdir(parents=True)
+        for i, target in enumerate(targets):
+            os.symlink(target, str(fd_dir / str(i)))
+
+    @patch("process.subprocess.run")
+    def test_single_pass_resolves_ipv4_and_ipv6(self, mock_run):
+        result = resolve_pids_by_ports([18417, 18418, 18419])
+        self.assertEqual(result, {18417: 4242, 18418: 4343, 18419: None})
+        mock_run.assert_not_called()
+
+    def test_resolve_pid_by_port_uses_batched_map(self):
+        self.assertEqual(resolve_pid_by_port(9999), 4444)
+
+    def test_results_cached_until_invalidated(self):
+        self.assertEqual(resolve_pids_by_ports([18417])[18417], 4242)
+        shutil.rmtree(str(self.root / "4242"))
+        self.assertEqual(resolve_pids_by_ports([18417])[18417], 4242)
+        invalidate_port_pid_cache()
+        self.assertIsNone(resolve_pids_by_ports([18417])[18417])
+
+    @patch("process._resolve_pid_lsof", return_value=None)
+    @patch("process._resolve_pid_ss", return_value=777)
+    def test_falls_back_to_ss_when_proc_unreadable(self, mock_ss, mock_lsof):
+        shutil.rmtree(str(self.root / "net"))
+        self.assertEqual(resolve_pids_by_ports([18417]), {18417: 777})
+        self.assertTrue(mock_ss.called)
+
+
+def _pool_returning(status=None, error=None):
+    pool = MagicMock()
+    if error is not None:
+        pool.request.side_effect = error
+    else:
+        pool.request.return_value = (status, "", {}, b"")
+    return pool
+
+
 class TestCheckHealth(unittest.TestCase):
-    @patch("urllib.request.urlopen")
-    def test_healthy(self, mock_urlopen):
-        mock_resp = MagicMock()
-        mock_resp.status = 200
-        mock_resp.__enter__ = MagicMock(return_value=mock_resp)
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
+    @patch("process.get_pool", return_value=_pool_returning(200))
+    def test_healthy(self, _):
         self.assertTrue(check_health("claude"))
 
-    @patch("urllib.request.urlopen")
-    def test_unhealthy_500(self, mock_urlopen):
-        mock_resp = MagicMock()
-        mock_resp.status = 500
-        mock_resp.__enter__ = MagicMock(return_value=mock_resp)
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
+    @patch("process.get_pool", return_value=_pool_returning(404))
+    def test_unhealthy_4xx(self, _):
         self.assertFalse(check_health("claude"))
 
-    @patch("urllib.request.urlopen", side_effect=Exception("connection refused"))
-    def test_unreachable(self, mock_urlopen):
+    @patch("process.get_pool", return_value=_pool_returning(500))
+    def test_unhealthy_500(self, _):
+        self.assertFalse(check_health("claude"))
+
+    @patch("process.get_pool", return_value=_pool_returning(error=Exception("connection refused")))
+    def test_unreachable(self, _):
         self.assertFalse(check_health("claude"))
 
 
@@ -129,5 +210,100 @@ class TestIsSSHSession(unittest.TestCase):
             os.environ.update(env_backup)
 
 
+_IGNORE_TERM = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(60)"
+
+
+@unittest.skipIf(IS_WINDOWS, "POSIX signals")
+class TestTerminatePids(unittest.TestCase):
+    def setUp(self):
+        self.procs = []
+
+    def tearDown(self):
+        for proc in self.procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+    def _spawn(self, code="import time; print('ready', flush=True); time.sleep(60)"):
+        proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE)
+        proc.stdout.readline()  # signal handlers are installed
+        self.procs.append(proc)
+        return proc
+
+    def test_sigterm_all_at_once(self):
+        procs = [self._spawn() for _ in range(3)]
+        start = time.monotonic()
+        out = terminate_pids([p.pid for p in procs], grace=5)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(out, {"killed": [], "alive": []})
+
+    def test_escalates_to_sigkill_after_grace(self):
+        stubborn, polite = self._spawn(_IGNORE_TERM), self._spawn()
+        start = time.monotonic()
+        out = terminate_pids([stubborn.pid, polite.pid], grace=0.3)
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(out, {"killed": [stubborn.pid], "alive": []})
+
+    def test_polling_fallback_without_pidfd(self):
+        proc = self._spawn()
+        with patch("process._open_pidfds", return_value={}):
+            os.kill(proc.pid, signal.SIGTERM)
+            self.assertEqual(wait_pids_exit([proc.pid], 2.0), set())
+
+    def test_wait_reports_survivors(self):
+        proc = self._spawn()
+        self.assertEqual(wait_pids_exit([proc.pid], 0.05), {proc.pid})
+
+    def test_find_proxy_pids_matches_binary_name(self):
+        tmp = tempfile.mkdtemp(prefix="ccproxy_fp_")
+        try:
+            script = os.path.join(tmp, "cli-proxy-api")
+            with open(script, "w") as f:
+                f.write("import time; print('ready', flush=True); time.sleep(60)\n")
+            proc = subprocess.Popen([sys.executable, script], stdout=subprocess.PIPE)
+            self.procs.append(proc)
+            proc.stdout.readline()
+            other = self._spawn()
+            pids = find_proxy_pids()
+            if pids is None:
+                self.skipTest("/proc not available")
+            self.assertIn(proc.pid, pids)
+            self.assertNotIn(other.pid, pids)
+        finally:
+            shutil.rmtree(tmp)
+
+
+class TestWaitPortsFree(unittest.TestCase):
+    def test_returns_once_listener_closes(self):
+        srv = socket.socket()
+        srv.bind(("127.0.0.1", 0))
+        srv.listen(1)
+        port = srv.getsockname()[1]
+        timer = threading.Timer(0.1, srv.close)
+        timer.start()
+        try:
+            start = time.monotonic()
+            self.assertEqual(wait_ports_free([port], timeout=2.0), set())
+            self.assertLess(time.monotonic() - start, 1.0)
+        finally:
+            timer.cancel()
+            srv.close()
+
+    def test_held_port_reported(self):
+        with socket.socket() as srv:
+            srv.bind(("127.0.0.1", 0))
+            srv.listen(1)
+            port = srv.getsockname()[1]
+            self.assertEqual(wait_ports_free([port], timeout=0.05), {port})
+
+
+class TestStopGracePeriod(unittest.TestCase):
+    def test_env_override_and_default(self):
+        with patch.dict(os.environ, {"CC_PROXY_STOP_GRACE": "0.5"}):
+            self.assertEqual(stop_grace_period(), 0.5)
+        with patch.dict(os.environ, {"CC_PROXY_STOP_GRACE": "soon"}):
+            self.assertEqual(stop_grace_period(), process.STOP_GRACE_DEFAULT)
+
+
 if __name__ == "__main__":
     unittest.main()
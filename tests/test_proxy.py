@@ -1,23 +1,76 @@
 """
 Tests for core/proxy.py — proxy lifecycle, version detection, status reporting.
-Uses mocks for subprocess and HTTP calls.
+Uses mocks for subprocess and HTTP calls; start_many runs against a fake
+cli-proxy-api script that serves HTTP on the configured port.
 """
 
 import os
 import shutil
+import signal
+import socket
 import sys
 import tempfile
+import textwrap
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
 
+import constants
+import process
 from proxy import (
+    _LogTail,
     get_binary_version,
     get_status,
+    start_many,
+    stop_many,
 )
-from constants import PORTS, PROVIDERS
+from constants import IS_WINDOWS, PORTS, PROVIDERS
+
+# Stand-in for cli-proxy-api: reads port / startup delay / exit code / bind
+# error from the -config file it is given, logs like the real binary to
+# stdout (main.log), then serves 200 on every GET.
+_FAKE_BINARY = textwrap.dedent("""\
+    #!{python}
+    import http.server, re, signal, sys, time
+    cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+    get = lambda key, default: (re.search(r"(?m)^" + key + r":\\s*(\\S+)", cfg) or [None, default])[1]
+    time.sleep(float(get("fake-delay", "0")))
+    if get("fake-exit", None):
+        print('level=error msg="config invalid"', flush=True)
+        sys.exit(int(get("fake-exit", "1")))
+    if get("fake-bind-error", None):
+        print('level=error msg="listen tcp 127.0.0.1:' + get("port", "0") + ': bind: address already in use"',
+              flush=True)
+        time.sleep(60)
+    if get("fake-noisy", None):
+        print('level=warning msg="usage plugin failed to start"', flush=True)
+        print('level=error msg="listen tcp 127.0.0.1:1: bind: permission denied"', flush=True)
+    if get("fake-hang", None):
+        time.sleep(60)
+    if get("fake-ignore-term", None):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    class H(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *a):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", int(get("port", "0"))), H)
+    print("API server started successfully on: 127.0.0.1:" + get("port", "0"), flush=True)
+    server.serve_forever()
+""")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
 
 
 class TestGetBinaryVersion(unittest.TestCase):
@@ -81,5 +134,145 @@ class TestGetStatus(unittest.TestCase):
             shutil.rmtree(tmp)
 
 
+
+@unittest.skipIf(IS_WINDOWS, "fake binary is a POSIX script")
+class TestStartMany(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_sm_"))
+        exe = self.tmp / "cli-proxy-api"
+        exe.write_text(_FAKE_BINARY.format(python=sys.executable))
+        exe.chmod(0o755)
+        (self.tmp / "config.yaml").write_text("port: 0\nauth-dir: x\n")
+        self.orig_ports = dict(PORTS)
+        for pvd in PROVIDERS:
+            constants.PORTS[pvd] = _free_port()
+        process.invalidate_port_pid_cache()
+        self.results = {}
+        self.env = patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(self.tmp / "tokens")})
+        self.env.start()
+
+    def tearDown(self):
+        for r in self.results.values():
+            if r.get("pid") and not r.get("reused"):
+                try:
+                    os.killpg(r["pid"], signal.SIGKILL)
+                except OSError:
+                    pass
+        self.env.stop()
+        constants.PORTS.update(self.orig_ports)
+        process.invalidate_port_pid_cache()
+        shutil.rmtree(str(self.tmp))
+
+    def _config(self, provider, extra):
+        d = self.tmp / "configs" / provider
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "config.yaml").write_text("port: 0\nauth-dir: x\n" + extra)
+
+    def _start(self, providers, **kw):
+        self.results = start_many(self.tmp, providers, quiet=True, **kw)
+        return self.results
+
+    def test_readiness_waits_overlap(self):
+        providers = ["claude", "openai", "gemini"]
+        for pvd in providers:
+            self._config(pvd, "fake-delay: 0.6\n")
+        start = time.monotonic()
+        res = self._start(providers)
+        elapsed = time.monotonic() - start
+        self.assertTrue(all(res[p]["ok"] for p in providers), res)
+        self.assertLess(elapsed, 1.5)  # sequential would be >= 1.8s
+        for pvd in providers:
+            self.assertGreaterEqual(res[pvd]["elapsed"], 0.6)
+            pid_file = self.tmp / "configs" / pvd / ".proxy.pid"
+            self.assertEqual(int(pid_file.read_text().strip()), res[pvd]["pid"])
+
+    def test_partial_failure_reported_per_provider(self):
+        self._config("openai", "fake-exit: 3\n")
+        res = self._start(["claude", "openai"])
+        self.assertTrue(res["claude"]["ok"])
+        self.assertFalse(res["openai"]["ok"])
+        self.assertEqual(res["openai"]["reason"], 'exited with code 3: level=error msg="config invalid"')
+
+    def test_ready_soon_after_listening(self):
+        self._config("claude", "fake-delay: 0.3\n")
+        res = self._start(["claude"])
+        self.assertTrue(res["claude"]["ok"])
+        self.assertLess(res["claude"]["elapsed"], 0.45)  # probes at most 50 ms apart once it binds
+
+    def test_fatal_log_line_fails_fast(self):
+        self._config("gemini", "fake-bind-error: 1\n")
+        start = time.monotonic()
+        res = self._start(["gemini"])
+        self.assertLess(time.monotonic() - start, 1.0)  # not the 3.5s deadline
+        self.assertFalse(res["gemini"]["ok"])
+        self.assertIn("bind: address already in use", res["gemini"]["reason"])
+
+    def test_non_fatal_error_lines_do_not_kill_the_proxy(self):
+        self._config("gemini", "fake-noisy: 1\n")
+        res = self._start(["gemini"])
+        self.assertTrue(res["gemini"]["ok"])
+        self.assertTrue(process.is_pid_alive(process.read_pid(self.tmp, "gemini")))
+
+    def test_log_tail_fatal_levels(self):
+        log = self.tmp / "main.log"
+        log.write_text("")
+        tail = _LogTail(log)
+        with open(str(log), "a") as f:
+            f.write('level=error msg="listen tcp :9: bind: address already in use"\n')
+        self.assertEqual(tail.scan(8317), (None, None))
+        with open(str(log), "a") as f:
+            f.write('level=fatal msg="bad config"\n')
+        self.assertEqual(tail.scan(8317), ("fatal", 'level=fatal msg="bad config"'))
+
+    def test_log_tail_reads_only_new_lines(self):
+        log = self.tmp / "main.log"
+        log.write_text("old: bind: address already in use\n")
+        tail = _LogTail(log)
+        self.assertEqual(tail.scan(), (None, None))
+        with open(str(log), "a") as f:
+            f.write("loading config\nAPI server started successfully on: :8317\npart")
+        self.assertEqual(tail.scan(), ("ready", "API server started successfully on: :8317"))
+        with open(str(log), "a") as f:
+            f.write("ial line\n")
+        self.assertEqual(tail.scan(), (None, None))
+        self.assertEqual(tail.last_line, "partial line")
+
+    def test_shared_deadline(self):
+        self._config("claude", "fake-hang: 1\n")
+        self._config("gemini", "fake-hang: 1\n")
+        start = time.monotonic()
+        res = self._start(["claude", "gemini"], timeout=0.5)
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertFalse(res["claude"]["ok"])
+        self.assertIn("not healthy", res["gemini"]["reason"])
+
+    def test_healthy_proxy_is_reused(self):
+        first = self._start(["claude"])
+        self.assertTrue(first["claude"]["ok"])
+        again = start_many(self.tmp, ["claude"], quiet=True)
+        self.assertTrue(again["claude"]["reused"])
+        self.assertEqual(again["claude"]["pid"], first["claude"]["pid"])
+
+
+    def test_stop_many_frees_ports_together(self):
+        providers = ["claude", "openai"]
+        self._config("openai", "fake-ignore-term: 1\n")
+        res = self._start(providers)
+        self.assertTrue(all(res[p]["ok"] for p in providers), res)
+        start = time.monotonic()
+        with patch("proxy._capture_usage_snapshot_before_stop"):
+            out = stop_many(self.tmp, providers, quiet=True, grace=0.3)
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertFalse(out["claude"]["killed"])
+        self.assertTrue(out["openai"]["killed"])
+        for pvd in providers:
+            self.assertTrue(out[pvd]["port_free"])
+            self.assertTrue(process._pid_exited(res[pvd]["pid"]))
+            self.assertFalse((self.tmp / "configs" / pvd / ".proxy.pid").exists())
+            with socket.socket() as s:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # as the Go binary does
+                s.bind(("127.0.0.1", PORTS[pvd]))  # a restart can bind right away
+
+
 if __name__ == "__main__":
     unittest.main()
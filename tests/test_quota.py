@@ -0,0 +1,107 @@
+"""
+Tests for core/quota.py — SQLite quota store (TTL, stale bound, bulk read,
+eviction, migration from legacy per-account JSON files).
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import quota
+from constants import QUOTA_CACHE_MAX_STALE, QUOTA_CACHE_TTL
+
+
+class _QuotaStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="ccproxy_quota_")
+        self.tmp_patch = patch("quota.tempfile.gettempdir", return_value=self.tmp)
+        self.tmp_patch.start()
+
+    def tearDown(self):
+        conn = getattr(quota._quota_db_local, "conn", None)
+        if conn is not None:
+            conn.close()
+            quota._quota_db_local.conn = None
+        self.tmp_patch.stop()
+        shutil.rmtree(self.tmp)
+
+    def _backdate(self, provider, auth_index, age):
+        quota._quota_db().execute(
+            "UPDATE quota SET fetched_at = ? WHERE provider = ? AND auth_index = ?",
+            (time.time() - age, provider, auth_index))
+
+
+class TestQuotaStore(_QuotaStoreTestCase):
+    def test_save_and_load_roundtrip(self):
+        quota._quota_cache_save("claude", "idx0", {"five_hour": {"used_pct": 12}})
+        self.assertEqual(quota._quota_cache_load("claude", "idx0"), {"five_hour": {"used_pct": 12}})
+        self.assertIsNone(quota._quota_cache_load("claude", "idx1"))
+        self.assertIsNone(quota._quota_cache_load("codex", "idx0"))
+
+    def test_fresh_and_stale_bounds(self):
+        quota._quota_cache_save("claude", "idx0", {"k": 1})
+        self._backdate("claude", "idx0", QUOTA_CACHE_TTL + 10)
+        self.assertIsNone(quota._quota_cache_load("claude", "idx0"))
+        data, age = quota._quota_cache_load_entry("claude", "idx0")
+        self.assertEqual(data, {"k": 1})
+        self.assertGreaterEqual(age, QUOTA_CACHE_TTL)
+        self._backdate("claude", "idx0", QUOTA_CACHE_MAX_STALE + 10)
+        self.assertEqual(quota._quota_cache_load_entry("claude", "idx0"), (None, None))
+
+    def test_load_many_is_per_provider(self):
+        for i in range(5):
+            quota._quota_cache_save("claude", "idx{}".format(i), {"n": i})
+        quota._quota_cache_save("codex", "idx0", {"n": 99})
+        self._backdate("claude", "idx4", QUOTA_CACHE_MAX_STALE + 10)
+        many = quota._quota_cache_load_many("claude")
+        self.assertEqual(sorted(many), ["idx0", "idx1", "idx2", "idx3"])
+        self.assertEqual(many["idx2"][0], {"n": 2})
+
+    def test_evict_drops_expired_rows(self):
+        quota._quota_cache_save("claude", "old", {})
+        quota._quota_cache_save("claude", "new", {})
+        self._backdate("claude", "old", QUOTA_CACHE_MAX_STALE + 10)
+        quota._quota_cache_evict()
+        rows = quota._quota_db().execute("SELECT auth_index FROM quota").fetchall()
+        self.assertEqual(rows, [("new",)])
+
+    def test_mark_stale_copies(self):
+        data = {"five_hour": {}}
+        marked = quota._quota_mark_stale(data, 75.5)
+        self.assertEqual(marked["__stale__"], {"age": 75})
+        self.assertNotIn("__stale__", data)
+
+
+class TestQuotaLegacyMigration(_QuotaStoreTestCase):
+    def _write_legacy(self, provider, auth_index, age, data):
+        path = quota._quota_legacy_path(provider, auth_index)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time() - age, "data": data}, f)
+        return path
+
+    def test_legacy_file_imported_once_and_removed(self):
+        path = self._write_legacy("claude", "idx0", 5, {"k": "legacy"})
+        self.assertTrue(path.startswith(self.tmp))
+        many = quota._quota_cache_load_many("claude", ["idx0", "idx1"])
+        self.assertEqual(many["idx0"][0], {"k": "legacy"})
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(quota._quota_cache_load("claude", "idx0"), {"k": "legacy"})
+
+    def test_expired_legacy_files_removed_on_open(self):
+        path = self._write_legacy("claude", "gone", 0, {})
+        old = time.time() - QUOTA_CACHE_MAX_STALE - 10
+        os.utime(path, (old, old))
+        quota._quota_db()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
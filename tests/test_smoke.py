@@ -82,6 +82,9 @@ class TestCoreImports(unittest.TestCase):
     def test_import_api(self):
         import api  # noqa: F401
 
+    def test_import_httppool(self):
+        import httppool  # noqa: F401
+
     def test_import_proxy(self):
         import proxy  # noqa: F401
 
@@ -94,12 +97,48 @@ class TestCoreImports(unittest.TestCase):
     def test_import_display(self):
         import display  # noqa: F401
 
+    def test_import_locks(self):
+        import locks  # noqa: F401
+
+    def test_import_ledger(self):
+        import ledger  # noqa: F401
+
     def test_import_quota(self):
         import quota  # noqa: F401
 
+    def test_import_prefetch(self):
+        import prefetch  # noqa: F401
+
     def test_import_tui(self):
         import tui  # noqa: F401
 
+    def test_import_daemon(self):
+        import daemon  # noqa: F401
+
+    def test_import_bluegreen(self):
+        import bluegreen  # noqa: F401
+
+    def test_import_shim(self):
+        import shim  # noqa: F401
+
+    def test_import_hotreload(self):
+        import hotreload  # noqa: F401
+
+    def test_import_tokenwatch(self):
+        import tokenwatch  # noqa: F401
+
+    def test_import_fastrun(self):
+        import fastrun  # noqa: F401
+
+    def test_import_overlap(self):
+        import overlap  # noqa: F401
+
+    def test_import_activator(self):
+        import activator  # noqa: F401
+
+    def test_import_supervisor(self):
+        import supervisor  # noqa: F401
+
     def test_import_cc_proxy(self):
         import cc_proxy  # noqa: F401
 
@@ -0,0 +1,247 @@
+"""
+Tests for core/supervisor.py — restart of crashed providers with backoff,
+the crash-loop breaker, intentional stops, unresponsive binaries and the
+status dashboard's supervision line (fake cli-proxy-api).
+"""
+
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import constants
+import process
+import supervisor
+from constants import IS_WINDOWS, PORTS, PROVIDERS
+from display import _fmt_supervision, _strip_ansi
+from paths import get_supervisor_resume_file
+from process import read_pid, read_supervisor_state, supervisor_pid
+from proxy import get_status, start_proxy, stop_many
+from supervisor import BACKOFF_MAX, Supervisor, backoff_delay
+
+# Stand-in for cli-proxy-api: `fake-exit` exits with code 3 before binding,
+# `fake-crash-after` serves that many seconds and then exits with code 3.
+_FAKE_BINARY = textwrap.dedent("""\
+    #!{python}
+    import http.server, os, re, sys, threading, time
+    cfg = open(sys.argv[sys.argv.index("-config") + 1]).read()
+    get = lambda key, default: (re.search(r"(?m)^" + key + r":\\s*(\\S+)", cfg) or [None, default])[1]
+    if get("fake-exit", None):
+        sys.exit(3)
+
+    class H(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *a):
+            pass
+
+    crash_after = get("fake-crash-after", None)
+    if crash_after:
+        threading.Timer(float(crash_after), lambda: os._exit(3)).start()
+    server = http.server.HTTPServer(("127.0.0.1", int(get("port", "0"))), H)
+    print("API server started successfully on: 127.0.0.1:" + get("port", "0"), flush=True)
+    server.serve_forever()
+""")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _FixedRng(object):
+    def __init__(self, value):
+        self.value = value
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.value
+
+
+class TestBackoff(unittest.TestCase):
+    def test_doubles_with_jitter_up_to_the_cap(self):
+        self.assertEqual(backoff_delay(1, _FixedRng(0.0)), 0.5)
+        self.assertEqual(backoff_delay(1, _FixedRng(1.0)), 1.0)
+        self.assertEqual(backoff_delay(4, _FixedRng(1.0)), 8.0)
+        self.assertEqual(backoff_delay(20, _FixedRng(1.0)), BACKOFF_MAX)
+        self.assertEqual(backoff_delay(20, _FixedRng(0.0)), BACKOFF_MAX / 2)
+
+
+class TestFmtSupervision(unittest.TestCase):
+    def test_states(self):
+        now = 10000.0
+        running = {"state": "running", "since": now - 7500, "restarts": 3}
+        self.assertEqual(_strip_ansi(_fmt_supervision(running, now)), "  supervised, up 2h05m, 3 restarts")
+        backoff = {"state": "backoff", "next_start": now + 8, "restarts": 1}
+        self.assertEqual(_strip_ansi(_fmt_supervision(backoff, now)), "  restarting in 8s (1 restart)")
+        broken = {"state": "broken", "failures": 5, "last_exit": "exited with code 3"}
+        self.assertEqual(_strip_ansi(_fmt_supervision(broken, now)),
+                         "  crash loop (5 failures, last: exited with code 3)")
+
+
+@unittest.skipIf(IS_WINDOWS, "fake binary is a POSIX script")
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_sup_"))
+        exe = self.tmp / "cli-proxy-api"
+        exe.write_text(_FAKE_BINARY.format(python=sys.executable))
+        exe.chmod(0o755)
+        (self.tmp / "config.yaml").write_text("port: 0\nauth-dir: x\n")
+        self.orig_ports = dict(PORTS)
+        for pvd in PROVIDERS:
+            constants.PORTS[pvd] = _free_port()
+        process.invalidate_port_pid_cache()
+        self.snapshots = []
+        self.patches = [
+            patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(self.tmp / "tokens"),
+                                    "CC_PROXY_CRASH_LOOP_LIMIT": "3"}),
+            patch("supervisor._capture_usage_snapshot_before_stop",
+                  side_effect=lambda base_dir, pvd, quiet=False: self.snapshots.append(pvd)),
+            patch.object(supervisor, "SUPERVISE_TICK", 0.05),
+            patch.object(supervisor, "BACKOFF_BASE", 0.05),
+        ]
+        for p in self.patches:
+            p.start()
+        self.sup = None
+
+    def tearDown(self):
+        if self.sup is not None:
+            self.sup.stop()
+            self.thread.join(10)
+            self.sup.shutdown()
+        for p in reversed(self.patches):
+            p.stop()
+        for pvd in PROVIDERS:
+            pid = read_pid(self.tmp, pvd)
+            if pid:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+        constants.PORTS.update(self.orig_ports)
+        process.invalidate_port_pid_cache()
+        shutil.rmtree(str(self.tmp))
+
+    def _config(self, extra):
+        d = self.tmp / "configs" / "claude"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "config.yaml").write_text("port: 0\nauth-dir: x\n" + extra)
+
+    def _serve(self):
+        self.sup = Supervisor(self.tmp, ["claude"])
+        self.thread = threading.Thread(target=self.sup.serve, daemon=True)
+        self.thread.start()
+        return self.sup
+
+    def _info(self):
+        return read_supervisor_state(self.tmp).get("providers", {}).get("claude", {})
+
+    def _wait(self, cond, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not cond():
+            self.assertLess(time.monotonic(), deadline, "timed out; state {}".format(self._info()))
+            time.sleep(0.02)
+
+    def test_crashed_provider_is_restarted(self):
+        self._config("fake-crash-after: 0.5\n")
+        self._serve()
+        self._wait(lambda: self._info().get("state") == "running")
+        first = self._info()["pid"]
+        self._wait(lambda: self._info().get("restarts", 0) >= 1 and self._info().get("state") == "running")
+        info = self._info()
+        self.assertNotEqual(info["pid"], first)
+        self.assertEqual(info["last_exit"], "exited with code 3")
+        self.assertEqual(read_pid(self.tmp, "claude"), info["pid"])
+        self.assertEqual(supervisor_pid(self.tmp), os.getpid())
+        status = get_status(self.tmp, "claude")
+        self.assertTrue(status["running"])
+        self.assertGreaterEqual(status["supervised"]["restarts"], 1)
+
+    def test_crash_loop_opens_breaker(self):
+        self._config("fake-exit: 1\n")
+        sup = self._serve()
+        self._wait(lambda: self._info().get("state") == "broken")
+        launches = sup.children["claude"].launches
+        self.assertEqual(launches, 3)
+        self.assertEqual(self._info()["failures"], 3)
+        self.assertIn("code 3", self._info()["last_exit"])
+        time.sleep(0.3)
+        self.assertEqual(sup.children["claude"].launches, launches)   # no restarts while open
+        self.assertFalse(get_status(self.tmp, "claude")["running"])
+
+    def test_stop_is_not_a_crash_and_start_resumes(self):
+        self._config("")
+        self._serve()
+        self._wait(lambda: self._info().get("state") == "running")
+        pid = self._info()["pid"]
+        with patch("proxy._capture_usage_snapshot_before_stop"):
+            stop_many(self.tmp, ["claude"], quiet=True)
+        self._wait(lambda: self._info().get("state") == "stopped")
+        self.assertEqual(self._info()["restarts"], 0)
+        self.assertFalse(process.is_pid_alive(pid))
+
+        process.invalidate_port_pid_cache()
+        self.assertTrue(start_proxy(self.tmp, "claude", quiet=True))   # via the resume file, no signal
+        self._wait(lambda: self._info().get("state") == "running")
+        self.assertNotEqual(self._info()["pid"], pid)
+        self.assertEqual(read_pid(self.tmp, "claude"), self._info()["pid"])
+        self.assertFalse(get_supervisor_resume_file(self.tmp).exists())
+
+    def test_shutdown_stops_binaries_still_starting(self):
+        self._config("")
+        spawned = []
+
+        def sigterm_while_waiting(launched, t0):
+            spawned.extend(proc for proc, _, _ in launched.values())
+            raise SystemExit(0)
+
+        sup = Supervisor(self.tmp, ["claude"])
+        with patch("supervisor.wait_ready", side_effect=sigterm_while_waiting):
+            with self.assertRaises(SystemExit):
+                sup.tick()
+        self.assertEqual(self._info()["pid"], spawned[0].pid)
+        sup.shutdown()
+        self.assertEqual(len(spawned), 1)
+        self.assertIsNotNone(spawned[0].poll())
+        self.assertEqual(self.snapshots, [])
+
+    def test_unresponsive_binary_is_snapshotted_and_restarted(self):
+        self._config("")
+        with patch.object(supervisor, "SUPERVISE_HEALTH_INTERVAL", 0.05), \
+                patch("supervisor.check_port_health", return_value=False):
+            self._serve()
+            self._wait(lambda: self._info().get("restarts", 0) >= 1)
+        self.assertIn("claude", self.snapshots)
+        self.assertTrue(self._info()["last_exit"].startswith("unresponsive"))
+
+    def test_shutdown_snapshots_and_stops_binaries(self):
+        self._config("")
+        sup = self._serve()
+        self._wait(lambda: self._info().get("state") == "running")
+        pid = self._info()["pid"]
+        sup.stop()
+        self.thread.join(10)
+        sup.shutdown()
+        self.sup = None
+        self.assertEqual(self.snapshots, ["claude"])
+        self.assertFalse(process.is_pid_alive(pid))
+        self.assertIsNone(read_pid(self.tmp, "claude"))
+        self.assertEqual(read_supervisor_state(self.tmp), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Tests for core/tokenwatch.py — inotify and polling token directory watchers
+keeping the token index current, and the TUI's mapping of changed files to
+providers.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import config
+import tokenwatch
+from config import get_token_infos
+from tokenwatch import TokenWatcher
+from tui import _tui_token_providers
+
+
+def _have_inotify():
+    fd = tokenwatch._inotify_open(tempfile.gettempdir())
+    if fd is None:
+        return False
+    os.close(fd)
+    return True
+
+
+class _WatcherCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="ccproxy_tw_"))
+        self.token_dir = self.tmp / "tokens"
+        self.token_dir.mkdir()
+        self.env = patch.dict(os.environ, {"CC_PROXY_TOKEN_DIR": str(self.token_dir)})
+        self.env.start()
+        self._write("claude-a.json", {"email": "a@test.com"})
+        self.events = []
+        self.got_event = threading.Event()
+        self.watcher = None
+
+    def tearDown(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.env.stop()
+        shutil.rmtree(str(self.tmp))
+
+    def _write(self, name, data):
+        tmp = self.token_dir / (name + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(str(tmp), str(self.token_dir / name))
+
+    def _on_change(self, names):
+        self.events.append(names)
+        self.got_event.set()
+
+    def _wait_event(self, timeout=3.0):
+        self.assertTrue(self.got_event.wait(timeout), "no change reported")
+        self.got_event.clear()
+        return self.events[-1]
+
+    def _emails(self):
+        return sorted(t["email"] for t in get_token_infos(self.tmp, "claude"))
+
+
+@unittest.skipUnless(_have_inotify(), "inotify unavailable")
+class TestInotifyWatcher(_WatcherCase):
+    def setUp(self):
+        super(TestInotifyWatcher, self).setUp()
+        self.watcher = TokenWatcher(self.tmp, self._on_change).start()
+        self.assertEqual(self.watcher.mode, "inotify")
+
+    def test_new_file_is_reported_quickly(self):
+        t0 = time.monotonic()
+        self._write("claude-b.json", {"email": "b@test.com"})
+        self.assertEqual(self._wait_event(), {"claude-b.json"})
+        self.assertLess(time.monotonic() - t0, 0.5)
+        self.assertEqual(self._emails(), ["a@test.com", "b@test.com"])
+
+    def test_reads_skip_scandir_while_watched(self):
+        self._write("claude-a.json", {"email": "a@test.com", "disabled": True})
+        self._wait_event()
+        with patch.object(config.os, "scandir", side_effect=AssertionError("scanned")), \
+                patch("config._read_token_fields", side_effect=AssertionError("parsed")):
+            infos = get_token_infos(self.tmp, "claude")
+        self.assertEqual(infos[0]["status"], "disabled")
+
+    def test_delete_is_reported(self):
+        (self.token_dir / "claude-a.json").unlink()
+        self.assertEqual(self._wait_event(), {"claude-a.json"})
+        self.assertEqual(self._emails(), [])
+
+    def test_nothing_reported_without_changes(self):
+        (self.token_dir / "notes.txt").write_text("not a token")
+        time.sleep(0.2)
+        self.assertEqual(self.events, [])
+
+    def test_stop_restores_scanning(self):
+        self.watcher.stop()
+        self.watcher = None
+        self._write("claude-c.json", {"email": "c@test.com"})
+        self.assertEqual(self._emails(), ["a@test.com", "c@test.com"])
+
+
+class TestPollingWatcher(_WatcherCase):
+    def setUp(self):
+        super(TestPollingWatcher, self).setUp()
+        with patch("tokenwatch._inotify_open", return_value=None):
+            self.watcher = TokenWatcher(self.tmp, self._on_change, poll_interval=0.05).start()
+        self.assertEqual(self.watcher.mode, "poll")
+
+    def test_changes_found_by_polling(self):
+        self._write("claude-b.json", {"email": "b@test.com"})
+        self.assertEqual(self._wait_event(), {"claude-b.json"})
+        (self.token_dir / "claude-a.json").unlink()
+        self.assertEqual(self._wait_event(), {"claude-a.json"})
+        self.assertEqual(self._emails(), ["b@test.com"])
+
+    def test_quiet_directory_reports_nothing(self):
+        time.sleep(0.3)
+        self.assertEqual(self.events, [])
+
+
+class TestTuiTokenProviders(unittest.TestCase):
+    def test_maps_names_to_providers(self):
+        providers = ["openai", "claude", "antigravity", "gemini"]
+        self.assertEqual(_tui_token_providers(providers, {"claude-x.json", "ag-y.json"}),
+                         ["claude", "antigravity"])
+        self.assertEqual(_tui_token_providers(providers, {"codex-z.json"}), ["openai"])
+        self.assertEqual(_tui_token_providers(providers, None), providers)
+
+
+if __name__ == "__main__":
+    unittest.main()
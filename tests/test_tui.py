@@ -0,0 +1,291 @@
+"""
+Tests for core/tui.py — ScreenBuffer differential rendering, the
+event-driven key input, the background refresh worker and batched
+account toggles.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import tui
+from constants import (
+    _TUI_CLEAR, _TUI_CLEAR_EOS, _TUI_HOME, _TUI_KEY_DOWN, _TUI_KEY_ESC, _TUI_KEY_LEFT, _TUI_KEY_UP,
+)
+from tui import ScreenBuffer, TuiInput, _TuiWorker, _tui_apply_error, _tui_merge_light, _tui_parse_keys
+
+
+class TestScreenBuffer(unittest.TestCase):
+    SIZE = (80, 24)
+
+    def setUp(self):
+        self.r, self.w = os.pipe()
+        self.screen = ScreenBuffer(fd=self.w)
+
+    def tearDown(self):
+        os.close(self.r)
+        os.close(self.w)
+
+    def _render(self, text, size=SIZE):
+        n = self.screen.render(text, size)
+        out = os.read(self.r, 1 << 16).decode("utf-8") if n else ""
+        self.assertEqual(len(out.encode("utf-8")), n)
+        return out
+
+    def test_first_frame_is_full_repaint(self):
+        out = self._render("a\nb\nc\n")
+        self.assertTrue(out.startswith(_TUI_HOME + _TUI_CLEAR))
+        for i, line in enumerate("abc"):
+            self.assertIn("\033[{};1H{}\033[K".format(i + 1, line), out)
+
+    def test_only_changed_lines_rewritten(self):
+        self._render("title 10:00:00\nrow1\nrow2\n")
+        out = self._render("title 10:00:01\nrow1\nrow2\n")
+        self.assertEqual(out, "\033[1;1Htitle 10:00:01\033[K")
+
+    def test_identical_frame_writes_nothing(self):
+        self._render("x\ny\n")
+        self.assertEqual(self.screen.render("x\ny\n", self.SIZE), 0)
+
+    def test_shorter_frame_clears_tail(self):
+        self._render("a\nb\nc\n")
+        out = self._render("a\nb\n")
+        self.assertEqual(out, "\033[3;1H" + _TUI_CLEAR_EOS)
+
+    def test_resize_forces_full_repaint(self):
+        self._render("a\nb\n")
+        out = self._render("a\nb\n", size=(120, 40))
+        self.assertTrue(out.startswith(_TUI_HOME + _TUI_CLEAR))
+        self.assertIn("\033[2;1Hb", out)
+
+    def test_tall_frame_keeps_footer_visible(self):
+        lines = ["line{}".format(i) for i in range(30)]
+        self._render("\n".join(lines), size=(80, 10))
+        self.assertEqual(self.screen._lines, lines[:7] + lines[-3:])
+
+
+
+
+class TestParseKeys(unittest.TestCase):
+    def test_arrow_sequences_and_plain_keys(self):
+        self.assertEqual(_tui_parse_keys("\x1b[Aq\x1bOB ㅁ"),
+                         [_TUI_KEY_UP, "q", _TUI_KEY_DOWN, " ", "ㅁ"])
+
+    def test_staging_keys(self):
+        self.assertEqual(tui._tui_key_to_action(" "), "toggle")
+        for key in ("\r", "\n", "c", "ㅊ"):
+            self.assertEqual(tui._tui_key_to_action(key), "commit")
+        for key in ("x", "ㅌ"):
+            self.assertEqual(tui._tui_key_to_action(key), "discard")
+
+    def test_lone_escape(self):
+        self.assertEqual(_tui_parse_keys("\x1b"), [_TUI_KEY_ESC])
+        self.assertEqual(_tui_parse_keys("\x1bx"), [_TUI_KEY_ESC, "x"])
+
+
+@unittest.skipIf(tui.IS_WINDOWS, "POSIX terminal input")
+class TestTuiInput(unittest.TestCase):
+    def setUp(self):
+        self.master, self.slave = os.openpty()
+        self.inp = TuiInput(fd=self.slave).open()
+
+    def tearDown(self):
+        self.inp.close()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def test_bulk_read_of_several_keys(self):
+        os.write(self.master, "s\x1b[Dㅇw".encode("utf-8"))
+        time.sleep(0.05)
+        keys, resized = self.inp.wait(1.0)
+        self.assertEqual(keys, ["s", _TUI_KEY_LEFT, "ㅇ", "w"])
+        self.assertFalse(resized)
+
+    def test_split_utf8_sequence(self):
+        raw = "ㅂ".encode("utf-8")
+        os.write(self.master, raw[:1])
+        self.assertEqual(self.inp.wait(1.0), ([], False))
+        os.write(self.master, raw[1:])
+        self.assertEqual(self.inp.wait(1.0)[0], ["ㅂ"])
+
+    def test_idle_wait_blocks_until_timeout(self):
+        start = time.monotonic()
+        self.assertEqual(self.inp.wait(0.2), ([], False))
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+        self.assertEqual(self.inp.wakeups, 1)
+
+    def test_wake_from_other_thread(self):
+        threading.Timer(0.05, self.inp.wake).start()
+        start = time.monotonic()
+        self.assertEqual(self.inp.wait(5.0), ([], False))
+        self.assertLess(time.monotonic() - start, 2.0)
+
+    def test_sigwinch_reports_resize(self):
+        import signal
+        os.kill(os.getpid(), signal.SIGWINCH)
+        self.assertEqual(self.inp.wait(1.0), ([], True))
+
+    def test_cbreak_set_once_and_restored(self):
+        import termios
+        import tty
+        self.inp.close()
+        before = termios.tcgetattr(self.slave)
+        calls = []
+        real = tty.setcbreak
+        with patch("tty.setcbreak", side_effect=lambda fd: calls.append(fd) or real(fd)):
+            self.inp = TuiInput(fd=self.slave).open()
+            for _ in range(5):
+                self.inp.wait(0)
+            self.assertEqual(termios.tcgetattr(self.slave)[3] & termios.ICANON, 0)
+            self.inp.close()
+        self.assertEqual(calls, [self.slave])
+        self.assertEqual(termios.tcgetattr(self.slave), before)
+        self.inp = TuiInput(fd=self.slave).open()
+
+
+class TestTuiWorker(unittest.TestCase):
+    def setUp(self):
+        self.worker = _TuiWorker(Path("/nonexistent"))
+
+    def tearDown(self):
+        self.worker.stop()
+
+    def _wait_results(self, n, timeout=5.0):
+        out = []
+        deadline = time.monotonic() + timeout
+        while len(out) < n and time.monotonic() < deadline:
+            out.extend(self.worker.drain())
+            time.sleep(0.01)
+        return out
+
+    def test_submit_returns_immediately_and_result_is_queued(self):
+        gate = threading.Event()
+
+        def slow_fetch(base_dir, provider):
+            gate.wait(5)
+            return {"status": {"provider": provider}}
+
+        with patch("tui._tui_fetch_provider_light", side_effect=slow_fetch):
+            start = time.monotonic()
+            self.assertTrue(self.worker.submit("refresh", "claude", False))
+            self.assertLess(time.monotonic() - start, 0.1)
+            self.assertEqual(self.worker.drain(), [])
+            gate.set()
+            results = self._wait_results(1)
+        self.assertEqual(len(results), 1)
+        kind, pvd, heavy, data, _ = results[0]
+        self.assertEqual((kind, pvd, heavy), ("data", "claude", False))
+        self.assertEqual(data["status"]["provider"], "claude")
+
+    def test_duplicate_jobs_are_dropped_while_pending(self):
+        gate = threading.Event()
+        calls = []
+
+        def slow_fetch(base_dir, provider):
+            calls.append(provider)
+            gate.wait(5)
+            return {}
+
+        with patch("tui._tui_fetch_provider_light", side_effect=slow_fetch):
+            self.assertTrue(self.worker.submit("refresh", "claude", False))
+            self.assertFalse(self.worker.submit("refresh", "claude", False))
+            self.assertTrue(self.worker.submit("refresh", "codex", False))
+            gate.set()
+            self._wait_results(2)
+            self.assertTrue(self.worker.submit("refresh", "claude", False))
+            self._wait_results(1)
+        self.assertEqual(calls, ["claude", "codex", "claude"])
+
+    def test_errors_come_back_as_results(self):
+        with patch("tui._tui_fetch_provider", side_effect=RuntimeError("boom")):
+            self.worker.submit("refresh", "claude", True)
+            results = self._wait_results(1)
+        self.assertEqual(results, [("error", "refresh", ["claude"], "boom")])
+
+    def test_failed_commit_clears_every_batched_provider(self):
+        batch = [("claude", {"name": "a.json"}), ("codex", {"name": "b.json"}), ("claude", {"name": "c.json"})]
+        with patch("tui._tui_apply_toggles", return_value={"claude": (True, "api"), "codex": (True, "api")}), \
+                patch("tui.prefetch_providers", side_effect=RuntimeError("timed out")):
+            self.worker.submit("commit", batch)
+            results = self._wait_results(2)
+        self.assertEqual(results[-1], ("error", "commit", ["claude", "codex"], "timed out"))
+
+        state = {"pending": {"claude": "applying", "codex": "applying", "gemini": "refreshing"}, "message": ""}
+        _tui_apply_error(state, results[-1])
+        self.assertEqual(state["pending"], {"gemini": "refreshing"})
+        self.assertIn("commit failed: timed out", state["message"])
+
+    def test_commit_reports_progress_then_result(self):
+        def fake_apply(base_dir, batch, progress_cb=None):
+            progress_cb("[1/3] writing 1/1")
+            return {"claude": (True, "api")}
+
+        batch = [("claude", {"name": "a.json"})]
+        with patch("tui._tui_apply_toggles", side_effect=fake_apply), \
+                patch("tui.prefetch_providers", return_value={"claude": {"auth_data": {"files": []}}}) as pre:
+            self.worker.submit("commit", batch)
+            results = self._wait_results(3)
+        self.assertEqual([r[0] for r in results], ["message", "message", "committed"])
+        self.assertEqual(results[0][1], "[1/3] writing 1/1")
+        self.assertEqual(results[2][1:3], (batch, {"claude": (True, "api")}))
+        self.assertEqual(pre.call_args[0][1], ["claude"])
+
+
+class TestTuiApplyToggles(unittest.TestCase):
+    def _write(self, base_dir, provider, account):
+        if account.get("broken"):
+            return False, "json parse failed", None, None
+        return True, "saved", Path(account["name"]), True
+
+    def test_one_parallel_reload_per_provider(self):
+        both_running = threading.Barrier(2, timeout=2)
+        calls = []
+
+        def fake_reload(base_dir, provider, changes, progress_cb=None):
+            calls.append((provider, [p.name for p, _ in changes]))
+            both_running.wait()  # breaks (and raises) if providers reload one after another
+            return "api"
+
+        batch = [("claude", {"name": "a.json"}), ("codex", {"name": "c.json"}),
+                 ("claude", {"name": "b.json"})]
+        with patch("tui._tui_write_toggle", side_effect=self._write), \
+                patch("tui.get_status", return_value={"running": True}), \
+                patch("tui.reload_accounts", side_effect=fake_reload):
+            results = tui._tui_apply_toggles(Path("/nonexistent"), batch)
+        self.assertEqual(results, {"claude": (True, "api"), "codex": (True, "api")})
+        self.assertEqual(sorted(calls), [("claude", ["a.json", "b.json"]), ("codex", ["c.json"])])
+
+    def test_write_errors_and_stopped_providers(self):
+        batch = [("claude", {"name": "a.json"}), ("claude", {"name": "bad.json", "broken": True})]
+        with patch("tui._tui_write_toggle", side_effect=self._write), \
+                patch("tui.get_status", return_value={"running": False}), \
+                patch("tui.reload_accounts") as reload:
+            results = tui._tui_apply_toggles(Path("/nonexistent"), batch)
+        reload.assert_not_called()
+        ok, msg = results["claude"]
+        self.assertFalse(ok)
+        self.assertIn("saved", msg)
+        self.assertIn("json parse failed", msg)
+
+
+class TestTuiMergeLight(unittest.TestCase):
+    def test_keeps_heavy_sections(self):
+        cur = {"quota_data": {"a": 1}, "models_per_account": {"a": []}, "proxy_models": {"data": []}}
+        fresh = _tui_merge_light(cur, {"status": {"running": True}})
+        self.assertEqual(fresh["quota_data"], {"a": 1})
+        self.assertEqual(fresh["models_per_account"], {"a": []})
+        self.assertTrue(fresh["status"]["running"])
+
+    def test_fresh_values_win(self):
+        fresh = _tui_merge_light({"quota_data": {"a": 1}}, {"quota_data": {"a": 2}})
+        self.assertEqual(fresh["quota_data"], {"a": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for core/usage.py — incremental UsageAggregator (watermarks, restart reset).
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+from usage import UsageAggregator
+
+
+def _detail(ts, source="a", tok=10, failed=False):
+    return {"timestamp": ts, "source": source, "failed": failed,
+            "tokens": {"input_tokens": tok, "output_tokens": 0, "total_tokens": tok}}
+
+
+def _payload(lists, total=None):
+    """{(api, model): [details]} → /usage payload."""
+    apis = {}
+    for (api, model), details in lists.items():
+        apis.setdefault(api, {"models": {}})["models"][model] = {"details": list(details)}
+    n = sum(len(d) for d in lists.values())
+    return {"usage": {"total_requests": n if total is None else total, "apis": apis}}
+
+
+class TestUsageAggregator(unittest.TestCase):
+    def test_only_new_details_are_folded(self):
+        agg = UsageAggregator()
+        d = [_detail("2026-03-01T10:00:0{}Z".format(i)) for i in range(3)]
+        self.assertEqual(len(agg.update(_payload({("k", "m"): d}))), 3)
+        self.assertEqual(agg.update(_payload({("k", "m"): d})), [])
+        d.append(_detail("2026-03-01T10:00:09Z", source="b", tok=5))
+        added = agg.update(_payload({("k", "m"): d}))
+        self.assertEqual([x[2]["source"] for x in added], ["b"])
+        roll = agg.rollups()
+        self.assertEqual(roll["models"]["m"]["requests"], 4)
+        self.assertEqual(roll["accounts"]["a"]["tokens"], 30)
+        self.assertEqual(roll["accounts"]["b"]["last_tok"], 5)
+
+    def test_equal_timestamps_at_watermark(self):
+        agg = UsageAggregator()
+        ts = "2026-03-01T10:00:00Z"
+        d = [_detail(ts), _detail(ts)]
+        agg.update(_payload({("k", "m"): d}))
+        d.append(_detail(ts, source="c"))
+        added = agg.update(_payload({("k", "m"): d}))
+        self.assertEqual([x[2]["source"] for x in added], ["c"])
+        self.assertEqual(agg.rollups()["models"]["m"]["requests"], 3)
+
+    def test_watermarks_are_per_api_and_model(self):
+        agg = UsageAggregator()
+        agg.update(_payload({("k1", "m"): [_detail("2026-03-01T10:00:05Z")],
+                             ("k2", "m"): [_detail("2026-03-01T10:00:01Z")]}))
+        added = agg.update(_payload({("k1", "m"): [_detail("2026-03-01T10:00:05Z")],
+                                     ("k2", "m"): [_detail("2026-03-01T10:00:01Z"),
+                                                   _detail("2026-03-01T10:00:02Z")]}))
+        self.assertEqual([(a, x["timestamp"]) for a, _, x in added], [("k2", "2026-03-01T10:00:02Z")])
+        self.assertEqual(agg.rollups()["models"]["m"]["requests"], 3)
+
+    def test_restart_resets_rollups(self):
+        agg = UsageAggregator()
+        agg.update(_payload({("k", "m"): [_detail("2026-03-01T10:00:0{}Z".format(i)) for i in range(5)]}))
+        # binary restarted: counters and details start over
+        added = agg.update(_payload({("k", "m"): [_detail("2026-03-01T11:00:00Z")]}))
+        self.assertEqual(len(added), 1)
+        self.assertEqual(agg.restarts, 1)
+        self.assertEqual(agg.rollups()["models"]["m"]["requests"], 1)
+
+    def test_matches_full_scan(self):
+        details = [_detail("2026-03-0{}T10:00:{:02d}Z".format(1 + i % 3, i), source="s{}".format(i % 4),
+                           tok=i, failed=(i % 7 == 0)) for i in range(60)]
+        details.sort(key=lambda d: d["timestamp"])
+        inc = UsageAggregator()
+        for n in range(0, 61, 7):
+            inc.update(_payload({("k", "m"): details[:n]}))
+        inc.update(_payload({("k", "m"): details}))
+        full = UsageAggregator()
+        full.update(_payload({("k", "m"): details}))
+        self.assertEqual(inc.rollups(), full.rollups())
+        self.assertEqual(inc.rollups()["models"]["m"]["fails"], 9)
+
+    def test_ignores_malformed_payload(self):
+        agg = UsageAggregator()
+        self.assertEqual(agg.update(None), [])
+        self.assertEqual(agg.update({"usage": "x"}), [])
+        self.assertEqual(agg.rollups(), {"daily": {}, "models": {}, "accounts": {}})
+
+
+if __name__ == "__main__":
+    unittest.main()